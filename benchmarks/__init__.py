@@ -0,0 +1,4 @@
+"""
+Repeatable performance benchmarks for Jarvis 2.0.
+Run a module directly, e.g. `python -m benchmarks.llm_benchmark --fake`.
+"""
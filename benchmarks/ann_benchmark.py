@@ -0,0 +1,114 @@
+"""
+ANN retrieval benchmark for Jarvis 2.0.
+Builds a clustered synthetic corpus of normalized embeddings (a stand-in for
+sentence-transformer output) and compares exact brute-force search with the
+IVF-flat index (and hnswlib when installed), reporting build time, recall@k
+against brute force and p50/p95 query latency.
+
+Usage:
+    python -m benchmarks.ann_benchmark
+    python -m benchmarks.ann_benchmark --sizes 10000 100000 1000000 --nprobe 16 64 --json out.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from typing import Dict, Any, List, Optional
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.embedding_store import normalize_rows
+from services.ann_index import IVFFlatIndex, HnswIndex, HNSWLIB_AVAILABLE, default_nlist, top_k
+
+CHUNK = 65536
+
+
+def make_corpus(n: int, dim: int, seed: int = 0):
+    """Gaussian mixture (about one cluster per 500 rows), generated in chunks"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(16, n // 500), dim)).astype(np.float32)
+    data = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, CHUNK):
+        size = min(CHUNK, n - start)
+        points = centers[rng.integers(0, len(centers), size)] + 0.35 * rng.standard_normal((size, dim), dtype=np.float32)
+        data[start:start + size] = normalize_rows(points)
+    queries = data[rng.choice(n, 200, replace=False)] + 0.2 * rng.standard_normal((200, dim), dtype=np.float32)
+    return data, normalize_rows(queries).astype(np.float32)
+
+
+def _percentiles(latencies: List[float]) -> Dict[str, float]:
+    ms = np.array(latencies) * 1000
+    return {'p50_ms': round(float(np.percentile(ms, 50)), 3), 'p95_ms': round(float(np.percentile(ms, 95)), 3)}
+
+
+def bench(name: str, n: int, search, queries: np.ndarray, truth: List[set], k: int,
+          build_s: float = 0.0, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    latencies, hits = [], 0
+    for q, exact in zip(queries, truth):
+        start = time.perf_counter()
+        rows = search(q)
+        latencies.append(time.perf_counter() - start)
+        hits += len(exact & set(np.asarray(rows).tolist()))
+    return {'method': name, 'rows': n, 'build_s': round(build_s, 2),
+            f'recall@{k}': round(hits / (len(queries) * k), 4), **_percentiles(latencies), **(extra or {})}
+
+
+def run(sizes: List[int], dim: int = 384, k: int = 10, nprobes: Optional[List[int]] = None,
+        queries_per_size: int = 100) -> List[Dict[str, Any]]:
+    results = []
+    for n in sizes:
+        data, queries = make_corpus(n, dim)
+        queries = queries[:queries_per_size]
+        fetch = lambda rows: data[rows]
+
+        exact = lambda q: top_k(data @ q, k)
+        truth = [set(exact(q).tolist()) for q in queries]
+        results.append(bench("exact", n, exact, queries, truth, k))
+
+        start = time.perf_counter()
+        ivf = IVFFlatIndex(dim, default_nlist(n))
+        sample = data[np.random.default_rng(1).choice(n, min(n, max(20000, 40 * ivf.nlist)), replace=False)]
+        ivf.train(sample)
+        for lo in range(0, n, CHUNK):
+            ivf.add(data[lo:lo + CHUNK], lo)
+        build_s = time.perf_counter() - start
+        for nprobe in nprobes or [ivf.nprobe]:
+            ivf.nprobe = nprobe
+            results.append(bench(f"ivf[nlist={ivf.nlist},nprobe={nprobe}]", n,
+                                 lambda q: ivf.search(q, k, fetch)[0], queries, truth, k, build_s))
+
+        if HNSWLIB_AVAILABLE:
+            start = time.perf_counter()
+            hnsw = HnswIndex(dim, capacity=n)
+            hnsw.add(data, 0)
+            results.append(bench("hnsw", n, lambda q: hnsw.search(q, k, fetch)[0], queries, truth, k,
+                                 time.perf_counter() - start))
+        del data
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Jarvis ANN retrieval benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--dim', type=int, default=384, help="Embedding size (all-MiniLM-L6-v2 = 384)")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--nprobe', type=int, nargs='+', help="IVF lists probed per query (default: index default)")
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--json', dest='json_path')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.dim, args.k, args.nprobe, args.queries)
+    for row in results:
+        print(f"{row['method']:<30} n={row['rows']:>8}  build {row['build_s']:>7.2f}s  "
+              f"recall@{args.k} {row[f'recall@{args.k}']:.3f}  p50 {row['p50_ms']:>8.3f}ms  p95 {row['p95_ms']:>8.3f}ms")
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Concurrent read benchmark for Jarvis 2.0.
+Measures retrieval latency (vector search + metadata fetch on a snapshot)
+on an idle store and while another thread ingests batches into the same
+collection, including seals and a compaction, as a large directory ingest
+would. Reads never take the store lock, so the two distributions should
+stay close.
+
+Usage:
+    python -m benchmarks.concurrent_read_benchmark
+    python -m benchmarks.concurrent_read_benchmark --rows 50000 --ingest 20000 --json out.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import threading
+import numpy as np
+from typing import Dict, Any, List
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import memory_store
+from services.memory_store import MemoryStore
+from benchmarks.ann_benchmark import make_corpus
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    ms = np.array(samples) * 1000
+    return {'reads': len(samples), 'p50_ms': round(float(np.percentile(ms, 50)), 2),
+            'p95_ms': round(float(np.percentile(ms, 95)), 2), 'max_ms': round(float(ms.max()), 2)}
+
+
+def run(rows: int = 20000, ingest: int = 20000, dim: int = 384, k: int = 8,
+        batch: int = 64, reads: int = 200) -> List[Dict[str, Any]]:
+    data, queries = make_corpus(rows + ingest, dim)
+    root = tempfile.mkdtemp()
+    try:
+        # Exact search, so reads cost the same before and after the ingest
+        with patch.object(memory_store, 'ANN_THRESHOLD', rows + ingest + 1):
+            store = MemoryStore(root)
+            docs = store.collection("documents")
+            for i in range(0, rows, 4096):
+                stop = min(rows, i + 4096)
+                docs.extend([{'document': f"chunk {j}"} for j in range(i, stop)], data[i:stop])
+
+            def read_once() -> float:
+                start = time.perf_counter()
+                query = queries[np.random.randint(len(queries))]
+                found, _ = docs.search(query, k)
+                docs.get_many(found)
+                return time.perf_counter() - start
+
+            idle = [read_once() for _ in range(reads)]
+
+            done = threading.Event()
+
+            def writer():
+                for i in range(rows, rows + ingest, batch):
+                    stop = min(rows + ingest, i + batch)
+                    docs.extend([{'document': f"chunk {j}"} for j in range(i, stop)], data[i:stop])
+                docs.compact()
+                done.set()
+
+            started = time.perf_counter()
+            thread = threading.Thread(target=writer)
+            thread.start()
+            busy = []
+            while not done.is_set():
+                busy.append(read_once())
+            thread.join()
+            ingest_s = time.perf_counter() - started
+            store.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    return [{'phase': 'idle', **_percentiles(idle)},
+            {'phase': f'during ingest ({ingest} rows, {ingest_s:.1f} s)', **_percentiles(busy)}]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Jarvis concurrent read benchmark")
+    parser.add_argument('--rows', type=int, default=20000, help="Rows stored before the ingest starts")
+    parser.add_argument('--ingest', type=int, default=20000, help="Rows appended by the writer thread")
+    parser.add_argument('--dim', type=int, default=384, help="Embedding size (all-MiniLM-L6-v2 = 384)")
+    parser.add_argument('--k', type=int, default=8)
+    parser.add_argument('--batch', type=int, default=64, help="Rows per extend() (ingestion batch size)")
+    parser.add_argument('--reads', type=int, default=200, help="Reads measured on the idle store")
+    parser.add_argument('--json', dest='json_path')
+    args = parser.parse_args(argv)
+
+    results = run(args.rows, args.ingest, args.dim, args.k, args.batch, args.reads)
+    for row in results:
+        print(f"{row['phase']:<36} {row['reads']:>6} reads  p50 {row['p50_ms']:>7.2f} ms  "
+              f"p95 {row['p95_ms']:>7.2f} ms  max {row['max_ms']:>7.2f} ms")
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Embedding backend benchmark for Jarvis 2.0.
+Loads each backend in a fresh interpreter and reports import + load time,
+resident memory after loading, encode throughput (sentences/sec) and how
+close its embeddings are to the sentence-transformers reference (minimum
+cosine). Backends whose packages or model files are missing are reported
+as skipped.
+
+Usage:
+    python export_embedding_onnx.py --int8    # once
+    python -m benchmarks.embedding_backend_benchmark
+    python -m benchmarks.embedding_backend_benchmark --sentences 2000 --json out.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+from typing import Dict, Any, List
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BACKENDS = [
+    ("sentence-transformers", {}),
+    ("onnx fp32 / onnxruntime", {'runtime': 'onnxruntime', 'int8': False}),
+    ("onnx int8 / onnxruntime", {'runtime': 'onnxruntime', 'int8': True}),
+    ("onnx fp32 / openvino", {'runtime': 'openvino', 'int8': False}),
+    ("onnx int8 / openvino", {'runtime': 'openvino', 'int8': True}),
+]
+
+WORDS = ("abrir youtube tocar música previsão do tempo amanhã lembrete reunião servidor erro arquivo "
+         "configuração projeto relatório enviar mensagem para Conceição desligar luz sala quanto custa").split()
+
+
+def make_sentences(n: int, seed: int = 0) -> List[str]:
+    rng = np.random.default_rng(seed)
+    return [" ".join(rng.choice(WORDS, rng.integers(3, 24))) for _ in range(n)]
+
+
+def _worker(name: str, options: Dict[str, Any], model: str, onnx_dir: str, sentences: int, batch: int):
+    """Runs in a child process: measures one backend and prints JSON"""
+    import psutil
+    start = time.perf_counter()
+    from services.embedding_backend import SentenceTransformerBackend, OnnxEmbeddingBackend
+    if options:
+        backend = OnnxEmbeddingBackend(onnx_dir, runtime=options['runtime'], int8=options['int8'])
+    else:
+        backend = SentenceTransformerBackend(model)
+    backend.encode(["aquecimento"])
+    load_s = time.perf_counter() - start
+    rss_mb = psutil.Process().memory_info().rss / 2**20
+
+    texts = make_sentences(sentences)
+    start = time.perf_counter()
+    vectors = np.asarray(backend.encode(texts, batch_size=batch), dtype=np.float32)
+    encode_s = time.perf_counter() - start
+    # Vectors go back through a temp file for the closeness check
+    path = os.path.join(tempfile.gettempdir(), f"jarvis_embedding_bench_{os.getpid()}.npy")
+    np.save(path, vectors)
+    print(json.dumps({'backend': name, 'load_s': round(load_s, 2), 'rss_mb': round(rss_mb, 1),
+                      'sentences_per_s': round(sentences / encode_s, 1), 'vectors': path}))
+
+
+def run(model: str = os.path.join("models", "embedding_model"), onnx_dir: str = os.path.join("models", "embedding_onnx"),
+        sentences: int = 500, batch: int = 32) -> List[Dict[str, Any]]:
+    if not os.path.exists(model):
+        model = 'all-MiniLM-L6-v2'
+    results, reference = [], None
+    for name, options in BACKENDS:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.embedding_backend_benchmark", "--worker", name,
+             "--model", model, "--onnx-dir", onnx_dir, "--sentences", str(sentences), "--batch", str(batch)],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        )
+        lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+        if proc.returncode or not lines:
+            error = (proc.stderr.strip().splitlines() or ["failed"])[-1]
+            results.append({'backend': name, 'skipped': error})
+            continue
+        row = json.loads(lines[-1])
+        path = row.pop('vectors')
+        vectors = np.load(path)
+        os.remove(path)
+        if reference is None and not options:
+            reference = vectors
+        if reference is not None:
+            a = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+            b = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+            row['min_cosine'] = round(float((a * b).sum(axis=1).min()), 5)
+        results.append(row)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Jarvis embedding backend benchmark")
+    parser.add_argument('--model', default=os.path.join("models", "embedding_model"))
+    parser.add_argument('--onnx-dir', default=os.path.join("models", "embedding_onnx"))
+    parser.add_argument('--sentences', type=int, default=500)
+    parser.add_argument('--batch', type=int, default=32)
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--json', dest='json_path')
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        _worker(args.worker, dict(BACKENDS)[args.worker], args.model, args.onnx_dir, args.sentences, args.batch)
+        return
+
+    results = run(args.model, args.onnx_dir, args.sentences, args.batch)
+    for row in results:
+        if 'skipped' in row:
+            print(f"{row['backend']:<26} skipped: {row['skipped']}")
+            continue
+        print(f"{row['backend']:<26} load {row['load_s']:>6.2f} s  RSS {row['rss_mb']:>7.1f} MB  "
+              f"{row['sentences_per_s']:>8.1f} sent/s  min cosine {row.get('min_cosine', float('nan')):.5f}")
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
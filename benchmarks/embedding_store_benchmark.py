@@ -0,0 +1,119 @@
+"""
+Embedding store ingestion benchmark for Jarvis 2.0.
+Appends N random embeddings one at a time and in batches to EmbeddingStore
+and compares it with the previous np.vstack-per-insert growth, reporting
+wall time, vectors/sec and bytes copied while growing.
+
+np.vstack is quadratic, so it only runs up to --vstack-limit vectors.
+
+Usage:
+    python -m benchmarks.embedding_store_benchmark
+    python -m benchmarks.embedding_store_benchmark --sizes 10000 100000 1000000 --dim 384 --json out.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from typing import Dict, Any, List
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.embedding_store import EmbeddingStore
+
+CHUNK = 4096  # Inputs are generated (untimed) in chunks so 1M x dim floats never exist at once
+
+
+def _vectors(n: int, dim: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    for start in range(0, n, CHUNK):
+        yield rng.standard_normal((min(CHUNK, n - start), dim), dtype=np.float32)
+
+
+def bench_vstack(n: int, dim: int) -> Dict[str, Any]:
+    """The previous approach: one np.vstack per inserted vector"""
+    matrix = []
+    copied = 0
+    elapsed = 0.0
+    for block in _vectors(n, dim):
+        start = time.perf_counter()
+        for vector in block:
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vector = vector / norm
+            if len(matrix) == 0:
+                matrix = np.array([vector])
+            else:
+                copied += matrix.nbytes
+                matrix = np.vstack([matrix, vector])
+        elapsed += time.perf_counter() - start
+    return _result("vstack", n, elapsed, copied)
+
+
+def bench_append(n: int, dim: int) -> Dict[str, Any]:
+    store = EmbeddingStore(dim=dim)
+    elapsed = 0.0
+    for block in _vectors(n, dim):
+        start = time.perf_counter()
+        for vector in block:
+            store.append(vector)
+        elapsed += time.perf_counter() - start
+    assert len(store) == n
+    return _result("store.append", n, elapsed, store.copied_bytes)
+
+
+def bench_extend(n: int, dim: int, batch_size: int) -> Dict[str, Any]:
+    store = EmbeddingStore(dim=dim)
+    elapsed = 0.0
+    for block in _vectors(n, dim):
+        start = time.perf_counter()
+        for i in range(0, len(block), batch_size):
+            store.extend(block[i:i + batch_size])
+        elapsed += time.perf_counter() - start
+    assert len(store) == n
+    return _result(f"store.extend[{batch_size}]", n, elapsed, store.copied_bytes)
+
+
+def _result(method: str, n: int, elapsed: float, copied: int) -> Dict[str, Any]:
+    return {
+        'method': method,
+        'vectors': n,
+        'seconds': round(elapsed, 3),
+        'vectors_per_sec': round(n / elapsed) if elapsed > 0 else None,
+        'copied_mb': round(copied / 1e6, 1)
+    }
+
+
+def run(sizes: List[int], dim: int = 384, batch_size: int = 64, vstack_limit: int = 10000) -> List[Dict[str, Any]]:
+    results = []
+    for n in sizes:
+        if n <= vstack_limit:
+            results.append(bench_vstack(n, dim))
+        results.append(bench_append(n, dim))
+        results.append(bench_extend(n, dim, batch_size))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Jarvis embedding store benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--dim', type=int, default=384, help="Embedding size (all-MiniLM-L6-v2 = 384)")
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--vstack-limit', type=int, default=10000, help="Largest N for the quadratic baseline")
+    parser.add_argument('--json', dest='json_path')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.dim, args.batch_size, args.vstack_limit)
+    for row in results:
+        print(f"{row['method']:<20} n={row['vectors']:>9}  {row['seconds']:>8.3f}s  "
+              f"{row['vectors_per_sec'] or 0:>10} vec/s  copied {row['copied_mb']:>10} MB")
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""
+LLM latency and throughput benchmark for Jarvis 2.0.
+Drives NLPProcessor.process_text over a fixed corpus of Portuguese commands
+and questions and reports time-to-first-token, tokens/sec, latency
+percentiles, JSON-validity rate and intent accuracy.
+
+Usage:
+    python -m benchmarks.llm_benchmark --fake
+    python -m benchmarks.llm_benchmark --model models/qwen2-1_5b-instruct-q4_k_m.gguf --n-threads 6 --n-batch 256 --json out.json --csv out.csv
+"""
+
+import os
+import re
+import sys
+import csv
+import json
+import time
+import asyncio
+import argparse
+import logging
+import zlib
+import math
+from dataclasses import dataclass, asdict, field
+from typing import List, Dict, Any, Optional
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation_manager import ConversationContext, IntentType
+from nlp_processor import NLPProcessor, ProcessingMode
+
+logger = logging.getLogger(__name__)
+
+# (text, base intent from keyword routing, processing mode, expected final intent)
+CORPUS = [
+    ("abrir youtube", IntentType.DIRECT_COMMAND, ProcessingMode.FAST, IntentType.DIRECT_COMMAND),
+    ("fechar o navegador", IntentType.DIRECT_COMMAND, ProcessingMode.FAST, IntentType.DIRECT_COMMAND),
+    ("aumentar o volume para cinquenta", IntentType.DIRECT_COMMAND, ProcessingMode.FAST, IntentType.DIRECT_COMMAND),
+    ("tocar música no spotify", IntentType.DIRECT_COMMAND, ProcessingMode.FAST, IntentType.DIRECT_COMMAND),
+    ("pesquisar previsão do tempo em são paulo", IntentType.DIRECT_COMMAND, ProcessingMode.FAST, IntentType.DIRECT_COMMAND),
+    ("tirar um print da tela", IntentType.DIRECT_COMMAND, ProcessingMode.FAST, IntentType.DIRECT_COMMAND),
+    ("que horas são", IntentType.TIME_QUERY, ProcessingMode.FAST, IntentType.TIME_QUERY),
+    ("que dia é hoje", IntentType.DATE_QUERY, ProcessingMode.FAST, IntentType.DATE_QUERY),
+    ("o que é inteligência artificial", IntentType.CONVERSATIONAL_QUERY, ProcessingMode.DETAILED, IntentType.CONVERSATIONAL_QUERY),
+    ("como funciona um motor elétrico", IntentType.CONVERSATIONAL_QUERY, ProcessingMode.DETAILED, IntentType.CONVERSATIONAL_QUERY),
+    ("qual a capital da austrália", IntentType.CONVERSATIONAL_QUERY, ProcessingMode.DETAILED, IntentType.CONVERSATIONAL_QUERY),
+    ("me explique o que é machine learning", IntentType.CONVERSATIONAL_QUERY, ProcessingMode.DETAILED, IntentType.CONVERSATIONAL_QUERY),
+    ("quem foi santos dumont", IntentType.CONVERSATIONAL_QUERY, ProcessingMode.DETAILED, IntentType.CONVERSATIONAL_QUERY),
+    ("por que o céu é azul", IntentType.CONVERSATIONAL_QUERY, ProcessingMode.DETAILED, IntentType.CONVERSATIONAL_QUERY),
+    ("meu pc está muito lento", IntentType.CONVERSATIONAL_QUERY, ProcessingMode.DETAILED, IntentType.INDIRECT_SUGGESTION),
+    ("está muito barulhento aqui", IntentType.CONVERSATIONAL_QUERY, ProcessingMode.DETAILED, IntentType.INDIRECT_SUGGESTION),
+    ("estou com frio", IntentType.CONVERSATIONAL_QUERY, ProcessingMode.DETAILED, IntentType.CONVERSATIONAL_QUERY),
+    ("conte uma piada", IntentType.CONVERSATIONAL_QUERY, ProcessingMode.DETAILED, IntentType.CONVERSATIONAL_QUERY),
+    ("qual é a diferença entre ram e ssd", IntentType.CONVERSATIONAL_QUERY, ProcessingMode.DETAILED, IntentType.CONVERSATIONAL_QUERY),
+    ("obrigado pela ajuda", IntentType.CONVERSATIONAL_QUERY, ProcessingMode.DETAILED, IntentType.EMOTIONAL_EXPRESSION),
+]
+
+
+class FakeLlama:
+    """
+    Deterministic stand-in for llama_cpp.Llama.
+    Produces a JSON answer derived from the user text, streams it in
+    fixed-size pieces and can simulate prompt-processing and per-token
+    decode time so the harness can be exercised in CI without a model file.
+    """
+    RULES = [
+        (r'\b(lento|barulh)', 'indirect_suggestion'),
+        (r'\b(obrigad|valeu)', 'emotional_expression'),
+        (r'\b(horas|horário)\b', 'time_query'),
+        (r'\bque dia\b', 'date_query'),
+        (r'\b(abrir|fechar|aumentar|diminuir|tocar|pesquisar|print)\b', 'direct_command'),
+    ]
+
+    def __init__(self, prompt_ms_per_token: float = 0.0, decode_ms_per_token: float = 0.0,
+                 chars_per_token: int = 4, invalid_json_every: int = 0, busy: bool = False,
+                 n_ctx: Optional[int] = None):
+        self.prompt_ms_per_token = prompt_ms_per_token
+        self.decode_ms_per_token = decode_ms_per_token
+        self.chars_per_token = chars_per_token
+        self.invalid_json_every = invalid_json_every
+        self.busy = busy  # Spin instead of sleeping so simulated decode burns CPU like a real model
+        self.n_ctx = n_ctx  # Prompts that do not fit with max_tokens are rejected, as llama-cpp does
+        self.calls = 0
+
+    def tokenize(self, data: bytes, add_bos: bool = True) -> List[int]:
+        # Whitespace tokenizer with stable ids
+        return [zlib.crc32(w) & 0xFFFF for w in data.split()]
+
+    def _answer(self, prompt: str) -> str:
+        users = re.findall(r'User: "([^"]*)"', prompt)
+        text = users[-1].lower() if users else ""
+        intent = 'conversational_query'
+        for pattern, candidate in self.RULES:
+            if re.search(pattern, text):
+                intent = candidate
+                break
+        answer = json.dumps({
+            "intent_classification": intent,
+            "confidence": 0.9,
+            "suggested_response": f"Resposta simulada para {text}.",
+            "parameters": {}
+        }, ensure_ascii=False)
+
+        if self.invalid_json_every and self.calls % self.invalid_json_every == 0:
+            answer = answer[:-1]  # Truncated JSON, as a model hitting max_tokens would produce
+        return answer
+
+    def _sleep_ms(self, ms: float):
+        if ms <= 0:
+            return
+        if self.busy:
+            end = time.thread_time() + ms / 1000
+            while time.thread_time() < end:
+                pass
+        else:
+            time.sleep(ms / 1000)
+
+    def __call__(self, prompt: str, max_tokens: int = 150, stream: bool = False, **kwargs):
+        self.calls += 1
+        answer = self._answer(prompt)
+        pieces = [answer[i:i + self.chars_per_token] for i in range(0, len(answer), self.chars_per_token)]
+        pieces = pieces[:max_tokens]
+        prompt_tokens = len(self.tokenize(prompt.encode('utf-8')))
+        if self.n_ctx and prompt_tokens + max_tokens > self.n_ctx:
+            raise ValueError(f"Requested tokens ({prompt_tokens + max_tokens}) exceed context window of {self.n_ctx}")
+
+        if stream:
+            def generate():
+                self._sleep_ms(prompt_tokens * self.prompt_ms_per_token)
+                for piece in pieces:
+                    self._sleep_ms(self.decode_ms_per_token)
+                    yield {'choices': [{'text': piece}]}
+            return generate()
+
+        self._sleep_ms(prompt_tokens * self.prompt_ms_per_token + len(pieces) * self.decode_ms_per_token)
+        return {
+            'choices': [{'text': "".join(pieces)}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': len(pieces)}
+        }
+
+
+class InstrumentedLlama:
+    """Wraps a Llama-like backend and records timing of the raw generation"""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.reset()
+
+    def reset(self):
+        self.start = None
+        self.first_token = None
+        self.end = None
+        self.tokens = 0
+        self.text = ""
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    def __call__(self, prompt: str, stream: bool = False, **kwargs):
+        self.reset()
+        self.start = time.perf_counter()
+        response = self.inner(prompt, stream=stream, **kwargs)
+
+        if not stream:
+            self.end = self.first_token = time.perf_counter()
+            choices = response.get('choices') or [{}]
+            self.text = choices[0].get('text', '')
+            usage = response.get('usage') or {}
+            self.tokens = usage.get('completion_tokens') or len(self.inner.tokenize(self.text.encode('utf-8')))
+            return response
+
+        def wrapped():
+            for chunk in response:
+                if self.first_token is None:
+                    self.first_token = time.perf_counter()
+                if chunk.get('choices'):
+                    self.text += chunk['choices'][0].get('text', '')
+                    self.tokens += 1
+                yield chunk
+            self.end = time.perf_counter()
+        return wrapped()
+
+
+@dataclass
+class SampleResult:
+    text: str
+    expected_intent: str
+    predicted_intent: str
+    latency_ms: float
+    llm_called: bool
+    ttft_ms: Optional[float] = None
+    tokens: int = 0
+    tokens_per_sec: Optional[float] = None
+    json_valid: Optional[bool] = None
+
+@dataclass
+class BenchmarkReport:
+    label: str
+    samples: List[SampleResult] = field(default_factory=list)
+    config: Dict[str, Any] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, Any]:
+        latencies = [s.latency_ms for s in self.samples]
+        llm = [s for s in self.samples if s.llm_called]
+        ttfts = [s.ttft_ms for s in llm if s.ttft_ms is not None]
+        rates = [s.tokens_per_sec for s in llm if s.tokens_per_sec]
+        validity = [s.json_valid for s in llm if s.json_valid is not None]
+        correct = [s.expected_intent == s.predicted_intent for s in self.samples]
+
+        return {
+            'label': self.label,
+            'samples': len(self.samples),
+            'llm_calls': len(llm),
+            'latency_ms': {f'p{p}': percentile(latencies, p) for p in (50, 90, 95, 99)},
+            'ttft_ms': {f'p{p}': percentile(ttfts, p) for p in (50, 95)},
+            'tokens_per_sec': round(sum(rates) / len(rates), 2) if rates else None,
+            'json_valid_rate': round(sum(validity) / len(validity), 3) if validity else None,
+            'intent_accuracy': round(sum(correct) / len(correct), 3) if correct else None,
+            'config': self.config
+        }
+
+    def write_json(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'summary': self.summary(), 'samples': [asdict(s) for s in self.samples]},
+                      f, indent=2, ensure_ascii=False)
+
+    def write_csv(self, path: str):
+        fields = list(SampleResult.__dataclass_fields__.keys())
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['label'] + fields)
+            writer.writeheader()
+            for s in self.samples:
+                writer.writerow({'label': self.label, **asdict(s)})
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return round(ordered[min(rank, len(ordered)) - 1], 2)
+
+
+def is_valid_json(text: str) -> bool:
+    cleaned = text.strip()
+    if cleaned.startswith('```'):
+        cleaned = cleaned.strip('`').replace('json', '', 1).strip()
+    try:
+        json.loads(cleaned)
+        return True
+    except (json.JSONDecodeError, ValueError):
+        return False
+
+
+async def run_benchmark(processor: NLPProcessor, corpus=CORPUS, repeats: int = 1,
+                        warmup: int = 1, label: str = "default", stream: bool = True) -> BenchmarkReport:
+    """Run every corpus entry `repeats` times through process_text and collect metrics"""
+    engine = processor.ai_engine
+    probe = InstrumentedLlama(engine.llm) if engine.llm is not None else None
+    if probe:
+        engine.llm = probe
+
+    report = BenchmarkReport(label=label)
+    stream_callback = (lambda token: None) if stream else None
+
+    try:
+        for text, base_intent, mode, _ in corpus[:warmup]:
+            await processor.process_text(text, base_intent, ConversationContext(), mode=mode, stream_callback=stream_callback)
+
+        for _ in range(repeats):
+            for text, base_intent, mode, expected in corpus:
+                if probe:
+                    probe.reset()
+                start = time.perf_counter()
+                result = await processor.process_text(
+                    text, base_intent, ConversationContext(), mode=mode, stream_callback=stream_callback
+                )
+                latency_ms = (time.perf_counter() - start) * 1000
+
+                sample = SampleResult(
+                    text=text,
+                    expected_intent=expected.value,
+                    predicted_intent=result.intent.value,
+                    latency_ms=round(latency_ms, 2),
+                    llm_called=bool(probe and probe.start is not None)
+                )
+                if sample.llm_called:
+                    sample.ttft_ms = round((probe.first_token - probe.start) * 1000, 2) if probe.first_token else None
+                    sample.tokens = probe.tokens
+                    if probe.end and probe.first_token and probe.end > probe.first_token and probe.tokens > 1:
+                        sample.tokens_per_sec = round((probe.tokens - 1) / (probe.end - probe.first_token), 2)
+                    sample.json_valid = is_valid_json(probe.text)
+                report.samples.append(sample)
+    finally:
+        if probe:
+            engine.llm = probe.inner
+
+    return report
+
+
+def build_llama(model_path: str, n_ctx: int, n_threads: int, n_batch: int):
+    from llama_cpp import Llama
+    return Llama(model_path=model_path, n_ctx=n_ctx, n_threads=n_threads, n_batch=n_batch,
+                 verbose=False, use_mmap=True)
+
+
+def build_processor(llm, n_ctx: int) -> NLPProcessor:
+    """NLPProcessor on `llm` whose prompt budget matches the benchmarked context window"""
+    processor = NLPProcessor(llm=llm)
+    engine = processor.ai_engine
+    engine.n_ctx = engine.context_packer.n_ctx = n_ctx
+    return processor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Jarvis LLM latency/throughput benchmark")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--model', help="Path to a GGUF model")
+    source.add_argument('--fake', action='store_true', help="Use the deterministic fake backend")
+    parser.add_argument('--n-threads', type=int, default=min(os.cpu_count() or 4, 8))
+    parser.add_argument('--n-batch', type=int, default=512)
+    parser.add_argument('--n-ctx', type=int, default=2048)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--no-stream', action='store_true', help="Benchmark non-streaming calls")
+    parser.add_argument('--fake-decode-ms', type=float, default=5.0, help="Per-token decode time of the fake backend")
+    parser.add_argument('--label', default=None)
+    parser.add_argument('--json', dest='json_path')
+    parser.add_argument('--csv', dest='csv_path')
+    args = parser.parse_args(argv)
+
+    if args.fake:
+        llm = FakeLlama(prompt_ms_per_token=0.05, decode_ms_per_token=args.fake_decode_ms, n_ctx=args.n_ctx)
+        label = args.label or "fake"
+    else:
+        llm = build_llama(args.model, args.n_ctx, args.n_threads, args.n_batch)
+        label = args.label or f"{os.path.basename(args.model)}-t{args.n_threads}-b{args.n_batch}"
+
+    processor = build_processor(llm, args.n_ctx)
+    report = asyncio.run(run_benchmark(processor, repeats=args.repeats, label=label, stream=not args.no_stream))
+    report.config = {
+        'model': args.model or 'fake', 'n_threads': args.n_threads, 'n_batch': args.n_batch,
+        'n_ctx': args.n_ctx, 'repeats': args.repeats, 'stream': not args.no_stream
+    }
+
+    print(json.dumps(report.summary(), indent=2, ensure_ascii=False))
+    if args.json_path:
+        report.write_json(args.json_path)
+    if args.csv_path:
+        report.write_csv(args.csv_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Quantized embedding benchmark for Jarvis 2.0.
+Compares float32, float16 and per-vector int8 codes on a clustered synthetic
+corpus: bytes per million vectors, recall@k against float32 exact search
+(codes only, and with float32 re-scoring of k * factor candidates) and query
+latency of a full scan. --collection also runs the same corpus through
+Collection.search_batch with the IVF index enabled, float32 against int8.
+
+Usage:
+    python -m benchmarks.quantization_benchmark
+    python -m benchmarks.quantization_benchmark --rows 1000000 --dim 384 --json out.json
+    python -m benchmarks.quantization_benchmark --rows 100000 --collection
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import numpy as np
+from typing import Dict, Any, List
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import memory_store
+from services.memory_store import MemoryStore
+from services.embedding_store import quantize, code_scores
+from services.ann_index import top_k
+from benchmarks.ann_benchmark import make_corpus, _percentiles
+
+
+def _recall(found: List[np.ndarray], truth: List[set], k: int) -> float:
+    return round(sum(len(t & set(f.tolist())) for f, t in zip(found, truth)) / (len(truth) * k), 4)
+
+
+def run(rows: int = 100000, dim: int = 384, k: int = 10, factor: int = 4, queries: int = 100) -> List[Dict[str, Any]]:
+    data, query_set = make_corpus(rows, dim)
+    query_set = query_set[:queries]
+    exact_scores = [data @ q for q in query_set]
+    truth = [set(top_k(s, k).tolist()) for s in exact_scores]
+
+    start = time.perf_counter()
+    for q in query_set:
+        top_k(data @ q, k)
+    results = [{'mode': 'float32', 'bytes_per_vector': dim * 4, 'mb_per_million': round(dim * 4 / 1.048576, 1),
+                'recall_codes': 1.0, 'recall_rescored': 1.0,
+                'scan_ms': round((time.perf_counter() - start) * 1000 / len(query_set), 2)}]
+
+    for mode in ("float16", "int8"):
+        codes, scales = quantize(data, mode)
+        per_vector = codes.itemsize * dim + (4 if scales is not None else 0)
+        plain, rescored = [], []
+        start = time.perf_counter()
+        for q in query_set:
+            plain.append(top_k(code_scores(codes, scales, q), k))
+        scan_ms = (time.perf_counter() - start) * 1000 / len(query_set)
+        for q in query_set:
+            candidates = np.sort(top_k(code_scores(codes, scales, q), k * factor))
+            rescored.append(candidates[top_k(data[candidates] @ q, k)])
+        results.append({'mode': mode, 'bytes_per_vector': per_vector,
+                        'mb_per_million': round(per_vector / 1.048576, 1),
+                        'recall_codes': _recall(plain, truth, k), 'recall_rescored': _recall(rescored, truth, k),
+                        'scan_ms': round(scan_ms, 2)})
+        del codes, scales
+    return results
+
+
+def run_collection(rows: int = 100000, dim: int = 384, k: int = 10, factor: int = 4,
+                   queries: int = 100) -> List[Dict[str, Any]]:
+    """Collection.search_batch above ANN_THRESHOLD: IVF candidates from float32 rows or from int8 codes"""
+    data, query_set = make_corpus(rows, dim)
+    query_set = query_set[:queries]
+    truth = [set(top_k(data @ q, k).tolist()) for q in query_set]
+    results = []
+    for mode in (None, "int8"):
+        root = tempfile.mkdtemp()
+        try:
+            with patch('services.ann_index.HNSWLIB_AVAILABLE', False), \
+                    patch.object(memory_store, 'RESCORE_FACTOR', factor):
+                store = MemoryStore(root)
+                docs = store.collection("documents", quantization=mode)
+                for start in range(0, rows, 10000):
+                    docs.extend([{'document': str(i)} for i in range(start, min(start + 10000, rows))],
+                                data[start:start + 10000])
+                found, latencies = [], []
+                for q in query_set:
+                    start = time.perf_counter()
+                    found.append(docs.search_batch(q[None, :], k)[0][0])
+                    latencies.append(time.perf_counter() - start)
+                results.append({'mode': mode or "float32", 'index': docs.index.kind,
+                                'recall': _recall(found, truth, k), **_percentiles(latencies)})
+                store.close()
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Jarvis quantized embedding benchmark")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--dim', type=int, default=384, help="Embedding size (all-MiniLM-L6-v2 = 384)")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--factor', type=int, default=4, help="Candidates re-scored in float32 = k * factor")
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--collection', action='store_true', help="Also search through Collection with the index")
+    parser.add_argument('--json', dest='json_path')
+    args = parser.parse_args(argv)
+
+    results = run(args.rows, args.dim, args.k, args.factor, args.queries)
+    for row in results:
+        print(f"{row['mode']:<8} {row['bytes_per_vector']:>5} B/vec  {row['mb_per_million']:>7} MB/1M  "
+              f"recall@{args.k} codes {row['recall_codes']:.4f}  re-scored {row['recall_rescored']:.4f}  "
+              f"scan {row['scan_ms']:>7.2f} ms")
+    if args.collection:
+        indexed = run_collection(args.rows, args.dim, args.k, args.factor, args.queries)
+        for row in indexed:
+            print(f"{row['mode']:<8} {row['index']} search_batch  recall@{args.k} {row['recall']:.4f}  "
+                  f"p50 {row['p50_ms']:>6.2f} ms  p95 {row['p95_ms']:>6.2f} ms")
+        results += indexed
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
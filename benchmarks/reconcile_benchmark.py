@@ -0,0 +1,100 @@
+"""
+Startup reconciliation benchmark for Jarvis 2.0.
+Creates a tree of N small text files, records them in a document manifest as
+already ingested, then times BrainIndexerService.reconcile() - the scan that
+runs at startup - with a handful of files changed, added and deleted.
+The embedder is never touched.
+
+Usage:
+    python -m benchmarks.reconcile_benchmark
+    python -m benchmarks.reconcile_benchmark --files 100000 --changed 50 --json out.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from typing import Dict, Any
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.indexer_service import BrainIndexerService
+from services.ingestion_pipeline import scan_files
+
+
+class ManifestOnlyMemory:
+    """Stands in for MemoryService: a manifest and nothing else"""
+
+    def __init__(self, manifest):
+        self.manifest = manifest
+        self.removed = 0
+
+    def document_manifest(self):
+        return self.manifest
+
+    def ingest_document(self, path):
+        raise AssertionError("the scan must not ingest")
+
+    def remove_documents(self, paths):
+        self.removed += len(list(paths))
+
+
+def run(files: int = 100000, per_dir: int = 500, changed: int = 50) -> Dict[str, Any]:
+    root = tempfile.mkdtemp()
+    try:
+        watched = os.path.join(root, "Documents")
+        start = time.perf_counter()
+        paths = []
+        for i in range(files):
+            directory = os.path.join(watched, f"pasta_{i // per_dir:04d}")
+            if i % per_dir == 0:
+                os.makedirs(directory)
+            path = os.path.join(directory, f"nota_{i}.md")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(f"nota {i}\n")
+            paths.append(path)
+        setup_s = time.perf_counter() - start
+
+        manifest = {path: {'mtime_ns': mtime_ns, 'size': size, 'chunks': 1, 'done': True, 'hash': None}
+                    for path, mtime_ns, size in scan_files([watched], {'.md'})}
+        for path in paths[:changed]:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write("editada\n")
+        for path in paths[changed:2 * changed]:
+            os.remove(path)
+        for i in range(changed):
+            with open(os.path.join(watched, f"nova_{i}.md"), 'w', encoding='utf-8') as f:
+                f.write("nova\n")
+
+        memory = ManifestOnlyMemory(manifest)
+        indexer = BrainIndexerService(memory, watch_paths=[watched])
+        result = indexer.reconcile()
+        return {'files': files, 'setup_s': round(setup_s, 2), 'scan_s': result['seconds'],
+                'files_per_sec': round(result['files'] / result['seconds']) if result['seconds'] else None,
+                'queued': result['queued'], 'deleted': result['deleted']}
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Jarvis startup reconciliation benchmark")
+    parser.add_argument('--files', type=int, default=100000)
+    parser.add_argument('--per-dir', type=int, default=500)
+    parser.add_argument('--changed', type=int, default=50, help="Files modified, deleted and added (each)")
+    parser.add_argument('--json', dest='json_path')
+    args = parser.parse_args(argv)
+
+    result = run(args.files, args.per_dir, args.changed)
+    for key, value in result.items():
+        print(f"{key:<14} {value}")
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Conversation retention benchmark for Jarvis 2.0.
+Simulates a year of use: every day adds a mix of repeated commands (near
+duplicates), clock questions and conversations about recurring topics, then
+runs one retention pass with the simulated clock. Reports, once a month, the
+turns a store without retention would hold next to the rows, live turns,
+summary facts and on-disk vector bytes of the conversation collection.
+
+Usage:
+    python -m benchmarks.retention_benchmark
+    python -m benchmarks.retention_benchmark --days 365 --turns 60 --json out.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import numpy as np
+from typing import Dict, Any, List
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.memory_store import MemoryStore
+from services.memory_retention import RetentionEngine, RetentionPolicy, DAY
+
+# (intent, share of turns, templates, noise norm): smaller noise = closer repeats
+WORKLOAD = [
+    ('DIRECT_COMMAND', 0.5, 30, 0.1),
+    ('TIME_QUERY', 0.1, 3, 0.1),
+    ('INFORMATION_QUERY', 0.25, 40, 0.5),
+    ('CONVERSATIONAL_QUERY', 0.15, 40, 0.5),
+]
+
+
+def _unit(x: np.ndarray) -> np.ndarray:
+    return (x / np.linalg.norm(x, axis=-1, keepdims=True)).astype(np.float32)
+
+
+def _dir_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def run(days: int = 365, turns: int = 40, dim: int = 384, report_every: int = 30, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = np.random.default_rng(seed)
+    kinds = [(intent, share, _unit(rng.standard_normal((templates, dim))), noise)
+             for intent, share, templates, noise in WORKLOAD]
+    shares = np.array([share for _, share, _, _ in kinds])
+    start = time.time() - days * DAY
+    now = [start]
+
+    root = tempfile.mkdtemp()
+    results = []
+    try:
+        store = MemoryStore(root)
+        conversations, facts = store.collection("conversations"), store.collection("facts")
+        engine = RetentionEngine(conversations, facts, policy=RetentionPolicy(), clock=lambda: now[0])
+        stored, retention_s = 0, 0.0
+        for day in range(1, days + 1):
+            picks = rng.choice(len(kinds), size=turns, p=shares / shares.sum())
+            metadatas, vectors = [], []
+            for i, pick in enumerate(picks):
+                intent, _, templates, noise = kinds[pick]
+                template = int(rng.integers(len(templates)))
+                noisy = templates[template] + rng.standard_normal(dim) * noise / np.sqrt(dim)
+                metadatas.append({'type': "interaction", 'intent': intent, 'timestamp': str(now[0] + i * 60),
+                                  'user_text': f"{intent.lower()} {template}", 'ai_response': "ok",
+                                  'document': f"User asked: '{intent.lower()} {template}'. Jarvis responded: 'ok'."})
+                vectors.append(noisy)
+            conversations.extend(metadatas, _unit(np.array(vectors)))
+            stored += turns
+            now[0] += DAY
+
+            began = time.perf_counter()
+            engine.run_pass()
+            retention_s += time.perf_counter() - began
+
+            if day % report_every == 0 or day == days:
+                results.append({
+                    'day': day,
+                    'turns_without_retention': stored,
+                    'rows': len(conversations),
+                    'live': conversations.live_count,
+                    'summaries': facts.live_count,
+                    'vector_mb': round(_dir_bytes(conversations.dir) / 2**20, 2),
+                    'vector_mb_without_retention': round(stored * dim * 4 / 2**20, 2),
+                    'retention_ms_per_day': round(retention_s * 1000 / day, 1),
+                })
+        store.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Jarvis conversation retention benchmark")
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--turns', type=int, default=40, help="Turns stored per simulated day")
+    parser.add_argument('--dim', type=int, default=384, help="Embedding size (all-MiniLM-L6-v2 = 384)")
+    parser.add_argument('--report-every', type=int, default=30, help="Days between report rows")
+    parser.add_argument('--json', dest='json_path')
+    args = parser.parse_args(argv)
+
+    results = run(args.days, args.turns, args.dim, args.report_every)
+    for row in results:
+        print(f"day {row['day']:>4}  turns {row['turns_without_retention']:>6}  rows {row['rows']:>6}  "
+              f"live {row['live']:>6}  summaries {row['summaries']:>5}  "
+              f"vectors {row['vector_mb']:>6.2f} MB (vs {row['vector_mb_without_retention']:>6.2f})  "
+              f"retention {row['retention_ms_per_day']:>6.1f} ms/day")
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
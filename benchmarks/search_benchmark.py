@@ -0,0 +1,91 @@
+"""
+Exact search benchmark for Jarvis 2.0.
+Compares the old per-query path (full score array for a collection, full
+argsort) with Collection.search_batch (blocked matrix product over all
+queries, argpartition per block), on a store with several sealed segments.
+Reports latency per query and the largest temporary score array.
+
+Usage:
+    python -m benchmarks.search_benchmark
+    python -m benchmarks.search_benchmark --rows 200000 --batch 4 --json out.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import numpy as np
+from typing import Dict, Any, List
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import memory_store
+from services.memory_store import MemoryStore, SEARCH_BLOCK
+from benchmarks.ann_benchmark import make_corpus
+
+
+def run(rows: int = 100000, dim: int = 384, k: int = 10, batch: int = 4, queries: int = 40) -> List[Dict[str, Any]]:
+    data, query_set = make_corpus(rows, dim)
+    query_set = query_set[:max(batch, queries - queries % batch)]
+    root = tempfile.mkdtemp()
+    try:
+        # Exact search only: keep the ANN index out of the comparison
+        with patch.object(memory_store, 'ANN_THRESHOLD', rows + 1):
+            store = MemoryStore(root)
+            docs = store.collection("documents")
+            for i in range(0, rows, 8192):
+                docs.extend([{'document': ""}] * len(data[i:i + 8192]), data[i:i + 8192])
+
+            start = time.perf_counter()
+            for q in query_set:
+                scores = docs.similarities(q)
+                np.argsort(scores)[::-1][:k]
+            full_ms = (time.perf_counter() - start) * 1000 / len(query_set)
+
+            start = time.perf_counter()
+            for q in query_set:
+                docs.search(q, k)
+            single_ms = (time.perf_counter() - start) * 1000 / len(query_set)
+
+            start = time.perf_counter()
+            for i in range(0, len(query_set), batch):
+                docs.search_batch(query_set[i:i + batch], k)
+            batch_ms = (time.perf_counter() - start) * 1000 / len(query_set)
+            store.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    return [
+        {'method': 'full argsort', 'ms_per_query': round(full_ms, 2), 'temp_scores': rows},
+        {'method': 'blocked argpartition', 'ms_per_query': round(single_ms, 2), 'temp_scores': min(rows, SEARCH_BLOCK)},
+        {'method': f'batch of {batch}', 'ms_per_query': round(batch_ms, 2),
+         'temp_scores': min(rows, SEARCH_BLOCK) * batch},
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Jarvis exact search benchmark")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--dim', type=int, default=384, help="Embedding size (all-MiniLM-L6-v2 = 384)")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--batch', type=int, default=4, help="Queries answered per search_batch() call")
+    parser.add_argument('--queries', type=int, default=40)
+    parser.add_argument('--json', dest='json_path')
+    args = parser.parse_args(argv)
+
+    results = run(args.rows, args.dim, args.k, args.batch, args.queries)
+    for row in results:
+        print(f"{row['method']:<22} {row['ms_per_query']:>8.2f} ms/query  "
+              f"largest score array {row['temp_scores']:>9} floats")
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
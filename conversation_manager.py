@@ -93,6 +93,7 @@ class ConversationContext:
     active_variables: Dict[str, Any] = field(default_factory=dict)
     pending_clarifications: List[str] = field(default_factory=list)
     long_term_memory: str = ""
+    retrieved_context: List[Dict[str, Any]] = field(default_factory=list)  # Scored RAG items for prompt packing
 
 class ConversationState:
     """Manages the current state of conversation"""
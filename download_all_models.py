@@ -55,6 +55,7 @@ def main():
     models_to_download = [
         ("download_whisper_ov.py", "Whisper OpenVINO (Speech-to-Text) [~500MB]"),
         ("download_embeddings.py", "Sentence Transformers Embedding Model [~150MB]"),
+        ("export_embedding_onnx.py", "Embedding Model ONNX Export (fast CPU backend) [~90MB]"),
         ("download_vlm.py", "Qwen2 Vision Language Model [~5-7GB]"),
         ("download_model.py", "Qwen2 0.5B Instruct LLM [~350MB]"),
     ]
@@ -0,0 +1,38 @@
+"""
+One-time export of the MiniLM embedding model to ONNX (fast CPU backend for MemoryService).
+Needs torch + sentence-transformers + onnxruntime once; Jarvis then runs the
+model with OpenVINO or onnxruntime and no PyTorch import.
+
+Usage:
+    python export_embedding_onnx.py
+    python export_embedding_onnx.py --int8
+    python export_embedding_onnx.py --model models/embedding_model --output models/embedding_onnx
+"""
+
+import os
+import sys
+import argparse
+
+from services.embedding_backend import export_onnx, ONNX_MODEL_DIR, MIN_COSINE
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the Jarvis embedding model to ONNX")
+    default_model = os.path.join("models", "embedding_model")
+    parser.add_argument('--model', default=default_model if os.path.exists(default_model) else 'all-MiniLM-L6-v2',
+                        help="sentence-transformers model name or local folder")
+    parser.add_argument('--output', default=ONNX_MODEL_DIR)
+    parser.add_argument('--int8', action='store_true', help="Also write dynamically quantized int8 weights")
+    args = parser.parse_args(argv)
+
+    print(f"Exporting {args.model} to {args.output}...")
+    config = export_onnx(args.model, args.output, int8=args.int8)
+    print(f"Done! dim={config['dim']} min cosine vs PyTorch: {config['min_cosine']}"
+          + (f" (int8: {config['min_cosine_int8']})" if args.int8 else ""))
+    if config['min_cosine'] < MIN_COSINE:
+        print("[WARNING] Exported embeddings differ from the PyTorch model; keep the sentence-transformers backend")
+        sys.exit(1)
+    if args.int8 and config['min_cosine_int8'] < MIN_COSINE:
+        print(f"[WARNING] int8 embeddings are below {MIN_COSINE} cosine to PyTorch; Jarvis will use model.onnx")
+
+if __name__ == "__main__":
+    main()
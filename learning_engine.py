@@ -28,6 +28,8 @@ import joblib
 
 from conversation_manager import ConversationTurn, IntentType, ConversationContext
 from services.path_manager import PathManager
+from services.work_scheduler import WorkPriority
+from services.service_runtime import run_io
 
 # Configure logging
 # logging.basicConfig(level=logging.INFO) # Controlled by main.py
@@ -531,6 +533,8 @@ class LearningModule:
         
         # Background learning task
         self._learning_task: Optional[asyncio.Task] = None
+        # Optional WorkScheduler (set by AIService) - batch learning yields to user turns
+        self.scheduler = None
     
     async def start_learning(self):
         """Start background learning process"""
@@ -640,6 +644,10 @@ class LearningModule:
                 recent_interactions = await self._get_recent_interactions()
                 
                 if len(recent_interactions) >= self.pattern_update_threshold:
+                    if self.scheduler and not await self.scheduler.admit(
+                        "batch_learning", WorkPriority.BACKGROUND, max_wait=60
+                    ):
+                        continue  # Shed; retried on the next interval
                     await self._process_batch_learning(recent_interactions)
                 
             except asyncio.CancelledError:
@@ -727,7 +735,7 @@ class LearningModule:
     
     async def _get_recent_interactions(self) -> List[ConversationTurn]:
         """Get recent interactions from history (asynchronously)"""
-        return await asyncio.to_thread(self._get_recent_interactions_sync)
+        return await run_io(self._get_recent_interactions_sync)
 
     def _get_recent_interactions_sync(self) -> List[ConversationTurn]:
         """Get recent interactions from history"""
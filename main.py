@@ -5,6 +5,7 @@ import json
 import psutil
 import datetime
 import keyboard
+import multiprocessing
 from pathlib import Path
 
 # Fix Unicode printing issues on Windows terminals
@@ -36,6 +37,7 @@ from services.optimized_voice_service import OptimizedVoiceThread
 from services.ai_service import AIService
 from services.tts_service import TTSService
 from services.action_controller import ActionController
+from services.tracing import tracer
 from conversation_manager import IntentType
 from services.hud_service import HolographicHUD
 
@@ -193,7 +195,7 @@ class JarvisHUD(QMainWindow):
         self.voice_thread.command_received.connect(self.on_voice_command)
         self.voice_thread.error_occurred.connect(self.on_voice_error)
         self.voice_thread.audio_level.connect(self.on_audio_level)
-        self.voice_thread.user_interrupted.connect(self.tts_service.abort)
+        self.voice_thread.user_interrupted.connect(self.on_user_interrupted)
         self.voice_thread.start()
 
         # Connect TTS to VoiceThread to prevent speaking-loop (Anti-Echo)
@@ -257,7 +259,16 @@ class JarvisHUD(QMainWindow):
                 "ai": 70 + (int(time.time()) % 20),
                 "pwr": 38 + (int(time.time() * 10) % 5),
                 "thr": 0.1,
-                "sync": 99.9
+                "sync": 99.9,
+                "dedup": self.ai_service.admission.stats(),
+                "sched": self.ai_service.scheduler.stats(),
+                "indexer": self.ai_service.indexer.stats() if getattr(self.ai_service, 'indexer', None) else None,
+                "memory_cache": self.ai_service.memory_service.cache_stats()
+                if getattr(self.ai_service, 'memory_service', None) else None,
+                "memory_retention": self.ai_service.memory_service.retention.stats()
+                if getattr(self.ai_service, 'memory_service', None) else None,
+                "runtime_cpu": self.ai_service.runtime.cpu_report()
+                if getattr(self.ai_service, 'runtime', None) else None
             }
             self.bridge.metrics_updated.emit(json.dumps(data))
         except Exception as e:
@@ -268,7 +279,7 @@ class JarvisHUD(QMainWindow):
         state = "LISTENING" if is_listening else "IDLE"
         self.bridge.state_changed.emit(state)
 
-    def on_voice_command(self, command: str, confidence: float):
+    def on_voice_command(self, command: str, confidence: float, source: str = "voice"):
         """Handle recognized command and relay to AI service"""
         if not command.strip():
             return
@@ -287,13 +298,27 @@ class JarvisHUD(QMainWindow):
         if not clean_text:
             return
 
+        # Voice turns start at speech onset; manual input starts one in on_text_submit.
+        # A new utterance supersedes answers still being generated or spoken
+        admission = self.ai_service.process_command(clean_text, turn_id=tracer.active_turn, source=source,
+                                                   supersede=True)
+        if admission.merged:
+            # Duplicate final (or repeated input) - the original turn already owns the HUD
+            print(f"HUD: Duplicate command ignored: '{clean_text}'")
+            return
+
         # Show transcribed text on HUD IMMEDIATELY
         self.bridge.message_shown.emit(f"USER: {clean_text}")
 
         # Pulse visual state and process - Set pause temporarily until action completes
         self.bridge.state_changed.emit('PROCESSING')
         self.voice_thread.pause()
-        self.ai_service.process_command(clean_text)
+        self.tts_service.flush()
+
+    def on_user_interrupted(self):
+        """Barge-in: stop speaking and cancel in-flight generation and queued work"""
+        self.tts_service.flush()
+        self.ai_service.interrupt("barge_in", sources=self.ai_service.HUD_SOURCES)
 
     def toggle_text_input(self):
         """Called safely via PyQT signal when Ctrl+Space is pressed"""
@@ -324,8 +349,9 @@ class JarvisHUD(QMainWindow):
         self._hide_text_input()
         
         if text:
+            tracer.start_turn("text")
             # Re-use the existing NLP voice pipeline logic!
-            self.on_voice_command(text, 1.0)
+            self.on_voice_command(text, 1.0, source="text")
             
     def keyPressEvent(self, event):
         if event.key() == Qt.Key.Key_Escape:
@@ -346,7 +372,8 @@ class JarvisHUD(QMainWindow):
         print(f"HUD: AI Response: {result.response_suggestion}")
 
         # Execute the action via controller (includes TTS and templates)
-        execution_response = self.action_controller.execute_nlp_result(result)
+        with tracer.span("action.dispatch", result.turn_id, intent=result.intent.value):
+            execution_response = self.action_controller.execute_nlp_result(result)
 
         # For conversational queries without registered commands, speak the response
         from conversation_manager import IntentType
@@ -356,7 +383,7 @@ class JarvisHUD(QMainWindow):
             # Speak response for conversational intents
             if hasattr(self, 'tts_service') and execution_response:
                 mood = result.sentiment if hasattr(result, 'sentiment') else 'neutral'
-                self.tts_service.speak(execution_response, mood=mood)
+                self.tts_service.speak(execution_response, mood=mood, turn_id=result.turn_id)
 
         # Safety net: ensure voice thread resumes even if TTS never speaks
         # (TTS speaking_finished signal is the primary resume, this is a fallback)
@@ -393,6 +420,9 @@ class JarvisHUD(QMainWindow):
             self.close()
 
 if __name__ == "__main__":
+    # Document ingestion uses a process pool; frozen (PyInstaller) builds need this on Windows
+    multiprocessing.freeze_support()
+
     # High DPI support
     os.environ["QT_AUTO_SCREEN_SCALE_FACTOR"] = "1"
     
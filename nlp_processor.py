@@ -8,6 +8,7 @@ import asyncio
 import re
 import json
 import time
+import threading
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 from enum import Enum
@@ -17,13 +18,17 @@ from datetime import datetime
 import aiohttp
 import os
 from conversation_manager import ConversationContext, IntentType
+from services.context_packer import ContextPacker
+from services.tracing import tracer
+from services.cancellation import CancellationToken, OperationCancelled
+from services.service_runtime import run_io
 # Configure logging
 # logging.basicConfig(level=logging.INFO) # Controlled by main.py
 logger = logging.getLogger(__name__)
 
 class LocalAIProcessor:
     """Processor for local AI using Llama-cpp (standalone) or Ollama API (fallback)"""
-    def __init__(self, model_name: str = "qwen2:1.5b"):
+    def __init__(self, model_name: str = "qwen2:1.5b", llm=None):
         self.ollama_url = "http://localhost:11434/api/generate"
         self.model_name = model_name
         
@@ -31,6 +36,26 @@ class LocalAIProcessor:
         self.use_llama_cpp = False
         self.llm = None
         self.clip_model = None # For Vision
+        # A llama.cpp context is not re-entrant; AIService lanes share this one model
+        self._inference_lock = threading.Lock()
+
+        # Prompt budget: context window minus tokens reserved for generation
+        self.n_ctx = 2048
+        self.max_tokens = 150
+        self.context_packer = ContextPacker(n_ctx=self.n_ctx, reserve_tokens=self.max_tokens)
+
+        # Vision preprocessing (created on first use - Pillow is only needed for VLM calls)
+        self.image_pipeline = None
+        self.last_vision_stats: Dict[str, Any] = {}
+
+        # Injected backend (benchmarks/tests) - skip model discovery entirely
+        if llm is not None:
+            self.llm = llm
+            self.use_llama_cpp = True
+            if hasattr(llm, 'tokenize'):
+                self.context_packer.tokenize = self._tokenize
+            logger.info(f"LocalAIProcessor: Using injected backend {type(llm).__name__}.")
+            return
         
         # Try to find a local GGUF model in 'models/' directory
         model_dir = os.path.join(os.path.dirname(__file__), "models")
@@ -55,7 +80,7 @@ class LocalAIProcessor:
                 # Create the model with safe defaults and error handling
                 self.llm = Llama(
                     model_path=model_path,
-                    n_ctx=2048,
+                    n_ctx=self.n_ctx,
                     n_threads=min(os.cpu_count() or 4, 8),  # Limit threads
                     verbose=False,
                     seed=-1,
@@ -66,6 +91,8 @@ class LocalAIProcessor:
                 )
 
                 self.use_llama_cpp = True
+                # Count prompt sections with the real tokenizer from now on
+                self.context_packer.tokenize = self._tokenize
                 logger.info(f"LocalAIProcessor: Successfully loaded model.")
 
                 # Test the model with a simple call
@@ -87,6 +114,8 @@ class LocalAIProcessor:
                         clip_model_path=os.path.join(model_dir, mmproj_files[0]),
                         verbose=False
                     )
+                    # Route chat completions through the projector so images are actually embedded
+                    self.llm.chat_handler = self.clip_model
                     logger.info(f"LocalAIProcessor: Multimodal VLM (Clip) loaded: {mmproj_files[0]}")
 
                 logger.info("LocalAIProcessor: Standalone Llama-cpp with KV Cache active.")
@@ -100,12 +129,15 @@ class LocalAIProcessor:
             logger.info("LocalAIProcessor: No .gguf model found in models/. Place a GGUF model file in the models/ directory to enable local LLM.")
             logger.info("LocalAIProcessor: Using intelligent fallback system for conversational queries.")
 
-    async def process_complex_query(self, text: str, context: ConversationContext, stream_callback=None) -> Dict[str, Any]:
+    async def process_complex_query(self, text: str, context: ConversationContext, stream_callback=None,
+                                    cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
         """Process query using local Llama-cpp instance or intelligent fallback"""
         if self.use_llama_cpp and self.llm:
             # Use standalone llama-cpp
             try:
-                return await self._process_via_llama_cpp(text, context, stream_callback)
+                return await self._process_via_llama_cpp(text, context, stream_callback, cancel_token)
+            except OperationCancelled:
+                raise
             except Exception as e:
                 logger.warning(f"LocalAIProcessor: Llama-cpp failed, using intelligent fallback: {e}")
 
@@ -153,12 +185,9 @@ class LocalAIProcessor:
                     now = datetime.datetime.now()
                     response = f"Hoje é {now.strftime('%d de %B de %Y')}, {now.strftime('%A')}."
 
-                # Stream response if callback provided
+                # Canned answers are complete already - emit in one chunk, no fake typing delay
                 if stream_callback:
-                    stream_callback("JARVIS: ")
-                    for char in response:
-                        stream_callback(char)
-                        await asyncio.sleep(0.01)  # Simulate typing
+                    stream_callback("JARVIS: " + response)
 
                 return {
                     'intent_classification': 'conversational_query',
@@ -185,10 +214,7 @@ class LocalAIProcessor:
                 response = template % subject
 
                 if stream_callback:
-                    stream_callback("JARVIS: ")
-                    for char in response:
-                        stream_callback(char)
-                        await asyncio.sleep(0.01)
+                    stream_callback("JARVIS: " + response)
 
                 return {
                     'intent_classification': 'conversational_query',
@@ -208,10 +234,7 @@ class LocalAIProcessor:
         response = random.choice(generic_responses)
 
         if stream_callback:
-            stream_callback("JARVIS: ")
-            for char in response:
-                stream_callback(char)
-                await asyncio.sleep(0.01)
+            stream_callback("JARVIS: " + response)
 
         return {
             'intent_classification': 'conversational_query',
@@ -224,113 +247,211 @@ class LocalAIProcessor:
         """Fixed system prompt for token reuse"""
         return "You are J.A.R.V.I.S., a smart AI assistant. Classify the user's intent and return ONLY a valid JSON object."
 
-    async def _process_via_llama_cpp(self, text: str, context: ConversationContext, stream_callback=None) -> Dict[str, Any]:
-        """Inference using llama-cpp-python with simple, compatible API calls"""
-        try:
-            short_mem = str(context.long_term_memory)[:150] if context.long_term_memory else "None"
-            # Build a simple, focused prompt
-            full_prompt = f"""You are J.A.R.V.I.S., a smart AI assistant. Classify the user's intent and return ONLY a valid JSON object.
+    def _tokenize(self, text: str) -> List[int]:
+        """Tokenize with the loaded model (used for prompt budgeting)"""
+        return self.llm.tokenize(text.encode('utf-8'), add_bos=False)
+
+    def _build_memory_block(self, context: ConversationContext, prompt_skeleton: str, max_tokens: int) -> str:
+        """Pack the best-scoring memory items and recent turns into the remaining context window"""
+        items = list(getattr(context, 'retrieved_context', None) or [])
+        if not items and context.long_term_memory:
+            # Pre-formatted memory text (no scores available) - let the packer trim it by lines
+            items = [
+                {'kind': 'memory', 'text': line, 'score': 0.5}
+                for line in str(context.long_term_memory).splitlines() if line.strip()
+            ]
+
+        # Most recent turns first, slightly below strong RAG hits
+        recent = list(context.conversation_history)[-3:]
+        for age, turn in enumerate(reversed(recent)):
+            user_input = turn.get('user_input')
+            if user_input:
+                items.append({
+                    'kind': 'turn',
+                    'text': f"User: {user_input} -> Jarvis: {turn.get('response', '')}",
+                    'score': 0.55 - 0.05 * age
+                })
+
+        return self.context_packer.build(items, prompt_skeleton, max_tokens=max_tokens) or "None"
+
+    def _llama_prompt(self, text: str, context: ConversationContext, memory: str) -> str:
+        """Simple, focused prompt for llama-cpp"""
+        return f"""You are J.A.R.V.I.S., a smart AI assistant. Classify the user's intent and return ONLY a valid JSON object.
 
 EXAMPLES:
 User: "o que é inteligência artificial?" -> {{"intent_classification": "conversational_query", "confidence": 0.92, "suggested_response": "IA é a simulação de inteligência humana por máquinas.", "parameters": {{}}}}
 User: "abrir youtube" -> {{"intent_classification": "direct_command", "confidence": 0.98, "suggested_response": "Abrindo YouTube agora.", "parameters": {{"target": "youtube", "action": "abrir"}}}}
 
-MEMORY: {short_mem}
+MEMORY: {memory}
 TOPIC: {context.current_topic}
 
 User: "{text}"
 JSON:"""
 
+    async def _process_via_llama_cpp(self, text: str, context: ConversationContext, stream_callback=None,
+                                     cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """
+        Inference using llama-cpp-python with simple, compatible API calls.
+        Streaming generation stops at the next token once `cancel_token` fires (barge-in).
+        """
+        try:
+            with tracer.span("llm.prompt_build"):
+                memory = self._build_memory_block(context, self._llama_prompt(text, context, ""), self.max_tokens)
+                full_prompt = self._llama_prompt(text, context, memory)
+
             full_text = ""
+            generation = {'tokens': 0, 'first_token': None}
 
             def run_inference():
                 nonlocal full_text
                 try:
-                    # Use the simple callable interface (most compatible)
-                    if stream_callback:
-                        # Simple streaming
-                        response = self.llm(
-                            full_prompt,
-                            max_tokens=150,
-                            temperature=0.3,
-                            stop=["User:", "\n\n", "JSON:"],
-                            stream=True
-                        )
-                        for chunk in response:
-                            if 'choices' in chunk and chunk['choices']:
-                                token = chunk['choices'][0].get('text', '')
-                                if token:
-                                    full_text += token
-                                    if stream_callback:
-                                        stream_callback(token)
-                    else:
-                        # Simple non-streaming
-                        response = self.llm(
-                            full_prompt,
-                            max_tokens=150,
-                            temperature=0.3,
-                            stop=["User:", "\n\n", "JSON:"],
-                            echo=False
-                        )
-                        if 'choices' in response and response['choices']:
-                            full_text = response['choices'][0].get('text', '').strip()
+                    with self._inference_lock:
+                        # Interrupted while waiting for the model
+                        if cancel_token and cancel_token.cancelled:
+                            return
+                        # Use the simple callable interface (most compatible)
+                        if stream_callback:
+                            # Simple streaming
+                            response = self.llm(
+                                full_prompt,
+                                max_tokens=self.max_tokens,
+                                temperature=0.3,
+                                stop=["User:", "\n\n", "JSON:"],
+                                stream=True
+                            )
+                            for chunk in response:
+                                if cancel_token and cancel_token.cancelled:
+                                    # Closing the generator stops llama.cpp from decoding further tokens
+                                    if hasattr(response, 'close'):
+                                        response.close()
+                                    break
+                                if 'choices' in chunk and chunk['choices']:
+                                    token = chunk['choices'][0].get('text', '')
+                                    if token:
+                                        if generation['first_token'] is None:
+                                            generation['first_token'] = time.perf_counter()
+                                        generation['tokens'] += 1
+                                        full_text += token
+                                        if stream_callback:
+                                            stream_callback(token)
+                        else:
+                            # Simple non-streaming
+                            response = self.llm(
+                                full_prompt,
+                                max_tokens=self.max_tokens,
+                                temperature=0.3,
+                                stop=["User:", "\n\n", "JSON:"],
+                                echo=False
+                            )
+                            if 'choices' in response and response['choices']:
+                                full_text = response['choices'][0].get('text', '').strip()
 
                 except Exception as inner_e:
                     logger.error(f"Llama-cpp inference error: {inner_e}", exc_info=True)
                     # Fallback response
                     full_text = f'{{"intent_classification": "conversational_query", "confidence": 0.8, "suggested_response": "Entendo que você quer saber sobre {text}.", "parameters": {{}}}}'
 
-            await asyncio.to_thread(run_inference)
+            with tracer.span("llm.generate", stream=bool(stream_callback)) as span:
+                started = time.perf_counter()
+                await run_io(run_inference)
+                if generation['first_token']:
+                    span.set(tokens=generation['tokens'],
+                             ttft_ms=round((generation['first_token'] - started) * 1000, 1))
+                if cancel_token and cancel_token.cancelled:
+                    span.set(cancelled=cancel_token.reason)
+
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
 
             if not full_text:
                 logger.warning("Llama-cpp returned empty response")
                 return {'intent_classification': 'conversational_query', 'confidence': 0.8, 'suggested_response': f"Entendo que você quer saber sobre {text}.", 'parameters': {}}
 
             return self._parse_local_response(full_text)
+        except OperationCancelled:
+            logger.info(f"Llama-cpp generation cancelled after {generation['tokens']} tokens")
+            raise
         except Exception as e:
             logger.error(f"Llama-cpp error: {e}", exc_info=True)
             # Return a valid fallback response
             return {'intent_classification': 'conversational_query', 'confidence': 0.8, 'suggested_response': f"Entendo que você quer saber sobre {text}.", 'parameters': {}}
 
-    async def process_image(self, image_path: str, prompt: str) -> str:
-        """Analyze an image using a multimodal local model"""
+    async def process_image(self, image, prompt: str) -> str:
+        """
+        Analyze an image using a multimodal local model.
+        `image` may be a file path or an in-memory PIL image (preferred - no PNG round-trip).
+        """
         if not self.clip_model or not self.llm:
             return "Erro: Modelo de visão não carregado. Adicione um arquivo mmproj na pasta models."
 
         try:
-            import base64
-            with open(image_path, "rb") as image_file:
-                base64_image = base64.b64encode(image_file.read()).decode('utf-8')
+            if self.image_pipeline is None:
+                from services.image_pipeline import ImagePipeline
+                self.image_pipeline = ImagePipeline()
 
-            data_uri = f"data:image/png;base64,{base64_image}"
+            call_start = time.perf_counter()
+            rss_before = self._current_rss_mb()
+            prepared = await run_io(self.image_pipeline.prepare, image)
+            preprocess_ms = (time.perf_counter() - call_start) * 1000
 
             def run_vision():
                 try:
-                    # Use simple llama-cpp API without chat format for compatibility
-                    response = self.llm(
-                        f"<image>{data_uri}</image>\n{prompt}",
-                        max_tokens=200,
-                        temperature=0.3,
-                        stop=["\n\n"]
-                    )
+                    with self._inference_lock:
+                        response = self.llm.create_chat_completion(
+                            messages=[{
+                                "role": "user",
+                                "content": [
+                                    {"type": "image_url", "image_url": {"url": prepared.data_uri}},
+                                    {"type": "text", "text": prompt}
+                                ]
+                            }],
+                            max_tokens=200,
+                            temperature=0.3
+                        )
                     if 'choices' in response and response['choices']:
-                        return response['choices'][0].get('text', 'Não foi possível analisar a imagem.').strip()
+                        content = response['choices'][0].get('message', {}).get('content')
+                        return (content or 'Não foi possível analisar a imagem.').strip()
                     else:
                         return 'Não foi possível analisar a imagem.'
                 except Exception as e:
                     logger.error(f"Vision inference error: {e}")
                     return f'Erro na análise: {e}'
 
-            return await asyncio.to_thread(run_vision)
+            inference_start = time.perf_counter()
+            result = await run_io(run_vision)
+            inference_ms = (time.perf_counter() - inference_start) * 1000
+
+            rss_after = self._current_rss_mb()
+            self.last_vision_stats = {
+                'preprocess_ms': round(preprocess_ms, 1),
+                'inference_ms': round(inference_ms, 1),
+                'total_ms': round((time.perf_counter() - call_start) * 1000, 1),
+                'image_size': prepared.size,
+                'payload_kb': round(prepared.payload_bytes / 1024, 1),
+                'cache_hit': prepared.cache_hit,
+                'rss_mb': rss_after,
+                'rss_delta_mb': round(rss_after - rss_before, 1) if rss_before else None
+            }
+            logger.info(f"LocalAIProcessor: Vision call stats {self.last_vision_stats}")
+            return result
         except Exception as e:
             logger.error(f"VLM Error: {e}")
             return f"Falha na análise visual: {e}"
 
-    async def extract_coordinates(self, image_path: str, element_description: str) -> Optional[Tuple[int, int]]:
+    @staticmethod
+    def _current_rss_mb() -> float:
+        try:
+            import psutil
+            return round(psutil.Process().memory_info().rss / 1024 / 1024, 1)
+        except Exception:
+            return 0.0
+
+    async def extract_coordinates(self, image, element_description: str) -> Optional[Tuple[int, int]]:
         """Use VLM to find coordinates (x, y) of an element on screen"""
         prompt = f"Find the precise [x, y] coordinates of the following element: '{element_description}'. Return ONLY the coordinates in the format [x, y] as normalized values between 0 and 1000. If not found, return [0, 0]."
         
-        result = await self.process_image(image_path, prompt)
+        # Same screen as the previous question -> cached payload, CLIP embedding reused
+        result = await self.process_image(image, prompt)
         
         # Regex to extract [x, y]
         match = re.search(r'\[(\d+),\s*(\d+)\]', result)
@@ -383,7 +504,11 @@ JSON:"""
 
     def _build_contextual_prompt(self, text: str, context: ConversationContext) -> str:
         """Prompt for local models to ensure robust intent classification and JSON output."""
-        short_mem = str(context.long_term_memory)[:150] if context.long_term_memory else "None"
+        # Ollama generates up to 80 tokens (num_predict)
+        short_mem = self._build_memory_block(context, self._contextual_prompt(text, context, ""), 80)
+        return self._contextual_prompt(text, context, short_mem)
+
+    def _contextual_prompt(self, text: str, context: ConversationContext, short_mem: str) -> str:
         return f"""You are J.A.R.V.I.S., a smart AI assistant. Classify the user's intent and return ONLY a valid JSON object.
 
 EXAMPLES:
@@ -497,11 +622,22 @@ class NLPResult:
     sentiment: Optional[str] = None
     complexity_score: float = 0.0
     parameters: Dict[str, Any] = None
+    turn_id: Optional[str] = None # Trace turn this result belongs to
 
     def __post_init__(self):
         if self.parameters is None:
             self.parameters = {}
 
+@dataclass
+class TextAnalysis:
+    """Rule-based analysis of a command, computed before (and independently of) the LLM call"""
+    sentiment: str
+    sentiment_confidence: float
+    entities: Dict[str, Any]
+    intent: IntentType
+    intent_confidence: float
+    complexity_score: float
+
 class EntityExtractor:
     """Enhanced entity extraction with Portuguese language support"""
     
@@ -804,7 +940,7 @@ class NLPProcessor:
     for enhanced natural language understanding in Jarvis 2.0
     """
     
-    def __init__(self):
+    def __init__(self, llm=None):
         self.entity_extractor = EntityExtractor()
         self.sentiment_analyzer = SentimentAnalyzer()
         self.contextual_analyzer = ContextualIntentAnalyzer()
@@ -813,7 +949,7 @@ class NLPProcessor:
         self.local_model = os.getenv("LOCAL_MODEL_NAME", "qwen2:1.5b")
         
         # Initialize selected processor
-        self.ai_engine = LocalAIProcessor(self.local_model)
+        self.ai_engine = LocalAIProcessor(self.local_model, llm=llm)
 
         # Test if the AI engine is working
         if hasattr(self.ai_engine, 'use_llama_cpp') and self.ai_engine.use_llama_cpp:
@@ -827,14 +963,9 @@ class NLPProcessor:
         self.complexity_threshold = 0.6
 
         
-    async def process_text(self, text: str, base_intent: IntentType, 
-                           context: ConversationContext, 
-                           mode: ProcessingMode = ProcessingMode.DETAILED,
-                           stream_callback=None) -> NLPResult:
-        """Main text processing method"""
-        
-        start_time = time.time()
-        
+    def analyze_text(self, text: str, base_intent: IntentType,
+                     context: ConversationContext) -> TextAnalysis:
+        """Sentiment, entities, contextual intent and complexity - no retrieval or LLM needed"""
         # Analyze sentiment
         sentiment, sentiment_confidence = self.sentiment_analyzer.analyze_sentiment(text)
         
@@ -848,6 +979,38 @@ class NLPProcessor:
         
         # Calculate complexity score
         complexity_score = self._calculate_complexity(text, entities)
+
+        return TextAnalysis(
+            sentiment=sentiment,
+            sentiment_confidence=sentiment_confidence,
+            entities=entities,
+            intent=refined_intent,
+            intent_confidence=intent_confidence,
+            complexity_score=complexity_score
+        )
+
+    async def process_text(self, text: str, base_intent: IntentType, 
+                           context: ConversationContext, 
+                           mode: ProcessingMode = ProcessingMode.DETAILED,
+                           stream_callback=None,
+                           analysis: Optional[TextAnalysis] = None,
+                           cancel_token: Optional[CancellationToken] = None) -> NLPResult:
+        """
+        Main text processing method.
+        `analysis` may be precomputed with analyze_text() (e.g. while RAG retrieval runs).
+        `cancel_token` aborts LLM generation with OperationCancelled when the user barges in.
+        """
+        
+        start_time = time.time()
+
+        if analysis is None:
+            with tracer.span("nlp.analysis"):
+                analysis = self.analyze_text(text, base_intent, context)
+        sentiment = analysis.sentiment
+        entities = analysis.entities
+        refined_intent = analysis.intent
+        intent_confidence = analysis.intent_confidence
+        complexity_score = analysis.complexity_score
         
         # Generate response suggestion
         response_suggestion = await self._generate_response_suggestion(
@@ -875,7 +1038,10 @@ class NLPProcessor:
             if refined_intent == IntentType.CONVERSATIONAL_QUERY and stream_callback:
                 stream_callback("JARVIS: ")
 
-            ai_result = await self.ai_engine.process_complex_query(text, context, stream_callback)
+            with tracer.span("nlp.ai_engine", engine=engine_type):
+                ai_result = await self.ai_engine.process_complex_query(
+                    text, context, stream_callback, cancel_token=cancel_token
+                )
             ai_response = ai_result.get('suggested_response')
 
             logger.info(f"NLP: AI engine returned: {ai_result.get('suggested_response', 'No response')[:100]}...")
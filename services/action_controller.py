@@ -5,6 +5,7 @@ import random
 from typing import Dict, Any, List, Optional, Callable
 from dataclasses import dataclass
 from conversation_manager import IntentType, CommandCategory
+from services.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -168,8 +169,11 @@ class ActionController:
         """Internal runner that executes command and speaks response"""
         import time
 
+        turn_id = getattr(nlp_result, 'turn_id', None)
+
         # Execute the command first
-        self._run_command(func, nlp_result)
+        with tracer.span("action.execute", turn_id, command=func.__name__):
+            self._run_command(func, nlp_result)
 
         # Small delay to allow UI update to complete
         time.sleep(0.1)
@@ -177,7 +181,7 @@ class ActionController:
         # Speak the response
         if self.tts:
             mood = nlp_result.sentiment if hasattr(nlp_result, 'sentiment') else 'neutral'
-            self.tts.speak(response_text, mood=mood)
+            self.tts.speak(response_text, mood=mood, turn_id=turn_id)
 
     def _run_command(self, func, nlp_result):
         """Internal runner for commands."""
@@ -228,7 +232,7 @@ class ActionController:
             
             # If the command returned a specific result text, we might want to say it
             if result and self.tts and "Abrindo" not in result: # Avoid "Abrindo Google" twice if already said
-                self.tts.speak(result)
+                self.tts.speak(result, turn_id=getattr(nlp_result, 'turn_id', None))
                 
         except Exception as e:
             logger.error(f"ActionController: Error in command {func.__name__}: {e}")
@@ -6,6 +6,8 @@ import threading
 import uuid
 import time
 import re
+from collections import deque
+from dataclasses import replace
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
@@ -26,7 +28,14 @@ from services.indexer_service import BrainIndexerService
 from services.vision_monitor_service import VisionMonitorService
 from services.coding_agent_service import CodingAgentService
 from services.memory_service import MemoryService
+from services.memory_retention import RETENTION_INTERVAL
 from services.telegram_service import TelegramService
+from services.stream_coalescer import TokenStreamCoalescer
+from services.service_runtime import ServiceRuntime, run_cpu, run_io
+from services.tracing import tracer
+from services.cancellation import CancellationToken, OperationCancelled
+from services.request_admission import RequestAdmission, Admission
+from services.work_scheduler import WorkScheduler, WorkPriority
 
 logger = logging.getLogger(__name__)
 
@@ -46,9 +55,18 @@ class AIService(QThread):
 
     # Commands loaded dynamically from ActionController registry
 
-    def __init__(self):
+    # Workers per task lane. Research/document ingestion gets its own lane so a
+    # slow web-agent run never blocks a volume command; commands stay serial so
+    # "abrir x" followed by "fechar x" still executes in order.
+    DEFAULT_CONCURRENCY = {'command': 1, 'research': 1, 'feedback': 1}
+
+    # Sources whose answers are shown and spoken on the HUD - the ones a barge-in interrupts
+    HUD_SOURCES = ('voice', 'text')
+
+    def __init__(self, concurrency: Optional[Dict[str, int]] = None):
         super().__init__()
         self.loop = None
+        self.runtime = None # ServiceRuntime, created in run()
         self.running = True
         
         # AI Components
@@ -62,11 +80,33 @@ class AIService(QThread):
         self.indexer = None # Initialized in run() after memory_service
         self.vision_monitor = None # Initialized in run() after processor
         self.telegram = TelegramService()
-        
-        # Runtime Context
+
+        # Runtime Context (history and environment; each command task works on its own snapshot)
         self.context = ConversationContext()
-        self.pending_tasks = []
+
+        # Task lanes: one asyncio.Queue per lane, created on the service loop in _serve()
+        self.concurrency = dict(self.DEFAULT_CONCURRENCY, **(concurrency or {}))
+        self.task_queues: Dict[str, asyncio.Queue] = {}
+        self.pending_tasks = deque() # Tasks submitted before the loop starts serving
         self.task_lock = threading.Lock()
+        self._serving = False
+        self._stop_event = None
+        self._workers = []
+
+        # Barge-in: command tasks carry a CancellationToken until they finish
+        self._inflight: List[Dict[str, Any]] = []
+        self.cancelled_tasks = 0
+
+        # Duplicate commands (Vosk double finals, Telegram, workflow replay) share one task
+        self.admission = RequestAdmission()
+
+        # Background jobs (vision, ingestion, batch learning) yield to user turns and high CPU
+        self.scheduler = WorkScheduler()
+
+        # Post-turn work (memory writes, learning, suggestions) runs off the critical path
+        # on the runtime's CPU pool. The lock keeps memory writes serialised and in order.
+        self._memory_writes = asyncio.Lock()
+        self._background_tasks = set()
 
     def run(self):
         """Main thread loop"""
@@ -74,78 +114,54 @@ class AIService(QThread):
             # Clear any stale tasks from previous session
             self.clear_pending_tasks()
             
-            # Initialize Async Loop for this thread
-            self.loop = asyncio.new_event_loop()
+            # One runtime (loop + CPU/IO pools) hosts this service and every background loop
+            self.runtime = ServiceRuntime()
+            self.loop = self.runtime.loop
             asyncio.set_event_loop(self.loop)
             
             # Initialize Memory and NLP Processor
             self.memory_service = MemoryService()
+            self.memory_service.scheduler = self.scheduler
             self.nlp_processor = NLPProcessor()
             try:
                 self.learning_module = LearningModule()
+                self.learning_module.scheduler = self.scheduler
                 logger.info("LearningModule initialized successfully")
-                # Start background learning
-                self.loop.run_until_complete(self.learning_module.start_learning())
+                # Background learning runs as a runtime service
+                self.runtime.register(
+                    "learning", self.learning_module.start_learning,
+                    stop=self.learning_module.stop_learning
+                )
             except Exception as e:
                 logger.error(f"Failed to initialize LearningModule: {e}")
                 self.learning_module = None
             
-            # Start background perception loop (as daemon thread with its own event loop)
-            self._bg_threads = []
-
-            def _run_async_loop(coro_func, name):
-                """Run an async coroutine in a dedicated daemon thread"""
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    loop.run_until_complete(coro_func())
-                except Exception as e:
-                    logger.error(f"Background service '{name}' crashed: {e}")
-                finally:
-                    loop.close()
-
-            perception_thread = threading.Thread(
-                target=_run_async_loop,
-                args=(self._perception_loop, "perception"),
-                daemon=True
+            # Background loops share the runtime instead of owning a thread + event loop each
+            self.runtime.register("perception", self._perception_loop)
+            self.runtime.register("memory_retention", self._retention_loop)
+            self.runtime.register(
+                "health_monitor", lambda: self.health_monitor.start_monitoring(self),
+                stop=self.health_monitor.stop,
+                health=lambda: self.health_monitor.running
             )
-            perception_thread.start()
-            self._bg_threads.append(perception_thread)
-
-            # Start Health Monitor
-            health_thread = threading.Thread(
-                target=_run_async_loop,
-                args=(lambda: self.health_monitor.start_monitoring(self), "health_monitor"),
-                daemon=True
-            )
-            health_thread.start()
-            self._bg_threads.append(health_thread)
             
             # Start Brain Indexer
-            self.indexer = BrainIndexerService(self.memory_service)
+            self.indexer = BrainIndexerService(self.memory_service, scheduler=self.scheduler)
             self.indexer.start()
             
             # Start Vision Monitor (every 60s)
             self.vision_monitor = VisionMonitorService(self)
-            vision_thread = threading.Thread(
-                target=_run_async_loop,
-                args=(self.vision_monitor.start, "vision_monitor"),
-                daemon=True
+            self.runtime.register(
+                "vision_monitor", self.vision_monitor.start,
+                stop=self.vision_monitor.stop,
+                health=lambda: self.vision_monitor.running
             )
-            vision_thread.start()
-            self._bg_threads.append(vision_thread)
 
             # Start periodic update check (every 24h)
-            update_thread = threading.Thread(
-                target=_run_async_loop,
-                args=(self._update_check_loop, "update_check"),
-                daemon=True
-            )
-            update_thread.start()
-            self._bg_threads.append(update_thread)
+            self.runtime.register("update_check", self._update_check_loop)
             
             # Start Telegram Service
-            self.telegram.command_received.connect(self.process_command)
+            self.telegram.command_received.connect(self._on_telegram_command)
             # Connect proactivity to Telegram
             self.learning_insight.connect(self.telegram.send_message)
             self.telegram.start()
@@ -154,54 +170,260 @@ class AIService(QThread):
             
             logger.info("AI Service initialized successfully")
             
-            # Process Loop
-            while self.running:
-                # Check for pending tasks
-                task = None
-                with self.task_lock:
-                    if self.pending_tasks:
-                        task = self.pending_tasks.pop(0)
-
-                if task:
-                    self.loop.run_until_complete(self._process_task(task))
-                else:
-                    # Sleep briefly to avoid CPU hogging (reduced from 100ms to 50ms)
-                    self.msleep(50)
-                    
-            # Cleanup
-            if self.learning_module:
-                self.loop.run_until_complete(self.learning_module.stop_learning())
-            self.loop.close()
+            # Serve the task lanes until stop(): workers block on their queues, no polling
+            self.runtime.register(
+                "ai_tasks", self._serve,
+                stop=self._drain_background,
+                health=lambda: {'pending': self.pending_count(), 'background': len(self._background_tasks)}
+            )
+            self.runtime.run()
             
         except Exception as e:
             logger.error(f"AI Service crashed: {e}")
             self.error_occurred.emit(str(e))
 
-    def process_command(self, command: str):
-        """Entry point for processing a text command (voice or manual)"""
+    def process_command(self, command: str, turn_id: Optional[str] = None, source: str = "voice",
+                        on_result=None, supersede: bool = False, on_cancel=None) -> Admission:
+        """
+        Entry point for processing a text command (voice, manual or Telegram).
+        `turn_id` ties the command to a trace turn started upstream (e.g. at speech onset).
+        Duplicates of an in-flight command are merged into it; `on_result` is called with the
+        shared NLPResult and `on_cancel` with the reason if it is dropped instead.
+        `supersede` cancels pending answers from the same source when the command is new.
+        """
+        admission = self.admission.admit(command, source, on_result, on_cancel)
+        if admission.merged:
+            return admission
+        if supersede:
+            self.interrupt("new_utterance", include_commands=False, sources=(source,))
+
         # Workflow recording logic
         if self.workflow_manager.is_recording:
             if "parar gravação" in command.lower() or "encerrar macro" in command.lower():
                 name = self.workflow_manager.stop_recording()
-                self.learning_insight.emit(f"✅ Workflow '{name}' gravado e salvo com sucesso.")
-                return
+                message = f"✅ Workflow '{name}' gravado e salvo com sucesso."
+                self.learning_insight.emit(message)
+                # Requesters (e.g. Telegram) get the confirmation, not a cancel notice
+                self.admission.complete(admission.ticket, NLPResult(
+                    original_text=command, processed_text=command, intent=IntentType.DIRECT_COMMAND,
+                    confidence=1.0, entities={}, context_relevance=0.0, response_suggestion=message,
+                    processing_time=0.0
+                ))
+                return admission
             else:
                 self.workflow_manager.add_to_recording(command)
                 # Still process it so the user sees it working during record
         
         # Queue the command for async processing in the AI service's event loop
-        # Note: _async_process_command is not defined in the provided context,
-        # but this line is part of the requested change.
-        # For now, we'll queue it as before, but the instruction implies a change to an async call.
-        # To make it syntactically correct and functional with existing _process_task:
+        base_intent, _ = self._detect_base_intent(command)
+        task = {
+            'type': 'command',
+            'data': command,
+            'turn_id': turn_id or tracer.start_turn("command"),
+            'queued_at': time.perf_counter(),
+            'cancel_token': CancellationToken(),
+            # Spoken answers are superseded by a new utterance; system commands are not
+            'interruptible': base_intent != IntentType.DIRECT_COMMAND,
+            'ticket': admission.ticket,
+            'source': source,
+            'interactive': True
+        }
+        # The turn holds background work back from submission until its first response
+        self.scheduler.begin_interactive()
         with self.task_lock:
-            self.pending_tasks.append({'type': 'command', 'data': command})
+            self._inflight.append(task)
+        self.submit_task(task)
+        return admission
+
+    def _on_telegram_command(self, text: str):
+        self.process_command(text, source="telegram", on_result=self._reply_telegram,
+                             on_cancel=self._cancelled_telegram)
+
+    def _reply_telegram(self, result: NLPResult):
+        if result.response_suggestion:
+            self.telegram.send_message(result.response_suggestion)
+
+    def _cancelled_telegram(self, reason: str):
+        self.telegram.send_message(f"⚠️ Comando cancelado ({reason}).")
+
+    def _release_task(self, task: Dict[str, Any], reason: Optional[str] = None):
+        """Forget a finished, cancelled or dropped command task (`reason` set unless it finished)"""
+        if 'cancel_token' in task:
+            with self.task_lock:
+                if task in self._inflight:
+                    self._inflight.remove(task)
+        if 'ticket' in task:
+            # No-op when the result was already delivered
+            self.admission.complete(task['ticket'], reason=reason)
+        self._first_response(task)
+
+    def _first_response(self, task: Dict[str, Any]):
+        """
+        The user has something to look at: the rest of the turn (streaming, research,
+        ingestion) no longer holds background work back. Safe from any thread.
+        """
+        if task.pop('interactive', False):
+            self.scheduler.end_interactive()
 
+    def interrupt(self, reason: str = "barge_in", include_commands: bool = True,
+                  sources: Optional[tuple] = None) -> int:
+        """
+        Cancel queued and running command tasks (thread-safe).
+        Barge-in cancels everything; a new utterance passes include_commands=False so
+        only pending answers are dropped while system commands still run.
+        `sources` limits the cancel to tasks from those sources (None = every source),
+        so speaking over the HUD never cancels a Telegram request.
+        """
+        with self.task_lock:
+            targets = [t for t in self._inflight
+                       if (include_commands or t.get('interruptible'))
+                       and (sources is None or t.get('source') in sources)]
+        cancelled = 0
+        for task in targets:
+            token = task['cancel_token']
+            if not token.cancelled:
+                token.cancel(reason)
+                cancelled += 1
+        if cancelled:
+            self.cancelled_tasks += cancelled
+            logger.info(f"AIService: Cancelled {cancelled} in-flight tasks ({reason})")
+        return cancelled
 
     def update_feedback(self, success: bool):
         """Public method to provide feedback on last action"""
+        self.submit_task({'type': 'feedback', 'data': success})
+
+    def submit_task(self, task: Dict[str, Any]):
+        """Thread-safe hand-off of a task to the service event loop"""
         with self.task_lock:
-            self.pending_tasks.append({'type': 'feedback', 'data': success})
+            if self._serving:
+                self.loop.call_soon_threadsafe(self._enqueue, task)
+            else:
+                self.pending_tasks.append(task)
+
+    def pending_count(self) -> int:
+        """Tasks waiting to be picked up by a worker"""
+        return len(self.pending_tasks) + sum(q.qsize() for q in self.task_queues.values())
+
+    def _task_lane(self, task: Dict[str, Any]) -> str:
+        """Route a task to its lane by type (and, for commands, by detected intent)"""
+        task_type = task.get('type')
+        if task_type == 'command':
+            base_intent, _ = self._detect_base_intent(str(task.get('data', '')))
+            if base_intent in (IntentType.AGENT_RESEARCH_QUERY, IntentType.DOC_LEARNING_QUERY):
+                return 'research'
+        return task_type if task_type in self.task_queues else 'command'
+
+    def _enqueue(self, task: Dict[str, Any]):
+        """Runs on the service loop thread"""
+        self.task_queues[self._task_lane(task)].put_nowait(task)
+
+    async def _serve(self):
+        """Start the lane workers and keep them running until stop() is called"""
+        self._stop_event = asyncio.Event()
+        self.task_queues = {lane: asyncio.Queue() for lane in self.concurrency}
+
+        for lane, count in self.concurrency.items():
+            for i in range(max(1, count)):
+                self._workers.append(asyncio.create_task(self._worker(lane), name=f"ai-{lane}-{i}"))
+
+        with self.task_lock:
+            while self.pending_tasks:
+                self._enqueue(self.pending_tasks.popleft())
+            self._serving = True
+
+        logger.info(f"AIService: Serving task lanes {self.concurrency}")
+        try:
+            if self.running:
+                await self._stop_event.wait()
+        finally:
+            with self.task_lock:
+                self._serving = False
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers.clear()
+
+    async def _worker(self, lane: str):
+        queue = self.task_queues[lane]
+        while True:
+            task = await queue.get()
+            reason = None
+            try:
+                with tracer.use_turn(task.get('turn_id')):
+                    if 'queued_at' in task:
+                        tracer.record("ai.queue_wait", task['queued_at'], time.perf_counter(), lane=lane)
+                    token = task.get('cancel_token')
+                    if token:
+                        # Cancelled while queued - skip without touching the LLM
+                        token.raise_if_cancelled()
+                    await self._process_task(task)
+            except OperationCancelled as e:
+                # Drop only this task's unsent tokens; other lanes keep streaming
+                if 'stream' in task:
+                    task['stream'].reset()
+                logger.info(f"AIService: Dropped '{task.get('data')}' ({e.reason})")
+                reason = e.reason
+            except Exception as e:
+                logger.error(f"AIService: Task failed in '{lane}' lane: {e}")
+                self.error_occurred.emit(str(e))
+                reason = "failed"
+            finally:
+                self._release_task(task, reason)
+                queue.task_done()
+
+    def _detect_base_intent(self, text: str):
+        """Fast keyword classification. Returns (base_intent, processing_mode)"""
+        text_lower = text.lower()
+
+        # Fast keyword matching — avoids Ollama for predictable commands ──────────────
+        DIRECT_CMD_KEYWORDS = [
+            'abrir', 'abri', 'abre', 'fechar', 'fecha', 'tocar', 'toca',
+            'pausar', 'pausa', 'aumentar', 'diminuir', 'volume', 'pesquisar',
+            'pesquisa', 'buscar', 'busca', 'procurar', 'desligar', 'reiniciar',
+            'print', 'screenshot', 'calcular', 'calcula', 'escreva', 'digite'
+        ]
+        VISION_KEYWORDS = [
+            'tela', 'câmera', 'camera', 'olhe', 'analise', 'veja', 'o que tem na'
+        ]
+
+        def _word_match(keywords, text):
+            """Check if any keyword exists as a whole word in text"""
+            for kw in keywords:
+                if ' ' in kw:
+                    # Multi-word keyword: simple substring match
+                    if kw in text:
+                        return True
+                else:
+                    # Single word: use word boundary
+                    if re.search(r'\b' + re.escape(kw) + r'\b', text):
+                        return True
+            return False
+
+        process_mode = ProcessingMode.FAST # Default to fast
+
+        # Check DIRECT_CMD_KEYWORDS FIRST (most specific, avoids stealing by date/time)
+        if _word_match(DIRECT_CMD_KEYWORDS, text_lower):
+            base_intent = IntentType.DIRECT_COMMAND
+        elif _word_match(['horas', 'que horas', 'horário'], text_lower):
+            base_intent = IntentType.TIME_QUERY
+        elif _word_match(['dia é hoje', 'que dia'], text_lower) or text_lower.strip() == 'data':
+            base_intent = IntentType.DATE_QUERY
+        elif _word_match(VISION_KEYWORDS, text_lower):
+            base_intent = IntentType.VISION_QUERY
+        elif _word_match(['pesquisa profunda', 'agente', 'investigue', 'preço de'], text_lower):
+            base_intent = IntentType.AGENT_RESEARCH_QUERY
+            process_mode = ProcessingMode.DETAILED
+        elif _word_match(['aprenda da pasta', 'leia os arquivos', 'ingerir'], text_lower):
+            base_intent = IntentType.DOC_LEARNING_QUERY
+            process_mode = ProcessingMode.DETAILED
+        else:
+            # Only send to Ollama (DETAILED) when we truly can't classify quickly
+            base_intent = IntentType.CONVERSATIONAL_QUERY
+            process_mode = ProcessingMode.DETAILED
+        # ─────────────────────────────────────────────────────────────────────────────
+
+        return base_intent, process_mode
 
     async def _process_task(self, task: Dict[str, Any]):
         """Internal task processor"""
@@ -210,91 +432,86 @@ class AIService(QThread):
         
         if task_type == 'command':
             text = data
+            cancel_token = task.get('cancel_token')
+            context = self._turn_context()
+
+            def emit(chunk: str):
+                # The bare "JARVIS: " prefix goes out before generation starts; it is not an answer yet
+                if chunk.strip() not in ("", "JARVIS:"):
+                    self._first_response(task)
+                self.stream_token_received.emit(chunk)
+
+            # Batches this task's LLM tokens to frame cadence before they cross the Qt/JS bridge
+            stream = task['stream'] = TokenStreamCoalescer(emit)
             logger.info(f"AIService: Processing command task: {text}")
             
             # 1. Base Intent Analysis (Fast)
-            # Simple keyword match to get started or rely on NLP for everything
-            # Simple intent checking to bypass LLM for fast execution
-            text_lower = text.lower()
-            
-            # Fast keyword matching — avoids Ollama for predictable commands ──────────────
-            DIRECT_CMD_KEYWORDS = [
-                'abrir', 'abri', 'abre', 'fechar', 'fecha', 'tocar', 'toca',
-                'pausar', 'pausa', 'aumentar', 'diminuir', 'volume', 'pesquisar',
-                'pesquisa', 'buscar', 'busca', 'procurar', 'desligar', 'reiniciar',
-                'print', 'screenshot', 'calcular', 'calcula', 'escreva', 'digite'
-            ]
-            VISION_KEYWORDS = [
-                'tela', 'câmera', 'camera', 'olhe', 'analise', 'veja', 'o que tem na'
-            ]
-
-            def _word_match(keywords, text):
-                """Check if any keyword exists as a whole word in text"""
-                for kw in keywords:
-                    if ' ' in kw:
-                        # Multi-word keyword: simple substring match
-                        if kw in text:
-                            return True
-                    else:
-                        # Single word: use word boundary
-                        if re.search(r'\b' + re.escape(kw) + r'\b', text):
-                            return True
-                return False
-
-            process_mode = ProcessingMode.FAST # Default to fast
-
-            # Check DIRECT_CMD_KEYWORDS FIRST (most specific, avoids stealing by date/time)
-            if _word_match(DIRECT_CMD_KEYWORDS, text_lower):
-                base_intent = IntentType.DIRECT_COMMAND
-            elif _word_match(['horas', 'que horas', 'horário'], text_lower):
-                base_intent = IntentType.TIME_QUERY
-            elif _word_match(['dia é hoje', 'que dia'], text_lower) or text_lower.strip() == 'data':
-                base_intent = IntentType.DATE_QUERY
-            elif _word_match(VISION_KEYWORDS, text_lower):
-                base_intent = IntentType.VISION_QUERY
-            elif _word_match(['pesquisa profunda', 'agente', 'investigue', 'preço de'], text_lower):
-                base_intent = IntentType.AGENT_RESEARCH_QUERY
-                process_mode = ProcessingMode.DETAILED
-            elif _word_match(['aprenda da pasta', 'leia os arquivos', 'ingerir'], text_lower):
-                base_intent = IntentType.DOC_LEARNING_QUERY
-                process_mode = ProcessingMode.DETAILED
-            else:
-                # Only send to Ollama (DETAILED) when we truly can't classify quickly
-                base_intent = IntentType.CONVERSATIONAL_QUERY
-                process_mode = ProcessingMode.DETAILED
-            # ─────────────────────────────────────────────────────────────────────────────
+            with tracer.span("ai.route"):
+                base_intent, process_mode = self._detect_base_intent(text)
 
-            
             logger.info(f"AIService: Analysis results: detected base_intent as {base_intent}")
             
-            # 2. Retrieve Past Context/Facts via RAG
+            # 2. Retrieve Past Context/Facts via RAG concurrently with the rule-based
+            #    sentiment/entity/intent analysis. Both run on the I/O pool, not behind background
+            #    jobs on the CPU pool: analysis on the loop thread would hold it until done and
+            #    the retrieval would start late.
+            retrieval = None
             if hasattr(self, 'memory_service') and self.memory_service:
-                self.context.long_term_memory = self.memory_service.retrieve_relevant_context(text)
+                retrieval = asyncio.create_task(self._traced_retrieval(text))
+            with tracer.span("nlp.analysis"):
+                analysis = await run_io(self.nlp_processor.analyze_text, text, base_intent, context)
+
+            if retrieval:
+                # Keep every scored candidate - the prompt builder packs them by token budget
+                context.retrieved_context = await retrieval
+                context.long_term_memory = self.memory_service.format_context(
+                    context.retrieved_context,
+                    limits={'fact': 2, 'document': 2, 'conversation': 3}
+                )
             
             # 3. Handle Special Deep Intelligence Intents
             if base_intent == IntentType.AGENT_RESEARCH_QUERY:
-                self.stream_token_received.emit("JARVIS: Iniciando pesquisa profunda via agente autônomo. Por favor, aguarde...")
+                emit("JARVIS: Iniciando pesquisa profunda via agente autônomo. Por favor, aguarde...")
                 research_results = await self.web_agent.research_topic(text)
-                self.context.long_term_memory += f"\nRecent Research: {research_results}"
+                context.long_term_memory += f"\nRecent Research: {research_results}"
+                context.retrieved_context.append({'kind': 'research', 'text': str(research_results), 'score': 1.0})
                 text = f"Resuma e me explique os seguintes resultados de pesquisa sobre {text}: {research_results}"
                 # Switch to detailed for explanation
                 process_mode = ProcessingMode.DETAILED
+                analysis = None # Text changed - re-analyze inside process_text
             
             elif base_intent == IntentType.DOC_LEARNING_QUERY:
-                self.stream_token_received.emit("JARVIS: Analisando e aprendendo com os documentos locais...")
+                emit("JARVIS: Analisando e aprendendo com os documentos locais...")
                 # Extract path or use default
                 target_dir = os.path.join(os.getcwd(), "documents")
-                await asyncio.to_thread(self.memory_service.ingest_directory, target_dir)
+                def report(progress):
+                    self.stream_token_received.emit(
+                        f"\nJARVIS: {progress.files_done}/{progress.files_total} arquivos, "
+                        f"{progress.chunks} trechos ({progress.percent:.0f}%)"
+                    )
+                # Requested by the user, so not gated as background work
+                await run_io(self.memory_service.ingest_directory, target_dir, report, False)
                 self.stream_token_received.emit("JARVIS: Aprendizado concluído. Agora conheço o conteúdo dos seus documentos.")
                 return
 
-            result = await self.nlp_processor.process_text(
-                text, 
-                base_intent, 
-                self.context, 
-                mode=process_mode,
-                stream_callback=lambda token: self.stream_token_received.emit(token)
-            )
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
+
+            with tracer.span("ai.nlp", mode=process_mode.value):
+                result = await self.nlp_processor.process_text(
+                    text, 
+                    base_intent, 
+                    context, 
+                    mode=process_mode,
+                    stream_callback=stream.push,
+                    analysis=analysis,
+                    cancel_token=cancel_token
+                )
+            if cancel_token:
+                # Interrupted during a non-streaming stage - nobody is waiting for this answer
+                cancel_token.raise_if_cancelled()
+            stream.flush()
+            result.turn_id = task.get('turn_id')
             
             # 3.5 JARVIS CODER FALLBACK (God Mode)
             # If LLM doesn't know how to handle and it's a direct command, try coding agent
@@ -304,56 +521,27 @@ class AIService(QThread):
                 result.response_suggestion = code_result
                 result.intent = IntentType.DIRECT_COMMAND # Override
             
-            # 4. Store memory
-            if hasattr(self, 'memory_service') and self.memory_service:
-                self.memory_service.store_interaction(
-                    user_text=text,
-                    ai_response=result.response_suggestion,
-                    intent=result.intent.name,
-                    timestamp=str(time.time())
-                )
-            
-            # 5. Update Context
-            self.context.last_command = text
-            self.context.conversation_history.append({
+            # 4. Update Context: the turn joins the shared history, its RAG results stay with the task
+            entry = {
                 'user_input': text,
                 'intent': result.intent.value,
                 'timestamp': datetime.now().isoformat(),
                 'entities': result.entities,
                 'response': result.response_suggestion,
                 'confidence': result.confidence
-            })
-            # 6. Silent Perception Learning (Learn from every interaction)
-            if self.learning_module:
-                try:
-                    turn = ConversationTurn(
-                        id=str(uuid.uuid4()),
-                        timestamp=datetime.now(),
-                        user_input=text,
-                        recognized_text=text,
-                        confidence_score=result.confidence,
-                        intent=result.intent,
-                        entities=result.entities,
-                        context={},
-                        response=result.response_suggestion,
-                        response_time=result.processing_time,
-                        satisfaction_score=0.8 # Default successful baseline
-                    )
-                    await self.learning_module.learn_from_interaction(turn, self.context)
-                except Exception as e:
-                    logger.error(f"Error passing interaction to learning module: {e}")
-                    
-            # 7. Emit Result for UI/Execution
+            }
+            for ctx in (context, self.context):
+                ctx.last_command = text
+                ctx.conversation_history.append(entry)
+
+            # 5. Emit Result for UI/Execution as soon as it exists
+            self._first_response(task)
             self.processing_finished.emit(result)
-            
-            # 8. Check for Proactive Suggestions (Learning)
-            if self.learning_module:
-                try:
-                    suggestions = await self.learning_module.generate_proactive_suggestions(self.context)
-                    for suggestion in suggestions:
-                        self.learning_insight.emit(suggestion)
-                except Exception as e:
-                    logger.error(f"Error generating suggestions: {e}")
+            if 'ticket' in task:
+                self.admission.complete(task['ticket'], result)
+
+            # 6. Memory storage, learning and suggestions don't affect this turn - run them in the background
+            self._spawn_background(self._post_process(text, result, context))
                 
         elif task_type == 'feedback':
             # Implement Learning from feedback
@@ -390,23 +578,121 @@ class AIService(QThread):
                 except Exception as e:
                     logger.error(f"Error processing feedback: {e}")
     
+    async def _drain_background(self):
+        """Shutdown hook: let in-flight background work (memory writes) finish"""
+        if self._stop_event:
+            self._stop_event.set()
+        if self._background_tasks:
+            await asyncio.wait(list(self._background_tasks), timeout=5)
+
+    def _spawn_background(self, coro):
+        """Fire-and-forget a coroutine on the service loop, keeping a reference until it finishes"""
+        task = asyncio.get_running_loop().create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    async def _traced_retrieval(self, text: str):
+        with tracer.span("ai.rag"):
+            return await run_io(self.memory_service.retrieve_scored_context, text)
+
+    def _turn_context(self) -> ConversationContext:
+        """
+        Snapshot of the shared context for one task. Lanes run side by side, so
+        retrieved context and research results must not leak between turns.
+        """
+        shared = self.context
+        return replace(
+            shared,
+            conversation_history=deque(shared.conversation_history, maxlen=shared.conversation_history.maxlen),
+            retrieved_context=list(shared.retrieved_context)
+        )
+
+    async def _post_process(self, text: str, result: NLPResult, context: ConversationContext):
+        """Background work after a result was emitted: store memory, learn, suggest"""
+        # Store memory (embedding + persistence) on the runtime's CPU pool
+        if hasattr(self, 'memory_service') and self.memory_service:
+            try:
+                # Let a follow-up turn finish first; the write is never dropped
+                await self.scheduler.admit("memory_store", WorkPriority.NORMAL, sheddable=False)
+                async with self._memory_writes:
+                    with tracer.span("memory.store"):
+                        await run_cpu(
+                            lambda: self.memory_service.store_interaction(
+                                user_text=text,
+                                ai_response=result.response_suggestion,
+                                intent=result.intent.name,
+                                timestamp=str(time.time())
+                            )
+                        )
+            except Exception as e:
+                logger.error(f"Error storing interaction: {e}")
+
+        if not self.learning_module:
+            return
+
+        # Silent Perception Learning (Learn from every interaction)
+        try:
+            turn = ConversationTurn(
+                id=str(uuid.uuid4()),
+                timestamp=datetime.now(),
+                user_input=text,
+                recognized_text=text,
+                confidence_score=result.confidence,
+                intent=result.intent,
+                entities=result.entities,
+                context={},
+                response=result.response_suggestion,
+                response_time=result.processing_time,
+                satisfaction_score=0.8 # Default successful baseline
+            )
+            await self.learning_module.learn_from_interaction(turn, context)
+        except Exception as e:
+            logger.error(f"Error passing interaction to learning module: {e}")
+
+        # Check for Proactive Suggestions (Learning)
+        try:
+            suggestions = await self.learning_module.generate_proactive_suggestions(context)
+            for suggestion in suggestions:
+                self.learning_insight.emit(suggestion)
+        except Exception as e:
+            logger.error(f"Error generating suggestions: {e}")
+
     def clear_pending_tasks(self):
         """Clear any pending tasks from the queue"""
         with self.task_lock:
             count = len(self.pending_tasks)
+            stale = list(self.pending_tasks)
             self.pending_tasks.clear()
+            if self._serving:
+                self.loop.call_soon_threadsafe(self._drain_queues)
             if count > 0:
                 logger.info(f"AIService: Cleared {count} stale pending tasks")
+        for task in stale:
+            self._release_task(task, "cleared")
         
         # Also reset conversation context to avoid old command influence
         self.context = ConversationContext()
         logger.info("AIService: Reset conversation context")
             
+    def _drain_queues(self):
+        """Drop queued (not yet started) tasks. Runs on the service loop thread"""
+        dropped = 0
+        for queue in self.task_queues.values():
+            while not queue.empty():
+                self._release_task(queue.get_nowait(), "cleared")
+                queue.task_done()
+                dropped += 1
+        if dropped:
+            logger.info(f"AIService: Cleared {dropped} queued tasks")
+
     async def _perception_loop(self):
         """Periodically check environment (active window) for proactive suggestions"""
         while self.running:
             try:
                 await asyncio.sleep(60) # Every minute
+                if not await self.scheduler.admit("proactive_suggestions", WorkPriority.BACKGROUND):
+                    continue
                 if self.vision_service and self.learning_module:
                     window_info = self.vision_service.get_active_window_info()
                     self.context.environmental_state['active_window'] = window_info
@@ -421,6 +707,21 @@ class AIService(QThread):
             except Exception as e:
                 logger.error(f"Error in perception loop: {e}")
 
+    async def _retention_loop(self):
+        """Periodic retention pass over conversation memory, one admitted batch at a time"""
+        while self.running:
+            await asyncio.sleep(RETENTION_INTERVAL)
+            retention = self.memory_service.retention
+            try:
+                # A shed step ends this round; the next one resumes at the same row
+                while self.running and await self.scheduler.admit("memory_retention", WorkPriority.BACKGROUND):
+                    if await run_cpu(retention.step):
+                        # Replaced and deleted documents leave tombstones too
+                        await run_cpu(self.memory_service.vacuum_documents)
+                        break
+            except Exception as e:
+                logger.error(f"Error in memory retention: {e}")
+
     async def _update_check_loop(self):
         while self.running:
             if await self.updater.check_for_updates():
@@ -429,5 +730,12 @@ class AIService(QThread):
 
     def stop(self):
         self.running = False
+        if self.runtime:
+            # Runs every service's stop hook, then cancels and closes the runtime loop
+            self.runtime.stop(wait=False)
+        else:
+            with self.task_lock:
+                if self._serving:
+                    self.loop.call_soon_threadsafe(self._stop_event.set)
         self.wait()
 
@@ -0,0 +1,254 @@
+import os
+import json
+import logging
+import threading
+import numpy as np
+from array import array
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    HNSWLIB_AVAILABLE = False
+
+# Rows -> (len(rows), dim) float32 vectors; supplied by the collection that owns the index
+FetchFn = Callable[[np.ndarray], np.ndarray]
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first (argpartition, then sort only k)"""
+    if k <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(scores, -k)[-k:]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(scores[candidates])[::-1]]
+
+def top_k_columns(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(indices, scores) of the k largest entries of each column of (n, m) scores, unordered"""
+    if k < len(scores):
+        indices = np.argpartition(scores, len(scores) - k, axis=0)[len(scores) - k:]
+        return indices, np.take_along_axis(scores, indices, axis=0)
+    indices = np.broadcast_to(np.arange(len(scores))[:, None], scores.shape)
+    return indices, scores
+
+def live_mask(rows: np.ndarray, limit: Optional[int] = None, dead: Optional[np.ndarray] = None) -> np.ndarray:
+    """Rows below `limit` (committed in the reader's snapshot) and not in the sorted `dead` array"""
+    keep = np.ones(len(rows), dtype=bool) if limit is None else rows < limit
+    if dead is not None and len(dead):
+        pos = np.minimum(np.searchsorted(dead, rows), len(dead) - 1)
+        keep &= dead[pos] != rows
+    return keep
+
+def default_nlist(n: int) -> int:
+    return int(min(4096, max(16, 4 * np.sqrt(n))))
+
+class IVFFlatIndex:
+    """
+    Inverted-file index over normalized vectors (pure numpy).
+    Spherical k-means centroids partition the rows into `nlist` lists of row ids;
+    a query scans the `nprobe` closest lists and rescores those rows exactly.
+    Vectors are not duplicated: candidates are fetched from the collection.
+    """
+    kind = "ivf"
+
+    def __init__(self, dim: int, nlist: int, nprobe: Optional[int] = None):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe or max(16, nlist // 16)
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[array] = [array('q') for _ in range(nlist)]
+        self.ntotal = 0
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, sample: np.ndarray, iterations: int = 10, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        sample = np.asarray(sample, dtype=np.float32)
+        nlist = min(self.nlist, len(sample))
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = self._assign(sample, centroids)
+            order = np.argsort(assign, kind='stable')
+            counts = np.bincount(assign, minlength=nlist)
+            filled = counts > 0
+            sums = np.zeros_like(centroids)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+            sums[filled] = np.add.reduceat(sample[order], starts, axis=0)
+            empty = ~filled
+            if empty.any():
+                # Re-seed empty lists with random rows
+                sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+        self.centroids = centroids
+        if nlist < self.nlist:
+            self.nlist = nlist
+            self.lists = self.lists[:nlist]
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray, batch: int = 65536) -> np.ndarray:
+        return np.concatenate([
+            np.argmax(vectors[i:i + batch] @ centroids.T, axis=1) for i in range(0, len(vectors), batch)
+        ]) if len(vectors) else np.empty(0, dtype=np.int64)
+
+    def add(self, vectors: np.ndarray, start_row: int):
+        """Index rows start_row .. start_row + len(vectors) - 1"""
+        if not len(vectors):
+            return
+        assign = self._assign(np.asarray(vectors, dtype=np.float32), self.centroids)
+        order = np.argsort(assign, kind='stable')
+        rows = (order + start_row).astype(np.int64)
+        bounds = np.searchsorted(assign[order], np.arange(self.nlist + 1))
+        for list_id in np.flatnonzero(np.diff(bounds)):
+            self.lists[list_id].frombytes(rows[bounds[list_id]:bounds[list_id + 1]].tobytes())
+        self.ntotal += len(vectors)
+
+    def search(self, query: np.ndarray, k: int, fetch: FetchFn, limit: Optional[int] = None,
+               dead: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k (rows, scores) among rows below `limit` that are not in the sorted `dead`
+        array. Both filters apply before scoring: `fetch` only has vectors for the
+        reader's rows, and a filtered candidate never takes one of the k places.
+        When fewer than k candidates survive (lists emptied by tombstones), the next
+        closest lists are probed as well, doubling nprobe each round.
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        closeness = self.centroids @ query
+        filtered = limit is not None or (dead is not None and len(dead) > 0)
+        found_rows, found_scores = [], []
+        probed, nprobe, total = 0, min(self.nprobe, self.nlist), 0
+        while probed < self.nlist and total < k:
+            # tobytes() snapshots each list, so a concurrent add() can still grow it
+            candidates = [np.frombuffer(self.lists[l].tobytes(), dtype=np.int64)
+                          for l in top_k(closeness, nprobe)[probed:] if len(self.lists[l])]
+            probed, nprobe = nprobe, min(self.nlist, 2 * nprobe)
+            if not candidates:
+                continue
+            rows = np.sort(np.concatenate(candidates))  # Sorted ids read the segments sequentially
+            if filtered:
+                rows = rows[live_mask(rows, limit, dead)]
+            found_rows.append(rows)
+            found_scores.append(fetch(rows) @ query)
+            total += len(rows)
+        if not total:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        rows, scores = np.concatenate(found_rows), np.concatenate(found_scores)
+        best = top_k(scores, k)
+        return rows[best], scores[best]
+
+    def save(self, path: str):
+        from services.memory_store import atomic_write
+        offsets = np.cumsum([0] + [len(l) for l in self.lists]).astype(np.int64)
+        ids = np.frombuffer(b"".join(l.tobytes() for l in self.lists), dtype=np.int64)
+        atomic_write(path, lambda f: np.savez(f, centroids=self.centroids, ids=ids, offsets=offsets,
+                                              meta=np.array([self.dim, self.nprobe, self.ntotal])))
+
+    @classmethod
+    def load(cls, path: str) -> "IVFFlatIndex":
+        data = np.load(path)
+        dim, nprobe, ntotal = (int(v) for v in data['meta'])
+        centroids, ids, offsets = data['centroids'], data['ids'], data['offsets']
+        index = cls(dim, len(centroids), nprobe)
+        index.centroids = centroids
+        for i in range(len(centroids)):
+            index.lists[i].frombytes(ids[offsets[i]:offsets[i + 1]].tobytes())
+        index.ntotal = ntotal
+        return index
+
+class HnswIndex:
+    """
+    hnswlib backend (used automatically when hnswlib is installed).
+    resize_index is not safe under concurrent queries, so add and search share a lock.
+    """
+    kind = "hnsw"
+
+    def __init__(self, dim: int, capacity: int = 1024, ef: int = 64, M: int = 16):
+        self.dim = dim
+        self.ef = ef
+        self.index = hnswlib.Index(space='ip', dim=dim)
+        self.index.init_index(max_elements=capacity, ef_construction=200, M=M)
+        self.index.set_ef(ef)
+        self.ntotal = 0
+        self._lock = threading.Lock()
+
+    @property
+    def trained(self) -> bool:
+        return True
+
+    def train(self, sample: np.ndarray, iterations: int = 10, seed: int = 0):
+        pass
+
+    def add(self, vectors: np.ndarray, start_row: int):
+        if not len(vectors):
+            return
+        with self._lock:
+            needed = self.ntotal + len(vectors)
+            if needed > self.index.get_max_elements():
+                self.index.resize_index(max(needed, 2 * self.index.get_max_elements()))
+            self.index.add_items(vectors, np.arange(start_row, start_row + len(vectors)))
+            self.ntotal = needed
+
+    def search(self, query: np.ndarray, k: int, fetch: FetchFn, limit: Optional[int] = None,
+               dead: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Same contract as IVFFlatIndex.search. The graph cannot skip rows, so filtered
+        hits are dropped after the query, which is repeated with a doubled k until
+        k rows survive or the whole index has been returned.
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(1, -1)
+        filtered = limit is not None or (dead is not None and len(dead) > 0)
+        with self._lock:
+            want = min(self.ntotal, k + (min(len(dead), 4 * k + 64) if dead is not None else 0))
+            while want:
+                self.index.set_ef(max(self.ef, want))
+                labels, distances = self.index.knn_query(query, k=want)
+                # 'ip' distance is 1 - dot
+                rows, scores = labels[0].astype(np.int64), (1.0 - distances[0]).astype(np.float32)
+                if not filtered:
+                    return rows, scores
+                keep = live_mask(rows, limit, dead)
+                if keep.sum() >= k or want >= self.ntotal:
+                    return rows[keep][:k], scores[keep][:k]
+                want = min(self.ntotal, 2 * want)
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    def save(self, path: str):
+        tmp_path = path + ".tmp"
+        self.index.save_index(tmp_path)
+        os.replace(tmp_path, path)
+        with open(path + ".json", 'w', encoding='utf-8') as f:
+            json.dump({'dim': self.dim, 'ntotal': self.ntotal, 'ef': self.ef}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "HnswIndex":
+        with open(path + ".json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        index = cls.__new__(cls)
+        index.dim, index.ef, index.ntotal = meta['dim'], meta['ef'], meta['ntotal']
+        index.index = hnswlib.Index(space='ip', dim=index.dim)
+        index.index.load_index(path, max_elements=max(index.ntotal, 1))
+        index.index.set_ef(index.ef)
+        index._lock = threading.Lock()
+        return index
+
+def create_index(dim: int, n: int, backend: str = "auto"):
+    """New (untrained) index sized for about `n` rows"""
+    if backend == "hnsw" or (backend == "auto" and HNSWLIB_AVAILABLE):
+        return HnswIndex(dim, capacity=max(1024, n))
+    return IVFFlatIndex(dim, default_nlist(n))
+
+def index_path(directory: str, backend: str = "auto") -> str:
+    kind = "hnsw" if backend == "hnsw" or (backend == "auto" and HNSWLIB_AVAILABLE) else "ivf"
+    return os.path.join(directory, "ann_hnsw.bin" if kind == "hnsw" else "ann_ivf.npz")
+
+def load_index(path: str):
+    if path.endswith(".bin"):
+        return HnswIndex.load(path)
+    return IVFFlatIndex.load(path)
@@ -0,0 +1,54 @@
+import threading
+import logging
+from typing import Optional, Callable, List
+
+logger = logging.getLogger(__name__)
+
+class OperationCancelled(Exception):
+    """Raised when work is abandoned because its cancellation token fired"""
+    def __init__(self, reason: str = "cancelled"):
+        super().__init__(reason)
+        self.reason = reason
+
+class CancellationToken:
+    """
+    Cooperative cancellation flag shared between threads.
+    The requester calls cancel(); long-running work polls `cancelled` (or calls
+    raise_if_cancelled()) at safe points such as between generated tokens.
+    """
+    __slots__ = ("_event", "reason", "_callbacks", "_lock")
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"CancellationToken: Callback failed: {e}")
+
+    def on_cancel(self, callback: Callable[[], None]):
+        """Run `callback` when cancelled (immediately if already cancelled)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise OperationCancelled(self.reason or "cancelled")
@@ -0,0 +1,125 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Section headers used when rendering packed items into the prompt
+SECTION_TITLES = {
+    'fact': "Known Facts",
+    'document': "Document Knowledge",
+    'conversation': "Past Context",
+    'turn': "Recent Turns",
+    'research': "Recent Research",
+}
+
+class ContextPacker:
+    """
+    Fits retrieved memory into the model's context window.
+    Counts tokens with the loaded model's tokenizer (falling back to a
+    chars/4 estimate when no model is loaded) and greedily packs the
+    highest-scoring items into the remaining budget.
+    """
+    def __init__(self, tokenize: Optional[Callable[[str], List[int]]] = None,
+                 n_ctx: int = 2048, reserve_tokens: int = 150, cache_size: int = 4096):
+        self.tokenize = tokenize
+        self.n_ctx = n_ctx
+        self.reserve_tokens = reserve_tokens
+        self.cache_size = cache_size
+        self._cache = OrderedDict() # text -> token count
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def count_tokens(self, text: str) -> int:
+        """Token count for a prompt section, cached so repeated facts are tokenized once"""
+        if not text:
+            return 0
+
+        with self._lock:
+            cached = self._cache.get(text)
+            if cached is not None:
+                self._cache.move_to_end(text)
+                self.cache_hits += 1
+                return cached
+
+        count = self._count_uncached(text)
+
+        with self._lock:
+            self.cache_misses += 1
+            self._cache[text] = count
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return count
+
+    def _count_uncached(self, text: str) -> int:
+        if self.tokenize:
+            try:
+                return len(self.tokenize(text))
+            except Exception as e:
+                logger.debug(f"ContextPacker: Tokenizer failed, using estimate: {e}")
+        # Rough estimate for Portuguese/English BPE vocabularies
+        return max(1, len(text) // 4)
+
+    def available_budget(self, prompt_skeleton: str, max_tokens: Optional[int] = None) -> int:
+        """Tokens left for context after the fixed prompt and the generation reserve"""
+        reserve = self.reserve_tokens if max_tokens is None else max_tokens
+        return max(0, self.n_ctx - reserve - self.count_tokens(prompt_skeleton))
+
+    def pack(self, items: List[Dict[str, Any]], budget: int) -> List[Dict[str, Any]]:
+        """
+        Greedy packing by score. Each item is a dict with 'kind', 'text' and 'score'.
+        Items that do not fit are skipped so smaller, lower-scored ones can still
+        use the leftover budget.
+        """
+        packed = []
+        used = 0
+        seen = set()
+
+        for item in sorted(items, key=lambda i: i.get('score', 0.0), reverse=True):
+            text = (item.get('text') or "").strip()
+            if not text or text in seen:
+                continue
+
+            # Separator overhead (" | " or a header line) is roughly one token
+            cost = self.count_tokens(text) + 1
+            if used + cost > budget:
+                continue
+
+            packed.append(item)
+            seen.add(text)
+            used += cost
+
+        return packed
+
+    def render(self, items: List[Dict[str, Any]]) -> str:
+        """Render packed items grouped by section, in the order of SECTION_TITLES"""
+        grouped = {}
+        for item in items:
+            grouped.setdefault(item.get('kind', 'fact'), []).append(item['text'].strip())
+
+        lines = []
+        for kind, title in SECTION_TITLES.items():
+            if kind in grouped:
+                lines.append(f"{title}: " + " | ".join(grouped.pop(kind)))
+        # Unlabelled kinds (e.g. pre-formatted memory text) go last, verbatim
+        for texts in grouped.values():
+            lines.extend(texts)
+
+        return "\n".join(lines)
+
+    def build(self, items: List[Dict[str, Any]], prompt_skeleton: str,
+              max_tokens: Optional[int] = None) -> str:
+        """Pack and render in one step for the given prompt skeleton"""
+        budget = self.available_budget(prompt_skeleton, max_tokens)
+        # Rendering adds one header line per section
+        header_cost = len(SECTION_TITLES) * 4
+        return self.render(self.pack(items, max(0, budget - header_cost)))
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.cache_hits + self.cache_misses
+        return {
+            'cached_sections': len(self._cache),
+            'hit_rate': round(self.cache_hits / total, 3) if total else 0.0
+        }
@@ -0,0 +1,225 @@
+import os
+import json
+import inspect
+import logging
+import importlib.util
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from services.embedding_store import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+# "auto" (ONNX export if present, else sentence-transformers), "onnx" or "sentence-transformers"
+BACKEND_ENV = "JARVIS_EMBEDDING_BACKEND"
+RUNTIME_ENV = "JARVIS_EMBEDDING_RUNTIME"   # "auto", "openvino" or "onnxruntime"
+ONNX_MODEL_DIR = os.path.join("models", "embedding_onnx")
+CONFIG_FILE = "embedding_config.json"
+MIN_COSINE = 0.999  # Export check: closeness to the PyTorch embeddings a graph needs to be used
+
+def mean_pool(hidden: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Average of the token states under the attention mask (sentence-transformers mean pooling)"""
+    mask = mask.astype(np.float32)[..., None]
+    summed = (hidden * mask).sum(axis=1)
+    return summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+def _onnxruntime_available() -> bool:
+    return importlib.util.find_spec("onnxruntime") is not None
+
+class SentenceTransformerBackend:
+    """The original PyTorch model (imports torch; kept as the reference and fallback)"""
+    name = "sentence-transformers"
+
+    def __init__(self, model_path: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_path)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, sentences, **kwargs) -> np.ndarray:
+        return self.model.encode(sentences, **kwargs)
+
+class OnnxEmbeddingBackend:
+    """
+    MiniLM exported to ONNX, run by OpenVINO or onnxruntime without PyTorch.
+    The export directory holds model.onnx (and model_int8.onnx when quantized),
+    tokenizer.json and embedding_config.json. By default the int8 graph is used
+    when the export measured it at MIN_COSINE or better, on onnxruntime only:
+    OpenVINO runs its dynamic-quantization ops slower than the fp32 graph.
+    Tokens go through the graph; mean pooling and normalization run in numpy,
+    as sentence-transformers does.
+    `tokenizer` and `infer` replace the loaded ones (tests).
+    """
+    name = "onnx"
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, runtime: str = "auto", int8: Optional[bool] = None,
+                 tokenizer=None, infer: Optional[Callable[[Dict[str, np.ndarray]], np.ndarray]] = None):
+        with open(os.path.join(model_dir, CONFIG_FILE), 'r', encoding='utf-8') as f:
+            self.config: Dict[str, Any] = json.load(f)
+        self.dim = self.config['dim']
+        self.max_seq_length = self.config.get('max_seq_length', 256)
+        self.normalize = self.config.get('normalize', True)
+        self.inputs: List[str] = self.config.get('inputs', ['input_ids', 'attention_mask', 'token_type_ids'])
+
+        measured = self.config.get('min_cosine_int8')
+        if int8 is None:
+            int8 = (os.path.exists(os.path.join(model_dir, "model_int8.onnx"))
+                    and measured is not None and measured >= MIN_COSINE
+                    and (runtime == "onnxruntime" or (runtime == "auto" and _onnxruntime_available())))
+            if int8:
+                runtime = "onnxruntime"
+        elif int8 and measured is not None and measured < MIN_COSINE:
+            raise ValueError(f"int8 export drifts from the PyTorch model (min cosine {measured} < {MIN_COSINE})")
+        self.model_path = os.path.join(model_dir, "model_int8.onnx" if int8 else "model.onnx")
+
+        self.tokenizer = tokenizer or self._load_tokenizer(model_dir)
+        if infer is None:
+            self.runtime, infer = self._load_runtime(self.model_path, runtime)
+        else:
+            self.runtime = "custom"
+        self._infer = infer
+
+    def _load_tokenizer(self, model_dir: str):
+        from tokenizers import Tokenizer
+        tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        tokenizer.enable_truncation(self.max_seq_length)
+        tokenizer.enable_padding(pad_id=self.config.get('pad_id', 0), pad_token=self.config.get('pad_token', "[PAD]"))
+        return tokenizer
+
+    @staticmethod
+    def _load_runtime(model_path: str, runtime: str):
+        """(runtime name, infer(feeds) -> last hidden state); OpenVINO first, as for Whisper"""
+        if runtime in ("auto", "openvino"):
+            try:
+                import openvino as ov
+                compiled = ov.Core().compile_model(model_path, "CPU", {"PERFORMANCE_HINT": "LATENCY"})
+                output = compiled.output(0)
+                return "openvino", lambda feeds: compiled(feeds)[output]
+            except Exception as e:
+                if runtime == "openvino":
+                    raise
+                logger.info(f"EmbeddingBackend: OpenVINO unavailable ({e}), trying onnxruntime")
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        return "onnxruntime", lambda feeds: session.run(None, feeds)[0]
+
+    def encode(self, sentences: Union[str, Sequence[str]], batch_size: int = 32,
+               convert_to_numpy: bool = True, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        """SentenceTransformer.encode-compatible: (dim,) for a string, (n, dim) for a list"""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        # Longest first, so each batch pads to similar lengths
+        order = sorted(range(len(texts)), key=lambda i: -len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            out[batch] = self._encode_batch([texts[i] for i in batch])
+        return out[0] if single else out
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+            'attention_mask': np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self._infer({name: feeds[name] for name in self.inputs})
+        pooled = mean_pool(np.asarray(hidden, dtype=np.float32), feeds['attention_mask'])
+        return normalize_rows(pooled) if self.normalize else pooled
+
+def create_embedding_backend(st_model_path: str, backend: Optional[str] = None, onnx_dir: str = ONNX_MODEL_DIR):
+    """
+    Embedding model selected by `backend` or the JARVIS_EMBEDDING_BACKEND variable.
+    "auto" uses the ONNX export when it exists (run export_embedding_onnx.py once)
+    and falls back to sentence-transformers if it cannot be loaded.
+    """
+    backend = (backend or os.getenv(BACKEND_ENV, "auto")).lower()
+    if backend not in ("auto", "onnx", "sentence-transformers"):
+        raise ValueError(f"Unknown embedding backend: {backend}")
+    if backend == "onnx" or (backend == "auto" and os.path.exists(os.path.join(onnx_dir, CONFIG_FILE))):
+        try:
+            model = OnnxEmbeddingBackend(onnx_dir, runtime=os.getenv(RUNTIME_ENV, "auto"))
+            logger.info(f"EmbeddingBackend: ONNX model on {model.runtime} ({os.path.basename(model.model_path)})")
+            return model
+        except Exception as e:
+            if backend == "onnx":
+                raise
+            logger.warning(f"EmbeddingBackend: ONNX model failed to load ({e}); using sentence-transformers")
+    return SentenceTransformerBackend(st_model_path)
+
+# ── Export (one-time; needs torch + sentence-transformers) ───────────────────────
+
+def export_onnx(model_name_or_path: str, output_dir: str = ONNX_MODEL_DIR, int8: bool = False,
+                opset: int = 14, check_sentences: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Export a sentence-transformers model (transformer + mean pooling) to ONNX.
+    Writes model.onnx, optionally model_int8.onnx (dynamic int8 weights), the
+    tokenizer and embedding_config.json, then checks the ONNX embeddings against
+    the PyTorch ones. Returns the written config (with the check results).
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(output_dir, exist_ok=True)
+    model = SentenceTransformer(model_name_or_path, device="cpu")
+    transformer = model[0]
+    modules = [type(m).__name__ for m in model]
+    pooling = model[modules.index('Pooling')].get_config_dict() if 'Pooling' in modules else {}
+    # sentence-transformers < 5 writes pooling_mode_mean_tokens, later versions pooling_mode
+    if pooling and not (pooling.get('pooling_mode_mean_tokens') or pooling.get('pooling_mode') == 'mean'):
+        raise ValueError("Only mean-pooling models are supported")
+
+    hf_model, hf_tokenizer = transformer.auto_model.eval(), transformer.tokenizer
+    hf_tokenizer.save_pretrained(output_dir)  # tokenizer.json (fast tokenizer) + vocab
+    sample = hf_tokenizer(["Exportando o modelo de embeddings"], return_tensors="pt")
+    inputs = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+
+    class HiddenStates(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, *args):
+            return self.inner(**dict(zip(inputs, args))).last_hidden_state
+
+    dynamic = {name: {0: 'batch', 1: 'sequence'} for name in inputs}
+    dynamic['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+    model_path = os.path.join(output_dir, "model.onnx")
+    # torch >= 2.9 defaults to the dynamo exporter (needs onnxscript, ignores dynamic_axes)
+    legacy = {'dynamo': False} if 'dynamo' in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.no_grad():
+        torch.onnx.export(HiddenStates(hf_model), tuple(sample[name] for name in inputs), model_path,
+                          input_names=inputs, output_names=['last_hidden_state'],
+                          dynamic_axes=dynamic, opset_version=opset, **legacy)
+
+    if int8:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(model_path, os.path.join(output_dir, "model_int8.onnx"), weight_type=QuantType.QInt8)
+
+    config = {
+        'source': model_name_or_path,
+        'dim': model.get_sentence_embedding_dimension(),
+        'max_seq_length': model.max_seq_length,
+        'normalize': 'Normalize' in modules,
+        'pooling': 'mean',
+        'inputs': inputs,
+        'pad_id': hf_tokenizer.pad_token_id,
+        'pad_token': hf_tokenizer.pad_token,
+    }
+    with open(os.path.join(output_dir, CONFIG_FILE), 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=1)
+
+    # Numerical check against the PyTorch model
+    sentences = check_sentences or [
+        "abrir youtube", "Qual é a previsão do tempo para amanhã em São Paulo?",
+        "O servidor retornou o erro ERR-1042 ao salvar config.py", "lembre-me de ligar para a Conceição às 18h",
+    ]
+    reference = np.asarray(model.encode(sentences, convert_to_numpy=True), dtype=np.float32)
+    for variant in ([False, True] if int8 else [False]):
+        exported = OnnxEmbeddingBackend(output_dir, runtime="onnxruntime", int8=variant).encode(sentences)
+        cosine = (normalize_rows(reference) * normalize_rows(exported)).sum(axis=1)
+        config[f"min_cosine{'_int8' if variant else ''}"] = round(float(cosine.min()), 6)
+    with open(os.path.join(output_dir, CONFIG_FILE), 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=1)
+    return config
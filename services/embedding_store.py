@@ -0,0 +1,133 @@
+import logging
+import numpy as np
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row (zero rows are left as zeros)"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def quantize(vectors: np.ndarray, mode: str):
+    """
+    Compact codes for normalized vectors: (codes, scales).
+    "int8": per-vector scale, codes = round(v / scale) with scale = max|v| / 127.
+    "float16": half precision, no scales.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if mode == "float16":
+        return vectors.astype(np.float16), None
+    if mode == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0 if len(vectors) else np.empty(0, dtype=np.float32)
+        scales[scales == 0] = 1.0
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    raise ValueError(f"Unknown quantization mode: {mode}")
+
+def code_scores(codes: np.ndarray, scales: Optional[np.ndarray], query: np.ndarray,
+                block: int = 2048) -> np.ndarray:
+    """
+    Approximate dot products of `query` (dim,) or queries (dim, m) against
+    quantized rows, decoded one cache-sized block at a time
+    """
+    out = np.empty((len(codes),) + query.shape[1:], dtype=np.float32)
+    for i in range(0, len(codes), block):
+        part = codes[i:i + block].astype(np.float32) @ query
+        if scales is not None:
+            part *= scales[i:i + block].reshape((-1,) + (1,) * (part.ndim - 1))
+        out[i:i + block] = part
+    return out
+
+class EmbeddingStore:
+    """
+    Growable matrix of pre-normalized embeddings with amortized O(1) append.
+    Rows live in a preallocated buffer whose capacity doubles when full, so
+    appending n vectors copies O(n) floats in total instead of the O(n^2)
+    of np.vstack-per-insert. `vectors` is a view of the used rows.
+    """
+    def __init__(self, dim: Optional[int] = None, dtype=np.float32, initial_capacity: int = 256):
+        self.dtype = np.dtype(dtype)
+        self.initial_capacity = max(1, initial_capacity)
+        self._data: Optional[np.ndarray] = None
+        self._size = 0
+        self.copied_bytes = 0  # Bytes moved by capacity growth (for benchmarks)
+        if dim is not None:
+            self._data = np.empty((self.initial_capacity, dim), dtype=self.dtype)
+
+    @classmethod
+    def from_array(cls, vectors, normalize: bool = False, dtype=np.float32) -> "EmbeddingStore":
+        """Wrap existing embeddings (e.g. loaded from disk)"""
+        store = cls(dtype=dtype)
+        vectors = np.asarray(vectors, dtype=store.dtype)
+        if vectors.size:
+            store.extend(vectors, normalize=normalize)
+        return store
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def dim(self) -> Optional[int]:
+        return None if self._data is None else self._data.shape[1]
+
+    @property
+    def capacity(self) -> int:
+        return 0 if self._data is None else self._data.shape[0]
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """View of the stored rows (shape (len, dim)); invalidated by later appends"""
+        if self._data is None:
+            return np.empty((0, 0), dtype=self.dtype)
+        return self._data[:self._size]
+
+    @property
+    def nbytes(self) -> int:
+        return 0 if self._data is None else self._data.nbytes
+
+    def _reserve(self, rows: int, dim: int):
+        if self._data is None:
+            self._data = np.empty((max(self.initial_capacity, rows), dim), dtype=self.dtype)
+            return
+        if dim != self._data.shape[1]:
+            raise ValueError(f"Embedding dimension {dim} does not match store dimension {self._data.shape[1]}")
+        if rows <= self._data.shape[0]:
+            return
+        capacity = self._data.shape[0]
+        while capacity < rows:
+            capacity *= 2
+        grown = np.empty((capacity, dim), dtype=self.dtype)
+        grown[:self._size] = self._data[:self._size]
+        self.copied_bytes += self._size * dim * self.dtype.itemsize
+        self._data = grown
+
+    def append(self, vector, normalize: bool = True) -> int:
+        """Add one vector; returns its row index"""
+        vector = np.asarray(vector, dtype=self.dtype).reshape(-1)
+        self._reserve(self._size + 1, vector.shape[0])
+        if normalize:
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vector = vector / norm
+        self._data[self._size] = vector
+        self._size += 1
+        return self._size - 1
+
+    def extend(self, vectors, normalize: bool = True) -> range:
+        """Add a batch of vectors (n, dim) with a single copy; returns their row indices"""
+        vectors = np.asarray(vectors, dtype=self.dtype)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        start = self._size
+        if len(vectors) == 0:
+            return range(start, start)
+        self._reserve(start + len(vectors), vectors.shape[1])
+        self._data[start:start + len(vectors)] = normalize_rows(vectors) if normalize else vectors
+        self._size += len(vectors)
+        return range(start, self._size)
+
+    def clear(self):
+        self._size = 0
+
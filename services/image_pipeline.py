@@ -0,0 +1,134 @@
+import io
+import time
+import base64
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Union
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PreparedImage:
+    """Image ready to be sent to the VLM"""
+    data_uri: str
+    phash: int
+    size: tuple
+    payload_bytes: int
+    cache_hit: bool = False
+    timings: Dict[str, float] = field(default_factory=dict)
+
+class ImagePipeline:
+    """
+    In-memory preprocessing stage for VLM calls.
+    Screens are downscaled to the CLIP projector's native resolution and
+    encoded once, without a PNG round-trip through disk. Prepared payloads
+    are cached by perceptual hash: a screen that has not visibly changed
+    maps to byte-identical data, so llama-cpp's Llava handler (which keeps
+    the CLIP embedding of the last image it encoded) can skip re-encoding
+    it for follow-up questions such as extract_coordinates.
+    """
+    def __init__(self, target_size: int = 336, cache_size: int = 16,
+                 max_hamming_distance: int = 4, jpeg_quality: int = 90):
+        self.target_size = target_size          # LLaVA-1.5 CLIP ViT-L/14 works at 336px
+        self.cache_size = cache_size
+        self.max_hamming_distance = max_hamming_distance
+        self.jpeg_quality = jpeg_quality
+        self._cache = OrderedDict()  # phash -> PreparedImage
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def perceptual_hash(image: Image.Image) -> int:
+        """64-bit difference hash (dHash): robust to scaling and small pixel noise"""
+        small = image.convert("L").resize((9, 8), Image.BILINEAR)
+        pixels = small.tobytes()  # one byte per pixel in "L" mode
+        value = 0
+        for row in range(8):
+            for col in range(8):
+                left = pixels[row * 9 + col]
+                right = pixels[row * 9 + col + 1]
+                value = (value << 1) | (1 if left > right else 0)
+        return value
+
+    @staticmethod
+    def hamming_distance(a: int, b: int) -> int:
+        return bin(a ^ b).count("1")
+
+    def load(self, image: Union[str, Image.Image]) -> Image.Image:
+        """Accept a file path (legacy callers) or an in-memory PIL image"""
+        if isinstance(image, Image.Image):
+            return image
+        with Image.open(image) as img:
+            img.load()
+            return img.copy()
+
+    def prepare(self, image: Union[str, Image.Image]) -> PreparedImage:
+        """Downscale, hash and encode an image, reusing a cached payload when possible"""
+        start = time.perf_counter()
+        img = self.load(image)
+        phash = self.perceptual_hash(img)
+        hashed = time.perf_counter()
+
+        cached = self._lookup(phash)
+        if cached:
+            return PreparedImage(
+                data_uri=cached.data_uri,
+                phash=cached.phash,
+                size=cached.size,
+                payload_bytes=cached.payload_bytes,
+                cache_hit=True,
+                timings={'hash_ms': (hashed - start) * 1000, 'encode_ms': 0.0}
+            )
+
+        resized = img.convert("RGB")
+        resized.thumbnail((self.target_size, self.target_size), Image.BILINEAR)
+
+        buffer = io.BytesIO()
+        resized.save(buffer, format="JPEG", quality=self.jpeg_quality)
+        payload = buffer.getvalue()
+        encoded = time.perf_counter()
+
+        prepared = PreparedImage(
+            data_uri="data:image/jpeg;base64," + base64.b64encode(payload).decode('ascii'),
+            phash=phash,
+            size=resized.size,
+            payload_bytes=len(payload),
+            timings={'hash_ms': (hashed - start) * 1000, 'encode_ms': (encoded - hashed) * 1000}
+        )
+        self._store(prepared)
+        return prepared
+
+    def _lookup(self, phash: int) -> Optional[PreparedImage]:
+        with self._lock:
+            for key in reversed(self._cache):
+                if self.hamming_distance(key, phash) <= self.max_hamming_distance:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return self._cache[key]
+            self.misses += 1
+        return None
+
+    def _store(self, prepared: PreparedImage):
+        with self._lock:
+            self._cache[prepared.phash] = prepared
+            self._cache.move_to_end(prepared.phash)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'cached_images': len(self._cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0
+        }
@@ -1,16 +1,24 @@
 import os
 import time
 import logging
+import threading
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from pathlib import Path
 
+from services.indexing_queue import IndexingQueue
+from services.ingestion_pipeline import scan_files
+from services.work_scheduler import WorkPriority
+
 logger = logging.getLogger(__name__)
 
 class BrainIndexerHandler(FileSystemEventHandler):
-    def __init__(self, memory_service):
-        self.memory_service = memory_service
-        self.valid_exts = {'.txt', '.md', '.py', '.js', '.html', '.css', '.pdf'}
+    """Forwards file events to the indexing queue; never ingests on the observer thread"""
+    def __init__(self, queue: IndexingQueue):
+        self.queue = queue
+        # Text formats only: the pipeline reads files as text and PDFs are rejected as binary.
+        # A skipped file is not in the manifest, so reconcile() would queue it on every start.
+        self.valid_exts = {'.txt', '.md', '.py', '.js', '.html', '.css'}
 
     def on_created(self, event):
         if not event.is_directory:
@@ -20,22 +28,27 @@ class BrainIndexerHandler(FileSystemEventHandler):
         if not event.is_directory:
             self._process_file(event.src_path)
 
-    def _process_file(self, file_path):
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self._process_file(event.src_path, deleted=True)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self._process_file(event.src_path, deleted=True)
+            self._process_file(event.dest_path)
+
+    def _process_file(self, file_path, deleted=False):
         ext = os.path.splitext(file_path)[1].lower()
         if ext in self.valid_exts:
-            logger.info(f"BrainIndexer: Autodetected new/modified file: {file_path}")
-            # Schedule ingestion in MemoryService
-            try:
-                self.memory_service.ingest_document(file_path)
-            except Exception as e:
-                logger.error(f"BrainIndexer: Error ingesting {file_path}: {e}")
+            logger.debug(f"BrainIndexer: Queued {'deleted' if deleted else 'new/modified'} file: {file_path}")
+            self.queue.submit(file_path, deleted=deleted)
 
 class BrainIndexerService:
     """
     Background service that monitors the filesystem and automatically
     ingests new knowledge into Jarvis's brain.
     """
-    def __init__(self, memory_service, watch_paths=None):
+    def __init__(self, memory_service, watch_paths=None, scheduler=None, debounce=2.0, workers=1):
         self.memory_service = memory_service
         if watch_paths is None:
             # Default to Documents and Desktop
@@ -47,11 +60,20 @@ class BrainIndexerService:
         else:
             self.watch_paths = watch_paths
             
+        self.queue = IndexingQueue(
+            self.memory_service.ingest_document,
+            remove=self.memory_service.remove_documents,
+            debounce=debounce, workers=workers, scheduler=scheduler,
+            indexed=lambda path: os.path.abspath(path) in self.memory_service.document_manifest()
+        )
+        self.scheduler = scheduler
         self.observer = Observer()
-        self.handler = BrainIndexerHandler(self.memory_service)
+        self.handler = BrainIndexerHandler(self.queue)
         self.running = False
+        self.last_scan = None
 
     def start(self):
+        self.queue.start()
         for path in self.watch_paths:
             if os.path.exists(path):
                 self.observer.schedule(self.handler, path, recursive=True)
@@ -59,8 +81,53 @@ class BrainIndexerService:
         
         self.observer.start()
         self.running = True
+        # Catch up on changes made while Jarvis was closed (watching starts first so nothing is missed)
+        threading.Thread(target=self._startup_scan, name="indexer-reconcile", daemon=True).start()
+
+    def _startup_scan(self):
+        try:
+            if self.scheduler:
+                self.scheduler.admit_blocking("indexer_reconcile", WorkPriority.BACKGROUND,
+                                              max_wait=300, sheddable=False)
+            self.reconcile()
+        except Exception as e:
+            logger.error(f"BrainIndexer: Startup reconciliation failed: {e}")
+
+    def reconcile(self):
+        """
+        Compare the watched folders with the document manifest: new or changed files
+        (size / mtime_ns) are queued, files deleted meanwhile are purged. Nothing is
+        read or embedded here; touched-but-identical files are settled by content hash
+        when the queue ingests them.
+        """
+        start = time.perf_counter()
+        manifest = self.memory_service.document_manifest()
+        seen = set()
+        queued = 0
+        for path, mtime_ns, size in scan_files([p for p in self.watch_paths if os.path.exists(p)],
+                                               self.handler.valid_exts):
+            seen.add(path)
+            saved = manifest.get(path)
+            if saved is None or not saved['done'] or saved['mtime_ns'] != mtime_ns or saved['size'] != size:
+                self.queue.submit(path)
+                queued += 1
+
+        roots = tuple(os.path.join(os.path.abspath(p), "") for p in self.watch_paths)
+        deleted = [path for path in manifest if path.startswith(roots) and path not in seen]
+        if deleted:
+            self.memory_service.remove_documents(deleted)
+
+        self.last_scan = {'files': len(seen), 'queued': queued, 'deleted': len(deleted),
+                          'seconds': round(time.perf_counter() - start, 3)}
+        logger.info(f"BrainIndexer: Startup scan of {len(seen)} files in {self.last_scan['seconds']}s: "
+                    f"{queued} queued, {len(deleted)} deleted")
+        return self.last_scan
 
     def stop(self):
         self.observer.stop()
         self.observer.join()
+        self.queue.stop()
         self.running = False
+
+    def stats(self):
+        return {**self.queue.stats(), 'last_scan': self.last_scan}
@@ -0,0 +1,175 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Iterable, Optional, Set
+
+from services.work_scheduler import WorkPriority
+
+logger = logging.getLogger(__name__)
+
+MAX_FILE_BYTES = 50 * (1 << 20)  # Larger files are skipped (logs, dumps)
+BINARY_PROBE_BYTES = 8192
+
+def looks_binary(path: str) -> bool:
+    """NUL bytes in the first block: images, PDFs, archives, executables"""
+    with open(path, 'rb') as f:
+        return b'\0' in f.read(BINARY_PROBE_BYTES)
+
+class IndexingQueue:
+    """
+    Coalescing, debounced queue between filesystem events and ingestion.
+    Each path waits for a quiet period of `debounce` seconds after its last event,
+    so the created + modified + modified burst of one save becomes one job. A path
+    is never processed by two workers at once: events arriving while it is being
+    ingested re-queue it once. Jobs run on `workers` threads off the watchdog thread.
+    A file that turns binary or outgrows `max_file_bytes` is removed like a deleted
+    one when `indexed(path)` says it has chunks from before.
+    """
+    def __init__(self, process: Callable[[str], Any], remove: Optional[Callable[[Iterable[str]], Any]] = None,
+                 debounce: float = 2.0, workers: int = 1, max_file_bytes: int = MAX_FILE_BYTES,
+                 scheduler=None, clock: Callable[[], float] = time.monotonic,
+                 indexed: Optional[Callable[[str], bool]] = None):
+        self.process = process
+        self.remove = remove
+        self.indexed = indexed
+        self.debounce = debounce
+        self.workers = max(1, workers)
+        self.max_file_bytes = max_file_bytes
+        self.scheduler = scheduler
+        self.clock = clock
+
+        self._cond = threading.Condition()
+        self._pending: Dict[str, Dict[str, Any]] = {}  # path -> {'due', 'deleted'}
+        self._running: Set[str] = set()
+        self._dirty: Dict[str, bool] = {}              # Events for running paths: path -> deleted
+        self._completed = deque()                      # Completion times (throughput window)
+        self._counts = {'events': 0, 'coalesced': 0, 'processed': 0, 'removed': 0, 'skipped': 0, 'failed': 0}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._dispatcher: Optional[threading.Thread] = None
+        self._stopping = False
+
+    # ── Lifecycle ───────────────────────────────────────────────────────────────
+
+    def start(self):
+        self._stopping = False
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="indexer")
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="indexer-queue", daemon=True)
+        self._dispatcher.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Pending paths are dropped; the startup scan picks them up next time"""
+        with self._cond:
+            self._stopping = True
+            self._pending.clear()
+            self._cond.notify_all()
+        if self._dispatcher:
+            self._dispatcher.join(timeout)
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ── Events ──────────────────────────────────────────────────────────────────
+
+    def submit(self, path: str, deleted: bool = False):
+        path = os.path.abspath(path)
+        with self._cond:
+            self._counts['events'] += 1
+            if path in self._running:
+                self._dirty[path] = deleted
+                return
+            if path in self._pending:
+                self._counts['coalesced'] += 1
+            # Every new event restarts the quiet period
+            self._pending[path] = {'due': self.clock() + self.debounce, 'deleted': deleted}
+            self._cond.notify()
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    # ── Dispatch ────────────────────────────────────────────────────────────────
+
+    def _take_due(self) -> tuple:
+        """((path, deleted), None) for the oldest due path, or (None, seconds to wait / None to wait for a notify)"""
+        if len(self._running) >= self.workers:
+            return None, None
+        now = self.clock()
+        path, entry = min(self._pending.items(), key=lambda item: item[1]['due'], default=(None, None))
+        if path is None:
+            return None, None
+        if entry['due'] > now:
+            return None, entry['due'] - now
+        del self._pending[path]
+        self._running.add(path)
+        return (path, entry['deleted']), None
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                job, wait = self._take_due()
+                if job is None:
+                    self._cond.wait(wait)
+                    continue
+            self._executor.submit(self._run_job, *job)
+
+    def run_pending(self):
+        """Process every due path on the calling thread (tests and benchmarks)"""
+        while True:
+            with self._cond:
+                job, _ = self._take_due()
+            if job is None:
+                return
+            self._run_job(*job)
+
+    def _run_job(self, path: str, deleted: bool):
+        try:
+            outcome = self._ingest(path, deleted)
+        except Exception as e:
+            outcome = 'failed'
+            logger.error(f"BrainIndexer: Error indexing {path}: {e}")
+        with self._cond:
+            self._counts[outcome] += 1
+            if outcome in ('processed', 'removed'):
+                self._completed.append(self.clock())
+            self._running.discard(path)
+            if path in self._dirty:
+                # Changed again while it was being ingested
+                self._pending[path] = {'due': self.clock() + self.debounce, 'deleted': self._dirty.pop(path)}
+            self._cond.notify()
+
+    def _ingest(self, path: str, deleted: bool) -> str:
+        if deleted or not os.path.exists(path):
+            if self.remove:
+                self.remove([path])
+            return 'removed'
+        size = os.path.getsize(path)
+        if size > self.max_file_bytes or looks_binary(path):
+            logger.info(f"BrainIndexer: Skipping {path} ({size} bytes, binary or over the size cap)")
+            if self.remove and self.indexed and self.indexed(path):
+                # Its old text chunks no longer describe the file (and the stale entry would be re-queued)
+                self.remove([path])
+            return 'skipped'
+        if self.scheduler:
+            # Wait out interactive turns / high CPU; documents are never dropped
+            self.scheduler.admit_blocking("document_ingestion", WorkPriority.BACKGROUND,
+                                          max_wait=120, sheddable=False)
+        self.process(path)
+        return 'processed'
+
+    # ── Metrics ─────────────────────────────────────────────────────────────────
+
+    def stats(self, window: float = 60.0) -> Dict[str, Any]:
+        with self._cond:
+            cutoff = self.clock() - window
+            while self._completed and self._completed[0] < cutoff:
+                self._completed.popleft()
+            return {
+                'queued': len(self._pending),
+                'running': len(self._running),
+                'files_per_min': round(len(self._completed) * 60.0 / window, 1),
+                **self._counts
+            }
@@ -0,0 +1,388 @@
+import io
+import os
+import time
+import zlib
+import hashlib
+import logging
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.memory_store import ManifestUpdate
+from services.work_scheduler import WorkPriority
+
+logger = logging.getLogger(__name__)
+
+VALID_EXTS = {'.txt', '.md', '.py', '.js', '.html', '.css'}
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 200
+POOL_MAX_BYTES = 16 * (1 << 20)  # Larger files are streamed in-process instead of returned whole by a worker
+
+# (chunk_id, text, content hash): chunk_id is the chunk's position in the current version of the file
+Chunk = Tuple[int, str, str]
+
+def chunk_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode('utf-8', 'ignore'), digest_size=16).hexdigest()
+
+def _is_boundary(line: str) -> bool:
+    # Blank lines (paragraphs) or ~1 in 4 lines picked by content, so cut points re-synchronize after an edit
+    return not line.strip() or zlib.crc32(line.encode('utf-8', 'ignore')) & 3 == 0
+
+def iter_chunks(stream, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> Iterator[Tuple[int, str]]:
+    """
+    Content-defined chunks read line by line from a text stream.
+    Bodies of up to `size - overlap` chars are cut at line ends chosen by the text
+    itself rather than at fixed offsets, so inserting or deleting text only changes
+    the chunks around the edit. Each chunk is prefixed with the last `overlap` chars
+    of the previous body.
+    """
+    body_max = size - overlap
+    body_min = body_max // 2
+    parts, length, tail, chunk_id = [], 0, "", 0
+    while True:
+        line = stream.readline(body_max)  # Long lines come back in body_max pieces
+        if parts and (not line or length + len(line) > body_max):
+            body = "".join(parts)
+            yield chunk_id, tail + body
+            tail = body[-overlap:] if overlap else ""
+            parts, length, chunk_id = [], 0, chunk_id + 1
+        if not line:
+            return
+        parts.append(line)
+        length += len(line)
+        if length >= body_min and _is_boundary(line):
+            body = "".join(parts)
+            yield chunk_id, tail + body
+            tail = body[-overlap:] if overlap else ""
+            parts, length, chunk_id = [], 0, chunk_id + 1
+
+def new_file_digest():
+    return hashlib.blake2b(digest_size=16)
+
+def file_hash(path: str, block: int = 1 << 20) -> str:
+    """Content hash of a file's bytes (same digest read_chunks computes while chunking)"""
+    digest = new_file_digest()
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(block), b""):
+            digest.update(data)
+    return digest.hexdigest()
+
+class _HashingReader(io.RawIOBase):
+    """Raw stream that feeds every byte it reads into a digest"""
+    def __init__(self, raw, digest):
+        self.raw = raw
+        self.digest = digest
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        n = self.raw.readinto(buffer)
+        if n:
+            self.digest.update(memoryview(buffer)[:n])
+        return n
+
+def read_chunks(path: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP, digest=None) -> Iterator[Chunk]:
+    """Non-blank chunks of a text file with their content hashes; `digest` receives the file's bytes"""
+    with open(path, 'rb', buffering=0) as raw:
+        stream = _HashingReader(raw, digest) if digest is not None else raw
+        with io.TextIOWrapper(io.BufferedReader(stream), encoding='utf-8', errors='ignore') as f:
+            for chunk_id, text in iter_chunks(f, size, overlap):
+                text = text.strip()
+                if text:
+                    yield chunk_id, text, chunk_hash(text)
+
+def chunk_file(path: str, size: int = CHUNK_SIZE,
+               overlap: int = CHUNK_OVERLAP) -> Tuple[str, Optional[List[Chunk]], Optional[str], Optional[str]]:
+    """Process-pool task: (path, chunks, error, file hash)"""
+    try:
+        digest = new_file_digest()
+        return path, list(read_chunks(path, size, overlap, digest)), None, digest.hexdigest()
+    except OSError as e:
+        return path, None, str(e), None
+
+def scan_files(roots: Iterable[str], exts=VALID_EXTS) -> Iterator[Tuple[str, int, int]]:
+    """
+    (path, mtime_ns, size) of every file with an extension in `exts` under `roots`.
+    os.scandir reuses the directory listing's file type (and on Windows its stat data),
+    so unchanged trees are scanned without reading any file.
+    """
+    stack = [os.path.abspath(root) for root in roots]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = sorted(os.scandir(directory), key=lambda e: e.name)
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif os.path.splitext(entry.name)[1].lower() in exts:
+                    st = entry.stat()
+                    yield entry.path, st.st_mtime_ns, st.st_size
+            except OSError:
+                continue
+
+def discover(paths: Iterable[str], exts=VALID_EXTS) -> List[Tuple[str, int, int]]:
+    """(path, mtime_ns, size) of every ingestible file in `paths` (files or directories)"""
+    found = []
+    for root_path in paths:
+        if os.path.isfile(root_path):
+            # Files named explicitly (watcher events) are taken as-is
+            try:
+                st = os.stat(root_path)
+            except OSError:
+                continue
+            found.append((os.path.abspath(root_path), st.st_mtime_ns, st.st_size))
+        else:
+            found.extend(scan_files([root_path], exts))
+    return found
+
+@dataclass
+class IngestionProgress:
+    files_total: int = 0
+    files_done: int = 0
+    files_skipped: int = 0   # Unchanged since they were last ingested
+    files_touched: int = 0   # New mtime, same content: only the manifest is updated
+    files_failed: int = 0
+    bytes_total: int = 0
+    bytes_done: int = 0
+    chunks: int = 0          # Rows appended
+    encoded: int = 0         # Chunks that went through the embedding model
+    cache_hits: int = 0      # New rows whose vector was reused from the embedding cache
+    kept: int = 0            # Unchanged chunks of modified files (left in place)
+    tombstoned: int = 0      # Rows replaced by a newer version of their file
+    batches: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def percent(self) -> float:
+        return 100.0 * self.bytes_done / self.bytes_total if self.bytes_total else 100.0
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.chunks / self.elapsed if self.elapsed > 0 else 0.0
+
+class IngestionPipeline:
+    """
+    Streaming document ingestion: discover -> read + chunk (process pool) ->
+    batched encode -> one bulk append per batch.
+    Files are replaced by source: a modified file keeps its unchanged chunks in
+    place, tombstones the chunks that disappeared and only appends new ones, whose
+    vectors come from the chunk-hash embedding cache when the same text was
+    embedded before. The per-file manifest (mtime, size, content hash) is committed with
+    the batch that completes each file, so unchanged files are skipped and an
+    interrupted run redoes only unfinished files without re-embedding.
+    """
+    def __init__(self, collection, encode: Callable[[List[str]], np.ndarray], batch_size: int = 64,
+                 workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP,
+                 progress_callback: Optional[Callable[[IngestionProgress], None]] = None,
+                 progress_interval: float = 5.0, scheduler=None):
+        self.collection = collection
+        self.store = collection.store
+        self.encode = encode
+        self.batch_size = max(1, batch_size)
+        # Reading/chunking is cheap next to encoding: a few workers keep the encoder fed
+        self.workers = min(4, max(0, (os.cpu_count() or 1) - 1)) if workers is None else workers
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.progress_callback = progress_callback
+        self.progress_interval = progress_interval
+        self.scheduler = scheduler
+
+    def run(self, paths: Iterable[str]) -> IngestionProgress:
+        progress = IngestionProgress()
+        manifest = self.store.file_manifest(self.collection.key)
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._manifest = ManifestUpdate()
+        self._last_report = 0.0
+
+        todo = []
+        for path, mtime_ns, size in discover(paths):
+            saved = manifest.get(path)
+            if saved and saved['done'] and saved['size'] == size:
+                if saved['mtime_ns'] == mtime_ns:
+                    progress.files_skipped += 1
+                    continue
+                if saved['hash'] and self._same_content(path, saved['hash']):
+                    # Touched or re-saved without changes
+                    self._manifest.files.append((path, mtime_ns, size, saved['chunks'], True, saved['hash']))
+                    progress.files_touched += 1
+                    continue
+            todo.append((path, mtime_ns, size))
+        progress.files_total = len(todo)
+        progress.bytes_total = sum(size for _, _, size in todo)
+
+        for (path, mtime_ns, size), (chunks, content_hash) in zip(todo, self._read(todo)):
+            if chunks is None:
+                progress.files_failed += 1
+                continue
+            self._replace(path, mtime_ns, size, chunks, content_hash, progress)
+            progress.files_done += 1
+            progress.bytes_done += size
+        self._flush(progress, final=True)
+        logger.info(f"IngestionPipeline: {progress.files_done} files, {progress.chunks} new rows "
+                    f"({progress.encoded} encoded, {progress.cache_hits} cached, {progress.kept} kept, "
+                    f"{progress.tombstoned} tombstoned) in {progress.elapsed:.1f}s; "
+                    f"{progress.files_skipped} unchanged, {progress.files_touched} touched, "
+                    f"{progress.files_failed} failed")
+        return progress
+
+    @staticmethod
+    def _same_content(path: str, saved_hash: str) -> bool:
+        try:
+            return file_hash(path) == saved_hash
+        except OSError:
+            return False
+
+    def remove(self, paths: Iterable[str]) -> int:
+        """Tombstone every row of deleted files and drop them from the manifest"""
+        update = ManifestUpdate(removed=list(paths))
+        for path in update.removed:
+            for rows in self.store.live_chunks(self.collection.key, path).values():
+                update.tombstones.extend(rows)
+        self.collection.commit_manifest(update)
+        return len(update.tombstones)
+
+    def _replace(self, path: str, mtime_ns: int, size: int, chunks: Iterable[Chunk],
+                 content_hash: Callable[[], str], progress: IngestionProgress):
+        live = self.store.live_chunks(self.collection.key, path)
+        new: List[Chunk] = []
+        count = 0
+        for chunk in chunks:
+            count += 1
+            rows = live.get(chunk[2])
+            if rows:
+                rows.pop(0)  # Unchanged chunk: its row stays
+                progress.kept += 1
+                continue
+            new.append(chunk)
+            if len(new) >= self.batch_size:
+                self._enqueue(path, new, progress)
+                new = []
+        self._enqueue(path, new, progress)
+        # Committed with (or after) the batch holding the file's last new row
+        stale = [row for rows in live.values() for row in rows]
+        self._manifest.files.append((path, mtime_ns, size, count, True, content_hash()))
+        self._manifest.tombstones.extend(stale)
+        progress.tombstoned += len(stale)
+
+    def _enqueue(self, path: str, chunks: List[Chunk], progress: IngestionProgress):
+        if not chunks:
+            return
+        cached = self.store.cached_rows(self.collection.key, list({h for _, _, h in chunks}))
+        vectors = {}
+        if cached:
+            hashes = sorted(cached, key=cached.get)
+            for h, vector in zip(hashes, self.collection.take(np.array([cached[h] for h in hashes]))):
+                vectors[h] = vector
+        for chunk_id, text, h in chunks:
+            self._buffer.append({
+                'meta': {
+                    "type": "doc_chunk",
+                    "source": os.path.basename(path),
+                    "path": path,
+                    "chunk_id": chunk_id,
+                    "hash": h,
+                    "document": text
+                },
+                'vector': vectors.get(h)
+            })
+            progress.cache_hits += h in vectors
+            if len(self._buffer) >= self.batch_size:
+                self._flush(progress)
+
+    def _read(self, todo) -> Iterator[Tuple[Optional[Iterable[Chunk]], Callable[[], str]]]:
+        """
+        (chunks, file hash getter) per file, in order; the hash is final once the chunks
+        are consumed. Small files are chunked by the pool with a bounded read-ahead.
+        """
+        if self.workers <= 0:
+            for path, _, _ in todo:
+                yield self._stream(path)
+            return
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            queue = iter(todo)
+            window = 4 * self.workers
+            def submit():
+                for path, _, size in queue:
+                    if size > POOL_MAX_BYTES:
+                        pending.append(None)  # Streamed in-process when its turn comes
+                    else:
+                        pending.append(pool.submit(chunk_file, path, self.chunk_size, self.overlap))
+                    return True
+                return False
+            for _ in range(window):
+                if not submit():
+                    break
+            for path, _, _ in todo:
+                future = pending.popleft()
+                submit()
+                if future is None:
+                    yield self._stream(path)
+                    continue
+                _, chunks, error, digest = future.result()
+                if error:
+                    logger.error(f"IngestionPipeline: Could not read {path}: {error}")
+                yield chunks, lambda digest=digest: digest
+
+    def _stream(self, path: str) -> Tuple[Optional[Iterable[Chunk]], Callable[[], str]]:
+        digest = new_file_digest()
+        try:
+            # Opened eagerly so unreadable files are reported before any chunk is buffered
+            chunks = read_chunks(path, self.chunk_size, self.overlap, digest)
+            first = next(chunks, None)
+        except OSError as e:
+            logger.error(f"IngestionPipeline: Could not read {path}: {e}")
+            return None, digest.hexdigest
+        return ([] if first is None else self._chain(first, chunks)), digest.hexdigest
+
+    @staticmethod
+    def _chain(first, rest):
+        yield first
+        yield from rest
+
+    def _flush(self, progress: IngestionProgress, final: bool = False):
+        manifest = self._manifest
+        if not self._buffer and not (final and (manifest.files or manifest.tombstones)):
+            return
+        if self.scheduler:
+            # Batches yield to interactive turns and high CPU; ingestion is never dropped
+            self.scheduler.admit_blocking("document_ingestion", WorkPriority.BACKGROUND,
+                                          max_wait=120, sheddable=False)
+        entries = self._buffer
+        # Each distinct text in the batch is encoded once
+        missing = {}
+        for entry in entries:
+            if entry['vector'] is None:
+                missing.setdefault(entry['meta']['hash'], entry['meta']['document'])
+        if missing:
+            encoded = np.asarray(self.encode(list(missing.values())), dtype=np.float32)
+            encoded = dict(zip(missing, encoded))
+            progress.encoded += len(missing)
+        if entries:
+            vectors = np.stack([e['vector'] if e['vector'] is not None else encoded[e['meta']['hash']] for e in entries])
+            self.collection.extend([e['meta'] for e in entries], vectors, manifest=manifest)
+        else:
+            self.collection.commit_manifest(manifest)
+        progress.chunks += len(entries)
+        progress.batches += 1
+        self._buffer = []
+        self._manifest = ManifestUpdate()
+
+        now = time.monotonic()
+        if self.progress_callback and (final or now - self._last_report >= self.progress_interval):
+            self._last_report = now
+            try:
+                self.progress_callback(progress)
+            except Exception as e:
+                logger.debug(f"IngestionPipeline: Progress callback failed: {e}")
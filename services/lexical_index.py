@@ -0,0 +1,150 @@
+import re
+import sqlite3
+import logging
+import unicodedata
+import numpy as np
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+def _fts5_available() -> bool:
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE probe USING fts5(x)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+FTS5_AVAILABLE = _fts5_available()
+
+RRF_K = 60  # Reciprocal rank fusion constant (rank 1 in one list scores 1/61)
+LEXICAL_VERSION = 2  # Bumped when document_text() changes; older indexes are rebuilt on open
+
+# Portuguese function words (accent-folded) and the commonest English ones
+STOPWORDS = frozenset("""
+a ao aos aquela aquelas aquele aqueles aquilo as ate com como da das de dela delas dele deles depois
+do dos e ela elas ele eles em entre era eram essa essas esse esses esta estas este estes eu foi foram
+ha isso isto ja la lhe lhes mais mas me mesmo meu meus minha minhas muito na nas nem no nos nossa
+nossas nosso nossos num numa o os ou para pela pelas pelo pelos por qual quando que quem se sem ser
+seu seus so sua suas tambem te tem teu tua um uma umas uns voce voces vos
+the of and to in is it was
+""".split())
+
+# Words with internal '.', '-' or '_' (file names, error codes, identifiers) stay whole
+_TOKEN = re.compile(r"\w+(?:[.\-]\w+)*")
+_PARTS = re.compile(r"[^\W_]+")
+
+def fold(text: str) -> str:
+    """Lower-case and strip accents: 'Informação' -> 'informacao'"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+def stem(word: str) -> str:
+    """Light Portuguese plural reduction on folded words (arquivos -> arquivo, acoes -> acao)"""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    for suffix, replacement in (("oes", "ao"), ("aes", "ao"), ("ais", "al"), ("eis", "el"), ("ns", "m")):
+        if word.endswith(suffix):
+            return word[:-len(suffix)] + replacement
+    if word.endswith(("res", "zes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+def tokenize(text: str) -> List[str]:
+    """
+    Index terms of `text`: folded, stopword-free, lightly stemmed words.
+    Compound tokens ('config.py', 'ERR-1042', 'user_id') are kept whole and
+    also split into their parts, so both the exact name and its pieces match.
+    """
+    terms = []
+    for token in _TOKEN.findall(fold(text or "")):
+        parts = _PARTS.findall(token)
+        if len(parts) > 1:
+            terms.append(token)
+        terms.extend(stem(p) for p in parts if p not in STOPWORDS)
+    return terms
+
+def document_text(metadata: Dict[str, Any]) -> str:
+    """
+    Indexed text of a stored row: its document plus the source file name, if any.
+    Interactions index only what was said, not the "User asked ... Jarvis
+    responded" template that would make every turn match "jarvis".
+    """
+    if metadata.get('type') == "interaction" and ('user_text' in metadata or 'ai_response' in metadata):
+        return f"{metadata.get('user_text') or ''} {metadata.get('ai_response') or ''}"
+    source = metadata.get('path') or metadata.get('source') or ""
+    name = re.split(r"[\\/]", source)[-1] if source else ""
+    return f"{metadata.get('document') or ''} {name}"
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = RRF_K) -> Dict[int, float]:
+    """{row: sum of 1 / (k + rank)} over every ranking (best first) the row appears in"""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (k + rank)
+    return fused
+
+class LexicalIndex:
+    """
+    BM25 inverted index over one collection's rows, kept in an FTS5 table of the
+    store's SQLite database. Terms come from tokenize() (FTS5 only splits on
+    spaces), rows are added in the same transaction as their metadata and the
+    FTS5 rowid is the collection row.
+    """
+    def __init__(self, db: sqlite3.Connection, collection: str):
+        if not collection.isidentifier():
+            raise ValueError(f"Invalid collection name for the lexical index: {collection}")
+        self.db = db
+        self.collection = collection
+        self.table = f"lexical_{collection}"
+        self.db.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+            f"terms, tokenize = \"unicode61 remove_diacritics 0 tokenchars '.-_'\")"
+        )
+
+    def add(self, start: int, metadatas: Iterable[Dict[str, Any]]):
+        """Index rows start, start + 1, ... (the caller commits)"""
+        self.db.executemany(
+            f"INSERT OR REPLACE INTO {self.table} (rowid, terms) VALUES (?, ?)",
+            [(start + i, " ".join(tokenize(document_text(m)))) for i, m in enumerate(metadatas)]
+        )
+
+    def copy_from(self, source: "LexicalIndex", remap: str):
+        """Copy the terms of `source` rows listed in table `remap` (old, new) as their new rows"""
+        self.db.execute(
+            f"INSERT INTO {self.table} (rowid, terms) SELECT r.new, l.terms FROM {source.table} l "
+            f"JOIN {remap} r ON l.rowid = r.old"
+        )
+
+    @staticmethod
+    def drop(db: sqlite3.Connection, collection: str):
+        """Remove a collection's index table (the caller commits)"""
+        if collection.isidentifier():
+            db.execute(f"DROP TABLE IF EXISTS lexical_{collection}")
+
+    def delete_from(self, row: int):
+        self.db.execute(f"DELETE FROM {self.table} WHERE rowid >= ?", (row,))
+
+    def max_row(self) -> int:
+        value = self.db.execute(f"SELECT MAX(rowid) FROM {self.table}").fetchone()[0]
+        return -1 if value is None else value
+
+    def search(self, text: str, k: int, db: Optional[sqlite3.Connection] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k (rows, BM25 scores) for a free-text query, best first; tombstoned rows
+        never match. `db` is a read connection to use instead of the writer's.
+        """
+        terms = sorted(set(tokenize(text)))
+        if not terms or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        # Any query term may match; bm25() is negated in SQLite (lower is better)
+        expression = " OR ".join(f'"{term}"' for term in terms)
+        found = (db or self.db).execute(
+            f"SELECT rowid, -bm25({self.table}) FROM {self.table} WHERE {self.table} MATCH ? "
+            f"AND rowid NOT IN (SELECT row FROM tombstones WHERE collection = ?) "
+            f"ORDER BY bm25({self.table}) LIMIT ?", (expression, self.collection, k)
+        ).fetchall()
+        rows = np.array([r for r, _ in found], dtype=np.int64)
+        scores = np.array([s for _, s in found], dtype=np.float32)
+        return rows, scores
@@ -0,0 +1,110 @@
+import re
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+_SPACES = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """Cache key of a text: case and whitespace do not change a MiniLM (uncased) embedding"""
+    return _SPACES.sub(" ", text).strip().casefold()
+
+class LRUCache:
+    """Thread-safe least-recently-used map with hit / miss counters"""
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default=None, valid: Optional[Callable[[Any], bool]] = None):
+        """Cached value, or `default` on a miss; entries failing `valid` are dropped (a miss)"""
+        with self._lock:
+            if key in self._data and (valid is None or valid(self._data[key])):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self._data.pop(key, None)
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0
+        }
+
+class EmbeddingCache:
+    """
+    Normalized text -> embedding LRU in front of an encoder.
+    Misses of one call are encoded together in a single encode(list) call.
+    Cached vectors are read-only so a caller cannot corrupt later hits.
+    """
+    def __init__(self, maxsize: int = 2048):
+        self.cache = LRUCache(maxsize)
+
+    def encode(self, texts: Sequence[str], encode: Callable[[List[str]], Any]) -> np.ndarray:
+        """(len(texts), dim) embeddings of `texts`, encoding only the ones not cached"""
+        keys = [normalize_text(t) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+        for key in keys:
+            if key not in found:
+                vector = self.cache.get(key)
+                if vector is not None:
+                    found[key] = vector
+        missing = list(dict.fromkeys(k for k in keys if k not in found))
+        if missing:
+            texts_by_key = {normalize_text(t): t for t in texts}
+            vectors = np.asarray(encode([texts_by_key[k] for k in missing]), dtype=np.float32)
+            for key, vector in zip(missing, vectors.reshape(len(missing), -1)):
+                vector = vector.copy()
+                vector.flags.writeable = False
+                found[key] = vector
+                self.cache.put(key, vector)
+        return np.stack([found[k] for k in keys]) if keys else np.empty((0, 0), dtype=np.float32)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+class ResultCache:
+    """
+    Short-lived cache of retrieval results, valid while the store's write
+    generation is unchanged and for at most `ttl` seconds. Callers read the
+    generation before computing a result, so a write that lands meanwhile
+    invalidates it.
+    """
+    def __init__(self, ttl: float = 30.0, maxsize: int = 256, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self.cache = LRUCache(maxsize)
+
+    def get(self, key: Hashable, generation: int) -> Optional[Any]:
+        now = self.clock()
+        entry = self.cache.get(key, valid=lambda e: e[0] == generation and now < e[1])
+        return None if entry is None else entry[2]
+
+    def put(self, key: Hashable, generation: int, value: Any):
+        self.cache.put(key, (generation, self.clock() + self.ttl, value))
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
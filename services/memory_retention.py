@@ -0,0 +1,293 @@
+import time
+import logging
+import numpy as np
+from collections import Counter
+from datetime import datetime
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, List, Optional
+
+from services.memory_store import ManifestUpdate
+from services.work_scheduler import WorkPriority
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400.0
+RETENTION_INTERVAL = 3600.0  # Seconds between background passes
+SUMMARY_CATEGORY = "conversation_summary"
+MAX_ASKED = 50               # Distinct requests remembered per summary
+
+# Days after which a turn of these intents is dropped (intent names as stored by AIService).
+# Commands and clock questions carry nothing once answered; conversations are summarized instead.
+DEFAULT_TTL_DAYS = {
+    'DIRECT_COMMAND': 14.0,
+    'VISUAL_ACTION': 14.0,
+    'TIME_QUERY': 1.0,
+    'DATE_QUERY': 1.0,
+    'RUN_WORKFLOW': 30.0,
+    'CLARIFICATION_REQUEST': 30.0,
+    'UNKNOWN': 30.0,
+}
+
+@dataclass
+class RetentionPolicy:
+    ttl_days: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_TTL_DAYS))
+    duplicate_similarity: float = 0.97  # An older turn this close to a newer one is dropped
+    duplicate_after_days: float = 1.0   # Recent turns are left alone (the current conversation)
+    summarize_after_days: float = 30.0  # Surviving turns older than this are folded into summary facts
+    cluster_similarity: float = 0.75    # Turns joining one summary
+    min_cluster: int = 3                # Smaller clusters stay as turns
+    vacuum_ratio: float = 0.2           # Tombstoned fraction that triggers a vacuum after a pass
+    batch: int = 256                    # Rows examined per step
+
+    @property
+    def min_age_days(self) -> float:
+        return min([self.duplicate_after_days, self.summarize_after_days, *self.ttl_days.values()])
+
+@dataclass
+class RetentionStats:
+    passes: int = 0
+    steps: int = 0
+    scanned: int = 0
+    expired: int = 0
+    duplicates: int = 0
+    summarized: int = 0    # Turns folded into summaries
+    summaries: int = 0     # Summary facts created
+    merged: int = 0        # Existing summaries extended with new turns
+    vacuumed: int = 0      # Rows reclaimed by vacuums
+
+def turn_time(meta: Dict[str, Any]) -> Optional[float]:
+    """Epoch seconds of a stored turn (AIService writes str(time.time()); ISO dates also parse)"""
+    value = meta.get('timestamp')
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+def digest_turns(turns: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Mergeable aggregate of a cluster of turns: count, period, requests with counts, latest answer"""
+    times = [t for t in (turn_time(turn) for turn in turns) if t is not None]
+    latest = max(turns, key=lambda turn: turn_time(turn) or 0.0)
+    asked = Counter(" ".join(str(turn.get('user_text') or turn.get('document', '')).split()) for turn in turns)
+    return {'turns': len(turns), 'first': min(times, default=None), 'last': max(times, default=None),
+            'asked': dict(asked.most_common(MAX_ASKED)), 'answer': " ".join(str(latest.get('ai_response') or "").split())}
+
+def merge_digests(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Digest of an existing summary extended with newly folded turns"""
+    asked = Counter(old.get('asked') or {})
+    asked.update(new['asked'])
+    firsts = [t for t in (old.get('first'), new['first']) if t is not None]
+    lasts = [t for t in (old.get('last'), new['last']) if t is not None]
+    newer = (new['last'] or 0.0) >= (old.get('last') or 0.0)
+    return {'turns': old.get('turns', 0) + new['turns'], 'first': min(firsts, default=None),
+            'last': max(lasts, default=None), 'asked': dict(asked.most_common(MAX_ASKED)),
+            'answer': new['answer'] if newer else old.get('answer', "")}
+
+def summarize_digest(digest: Dict[str, Any], max_questions: int = 5, max_answer: int = 200) -> str:
+    """Extractive summary text: period, most frequent requests, latest answer"""
+    period = ""
+    if digest['first'] is not None:
+        first, last = (datetime.fromtimestamp(t).strftime("%Y-%m-%d") for t in (digest['first'], digest['last']))
+        period = f" ({first})" if first == last else f" ({first} to {last})"
+    asked = Counter(digest['asked']).most_common(max_questions)
+    questions = "; ".join(f"'{q}'" + (f" x{n}" if n > 1 else "") for q, n in asked)
+    answer = digest['answer'][:max_answer]
+    summary = f"Summary of {digest['turns']} past conversations{period}: user asked {questions}."
+    return summary + (f" Latest answer: '{answer}'." if answer else "")
+
+def cluster_rows(vectors: np.ndarray, threshold: float) -> List[List[int]]:
+    """Greedy leader clustering of normalized vectors: each joins the closest centroid above `threshold`"""
+    clusters: List[List[int]] = []
+    sums: List[np.ndarray] = []
+    for i, vector in enumerate(vectors):
+        if sums:
+            centroids = np.stack(sums)
+            centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-10
+            scores = centroids @ vector
+            best = int(np.argmax(scores))
+            if scores[best] >= threshold:
+                clusters[best].append(i)
+                sums[best] = sums[best] + vector
+                continue
+        clusters.append([i])
+        sums.append(vector.astype(np.float32).copy())
+    return clusters
+
+class RetentionEngine:
+    """
+    Keeps the conversation collection from growing with every turn.
+    Turns are examined oldest first, `policy.batch` rows per step():
+    - turns of short-lived intents (DIRECT_COMMAND, TIME_QUERY, ...) expire by age;
+    - a turn nearly identical (cosine) to a newer one is dropped, the newest is kept;
+    - what survives past `summarize_after_days` is clustered by similarity and
+      each large enough cluster is folded into a summary fact in `facts`: the
+      closest existing summary is extended (and replaced), else one is created.
+    Dropped turns and replaced summaries are tombstoned; once a pass ends with
+    enough of them the collection is vacuumed, so vectors and metadata shrink.
+    `summarize` renders a digest (see digest_turns) as text - extractive by
+    default, an LLM can be plugged in - and `encode` embeds it (the cluster
+    centroid is used without one).
+    """
+    def __init__(self, conversations, facts, encode: Optional[Callable[[List[str]], np.ndarray]] = None,
+                 policy: Optional[RetentionPolicy] = None,
+                 summarize: Callable[[Dict[str, Any]], str] = summarize_digest,
+                 clock: Callable[[], float] = time.time, scheduler=None):
+        self.conversations = conversations
+        self.facts = facts
+        self.encode = encode
+        self.policy = policy or RetentionPolicy()
+        self.summarize = summarize
+        self.clock = clock
+        self.scheduler = scheduler
+        self.totals = RetentionStats()
+        self._cursor = 0
+        self._epoch = conversations.epoch
+
+    def step(self) -> bool:
+        """Examine the next batch of turns; returns True when the pass is complete"""
+        collection, policy = self.conversations, self.policy
+        snapshot = collection.snapshot()
+        if collection.epoch != self._epoch:
+            # Vacuumed elsewhere: row numbers changed
+            self._cursor, self._epoch = 0, collection.epoch
+        now = self.clock()
+        horizon = now - policy.min_age_days * DAY
+        stop = min(snapshot.rows, self._cursor + policy.batch)
+        rows = [r for r in range(self._cursor, stop) if r not in snapshot.dead]
+        self.totals.steps += 1
+
+        # Rows are appended in time order: the first turn too young for every rule ends the pass
+        done = stop >= snapshot.rows
+        turns = []
+        for row, meta in zip(rows, collection.get_many(rows, snapshot)):
+            when = turn_time(meta)
+            if when is not None and when > horizon:
+                done = True
+                break
+            if when is not None:
+                turns.append((row, meta, (now - when) / DAY))
+        self.totals.scanned += len(turns)
+        self._cursor = 0 if done else stop
+
+        removed = set()
+        for row, meta, age in turns:
+            ttl = policy.ttl_days.get(meta.get('intent'))
+            if ttl is not None and age >= ttl:
+                removed.add(row)
+        self.totals.expired += len(removed)
+
+        removed |= self._duplicates([(row, age) for row, _, age in turns if row not in removed], snapshot, removed)
+        removed |= self._summarize([(row, meta) for row, meta, age in turns
+                                    if row not in removed and age >= policy.summarize_after_days], snapshot)
+        if removed:
+            collection.commit_manifest(ManifestUpdate(tombstones=sorted(removed)))
+
+        if done:
+            self.totals.passes += 1
+            self.vacuum_if_due(self.facts)
+            if self.vacuum_if_due(collection):
+                self._cursor, self._epoch = 0, collection.epoch
+        return done
+
+    def vacuum_if_due(self, collection) -> int:
+        """Vacuum `collection` once its tombstones reach the policy's vacuum_ratio"""
+        dead = len(collection.snapshot().dead)
+        if not dead or dead < self.policy.vacuum_ratio * len(collection):
+            return 0
+        removed = collection.vacuum()
+        self.totals.vacuumed += removed
+        return removed
+
+    def _duplicates(self, candidates, snapshot, removed) -> set:
+        """Rows with a newer, live, near-identical turn"""
+        policy = self.policy
+        rows = np.array(sorted(row for row, age in candidates if age >= policy.duplicate_after_days), dtype=np.int64)
+        if not len(rows):
+            return set()
+        found = set()
+        hits = self.conversations.search_batch(self.conversations.take(rows, snapshot), 4, snapshot)
+        for row, (neighbours, scores) in zip(rows.tolist(), hits):
+            for other, score in zip(neighbours.tolist(), scores.tolist()):
+                if other > row and score >= policy.duplicate_similarity and other not in removed and other not in found:
+                    found.add(row)
+                    break
+        self.totals.duplicates += len(found)
+        return found
+
+    def _summarize(self, candidates, snapshot) -> set:
+        """Fold clusters of old turns into summary facts; returns the folded rows"""
+        policy = self.policy
+        if len(candidates) < policy.min_cluster:
+            return set()
+        rows = np.array([row for row, _ in candidates], dtype=np.int64)
+        vectors = self.conversations.take(rows, snapshot)
+        clusters = [c for c in cluster_rows(vectors, policy.cluster_similarity) if len(c) >= policy.min_cluster]
+        if not clusters:
+            return set()
+
+        # Each cluster extends the closest existing summary, or starts a new one
+        facts = self.facts.snapshot()
+        targets: Dict[Any, list] = {}   # Summary row (or ('new', i)) -> [digest, vector sum]
+        for i, cluster in enumerate(clusters):
+            digest = digest_turns([candidates[j][1] for j in cluster])
+            total = vectors[cluster].sum(axis=0)
+            key = ('new', i)
+            found, scores = self.facts.search(total / (np.linalg.norm(total) + 1e-10), 1, facts)
+            if len(found) and scores[0] >= policy.cluster_similarity:
+                row = int(found[0])
+                if row in targets:
+                    key = row
+                else:
+                    meta = self.facts.get_many([row], facts)[0]
+                    if meta.get('category') == SUMMARY_CATEGORY:
+                        key = row
+                        targets[row] = [meta, self.facts.take([row], facts)[0] * meta.get('turns', 1)]
+            if key in targets:
+                targets[key][0] = merge_digests(targets[key][0], digest)
+                targets[key][1] = targets[key][1] + total
+            else:
+                targets[key] = [digest, total]
+
+        metadatas = []
+        for digest, _ in targets.values():
+            digest = {name: digest.get(name) for name in ('turns', 'first', 'last', 'asked', 'answer')}
+            metadatas.append({'type': "fact", 'category': SUMMARY_CATEGORY, 'document': self.summarize(digest), **digest})
+        if self.encode is not None:
+            embeddings = np.asarray(self.encode([m['document'] for m in metadatas]), dtype=np.float32)
+        else:
+            embeddings = np.stack([total for _, total in targets.values()])
+        replaced = [key for key in targets if isinstance(key, int)]
+        # Facts are committed before the turns are tombstoned: a crash in between duplicates, never loses
+        self.facts.extend(metadatas, embeddings, ManifestUpdate(tombstones=replaced))
+
+        folded = {int(rows[i]) for cluster in clusters for i in cluster}
+        self.totals.summaries += len(targets) - len(replaced)
+        self.totals.merged += len(replaced)
+        self.totals.summarized += len(folded)
+        return folded
+
+    def run_pass(self, max_steps: Optional[int] = None) -> bool:
+        """
+        Steps until the pass completes (or `max_steps`). With a scheduler, every
+        step waits for interactive turns and high CPU; a shed step ends the run
+        early and the next call resumes where it stopped. Returns True if the
+        pass completed.
+        """
+        steps = 0
+        while max_steps is None or steps < max_steps:
+            if self.scheduler and not self.scheduler.admit_blocking("memory_retention", WorkPriority.BACKGROUND):
+                return False
+            steps += 1
+            if self.step():
+                logger.info(f"RetentionEngine: Pass complete ({self.stats()})")
+                return True
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {**asdict(self.totals), 'rows': len(self.conversations),
+                'live': self.conversations.live_count, 'cursor': self._cursor}
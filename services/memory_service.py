@@ -2,10 +2,18 @@ import os
 import json
 import logging
 import pickle
+import threading
 import numpy as np
+from contextlib import contextmanager
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
+from services.memory_store import MemoryStore, HYBRID_POOL
+from services.ingestion_pipeline import IngestionPipeline, IngestionProgress
+from services.memory_cache import EmbeddingCache, ResultCache, normalize_text
+from services.embedding_backend import create_embedding_backend
+from services.memory_retention import RetentionEngine
+
 logger = logging.getLogger(__name__)
 
 class MemoryService:
@@ -17,71 +25,91 @@ class MemoryService:
         self.db_path = db_path
         os.makedirs(self.db_path, exist_ok=True)
         
+        # Legacy full-pickle files, migrated into the append-only store on first start
         self.conversations_file = os.path.join(self.db_path, "conversations.pkl")
         self.facts_file = os.path.join(self.db_path, "facts.pkl")
-        
-        self.conversations = []
-        self.facts = []
-        self.conversations_embeddings = []
-        self.facts_embeddings = []
-        self.doc_embeddings = []   # New: For larger documents
-        self.documents = []        # New: metadata for documents
-        self.knowledge_graph = {} # {entity: {relation: [targets]}}
-        
         self.docs_file = os.path.join(self.db_path, "docs_rag.pkl")
+
+        # Collections: metadata rows + pre-normalized embeddings, row i matching row i
+        self.store = MemoryStore.open(self.db_path)
+        self.conversations = self.store.collection("conversations")
+        self.facts = self.store.collection("facts")
+        # New: chunks of larger documents. The largest collection is searched on int8 codes
+        self.documents = self.store.collection("documents", quantization="int8")
+        self.knowledge_graph = {} # {entity: {relation: [targets]}}
+        self._load_db()
+
+        self.ingest_batch_size = 64  # Chunks per encode() call and per bulk append
+        self.scheduler = None        # Set by AIService so ingestion batches yield to user turns
+        # Pipelines hold row numbers of the documents' current epoch, so a vacuum waits for none to run
+        self._document_writers = 0
+        self._document_lock = threading.Lock()
+        # Repeated commands skip the embedder; retrievals are reused until the store changes
+        self.embedding_cache = EmbeddingCache(maxsize=2048)
+        self.result_cache = ResultCache(ttl=30.0)
         
         try:
-            from sentence_transformers import SentenceTransformer
             # Load lightweight local embedding model (local path in models/)
-            model_path = os.path.join(self.db_path.parent if hasattr(self.db_path, 'parent') else "models", "embedding_model")
+            models_dir = self.db_path.parent if hasattr(self.db_path, 'parent') else "models"
+            model_path = os.path.join(models_dir, "embedding_model")
             if not os.path.exists(model_path):
                 # Fallback to download if local folder doesn't exist yet
                 model_path = 'all-MiniLM-L6-v2'
                 
-            self.embedder = SentenceTransformer(model_path)
-            self._load_db()
-            self._dirty = False # Track if we need to save
-            logger.info("MemoryService: Optimized RAG initialized successfully.")
+            # ONNX export (OpenVINO / onnxruntime, no PyTorch) when present; JARVIS_EMBEDDING_BACKEND overrides
+            self.embedder = create_embedding_backend(model_path, onnx_dir=os.path.join(models_dir, "embedding_onnx"))
+            logger.info(f"MemoryService: Optimized RAG initialized successfully ({self.embedder.name}).")
         except Exception as e:
             logger.error(f"Failed to initialize MemoryService: {e}")
             self.embedder = None
+
+        # Expires, deduplicates and summarizes old turns; AIService runs it in the background
+        self.retention = RetentionEngine(self.conversations, self.facts,
+                                         encode=self._encode if self.embedder else None)
             
     def _load_db(self):
-        if os.path.exists(self.conversations_file):
-            with open(self.conversations_file, 'rb') as f:
-                data = pickle.load(f)
-                self.conversations = data.get('docs', [])
-                self.conversations_embeddings = data.get('embeddings', [])
-                
-        if os.path.exists(self.facts_file):
-            with open(self.facts_file, 'rb') as f:
-                data = pickle.load(f)
-                self.facts = data.get('docs', [])
-                self.facts_embeddings = data.get('embeddings', [])
-                # Backward compatibility: ensure norms
-                if len(self.facts_embeddings) > 0:
-                    norms = np.linalg.norm(self.facts_embeddings, axis=1)
-                    norms[norms == 0] = 1.0
-                    self.facts_embeddings = self.facts_embeddings / norms[:, np.newaxis]
-
-        if os.path.exists(self.docs_file):
-            with open(self.docs_file, 'rb') as f:
-                data = pickle.load(f)
-                self.documents = data.get('documents', []) # Changed from 'docs' to 'documents' for consistency
-                self.doc_embeddings = data.get('embeddings', [])
-                self.knowledge_graph = data.get('knowledge_graph', {})
-
-    def _save_db(self):
-        with open(self.conversations_file, 'wb') as f:
-            pickle.dump({'docs': self.conversations, 'embeddings': self.conversations_embeddings}, f)
-        with open(self.facts_file, 'wb') as f:
-            pickle.dump({'docs': self.facts, 'embeddings': self.facts_embeddings}, f)
-        with open(self.docs_file, 'wb') as f:
-            pickle.dump({
-                'documents': self.documents, # Changed from 'docs' to 'documents' for consistency
-                'embeddings': self.doc_embeddings,
-                'knowledge_graph': self.knowledge_graph
-            }, f)
+        """Startup is O(1) in history: segments are mmapped, metadata stays in SQLite"""
+        if not self.store.existed:
+            self._migrate_pickles()
+        self.knowledge_graph = self.store.load_relations()
+
+    def _migrate_pickles(self):
+        """One-time import of the old full-rewrite pickle files"""
+        # Vectors are re-normalized on append (old facts were not always normalized)
+        legacy = [
+            (self.conversations_file, self.conversations, 'docs'),
+            (self.facts_file, self.facts, 'docs'),
+            (self.docs_file, self.documents, 'documents'),
+        ]
+        for path, collection, key in legacy:
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, 'rb') as f:
+                    data = pickle.load(f)
+                docs = data.get(key, [])
+                embeddings = np.asarray(data.get('embeddings', []), dtype=np.float32)
+                if len(docs) and len(docs) == len(embeddings):
+                    collection.extend(docs, embeddings)
+                for entity, relations in data.get('knowledge_graph', {}).items():
+                    for relation, targets in relations.items():
+                        for target in targets:
+                            self.store.add_relation(entity, relation, target)
+                os.replace(path, path + ".migrated")
+                logger.info(f"MemoryService: Migrated {len(docs)} items from {os.path.basename(path)}")
+            except Exception as e:
+                logger.error(f"MemoryService: Failed to migrate {path}: {e}")
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Embeddings of short texts (queries, facts, interactions) through the LRU cache"""
+        return self.embedding_cache.encode(texts, self.embedder.encode)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return {'embeddings': self.embedding_cache.stats(), 'results': self.result_cache.stats()}
+
+    def compact(self):
+        """Merge embedding segments (also runs automatically as segments accumulate)"""
+        self.store.compact()
 
     def store_interaction(self, user_text: str, ai_response: str, intent: str, timestamp: str):
         if not self.embedder: return
@@ -97,19 +125,10 @@ class MemoryService:
                 "document": document
             }
             
-            embedding = self.embedder.encode(document)
-            # Pre-normalize
-            norm = np.linalg.norm(embedding)
-            if norm > 0: embedding = embedding / norm
+            embedding = self._encode([document])[0]
 
-            self.conversations.append(metadata)
-            
-            if len(self.conversations_embeddings) == 0:
-                self.conversations_embeddings = np.array([embedding])
-            else:
-                self.conversations_embeddings = np.vstack([self.conversations_embeddings, embedding])
-            
-            self._save_db()
+            # Appends one row (normalized by the store) - nothing else is rewritten
+            self.conversations.append(metadata, embedding)
             logger.debug(f"MemoryService: Stored interaction at {timestamp}")
         except Exception as e:
             logger.error(f"MemoryService Error storing interaction: {e}")
@@ -119,7 +138,7 @@ class MemoryService:
         
         try:
             # Upsert logic - avoid exact duplicates
-            if any(f['document'] == fact_text for f in self.facts):
+            if self.facts.contains_document(fact_text):
                 return
                 
             metadata = {
@@ -128,104 +147,169 @@ class MemoryService:
                 "document": fact_text
             }
             
-            embedding = self.embedder.encode(fact_text)
-            # Pre-normalize for instant search later
-            norm = np.linalg.norm(embedding)
-            if norm > 0: embedding = embedding / norm
+            embedding = self._encode([fact_text])[0]
 
-            self.facts.append(metadata)
-            
-            if len(self.facts_embeddings) == 0:
-                self.facts_embeddings = np.array([embedding])
-            else:
-                self.facts_embeddings = np.vstack([self.facts_embeddings, embedding])
-                
-            self._save_db()
+            # Pre-normalized by the store for instant search later
+            self.facts.append(metadata, embedding)
             logger.info(f"MemoryService: Stored fact '{fact_text[:20]}...'")
         except Exception as e:
             logger.error(f"MemoryService Error storing fact: {e}")
 
-    def retrieve_relevant_context(self, current_query: str, n_results: int = 3) -> str:
-        if not self.embedder: return ""
+    def retrieve_scored_context(self, current_query: str, k_facts: int = 5,
+                                k_docs: int = 8, k_conversations: int = 5,
+                                threshold: float = 0.35) -> List[Dict[str, Any]]:
+        """
+        Retrieve candidate memory items, ranked by vector similarity and BM25
+        keyword matches fused with reciprocal rank fusion (exact identifiers,
+        file names and proper nouns surface even when embeddings miss them).
+        Returns dicts with 'kind' ('fact' | 'document' | 'conversation'), 'text',
+        'score' (fused, 1.0 = best in both rankings) and 'similarity' so the
+        prompt builder can pack them by token budget.
+        """
+        return self.retrieve_scored_context_batch([current_query], k_facts, k_docs, k_conversations, threshold)[0]
+
+    def retrieve_scored_context_batch(self, queries: List[str], k_facts: int = 5,
+                                      k_docs: int = 8, k_conversations: int = 5,
+                                      threshold: float = 0.35) -> List[List[Dict[str, Any]]]:
+        """
+        retrieve_scored_context for several queries at once (e.g. speculative
+        retrievals on partial transcripts): one encode() call, and one scan per
+        collection in which every block is scored against all queries together.
+        """
+        results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        if not self.embedder or not queries: return results
+        
+        # Read before searching: a write landing meanwhile invalidates what is cached below
+        generation = self.store.generation
+        keys = [(normalize_text(q), k_facts, k_docs, k_conversations, threshold) for q in queries]
+        pending = []
+        for i, key in enumerate(keys):
+            cached = self.result_cache.get(key, generation)
+            if cached is None:
+                pending.append(i)
+            else:
+                results[i] = [dict(item) for item in cached]
+        if not pending:
+            return results
         
-        context_parts = []
         try:
-            query_embedding = self.embedder.encode(current_query).reshape(1, -1)
-            
-            def get_top_k(query_emb, stored_embs, stored_docs, k=2):
-                if len(stored_embs) == 0:
-                    return []
-                
-                # Normalize query once
-                query_norm = np.linalg.norm(query_emb)
-                normalized_query = query_emb / (query_norm + 1e-10)
-                
-                # Stored embeddings are now pre-normalized (see store methods)
-                similarities = np.dot(normalized_query, stored_embs.T)[0]
-                
-                top_indices = np.argsort(similarities)[::-1][:k]
-                return [stored_docs[i]['document'] for i in top_indices if similarities[i] > 0.35]
+            texts = [queries[i] for i in pending]
+            embeddings = self._encode(texts)
+            # Normalize the queries once
+            embeddings = embeddings / (np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-10)
             
-            # 1. Facts
-            fact_results = get_top_k(query_embedding, self.facts_embeddings, self.facts, k=2)
-            if fact_results:
-                context_parts.append("Known Facts: " + " | ".join(fact_results))
-
-            # 2. Documents (RAG)
-            doc_results = get_top_k(query_embedding, self.doc_embeddings, self.documents, k=2)
-            if doc_results:
-                context_parts.append("Document Knowledge: " + " | ".join(doc_results))
-
-            # 3. Interactions
-            conv_results = get_top_k(query_embedding, self.conversations_embeddings, self.conversations, k=n_results)
-            if conv_results:
-                context_parts.append("Past Context: " + " | ".join(conv_results))
+            collections = [(self.facts, 'fact', k_facts), (self.documents, 'document', k_docs),
+                           (self.conversations, 'conversation', k_conversations)]
+            for collection, kind, k in collections:
+                # One immutable view per collection: concurrent ingestion never blocks or tears it
+                snapshot = collection.snapshot()
+                if snapshot.rows == 0 or k <= 0:
+                    continue
+                # Stored embeddings are pre-normalized; exact or ANN search by collection size
+                hits = collection.search_batch(embeddings, k * HYBRID_POOL, snapshot)
+                for i, text, query, vector_hits in zip(pending, texts, embeddings, hits):
+                    # Vector hits below the threshold are dropped; keyword hits are kept
+                    rows, scores, similarities = collection.hybrid_search(query, text, k, threshold, vector_hits,
+                                                                          snapshot)
+                    docs = collection.get_many(rows, snapshot)
+                    results[i].extend(
+                        {'kind': kind, 'text': doc['document'], 'score': float(score), 'similarity': float(similarity)}
+                        for doc, score, similarity in zip(docs, scores, similarities)
+                    )
+            for i in pending:
+                self.result_cache.put(keys[i], generation, [dict(item) for item in results[i]])
                 
         except Exception as e:
             logger.error(f"MemoryService Error during retrieval: {e}")
             
+        return results
+
+    @staticmethod
+    def format_context(items: List[Dict[str, Any]], limits: Optional[Dict[str, int]] = None) -> str:
+        """Render scored items as the legacy 'Known Facts / Document Knowledge / Past Context' block"""
+        limits = limits or {}
+        sections = [('fact', "Known Facts"), ('document', "Document Knowledge"), ('conversation', "Past Context")]
+        context_parts = []
+        for kind, title in sections:
+            texts = [i['text'] for i in items if i['kind'] == kind]
+            if kind in limits:
+                texts = texts[:limits[kind]]
+            if texts:
+                context_parts.append(f"{title}: " + " | ".join(texts))
         return "\n".join(context_parts)
 
+    def retrieve_relevant_context(self, current_query: str, n_results: int = 3) -> str:
+        items = self.retrieve_scored_context(current_query, k_facts=2, k_docs=2, k_conversations=n_results)
+        return self.format_context(items)
+
+    def _ingestion_pipeline(self, workers=None, progress_callback=None, background: bool = True) -> IngestionPipeline:
+        encode = lambda texts: self.embedder.encode(
+            texts, batch_size=self.ingest_batch_size, convert_to_numpy=True, show_progress_bar=False
+        )
+        return IngestionPipeline(self.documents, encode, batch_size=self.ingest_batch_size, workers=workers,
+                                 progress_callback=progress_callback,
+                                 scheduler=self.scheduler if background else None)
+
+    @contextmanager
+    def _document_writer(self):
+        with self._document_lock:
+            self._document_writers += 1
+        try:
+            yield
+        finally:
+            with self._document_lock:
+                self._document_writers -= 1
+
+    def vacuum_documents(self) -> int:
+        """
+        Reclaim the chunks of replaced and deleted files once they are a large share of
+        the collection: tombstones slow every scan and crowd out ANN candidates.
+        Skipped while an ingestion runs. Returns the number of rows removed.
+        """
+        with self._document_lock:
+            if self._document_writers:
+                return 0
+            return self.retention.vacuum_if_due(self.documents)
+
     def ingest_document(self, file_path: str):
         """Read a file, chunk it, and store in vector DB"""
         if not self.embedder: return
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            # Simple chunking by paragraph or fixed size
-            chunks = [content[i:i+800] for i in range(0, len(content), 600)] # Overlap of 200
-            
-            for i, chunk in enumerate(chunks):
-                metadata = {
-                    "type": "doc_chunk",
-                    "source": os.path.basename(file_path),
-                    "chunk_id": i,
-                    "document": chunk.strip()
-                }
-                
-                embedding = self.embedder.encode(chunk)
-                norm = np.linalg.norm(embedding)
-                if norm > 0: embedding = embedding / norm
-
-                self.documents.append(metadata)
-                if len(self.doc_embeddings) == 0:
-                    self.doc_embeddings = np.array([embedding])
-                else:
-                    self.doc_embeddings = np.vstack([self.doc_embeddings, embedding])
-            
-            self._save_db()
-            logger.info(f"MemoryService: Ingested {len(chunks)} chunks from {file_path}")
+            # A single file is streamed in-process; no pool start-up cost
+            with self._document_writer():
+                progress = self._ingestion_pipeline(workers=0).run([file_path])
+            logger.info(f"MemoryService: Ingested {progress.chunks} chunks from {file_path}")
         except Exception as e:
             logger.error(f"Error ingesting document: {e}")
 
-    def ingest_directory(self, dir_path: str):
-        """Ingest all text-based files in a directory"""
-        valid_exts = ['.txt', '.md', '.py', '.js', '.html', '.css']
-        for root, _, files in os.walk(dir_path):
-            for file in files:
-                if any(file.endswith(ext) for ext in valid_exts):
-                    self.ingest_document(os.path.join(root, file))
+    def ingest_directory(self, dir_path: str, progress_callback=None,
+                         background: bool = True) -> Optional[IngestionProgress]:
+        """
+        Ingest all text-based files in a directory (resumes an interrupted run, skips unchanged files).
+        background=False is for an ingestion the user is waiting on: its batches do not yield to
+        the scheduler, which would otherwise hold them back behind the user's own turns.
+        """
+        if not self.embedder: return None
+        try:
+            with self._document_writer():
+                return self._ingestion_pipeline(progress_callback=progress_callback,
+                                                background=background).run([dir_path])
+        except Exception as e:
+            logger.error(f"Error ingesting directory {dir_path}: {e}")
+            return None
+
+    def document_manifest(self) -> Dict[str, Dict[str, Any]]:
+        """{path: {mtime_ns, size, chunks, done, hash}} of every ingested document"""
+        return self.store.file_manifest(self.documents.key)
+
+    def remove_documents(self, file_paths):
+        """Hide every chunk of deleted files from retrieval (rows are tombstoned)"""
+        try:
+            with self._document_writer():
+                removed = self._ingestion_pipeline(workers=0).remove(os.path.abspath(p) for p in file_paths)
+            logger.info(f"MemoryService: Removed {removed} chunks of deleted documents")
+        except Exception as e:
+            logger.error(f"Error removing documents: {e}")
 
     def add_relation(self, entity: str, relation: str, target: str):
         """Add a relationship to the knowledge graph"""
@@ -236,7 +320,7 @@ class MemoryService:
         
         if target not in self.knowledge_graph[entity][relation]:
             self.knowledge_graph[entity][relation].append(target)
-            self._save_db()
+            self.store.add_relation(entity, relation, target)
             logger.info(f"MemoryService: Added relation {entity} -> {relation} -> {target}")
 
     def query_relations(self, entity: str) -> Dict[str, List[str]]:
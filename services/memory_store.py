@@ -0,0 +1,1021 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+import numpy as np
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+from services.embedding_store import EmbeddingStore, quantize, code_scores
+from services.ann_index import top_k, top_k_columns, create_index, index_path, load_index
+from services.lexical_index import LexicalIndex, FTS5_AVAILABLE, LEXICAL_VERSION, reciprocal_rank_fusion, RRF_K
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+SEGMENT_ROWS = 4096   # Tail rows sealed into one .npy segment
+MAX_SEGMENTS = 8      # Sealed segments merged by compaction above this count
+ANN_THRESHOLD = 20000 # Exact search below this many rows, ANN index above
+INDEX_SAVE_EVERY = 65536  # Rows added before the ANN index file is rewritten
+QUANTIZATION_MODES = ("int8", "float16")
+RESCORE_FACTOR = 4    # Quantized search re-scores k * RESCORE_FACTOR candidates in float32
+HYBRID_POOL = 4       # Hybrid search fuses the top k * HYBRID_POOL of each ranking
+LEXICAL_MIN_SCORE = 0.5  # BM25 a keyword hit below the similarity threshold needs to be fused
+SEARCH_BLOCK = 16384  # Rows scored per matrix product in exact search
+
+def atomic_write(path: str, write):
+    """Write via `write(f)` to a temp file, fsync and rename over `path`"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+@dataclass
+class ManifestUpdate:
+    """File-manifest changes committed in the same transaction as a batch of rows"""
+    files: List[tuple] = field(default_factory=list)       # (path, mtime_ns, size, chunks, done, content hash)
+    tombstones: List[int] = field(default_factory=list)    # Rows superseded by a newer version of their file
+    removed: List[str] = field(default_factory=list)       # Paths dropped from the manifest
+
+@dataclass(frozen=True)
+class CollectionSnapshot:
+    """
+    Immutable view of a collection, published after each committed write.
+    Readers take one reference and never lock: segments and codes are
+    read-only mmaps, the tail is a view of rows the writer never touches
+    again, and the tombstone set is replaced rather than mutated. The ANN
+    index keeps growing in place, so its candidates are clipped to `rows`.
+    """
+    rows: int
+    segments: tuple
+    codes: tuple
+    tail: np.ndarray
+    dead: frozenset
+    dead_rows: np.ndarray        # `dead` as a sorted array
+    quantization: Optional[str]
+    index: Any = None
+    key: str = ""                # SQLite key of the metadata these rows number (changes on vacuum)
+
+    @property
+    def parts(self) -> List[tuple]:
+        """(float32 vectors, codes or None) for each segment, then the tail"""
+        parts = list(zip(self.segments, self.codes))
+        if len(self.tail):
+            parts.append((self.tail, None))
+        return parts
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError as e:
+        # Windows refuses to delete files that are still memory-mapped; retried at next startup
+        logger.debug(f"MemoryStore: Could not remove {path}: {e}")
+
+class Collection:
+    """
+    One memory collection (conversations, facts or documents).
+    Metadata rows live in SQLite; embeddings live in sealed .npy segments opened
+    with mmap plus a raw float32 tail file that appends only the new row's bytes.
+    Row i of the metadata matches row i of the embeddings. Replaced rows are
+    tombstoned (hidden from search) rather than rewritten. Writers serialize on
+    the store lock and publish a CollectionSnapshot once their rows are
+    committed; every read goes through the snapshot without taking the lock.
+    With `quantization` set, each sealed segment also gets compact int8 / float16
+    codes that exact search scans instead of the float32 file; the float32 rows
+    stay on disk (mmapped) for re-scoring the best candidates.
+    Metadata is stored under `key`: the name, then `<name>__<epoch>` once
+    vacuum() has renumbered the rows.
+    """
+    def __init__(self, store: "MemoryStore", name: str, state: Dict[str, Any]):
+        self.store = store
+        self.name = name
+        self.dir = os.path.join(store.root, name)
+        os.makedirs(self.dir, exist_ok=True)
+
+        self.key: str = state.get('key', name)
+        self.epoch: int = state.get('epoch', 0)
+        # Keys left by a vacuum are kept for readers of older snapshots until the next start
+        for retired in state.get('retired', []):
+            store._drop_key(retired)
+        self._retired: List[str] = []
+
+        self.dim: Optional[int] = state.get('dim')
+        self.segment_files: List[Dict[str, Any]] = list(state.get('segments', []))
+        self.next_segment: int = state.get('next_segment', 0)
+        self._segments = [np.load(os.path.join(self.dir, s['file']), mmap_mode='r') for s in self.segment_files]
+        self._sealed_rows = sum(s['rows'] for s in self.segment_files)
+        self._tail = EmbeddingStore(dim=self.dim)
+        self._tail_fh = None
+        self.quantization: Optional[str] = state.get('quantization')
+        self.rescore_factor = RESCORE_FACTOR
+
+        self._load_tail()
+        if state.get('lexical', 1 if state else LEXICAL_VERSION) < LEXICAL_VERSION:
+            # Indexed with an older document_text(): rebuilt from the metadata by the catch-up below
+            self.store._drop_lexical(self.key)
+        self.store._open_lexical(self.key)
+        self._reconcile()
+        self.store._catch_up_lexical(self.key)
+        self._remove_orphans()
+        self._codes = [self._load_codes(s['file']) for s in self.segment_files]
+
+        self._dead = frozenset(self.store._tombstones(self.key))
+        self._dead_array: Optional[np.ndarray] = None
+
+        self.ann_backend = "auto"
+        self.index = None
+        self._index_saved = 0
+        self._publish()
+        self._load_index()
+        self._publish()
+
+    # ── Startup ─────────────────────────────────────────────────────────────────
+
+    @property
+    def tail_path(self) -> str:
+        # Named after the row it starts at, so a seal interrupted by a crash never replays old rows
+        return os.path.join(self.dir, f"tail_{self._sealed_rows}.f32")
+
+    def _load_tail(self):
+        if self.dim is None or not os.path.exists(self.tail_path):
+            return
+        raw = np.fromfile(self.tail_path, dtype=np.float32)
+        rows = len(raw) // self.dim
+        if rows:
+            self._tail.extend(raw[:rows * self.dim].reshape(rows, self.dim), normalize=False)
+
+    def _reconcile(self):
+        """Drop rows half-written by a crash: vectors without metadata or metadata without vectors"""
+        meta_rows = self.store._max_row(self.key) + 1
+        rows = len(self)
+        if rows > meta_rows and rows - meta_rows <= len(self._tail):
+            keep = len(self._tail) - (rows - meta_rows)
+            vectors = self._tail.vectors[:keep].copy()
+            self._tail.clear()
+            self._tail.extend(vectors, normalize=False)
+            logger.warning(f"MemoryStore: Dropped {rows - meta_rows} orphan vectors from '{self.name}'")
+        elif meta_rows > rows:
+            self.store._delete_rows_from(self.key, rows)
+            logger.warning(f"MemoryStore: Dropped {meta_rows - rows} rows without vectors from '{self.name}'")
+        # Rewrite the tail to exactly the surviving rows (also trims a torn last row)
+        if self.dim is not None:
+            expected = len(self._tail) * self.dim * 4
+            if os.path.exists(self.tail_path) and os.path.getsize(self.tail_path) != expected:
+                atomic_write(self.tail_path, lambda f: f.write(self._tail.vectors.tobytes()))
+
+    def _remove_orphans(self):
+        keep = {s['file'] for s in self.segment_files} | {os.path.basename(self.tail_path)}
+        for s in self.segment_files:
+            keep.update(os.path.basename(p) for p in self._code_paths(s['file']) if p)
+        for entry in os.listdir(self.dir):
+            owned = entry.startswith(("seg_", "tail_")) or entry.endswith(".tmp")
+            if owned and entry not in keep:
+                _remove_quietly(os.path.join(self.dir, entry))
+
+    def _load_index(self):
+        path = index_path(self.dir, self.ann_backend)
+        if not os.path.exists(path):
+            return
+        try:
+            index = load_index(path)
+        except Exception as e:
+            logger.error(f"MemoryStore: Ignoring unreadable ANN index for '{self.name}': {e}")
+            return
+        if index.ntotal > len(self):
+            return  # Rows were dropped by recovery; rebuilt on the next write
+        # Rows appended after the last save are inserted incrementally
+        self._index_rows(index, index.ntotal, len(self))
+        self.index = index
+        self._index_saved = index.ntotal
+
+    def state(self) -> Dict[str, Any]:
+        return {'dim': self.dim, 'segments': self.segment_files, 'next_segment': self.next_segment,
+                'quantization': self.quantization, 'key': self.key, 'epoch': self.epoch, 'retired': self._retired,
+                'lexical': LEXICAL_VERSION}
+
+    # ── Quantized codes ─────────────────────────────────────────────────────────
+
+    def _code_paths(self, segment_file: str):
+        """(codes, scales) file paths of a segment for the current mode"""
+        if not self.quantization:
+            return None, None
+        stem = os.path.join(self.dir, segment_file[:-len(".npy")])
+        scales = f"{stem}.{self.quantization}s.npy" if self.quantization == "int8" else None
+        return f"{stem}.{self.quantization}.npy", scales
+
+    def _load_codes(self, segment_file: str, block: int = 65536):
+        codes_path, scales_path = self._code_paths(segment_file)
+        if codes_path is None:
+            return None
+        if not os.path.exists(codes_path) or (scales_path and not os.path.exists(scales_path)):
+            # Encoded block by block through memmaps, so a large segment is never decoded at once
+            segment = np.load(os.path.join(self.dir, segment_file), mmap_mode='r')
+            codes, scales = quantize(segment[:0], self.quantization)
+            codes_out = np.lib.format.open_memmap(codes_path + ".tmp", mode='w+', dtype=codes.dtype,
+                                                  shape=segment.shape)
+            scales_out = np.lib.format.open_memmap(scales_path + ".tmp", mode='w+', dtype=np.float32,
+                                                   shape=(len(segment),)) if scales_path else None
+            for i in range(0, len(segment), block):
+                codes, scales = quantize(segment[i:i + block], self.quantization)
+                codes_out[i:i + block] = codes
+                if scales_out is not None:
+                    scales_out[i:i + block] = scales
+            codes_out.flush()
+            if scales_out is not None:
+                scales_out.flush()
+            # Memmaps are closed before the rename (Windows refuses to replace mapped files)
+            del codes_out, scales_out
+            if scales_path:
+                os.replace(scales_path + ".tmp", scales_path)
+            os.replace(codes_path + ".tmp", codes_path)
+        return (np.load(codes_path, mmap_mode='r'),
+                np.load(scales_path, mmap_mode='r') if scales_path else None)
+
+    def set_quantization(self, mode: Optional[str]):
+        """Switch the code format of sealed segments (None keeps float32 only)"""
+        if mode is not None and mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode: {mode}")
+        with self.store.lock:
+            if mode == self.quantization:
+                return
+            self.quantization = mode
+            self._codes = [self._load_codes(s['file']) for s in self.segment_files]
+            self._publish()
+            self.store.save_manifest()
+            self._remove_orphans()
+            logger.info(f"MemoryStore: '{self.name}' quantization set to {mode or 'float32'}")
+
+    @property
+    def nbytes_codes(self) -> int:
+        """Bytes scanned by quantized search (codes + scales of sealed segments)"""
+        total = 0
+        for codes in self._codes:
+            if codes:
+                total += codes[0].nbytes + (codes[1].nbytes if codes[1] is not None else 0)
+        return total
+
+    # ── Reads ───────────────────────────────────────────────────────────────────
+
+    def snapshot(self) -> CollectionSnapshot:
+        """The latest published view (an atomic reference read; never blocks on writers)"""
+        return self._snapshot
+
+    def __len__(self) -> int:
+        return self._sealed_rows + len(self._tail)
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        return self.get_many([row])[0]
+
+    def get_many(self, rows: Iterable[int], snapshot: Optional[CollectionSnapshot] = None) -> List[Dict[str, Any]]:
+        """Metadata for `rows`, in the same order (rows of a snapshot are always committed)"""
+        rows = [int(r) for r in rows]
+        if not rows:
+            return []
+        found = self.store._fetch((snapshot or self._snapshot).key, rows)
+        return [found[r] for r in rows]
+
+    def take(self, rows: np.ndarray, snapshot: Optional[CollectionSnapshot] = None) -> np.ndarray:
+        """Vectors of the given (sorted) rows, gathered across segments and the tail"""
+        rows = np.asarray(rows, dtype=np.int64)
+        snapshot = snapshot or self._snapshot
+        out = np.empty((len(rows), self.dim or 0), dtype=np.float32)
+        offset = 0
+        for part, _ in snapshot.parts:
+            lo, hi = np.searchsorted(rows, [offset, offset + len(part)])
+            if hi > lo:
+                out[lo:hi] = part[rows[lo:hi] - offset]
+            offset += len(part)
+        return out
+
+    def take_approximate(self, rows: np.ndarray, snapshot: Optional[CollectionSnapshot] = None) -> np.ndarray:
+        """take() decoded from the quantized codes where a part has them (the tail stays float32)"""
+        rows = np.asarray(rows, dtype=np.int64)
+        snapshot = snapshot or self._snapshot
+        out = np.empty((len(rows), self.dim or 0), dtype=np.float32)
+        offset = 0
+        for part, codes in snapshot.parts:
+            lo, hi = np.searchsorted(rows, [offset, offset + len(part)])
+            if hi > lo:
+                local = rows[lo:hi] - offset
+                if codes:
+                    out[lo:hi] = codes[0][local]
+                    if codes[1] is not None:
+                        out[lo:hi] *= codes[1][local][:, None]
+                else:
+                    out[lo:hi] = part[local]
+            offset += len(part)
+        return out
+
+    def search(self, query: np.ndarray, k: int, snapshot: Optional[CollectionSnapshot] = None):
+        """Top-k (rows, scores) for a normalized query, best first (see search_batch)"""
+        return self.search_batch(np.asarray(query, dtype=np.float32).reshape(1, -1), k, snapshot)[0]
+
+    def search_batch(self, queries: np.ndarray, k: int,
+                     snapshot: Optional[CollectionSnapshot] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Top-k (rows, scores) of each normalized query in `queries` (m, dim), best first.
+        Exact below ANN_THRESHOLD rows: each block of a segment is multiplied by
+        all queries at once and cut down with argpartition, so a scan is O(n) and
+        never allocates a score array the size of the collection. Above it the
+        ANN index (built on the write path) answers each query. Quantized
+        collections score on their codes either way and re-score the best
+        k * rescore_factor candidates in float32.
+        """
+        snapshot = snapshot or self._snapshot
+        queries = np.asarray(queries, dtype=np.float32)
+        queries = queries.reshape(-1, queries.shape[-1])
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+        if snapshot.rows == 0 or k <= 0:
+            return [empty] * len(queries)
+        dead = snapshot.dead
+        index = snapshot.index
+        quantized = bool(snapshot.quantization)
+        if index is not None:
+            # The IVF index fetches its candidates from here, so it can score them on the codes;
+            # hnswlib keeps its own float32 copy and never reads them
+            quantized = quantized and self.rescore_factor and index.kind == "ivf"
+            pool = k * self.rescore_factor if quantized else k
+            fetch = (lambda rows: self.take_approximate(rows, snapshot)) if quantized else \
+                (lambda rows: self.take(rows, snapshot))
+            dead_rows = snapshot.dead_rows if dead else None
+            results = []
+            for query in queries:
+                # Rows added after the snapshot and tombstones are filtered by the index itself
+                rows, scores = index.search(query, pool, fetch, limit=snapshot.rows, dead=dead_rows)
+                results.append(self._rescore(rows, query, k, snapshot) if pool != k else (rows, scores))
+            return results
+
+        pool = k * self.rescore_factor if quantized and self.rescore_factor else k
+        candidate_rows, candidate_scores = self._scan(snapshot, queries.T, pool, quantized)
+        results = []
+        for j, query in enumerate(queries):
+            rows, scores = candidate_rows[:, j], candidate_scores[:, j]
+            best = top_k(scores, pool)
+            best = best[np.isfinite(scores[best])]
+            rows, scores = rows[best], scores[best]
+            results.append(self._rescore(rows, query, k, snapshot) if pool != k else (rows, scores))
+        return results
+
+    def _rescore(self, rows: np.ndarray, query: np.ndarray, k: int, snapshot: CollectionSnapshot):
+        """Candidates from the codes, final top-k order from the float32 rows"""
+        rows = np.sort(rows)
+        scores = self.take(rows, snapshot) @ query
+        best = top_k(scores, k)
+        return rows[best], scores[best]
+
+    @staticmethod
+    def _scan(snapshot: CollectionSnapshot, queries_t: np.ndarray, k: int, quantized: bool):
+        """(rows, scores), each (candidates, m): the k best rows of every block for each query"""
+        dead = snapshot.dead_rows if snapshot.dead else None
+        found_rows, found_scores = [], []
+        offset = 0
+        for segment, codes in snapshot.parts:
+            for lo in range(0, len(segment), SEARCH_BLOCK):
+                hi = min(len(segment), lo + SEARCH_BLOCK)
+                if quantized and codes:
+                    scales = codes[1][lo:hi] if codes[1] is not None else None
+                    scores = code_scores(codes[0][lo:hi], scales, queries_t)
+                else:
+                    scores = segment[lo:hi] @ queries_t
+                if dead is not None:
+                    first, last = np.searchsorted(dead, [offset + lo, offset + hi])
+                    scores[dead[first:last] - (offset + lo)] = -np.inf
+                rows, block_scores = top_k_columns(scores, k)
+                found_rows.append(rows + (offset + lo))
+                found_scores.append(block_scores)
+            offset += len(segment)
+        return np.concatenate(found_rows), np.concatenate(found_scores)
+
+    def lexical_search(self, text: str, k: int, snapshot: Optional[CollectionSnapshot] = None):
+        """Top-k (rows, BM25 scores) of the inverted index, tombstoned rows excluded"""
+        snapshot = snapshot or self._snapshot
+        rows, scores = self.store._lexical_search(snapshot.key, text, k)
+        keep = rows < snapshot.rows  # Committed after the snapshot was taken
+        return rows[keep], scores[keep]
+
+    def score_rows(self, rows: np.ndarray, query: np.ndarray,
+                   snapshot: Optional[CollectionSnapshot] = None) -> np.ndarray:
+        """Exact float32 similarity of a normalized query to specific rows"""
+        rows = np.asarray(rows, dtype=np.int64)
+        order = np.argsort(rows)
+        scores = np.empty(len(rows), dtype=np.float32)
+        scores[order] = self.take(rows[order], snapshot) @ np.asarray(query, dtype=np.float32).reshape(-1)
+        return scores
+
+    def hybrid_search(self, query: np.ndarray, text: str, k: int, threshold: float = 0.0, hits=None,
+                      snapshot: Optional[CollectionSnapshot] = None):
+        """
+        Top-k (rows, fused scores, similarities) fusing vector and BM25 rankings
+        with reciprocal rank fusion. Vector hits at or below `threshold` are not
+        ranked; lexical hits below it are when their BM25 reaches LEXICAL_MIN_SCORE,
+        so exact names and codes still surface but words found in most rows do not.
+        Above ANN_THRESHOLD the lexical hits double as exactly re-scored candidates
+        for the vector ranking, catching neighbours the ANN index missed.
+        Fused scores are normalized so rank 1 in both rankings is 1.0. `hits` are
+        vector results already computed by search_batch(queries, k * HYBRID_POOL)
+        on the same `snapshot`.
+        """
+        snapshot = snapshot or self._snapshot
+        pool = k * HYBRID_POOL
+        rows, scores = hits if hits is not None else self.search(query, pool, snapshot)
+        lexical_rows, lexical_scores = self.lexical_search(text, pool, snapshot)
+        similarity = dict(zip(rows.tolist(), scores.tolist()))
+        missing = [r for r in lexical_rows.tolist() if r not in similarity]
+        if missing:
+            similarity.update(zip(missing, self.score_rows(missing, query, snapshot).tolist()))
+        if snapshot.index is not None and missing:
+            candidates = np.array(list(similarity), dtype=np.int64)
+            candidate_scores = np.array([similarity[r] for r in candidates.tolist()], dtype=np.float32)
+            best = top_k(candidate_scores, pool)
+            rows, scores = candidates[best], candidate_scores[best]
+        vector_ranking = rows[scores > threshold].tolist()
+        lexical_ranking = [r for r, score in zip(lexical_rows.tolist(), lexical_scores.tolist())
+                           if score >= LEXICAL_MIN_SCORE or similarity[r] > threshold]
+        fused = reciprocal_rank_fusion([vector_ranking, lexical_ranking])
+        ranked = sorted(fused, key=fused.get, reverse=True)[:k]
+        norm = 2.0 / (RRF_K + 1)
+        return (np.array(ranked, dtype=np.int64),
+                np.array([fused[r] / norm for r in ranked], dtype=np.float32),
+                np.array([similarity[r] for r in ranked], dtype=np.float32))
+
+    @property
+    def live_count(self) -> int:
+        return len(self) - len(self._dead)
+
+    # ── Snapshots (called with the lock held) ───────────────────────────────────
+
+    def _dead_rows(self) -> np.ndarray:
+        """Tombstoned rows as a sorted array (rebuilt only after new tombstones)"""
+        if self._dead_array is None:
+            self._dead_array = np.sort(np.fromiter(self._dead, dtype=np.int64, count=len(self._dead)))
+        return self._dead_array
+
+    def _publish(self):
+        """Make every committed change visible to readers with one reference swap"""
+        self._snapshot = CollectionSnapshot(
+            rows=len(self), segments=tuple(self._segments), codes=tuple(self._codes),
+            tail=self._tail.vectors, dead=self._dead, dead_rows=self._dead_rows(),
+            quantization=self.quantization, index=self.index, key=self.key
+        )
+
+    def _index_rows(self, index, start: int, stop: int, batch: int = 65536):
+        for lo in range(start, stop, batch):
+            hi = min(stop, lo + batch)
+            index.add(self.take(np.arange(lo, hi)), lo)
+
+    def _build_index(self):
+        n = len(self)
+        index = create_index(self.dim, n, self.ann_backend)
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(n, min(n, max(20000, 40 * getattr(index, 'nlist', 0))), replace=False))
+        index.train(self.take(sample_rows))
+        self._index_rows(index, 0, n)
+        self.index = index
+        self._save_index()
+        logger.info(f"MemoryStore: Built {index.kind} index for '{self.name}' ({n} rows)")
+
+    def _save_index(self):
+        if self.index is not None and self.index.ntotal != self._index_saved:
+            self.index.save(index_path(self.dir, self.ann_backend))
+            self._index_saved = self.index.ntotal
+
+    def contains_document(self, text: str) -> bool:
+        return self.store._contains_document(self.key, text)
+
+    def similarities(self, query: np.ndarray) -> np.ndarray:
+        """Dot product of a normalized query against every row (one score per row)"""
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        parts = self._snapshot.parts
+        if not parts:
+            return np.empty(0, dtype=np.float32)
+        return np.concatenate([part @ query for part, _ in parts])
+
+    def approximate_similarities(self, query: np.ndarray) -> np.ndarray:
+        """similarities() computed on the quantized codes of sealed segments (the tail is exact)"""
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        scores = [code_scores(codes[0], codes[1], query) if codes else part @ query
+                  for part, codes in self._snapshot.parts]
+        return np.concatenate(scores) if scores else np.empty(0, dtype=np.float32)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """All embeddings as one in-memory array (copies; prefer similarities())"""
+        parts = [np.asarray(part) for part, _ in self._snapshot.parts if len(part)]
+        return np.concatenate(parts) if parts else np.empty((0, self.dim or 0), dtype=np.float32)
+
+    # ── Writes ──────────────────────────────────────────────────────────────────
+
+    def append(self, metadata: Dict[str, Any], vector) -> int:
+        return self.extend([metadata], np.asarray(vector).reshape(1, -1)).start
+
+    def extend(self, metadatas: List[Dict[str, Any]], vectors, manifest: Optional[ManifestUpdate] = None) -> range:
+        """
+        Append rows: vectors are normalized and written to the tail first, then the
+        metadata is committed. A crash in between leaves orphan vectors that are
+        dropped on the next load. `manifest` is committed in the same transaction
+        as the metadata.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(metadatas) != len(vectors):
+            raise ValueError("metadata and vectors must have the same length")
+        if not metadatas:
+            if manifest:
+                self.commit_manifest(manifest)
+            return range(len(self), len(self))
+
+        with self.store.lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._tail = EmbeddingStore(dim=self.dim)
+                self.store.save_manifest()
+            start = len(self)
+            rows = self._tail.extend(vectors)
+            if self._tail_fh is None:
+                self._tail_fh = open(self.tail_path, 'ab')
+            self._tail_fh.write(self._tail.vectors[rows.start:rows.stop].tobytes())
+            self._tail_fh.flush()
+            self.store._insert(self.key, start, metadatas, manifest)
+            if manifest:
+                self._bury(manifest.tombstones)
+            # Rows become visible only now, with their metadata committed
+            self._publish()
+            self.store.generation += 1
+
+            if self.index is not None:
+                self.index.add(self._tail.vectors[rows.start:rows.stop], start)
+                if self.index.ntotal - self._index_saved >= INDEX_SAVE_EVERY:
+                    self._save_index()
+            elif len(self) >= ANN_THRESHOLD:
+                # Readers keep scanning exactly until the finished index is published
+                self._build_index()
+                self._publish()
+
+            if len(self._tail) >= SEGMENT_ROWS:
+                self._seal()
+            return range(start, start + len(metadatas))
+
+    def commit_manifest(self, manifest: ManifestUpdate):
+        """Manifest changes (e.g. tombstones of a shrunk or deleted file) without new rows"""
+        with self.store.lock:
+            self.store._apply_manifest(self.key, manifest)
+            self.store.db.commit()
+            self._bury(manifest.tombstones)
+            self._publish()
+            self.store.generation += 1
+
+    def _bury(self, rows: List[int]):
+        if rows:
+            self._dead = self._dead | frozenset(rows)  # Copy-on-write: snapshots keep the old set
+            self._dead_array = None
+
+    def _seal(self):
+        """Move the tail into an immutable .npy segment"""
+        name = f"seg_{self.next_segment:06d}.npy"
+        tail = self._tail.vectors
+        atomic_write(os.path.join(self.dir, name), lambda f: np.save(f, tail))
+
+        old_tail = self.tail_path
+        if self._tail_fh:
+            self._tail_fh.close()
+            self._tail_fh = None
+        self.segment_files.append({'file': name, 'rows': len(tail)})
+        self.next_segment += 1
+        self._segments.append(np.load(os.path.join(self.dir, name), mmap_mode='r'))
+        self._codes.append(self._load_codes(name))
+        self._sealed_rows += len(tail)
+        self._tail = EmbeddingStore(dim=self.dim)
+        self._publish()
+        # The manifest switch is the commit point; the old tail is garbage afterwards
+        self.store.save_manifest()
+        _remove_quietly(old_tail)
+
+        if len(self.segment_files) > MAX_SEGMENTS:
+            self.compact()
+
+    def compact(self):
+        """Merge all sealed segments into one (streamed through a memmap, not loaded in RAM)"""
+        with self.store.lock:
+            if len(self.segment_files) < 2:
+                return
+            name = f"seg_{self.next_segment:06d}.npy"
+            path = self._write_segment(name, self._sealed_rows, self._segments)
+
+            old_files = [s['file'] for s in self.segment_files]
+            old_codes = [p for old in old_files for p in self._code_paths(old) if p]
+            self.segment_files = [{'file': name, 'rows': self._sealed_rows}]
+            self.next_segment += 1
+            self._segments = [np.load(path, mmap_mode='r')]
+            self._codes = [self._load_codes(name)]
+            self._publish()
+            self.store.save_manifest()
+            for old in old_files:
+                _remove_quietly(os.path.join(self.dir, old))
+            for old in old_codes:
+                _remove_quietly(old)
+            logger.info(f"MemoryStore: Compacted {len(old_files)} segments of '{self.name}'")
+
+    def _write_segment(self, name: str, rows: int, blocks: Iterable[np.ndarray]) -> str:
+        """Stream blocks of vectors into a new .npy segment through a memmap"""
+        path = os.path.join(self.dir, name)
+        tmp_path = path + ".tmp"
+        out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(rows, self.dim))
+        offset = 0
+        for block in blocks:
+            out[offset:offset + len(block)] = block
+            offset += len(block)
+        out.flush()
+        del out
+        with open(tmp_path, 'rb+') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return path
+
+    def vacuum(self) -> int:
+        """
+        Rewrite the collection without its tombstoned rows; the others are renumbered
+        in order. Live vectors are streamed into one new segment and their metadata,
+        keyword terms and file manifest are copied under a new key; the manifest
+        switch commits both. Snapshots taken before keep their segments and key
+        until the next vacuum (or start). Returns the number of rows removed.
+        """
+        with self.store.lock:
+            dead = self._dead_rows()
+            if not len(dead):
+                return 0
+            for retired in self._retired:
+                self.store._drop_key(retired)
+            self._retired = []
+
+            live = np.setdiff1d(np.arange(len(self), dtype=np.int64), dead, assume_unique=True)
+            epoch = self.epoch + 1
+            key = f"{self.name}__{epoch}"
+            self.store._drop_key(key)  # Left behind by a vacuum interrupted before its switch
+            self.store._open_lexical(key)
+            self.store._copy_rows(self.key, key, live)
+
+            name = f"seg_{self.next_segment:06d}.npy"
+            blocks = (self.take(live[lo:lo + SEARCH_BLOCK]) for lo in range(0, len(live), SEARCH_BLOCK))
+            path = self._write_segment(name, len(live), blocks) if len(live) else None
+            if self.index is not None:
+                # Its labels are the old row numbers: removed before the switch so it is never reloaded
+                _remove_quietly(index_path(self.dir, self.ann_backend))
+                self.index = None
+                self._index_saved = 0
+
+            old_files = [s['file'] for s in self.segment_files]
+            old_codes = [p for old in old_files for p in self._code_paths(old) if p]
+            old_tail = self.tail_path
+            if self._tail_fh:
+                self._tail_fh.close()
+                self._tail_fh = None
+            self.segment_files = [{'file': name, 'rows': len(live)}] if path else []
+            self.next_segment += 1
+            self._segments = [np.load(path, mmap_mode='r')] if path else []
+            self._codes = [self._load_codes(name)] if path else []
+            self._sealed_rows = len(live)
+            self._tail = EmbeddingStore(dim=self.dim)
+            self._dead = frozenset()
+            self._dead_array = None
+            self._retired = [self.key]
+            self.key, self.epoch = key, epoch
+            self._publish()
+            # The manifest switch is the commit point
+            self.store.save_manifest()
+            self.store.generation += 1
+            for old in old_files:
+                _remove_quietly(os.path.join(self.dir, old))
+            for old in old_codes + [old_tail]:
+                _remove_quietly(old)
+
+            if len(self) >= ANN_THRESHOLD:
+                self._build_index()
+                self._publish()
+            logger.info(f"MemoryStore: Vacuumed '{self.name}': {len(dead)} rows removed, {len(live)} kept")
+            return len(dead)
+
+    def close(self):
+        with self.store.lock:
+            self._save_index()
+            if self._tail_fh:
+                self._tail_fh.flush()
+                os.fsync(self._tail_fh.fileno())
+                self._tail_fh.close()
+                self._tail_fh = None
+
+class MemoryStore:
+    """
+    Append-only persistence for MemoryService.
+    A JSON manifest (rewritten atomically) lists each collection's segments;
+    metadata and knowledge-graph relations live in SQLite (WAL). Startup opens
+    the manifest, mmaps the segments and reads at most one tail, so it does not
+    grow with history; writes touch only the bytes they add.
+    Use MemoryStore.open() so every MemoryService on the same path shares one store.
+    """
+    _instances: Dict[str, "MemoryStore"] = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, root: str) -> "MemoryStore":
+        key = os.path.abspath(root)
+        with cls._instances_lock:
+            store = cls._instances.get(key)
+            if store is None or store.closed:
+                store = cls._instances[key] = cls(root)
+            return store
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.lock = threading.RLock()
+        self.closed = False
+        self.manifest_path = os.path.join(root, "manifest.json")
+
+        self.db_path = os.path.join(root, "memory.sqlite3")
+        self.db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS items (
+                collection TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                document TEXT,
+                meta TEXT NOT NULL,
+                PRIMARY KEY (collection, row)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS items_document ON items (collection, document);
+            CREATE TABLE IF NOT EXISTS files (
+                collection TEXT NOT NULL,
+                path TEXT NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                chunks INTEGER NOT NULL,
+                done INTEGER NOT NULL,
+                hash TEXT,
+                PRIMARY KEY (collection, path)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS chunks (
+                collection TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                PRIMARY KEY (collection, row)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS chunks_path ON chunks (collection, path);
+            CREATE INDEX IF NOT EXISTS chunks_hash ON chunks (collection, hash);
+            CREATE TABLE IF NOT EXISTS tombstones (
+                collection TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                PRIMARY KEY (collection, row)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS relations (
+                entity TEXT NOT NULL,
+                relation TEXT NOT NULL,
+                target TEXT NOT NULL,
+                PRIMARY KEY (entity, relation, target)
+            ) WITHOUT ROWID;
+        """)
+        self.db.commit()
+
+        self.existed = os.path.exists(self.manifest_path)
+        manifest = {'version': MANIFEST_VERSION, 'collections': {}}
+        if self.existed:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        self._states = manifest.get('collections', {})
+        self.collections: Dict[str, Collection] = {}
+        self._lexical: Dict[str, LexicalIndex] = {}
+        self.generation = 0  # Bumped after every committed write (invalidates cached retrievals)
+        # Readers use their own connection per thread: WAL lets them run while a write is in progress
+        self._readers = threading.local()
+        self._reader_dbs: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        if not FTS5_AVAILABLE:
+            logger.warning("MemoryStore: SQLite has no FTS5; retrieval falls back to vectors only")
+
+    def collection(self, name: str, quantization: Optional[str] = None) -> Collection:
+        """Open (or create) a collection; `quantization` switches it to int8 / float16 codes"""
+        with self.lock:
+            if name not in self.collections:
+                self.collections[name] = Collection(self, name, self._states.get(name, {}))
+                self.save_manifest()
+            collection = self.collections[name]
+            if quantization:
+                collection.set_quantization(quantization)
+            return collection
+
+    def save_manifest(self):
+        with self.lock:
+            for name, collection in self.collections.items():
+                self._states[name] = collection.state()
+            data = json.dumps({'version': MANIFEST_VERSION, 'collections': self._states}, indent=1)
+            atomic_write(self.manifest_path, lambda f: f.write(data.encode('utf-8')))
+
+    def compact(self):
+        for collection in list(self.collections.values()):
+            collection.compact()
+
+    def close(self):
+        with self.lock:
+            for collection in self.collections.values():
+                collection.close()
+            self.db.close()
+            with self._readers_lock:
+                for db in self._reader_dbs:
+                    db.close()
+                self._reader_dbs.clear()
+            self.closed = True
+
+    def _reader(self) -> sqlite3.Connection:
+        """This thread's read-only connection (sees committed data, never waits on the store lock)"""
+        db = getattr(self._readers, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, check_same_thread=False)
+            db.execute("PRAGMA query_only=ON")
+            self._readers.db = db
+            with self._readers_lock:
+                self._reader_dbs.append(db)
+        return db
+
+    # ── Knowledge graph ─────────────────────────────────────────────────────────
+
+    def add_relation(self, entity: str, relation: str, target: str) -> bool:
+        """Returns False if the relation already existed"""
+        with self.lock:
+            cursor = self.db.execute("INSERT OR IGNORE INTO relations VALUES (?, ?, ?)", (entity, relation, target))
+            self.db.commit()
+            return cursor.rowcount > 0
+
+    def load_relations(self) -> Dict[str, Dict[str, List[str]]]:
+        graph: Dict[str, Dict[str, List[str]]] = {}
+        with self.lock:
+            for entity, relation, target in self.db.execute("SELECT entity, relation, target FROM relations"):
+                graph.setdefault(entity, {}).setdefault(relation, []).append(target)
+        return graph
+
+    # ── File manifest ───────────────────────────────────────────────────────────
+
+    def file_manifest(self, collection: str) -> Dict[str, Dict[str, Any]]:
+        """{path: {mtime_ns, size, chunks, done, hash}} recorded by the ingestion pipeline"""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT path, mtime_ns, size, chunks, done, hash FROM files WHERE collection = ?", (collection,)
+            ).fetchall()
+        return {path: {'mtime_ns': mtime_ns, 'size': size, 'chunks': chunks, 'done': bool(done), 'hash': content_hash}
+                for path, mtime_ns, size, chunks, done, content_hash in rows}
+
+    def live_chunks(self, collection: str, path: str) -> Dict[str, List[int]]:
+        """{chunk hash: [rows]} of the current (not tombstoned) rows of a file"""
+        found: Dict[str, List[int]] = {}
+        with self.lock:
+            for row, chunk_hash in self.db.execute(
+                "SELECT c.row, c.hash FROM chunks c LEFT JOIN tombstones t "
+                "ON t.collection = c.collection AND t.row = c.row "
+                "WHERE c.collection = ? AND c.path = ? AND t.row IS NULL ORDER BY c.row", (collection, path)
+            ):
+                found.setdefault(chunk_hash, []).append(row)
+        return found
+
+    def cached_rows(self, collection: str, hashes: List[str]) -> Dict[str, int]:
+        """Embedding cache: a row (live or tombstoned) already holding each chunk hash's vector"""
+        found = {}
+        with self.lock:
+            for i in range(0, len(hashes), 500):
+                batch = hashes[i:i + 500]
+                query = f"SELECT hash, MIN(row) FROM chunks WHERE collection = ? AND hash IN ({','.join('?' * len(batch))}) GROUP BY hash"
+                found.update(self.db.execute(query, (collection, *batch)).fetchall())
+        return found
+
+    def _tombstones(self, collection: str) -> set:
+        with self.lock:
+            return {row for (row,) in self.db.execute("SELECT row FROM tombstones WHERE collection = ?", (collection,))}
+
+    def _apply_manifest(self, collection: str, manifest: Optional[ManifestUpdate]):
+        if not manifest:
+            return
+        self.db.executemany(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(collection, path, mtime_ns, size, chunks, int(done), content_hash)
+             for path, mtime_ns, size, chunks, done, content_hash in manifest.files]
+        )
+        self.db.executemany("INSERT OR IGNORE INTO tombstones VALUES (?, ?)",
+                            [(collection, int(row)) for row in manifest.tombstones])
+        self.db.executemany("DELETE FROM files WHERE collection = ? AND path = ?",
+                            [(collection, path) for path in manifest.removed])
+
+    # ── Lexical index ───────────────────────────────────────────────────────────
+
+    def _open_lexical(self, collection: str):
+        if FTS5_AVAILABLE and collection not in self._lexical:
+            with self.lock:
+                self._lexical[collection] = LexicalIndex(self.db, collection)
+                self.db.commit()
+
+    def _drop_lexical(self, collection: str):
+        if FTS5_AVAILABLE:
+            with self.lock:
+                self._lexical.pop(collection, None)
+                LexicalIndex.drop(self.db, collection)
+                self.db.commit()
+
+    def _catch_up_lexical(self, collection: str, batch: int = 2000):
+        """Index rows stored before the lexical index existed (one-time, on upgrade)"""
+        lexical = self._lexical.get(collection)
+        if lexical is None:
+            return
+        with self.lock:
+            start, added = lexical.max_row() + 1, 0
+            while True:
+                found = self.db.execute(
+                    "SELECT row, meta FROM items WHERE collection = ? AND row >= ? ORDER BY row LIMIT ?",
+                    (collection, start, batch)
+                ).fetchall()
+                if not found:
+                    break
+                for row, meta in found:
+                    lexical.add(row, [json.loads(meta)])
+                self.db.commit()
+                added += len(found)
+                start = found[-1][0] + 1
+        if added:
+            logger.info(f"MemoryStore: Indexed {added} existing rows of '{collection}' for keyword search")
+
+    def _lexical_search(self, collection: str, text: str, k: int):
+        lexical = self._lexical.get(collection)
+        if lexical is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return lexical.search(text, k, self._reader())
+
+    # ── Metadata (called with the lock held) ────────────────────────────────────
+
+    def _copy_rows(self, source: str, target: str, rows: np.ndarray):
+        """Copy `rows` (sorted) of key `source` to key `target` as rows 0, 1, ... (vacuum)"""
+        self.db.execute("CREATE TEMP TABLE IF NOT EXISTS remap (old INTEGER PRIMARY KEY, new INTEGER NOT NULL)")
+        self.db.execute("DELETE FROM remap")
+        self.db.executemany("INSERT INTO remap VALUES (?, ?)", ((old, new) for new, old in enumerate(rows.tolist())))
+        self.db.execute("INSERT INTO items SELECT ?, r.new, i.document, i.meta FROM items i "
+                        "JOIN remap r ON i.row = r.old WHERE i.collection = ?", (target, source))
+        self.db.execute("INSERT INTO chunks SELECT ?, r.new, c.path, c.hash FROM chunks c "
+                        "JOIN remap r ON c.row = r.old WHERE c.collection = ?", (target, source))
+        self.db.execute("INSERT INTO files SELECT ?, path, mtime_ns, size, chunks, done, hash FROM files "
+                        "WHERE collection = ?", (target, source))
+        if source in self._lexical and target in self._lexical:
+            self._lexical[target].copy_from(self._lexical[source], "remap")
+        self.db.execute("DELETE FROM remap")
+        self.db.commit()
+
+    def _drop_key(self, key: str):
+        """Delete everything stored under a collection key (retired by a vacuum)"""
+        with self.lock:
+            for table in ("items", "chunks", "files", "tombstones"):
+                self.db.execute(f"DELETE FROM {table} WHERE collection = ?", (key,))
+            self._lexical.pop(key, None)
+            if FTS5_AVAILABLE:
+                LexicalIndex.drop(self.db, key)
+            self.db.commit()
+
+    def _insert(self, collection: str, start: int, metadatas: List[Dict[str, Any]],
+                manifest: Optional[ManifestUpdate] = None):
+        self.db.executemany(
+            "INSERT OR REPLACE INTO items (collection, row, document, meta) VALUES (?, ?, ?, ?)",
+            [(collection, start + i, m.get('document'), json.dumps(m, ensure_ascii=False, default=str))
+             for i, m in enumerate(metadatas)]
+        )
+        # Ingested chunks carry their file and content hash (file manifest + embedding cache)
+        self.db.executemany(
+            "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?)",
+            [(collection, start + i, m['path'], m['hash']) for i, m in enumerate(metadatas) if 'hash' in m and 'path' in m]
+        )
+        if collection in self._lexical:
+            self._lexical[collection].add(start, metadatas)
+        self._apply_manifest(collection, manifest)
+        self.db.commit()
+
+    def _fetch(self, collection: str, rows: List[int]) -> Dict[int, Dict[str, Any]]:
+        found = {}
+        db = self._reader()
+        for i in range(0, len(rows), 500):
+            batch = rows[i:i + 500]
+            query = f"SELECT row, meta FROM items WHERE collection = ? AND row IN ({','.join('?' * len(batch))})"
+            for row, meta in db.execute(query, (collection, *batch)):
+                found[row] = json.loads(meta)
+        return found
+
+    def _contains_document(self, collection: str, text: str) -> bool:
+        return self._reader().execute(
+            "SELECT 1 FROM items WHERE collection = ? AND document = ? LIMIT 1", (collection, text)
+        ).fetchone() is not None
+
+    def _max_row(self, collection: str) -> int:
+        value = self.db.execute("SELECT MAX(row) FROM items WHERE collection = ?", (collection,)).fetchone()[0]
+        return -1 if value is None else value
+
+    def _delete_rows_from(self, collection: str, row: int):
+        self.db.execute("DELETE FROM items WHERE collection = ? AND row >= ?", (collection, row))
+        self.db.execute("DELETE FROM chunks WHERE collection = ? AND row >= ?", (collection, row))
+        self.db.execute("DELETE FROM tombstones WHERE collection = ? AND row >= ?", (collection, row))
+        if collection in self._lexical:
+            self._lexical[collection].delete_from(row)
+        self.db.commit()
@@ -9,6 +9,7 @@ import librosa
 from typing import Optional
 from PyQt6.QtCore import QThread, pyqtSignal
 from services.voice_processor_v2 import VoiceProcessorV2
+from services.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +36,7 @@ class OptimizedVoiceThread(QThread):
         self.is_paused = False # Prevents hearing its own TTS output
         
         self.input_device = self._get_best_input_device()
+        self.turn_id = None # Trace turn of the utterance being captured
 
     def _get_best_input_device(self) -> Optional[int]:
         """Finds the best microphone, avoiding Monitors/TVs/HDMI."""
@@ -112,6 +114,7 @@ class OptimizedVoiceThread(QThread):
                 print(f"HUD: OptimizedVoiceThread: sd.InputStream active at {self.native_sr}Hz.")
                 last_speech_time = None
                 is_speaking = False
+                speech_start_pc = last_speech_pc = 0.0 # perf_counter stamps for tracing
                 SILENCE_TIMEOUT = 0.8  # seconds of silence to trigger transcription
 
                 MIN_AUDIO_S = 0.1     # Minimum audio length to bother transcribing
@@ -143,8 +146,12 @@ class OptimizedVoiceThread(QThread):
                                 continue # Still skip processing this chunk to avoid echo-command
                                 
                             last_speech_time = time.time()
+                            last_speech_pc = time.perf_counter()
                             if not is_speaking:
                                 is_speaking = True
+                                # A new turn starts at speech onset
+                                self.turn_id = tracer.start_turn("voice")
+                                speech_start_pc = last_speech_pc
                                 current_speech_samples = 0
                                 print(f"HUD: SPEECH DETECTED (Pre-buffer: {len(self.pre_speech_buffer)} frames)")
                                 self.listening_state.emit(True)
@@ -167,6 +174,8 @@ class OptimizedVoiceThread(QThread):
                         if last_speech_time and time.time() - last_speech_time >= SILENCE_TIMEOUT:
                             is_speaking = False
                             print(f"HUD: SILENCE DETECTED (after {time.time()-last_speech_time:.1f}s of silence)")
+                            tracer.record("voice.speech", speech_start_pc, last_speech_pc, self.turn_id)
+                            tracer.record("voice.silence_wait", last_speech_pc, time.perf_counter(), self.turn_id)
                             self.listening_state.emit(False)
                             last_speech_time = None
                             
@@ -176,12 +185,14 @@ class OptimizedVoiceThread(QThread):
                             
                             if audio_secs >= MIN_AUDIO_S:
                                 # Process STT in background to not block the audio loop
-                                def _transcribe():
+                                def _transcribe(turn_id=self.turn_id):
                                     try:
-                                        final_text = self.processor.get_final_text()
+                                        with tracer.span("stt.final", turn_id):
+                                            final_text = self.processor.get_final_text()
                                         print(f"HUD: [DEBUG] STT final_text result: '{final_text}'")
                                         if final_text:
-                                            self._process_recognized_text(final_text)
+                                            with tracer.use_turn(turn_id):
+                                                self._process_recognized_text(final_text)
                                     except Exception as e:
                                         import traceback
                                         print(f"HUD: [ERROR] Background STT transcription failed: {e}")
@@ -0,0 +1,169 @@
+import re
+import time
+import uuid
+import logging
+import threading
+import unicodedata
+from difflib import SequenceMatcher
+from dataclasses import dataclass, field
+from typing import Optional, Callable, List, Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_NUMBERS = re.compile(r"\d+")
+# Normalized (accent-free) words that flip a command's meaning
+NEGATIONS = frozenset({"nao", "nem", "nunca", "jamais", "sem", "not", "no", "dont", "never"})
+
+def normalize_command(text: str) -> str:
+    """Case-fold, drop accents and punctuation and collapse whitespace"""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(_PUNCTUATION.sub(" ", text).split())
+
+@dataclass
+class AdmissionTicket:
+    """One unit of work shared by every requester of the same command"""
+    id: str
+    text: str
+    normalized: str
+    created_at: float
+    sources: List[str] = field(default_factory=list)
+    callbacks: List[Callable[[Any], None]] = field(default_factory=list)
+    cancel_callbacks: List[Callable[[str], None]] = field(default_factory=list)
+    done: bool = False
+    finished_at: Optional[float] = None
+    result: Any = None
+
+@dataclass
+class Admission:
+    ticket: AdmissionTicket
+    merged: bool  # True when the command was folded into an existing ticket
+
+class RequestAdmission:
+    """
+    De-duplicates commands arriving from voice, manual input, Telegram and workflow replay.
+    A command identical or near-identical to one that is still in flight (or finished less
+    than `window` seconds ago) is merged into that ticket instead of being processed again;
+    its requester receives the shared result, or the reason when the ticket is cancelled.
+    Near-identical means the same words up to one misspelt word: numbers and negations
+    must match exactly, so "volume 20" / "volume 30" and "desligar o computador" /
+    "não desligar o computador" are never merged.
+    """
+    def __init__(self, window: float = 1.5, similarity: float = 0.9, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.similarity = similarity
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tickets: Dict[str, AdmissionTicket] = {}
+        self._counts = {'admitted': 0, 'merged_inflight': 0, 'dropped_recent': 0}
+        self._by_source: Dict[str, int] = {}
+
+    def _is_duplicate(self, normalized: str, ticket: AdmissionTicket) -> bool:
+        if normalized == ticket.normalized:
+            return True
+        if _NUMBERS.findall(normalized) != _NUMBERS.findall(ticket.normalized):
+            return False
+        words, other = normalized.split(), ticket.normalized.split()
+        if len(words) != len(other):
+            return False
+        edits = [(a, b) for a, b in zip(words, other) if a != b]
+        if len(edits) != 1:
+            return False
+        # A single recognition slip ("spotfy"), never a different or negating word
+        a, b = edits[0]
+        if a in NEGATIONS or b in NEGATIONS:
+            return False
+        return SequenceMatcher(None, a, b).ratio() >= self.similarity
+
+    def _prune(self, now: float):
+        expired = [tid for tid, t in self._tickets.items() if t.done and now - t.finished_at > self.window]
+        for tid in expired:
+            del self._tickets[tid]
+
+    def admit(self, text: str, source: str = "voice",
+              on_result: Optional[Callable[[Any], None]] = None,
+              on_cancel: Optional[Callable[[str], None]] = None) -> Admission:
+        """
+        Register a request. Returns the ticket to process, or the one it was merged into.
+        `on_cancel` is called with the reason if the ticket ends without a result.
+        """
+        normalized = normalize_command(text)
+        now = self._clock()
+        replay: Optional[Tuple[Callable, Any]] = None
+
+        with self._lock:
+            self._prune(now)
+            match = next((t for t in self._tickets.values() if self._is_duplicate(normalized, t)), None)
+
+            if match is None:
+                ticket = AdmissionTicket(id=uuid.uuid4().hex[:12], text=text, normalized=normalized,
+                                         created_at=now, sources=[source])
+                if on_result:
+                    ticket.callbacks.append(on_result)
+                if on_cancel:
+                    ticket.cancel_callbacks.append(on_cancel)
+                self._tickets[ticket.id] = ticket
+                self._counts['admitted'] += 1
+                return Admission(ticket, merged=False)
+
+            match.sources.append(source)
+            self._by_source[source] = self._by_source.get(source, 0) + 1
+            if match.done:
+                self._counts['dropped_recent'] += 1
+                if on_result:
+                    replay = (on_result, match.result)
+            else:
+                self._counts['merged_inflight'] += 1
+                if on_result:
+                    match.callbacks.append(on_result)
+                if on_cancel:
+                    match.cancel_callbacks.append(on_cancel)
+
+        logger.info(f"RequestAdmission: '{text}' from {source} merged into ticket {match.id} ('{match.text}')")
+        if replay:
+            self._deliver([replay[0]], replay[1])
+        return Admission(match, merged=True)
+
+    def complete(self, ticket: AdmissionTicket, result: Any = None, reason: Optional[str] = "cancelled"):
+        """
+        Finish a ticket and hand `result` to every merged requester.
+        Without a result (cancelled or failed) every requester's `on_cancel` gets `reason`
+        (reason=None: finished without an answer, nobody is told) and the ticket is
+        forgotten immediately so a repeat of the same command is processed again.
+        """
+        with self._lock:
+            if ticket.done:
+                return
+            ticket.done = True
+            ticket.finished_at = self._clock()
+            callbacks, ticket.callbacks = ticket.callbacks, []
+            cancel_callbacks, ticket.cancel_callbacks = ticket.cancel_callbacks, []
+            if result is None:
+                self._tickets.pop(ticket.id, None)
+            else:
+                ticket.result = result
+        if result is not None:
+            self._deliver(callbacks, result)
+        elif reason:
+            self._deliver(cancel_callbacks, reason)
+
+    @staticmethod
+    def _deliver(callbacks: List[Callable[[Any], None]], result: Any):
+        for callback in callbacks:
+            try:
+                callback(result)
+            except Exception as e:
+                logger.error(f"RequestAdmission: Result delivery failed: {e}")
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return sum(1 for t in self._tickets.values() if not t.done)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counts,
+                'dropped': self._counts['merged_inflight'] + self._counts['dropped_recent'],
+                'dropped_by_source': dict(self._by_source)
+            }
@@ -0,0 +1,306 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+import collections.abc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Dict, Any, List, Awaitable
+
+logger = logging.getLogger(__name__)
+
+# Name of the service that owns the currently running task (inherited by child tasks)
+_current_service: contextvars.ContextVar = contextvars.ContextVar("jarvis_service", default=None)
+# Runtime hosting that service, so code deep inside a service can reach its pools
+_current_runtime: contextvars.ContextVar = contextvars.ContextVar("jarvis_runtime", default=None)
+
+@dataclass
+class ServiceEntry:
+    """A coroutine service registered with the runtime"""
+    name: str
+    start: Callable[[], Awaitable]
+    stop: Optional[Callable] = None
+    health: Optional[Callable[[], Any]] = None
+    state: str = "registered"   # registered | running | finished | crashed | stopped
+    started_at: float = 0.0
+    cpu_seconds: float = 0.0    # time.thread_time spent stepping this service's tasks and pool jobs
+    pool_jobs: int = 0
+    last_error: Optional[str] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    # Charged from the loop thread and from pool threads at the same time
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def charge(self, seconds: float, pool_job: bool = False):
+        with self._lock:
+            self.cpu_seconds += seconds
+            if pool_job:
+                self.pool_jobs += 1
+
+    def usage(self):
+        """(cpu_seconds, pool_jobs) read together"""
+        with self._lock:
+            return self.cpu_seconds, self.pool_jobs
+
+class _AccountedCoroutine(collections.abc.Coroutine):
+    """
+    Coroutine proxy that charges the thread CPU time of every step to a service.
+    asyncio drives it through send()/throw() exactly like a native coroutine.
+    """
+    __slots__ = ("_coro", "_entry")
+
+    def __init__(self, coro, entry: ServiceEntry):
+        self._coro = coro
+        self._entry = entry
+
+    def send(self, value):
+        start = time.thread_time()
+        try:
+            return self._coro.send(value)
+        finally:
+            self._entry.charge(time.thread_time() - start)
+
+    def throw(self, typ, val=None, tb=None):
+        start = time.thread_time()
+        try:
+            if val is None and tb is None:
+                return self._coro.throw(typ)
+            return self._coro.throw(typ, val, tb)
+        finally:
+            self._entry.charge(time.thread_time() - start)
+
+    def close(self):
+        return self._coro.close()
+
+    def __await__(self):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.send(None)
+
+class ServiceRuntime:
+    """
+    Single background runtime for Jarvis services.
+    One asyncio loop hosts every registered service coroutine; CPU-heavy
+    background work goes to a bounded CPU pool and blocking calls (disk,
+    network, inference a user turn waits on, to_thread) to a separate I/O
+    pool, so services share awaitables and executors instead of each owning
+    a thread and event loop. Code running inside a service reaches the pools
+    through the module-level run_cpu()/run_io().
+    """
+    def __init__(self, cpu_workers: Optional[int] = None, io_workers: int = 8):
+        self.loop = asyncio.new_event_loop()
+        self.cpu_pool = ThreadPoolExecutor(
+            max_workers=cpu_workers or max(1, (os.cpu_count() or 2) // 2),
+            thread_name_prefix="jarvis-cpu"
+        )
+        self.io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="jarvis-io")
+        self.loop.set_default_executor(self.io_pool)
+        self.loop.set_task_factory(self._task_factory)
+
+        self.services: Dict[str, ServiceEntry] = {}
+        self._thread = None
+        self._running = False
+        self._stopping = False
+        self._shutdown_event = None
+
+    # ── Registration ────────────────────────────────────────────────────────────
+
+    def register(self, name: str, start: Callable[[], Awaitable],
+                 stop: Optional[Callable] = None, health: Optional[Callable[[], Any]] = None):
+        """
+        Register a service. `start` returns the service coroutine; `stop` (sync or async)
+        is called on shutdown before the task is cancelled; `health` returns a status value.
+        Services registered while the runtime is running are started immediately.
+        """
+        if name in self.services:
+            raise ValueError(f"Service '{name}' already registered")
+        entry = ServiceEntry(name=name, start=start, stop=stop, health=health)
+        self.services[name] = entry
+        if self._running:
+            self.loop.call_soon_threadsafe(self._start_service, entry)
+        return entry
+
+    def _start_service(self, entry: ServiceEntry):
+        context = contextvars.copy_context()
+        context.run(_current_service.set, entry.name)
+        context.run(_current_runtime.set, self)
+        try:
+            coro = context.run(entry.start)
+        except Exception as e:
+            entry.state = "crashed"
+            entry.last_error = str(e)
+            logger.error(f"ServiceRuntime: Service '{entry.name}' failed to start: {e}")
+            return
+
+        entry.state = "running"
+        entry.started_at = time.time()
+        entry.task = self.loop.create_task(
+            _AccountedCoroutine(coro, entry), name=f"service:{entry.name}", context=context
+        )
+        entry.task.add_done_callback(lambda task, e=entry: self._on_service_done(e, task))
+
+    def _on_service_done(self, entry: ServiceEntry, task: asyncio.Task):
+        if task.cancelled():
+            entry.state = "stopped"
+        elif task.exception():
+            entry.state = "crashed"
+            entry.last_error = str(task.exception())
+            logger.error(f"ServiceRuntime: Service '{entry.name}' crashed: {task.exception()}")
+        else:
+            entry.state = "finished"
+
+    def _task_factory(self, loop, coro, **kwargs):
+        """Child tasks created by a service are charged to that service"""
+        name = _current_service.get()
+        entry = self.services.get(name) if name else None
+        if entry and not isinstance(coro, _AccountedCoroutine):
+            coro = _AccountedCoroutine(coro, entry)
+        return asyncio.Task(coro, loop=loop, **kwargs)
+
+    # ── Lifecycle ───────────────────────────────────────────────────────────────
+
+    def run(self):
+        """Run the loop in the calling thread until stop() is called"""
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._main())
+        finally:
+            self._close()
+
+    def start(self, name: str = "jarvis-runtime"):
+        """Run the loop in a dedicated thread"""
+        self._thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    async def _main(self):
+        self._shutdown_event = asyncio.Event()
+        self._running = True
+        for entry in list(self.services.values()):
+            if entry.state == "registered":
+                self._start_service(entry)
+        logger.info(f"ServiceRuntime: Started {len(self.services)} services on one loop")
+
+        await self._shutdown_event.wait()
+        await self._stop_services()
+
+    async def _stop_services(self, timeout: float = 5.0):
+        self._stopping = True
+        for entry in self.services.values():
+            if entry.stop:
+                try:
+                    result = entry.stop()
+                    if asyncio.iscoroutine(result):
+                        await asyncio.wait_for(result, timeout)
+                except Exception as e:
+                    logger.error(f"ServiceRuntime: Stop hook of '{entry.name}' failed: {e}")
+
+        tasks = [t for t in asyncio.all_tasks(self.loop) if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+    def _close(self):
+        self._running = False
+        self.cpu_pool.shutdown(wait=False, cancel_futures=True)
+        self.io_pool.shutdown(wait=False, cancel_futures=True)
+        try:
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        except Exception:
+            pass
+        self.loop.close()
+        logger.info(f"ServiceRuntime: Stopped. CPU report: {self.cpu_report()}")
+
+    def stop(self, wait: bool = True, timeout: float = 10.0):
+        """Thread-safe shutdown request: run stop hooks, cancel tasks, close the pools"""
+        if self._running and self._shutdown_event and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._shutdown_event.set)
+        if wait and self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._running and not self._stopping
+
+    # ── Work submission ─────────────────────────────────────────────────────────
+
+    def submit(self, coro):
+        """Schedule a coroutine from any thread. Returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def run_cpu(self, func: Callable, *args):
+        """Run CPU-bound work on the bounded CPU pool, charged to the calling service"""
+        return await self._run_in(self.cpu_pool, func, *args)
+
+    async def run_io(self, func: Callable, *args):
+        """Run a blocking call on the I/O pool, charged to the calling service"""
+        return await self._run_in(self.io_pool, func, *args)
+
+    async def _run_in(self, pool, func, *args):
+        name = _current_service.get()
+        entry = self.services.get(name) if name else None
+
+        def job():
+            start = time.thread_time()
+            try:
+                return func(*args)
+            finally:
+                if entry:
+                    entry.charge(time.thread_time() - start, pool_job=True)
+
+        # Like to_thread, the job sees the caller's context (trace turn, service)
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(pool, context.run, job)
+
+    # ── Reporting ───────────────────────────────────────────────────────────────
+
+    def health(self) -> Dict[str, Dict[str, Any]]:
+        report = {}
+        for entry in self.services.values():
+            status = {'state': entry.state, 'uptime_s': round(time.time() - entry.started_at, 1) if entry.started_at else 0.0}
+            if entry.last_error:
+                status['error'] = entry.last_error
+            if entry.health:
+                try:
+                    status['health'] = entry.health()
+                except Exception as e:
+                    status['health'] = f"error: {e}"
+            report[entry.name] = status
+        return report
+
+    def cpu_report(self) -> List[Dict[str, Any]]:
+        """Per-service CPU seconds, highest first"""
+        rows = []
+        for entry in list(self.services.values()):
+            uptime = time.time() - entry.started_at if entry.started_at else 0.0
+            cpu_seconds, pool_jobs = entry.usage()
+            rows.append({
+                'service': entry.name,
+                'cpu_s': round(cpu_seconds, 3),
+                'cpu_pct': round(100 * cpu_seconds / uptime, 2) if uptime > 0 else 0.0,
+                'pool_jobs': pool_jobs,
+                'state': entry.state
+            })
+        return sorted(rows, key=lambda r: r['cpu_s'], reverse=True)
+
+
+async def run_cpu(func: Callable, *args):
+    """CPU-bound background work on the current runtime's CPU pool (a worker thread outside one)"""
+    runtime = _current_runtime.get()
+    if runtime is None:
+        return await asyncio.to_thread(func, *args)
+    return await runtime.run_cpu(func, *args)
+
+
+async def run_io(func: Callable, *args):
+    """Blocking call on the current runtime's I/O pool (a worker thread outside one)"""
+    runtime = _current_runtime.get()
+    if runtime is None:
+        return await asyncio.to_thread(func, *args)
+    return await runtime.run_io(func, *args)
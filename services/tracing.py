@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import uuid
+import atexit
+import logging
+import threading
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+# Turn being processed by the current task/thread (copied into asyncio.to_thread workers)
+_current_turn: contextvars.ContextVar = contextvars.ContextVar("jarvis_turn", default=None)
+
+class _NullSpan:
+    """Returned when tracing is disabled: entering/exiting costs two method calls"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class Span:
+    """Timed stage of a turn. Use as a context manager"""
+    __slots__ = ("tracer", "name", "turn_id", "attrs", "start")
+
+    def __init__(self, tracer, name: str, turn_id: Optional[str], attrs: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.turn_id = turn_id
+        self.attrs = attrs
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer.record(self.name, self.start, time.perf_counter(), self.turn_id, **self.attrs)
+        return False
+
+    def set(self, **attrs):
+        """Attach attributes discovered while the span is open (e.g. token counts)"""
+        self.attrs.update(attrs)
+
+class Tracer:
+    """
+    Per-turn latency tracing.
+    A turn id is created when a request starts (speech onset, manual input,
+    Telegram) and handed through the voice thread, AIService, NLPProcessor,
+    ActionController and TTSService; every stage records a span against it.
+    Spans are kept in a ring buffer, optionally streamed to JSONL, exported
+    in Chrome trace_event format (chrome://tracing, Perfetto) and summarised
+    as rolling p50/p95 per stage.
+
+    Enabled with JARVIS_TRACE=1. When disabled every call returns immediately.
+    """
+    def __init__(self, enabled: Optional[bool] = None, max_spans: int = 20000,
+                 window: int = 200, output_path: Optional[str] = None):
+        if enabled is None:
+            enabled = os.getenv("JARVIS_TRACE", "").lower() in ("1", "true", "yes", "on")
+        self.enabled = enabled
+        self.window = window
+        self.output_path = output_path or os.getenv("JARVIS_TRACE_FILE")
+
+        self._spans = deque(maxlen=max_spans)
+        self._stage_windows: Dict[str, deque] = {}
+        self._turns = OrderedDict()  # turn_id -> {'start': perf, 'source': str}
+        self._lock = threading.Lock()
+        self._active_turn = None
+        self._pid = os.getpid()
+        # perf_counter is monotonic and shared across threads; this maps it to wall time
+        self._epoch_offset = time.time() - time.perf_counter()
+
+        if self.enabled:
+            logger.info("Tracer: Per-turn latency tracing enabled")
+
+    # ── Turns ───────────────────────────────────────────────────────────────────
+
+    def start_turn(self, source: str = "voice") -> Optional[str]:
+        """Open a new turn and make it the active one. Returns None when disabled"""
+        if not self.enabled:
+            return None
+        turn_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._turns[turn_id] = {'start': time.perf_counter(), 'source': source}
+            while len(self._turns) > 256:  # turns that never finished (e.g. no speech output)
+                self._turns.popitem(last=False)
+            self._active_turn = turn_id
+        return turn_id
+
+    @property
+    def active_turn(self) -> Optional[str]:
+        """Most recently started turn - used where a Qt signal cannot carry the id"""
+        return self._active_turn
+
+    def finish_turn(self, turn_id: Optional[str], **attrs):
+        """Record the end-to-end 'turn' span (start_turn -> now)"""
+        if not self.enabled or not turn_id:
+            return
+        with self._lock:
+            turn = self._turns.pop(turn_id, None)
+        if turn:
+            self.record("turn", turn['start'], time.perf_counter(), turn_id, source=turn['source'], **attrs)
+
+    @contextmanager
+    def use_turn(self, turn_id: Optional[str]):
+        """Make `turn_id` the implicit turn for spans opened in this context"""
+        token = _current_turn.set(turn_id)
+        try:
+            yield turn_id
+        finally:
+            _current_turn.reset(token)
+
+    def current_turn(self) -> Optional[str]:
+        return _current_turn.get()
+
+    # ── Spans ───────────────────────────────────────────────────────────────────
+
+    def span(self, name: str, turn_id: Optional[str] = None, **attrs):
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, turn_id or _current_turn.get(), attrs)
+
+    def record(self, name: str, start: float, end: float, turn_id: Optional[str] = None, **attrs):
+        """Record a span measured elsewhere (perf_counter timestamps)"""
+        if not self.enabled:
+            return
+        event = {
+            'name': name,
+            'turn': turn_id or _current_turn.get(),
+            'start': start,
+            'dur_ms': (end - start) * 1000,
+            'tid': threading.get_ident(),
+            'thread': threading.current_thread().name,
+            'attrs': attrs
+        }
+        with self._lock:
+            self._spans.append(event)
+            stage = self._stage_windows.get(name)
+            if stage is None:
+                stage = self._stage_windows[name] = deque(maxlen=self.window)
+            stage.append(event['dur_ms'])
+            if self.output_path:
+                self._append_jsonl(self.output_path, [event])
+
+    def spans(self, turn_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(s) for s in self._spans if turn_id is None or s['turn'] == turn_id]
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+            self._stage_windows.clear()
+            self._turns.clear()
+
+    # ── Reporting / export ──────────────────────────────────────────────────────
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Rolling p50/p95 per stage over the last `window` spans"""
+        with self._lock:
+            windows = {name: sorted(values) for name, values in self._stage_windows.items()}
+        return {
+            name: {
+                'count': len(values),
+                'p50_ms': round(self._percentile(values, 50), 2),
+                'p95_ms': round(self._percentile(values, 95), 2)
+            }
+            for name, values in windows.items() if values
+        }
+
+    @staticmethod
+    def _percentile(ordered: List[float], pct: float) -> float:
+        # Nearest-rank
+        index = max(0, min(len(ordered) - 1, -(-len(ordered) * pct // 100) - 1))
+        return ordered[int(index)]
+
+    def _to_json_line(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'name': event['name'],
+            'turn': event['turn'],
+            'ts': round(event['start'] + self._epoch_offset, 6),
+            'dur_ms': round(event['dur_ms'], 3),
+            'thread': event['thread'],
+            **({'attrs': event['attrs']} if event['attrs'] else {})
+        }
+
+    def _append_jsonl(self, path: str, events: List[Dict[str, Any]], mode: str = 'a'):
+        try:
+            with open(path, mode, encoding='utf-8') as f:
+                for event in events:
+                    f.write(json.dumps(self._to_json_line(event), ensure_ascii=False, default=str) + "\n")
+        except Exception as e:
+            logger.error(f"Tracer: Failed to write {path}: {e}")
+
+    def export_jsonl(self, path: str):
+        self._append_jsonl(path, self.spans(), mode='w')
+
+    def export_chrome(self, path: str):
+        """Write Chrome trace_event JSON (complete 'X' events, microseconds)"""
+        events = []
+        threads = {}
+        for span in self.spans():
+            threads[span['tid']] = span['thread']
+            args = dict(span['attrs'])
+            if span['turn']:
+                args['turn'] = span['turn']
+            events.append({
+                'name': span['name'],
+                'cat': span['name'].split('.')[0],
+                'ph': 'X',
+                'ts': round(span['start'] * 1e6, 1),
+                'dur': round(span['dur_ms'] * 1000, 1),
+                'pid': self._pid,
+                'tid': span['tid'],
+                'args': args
+            })
+        for tid, name in threads.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': self._pid, 'tid': tid, 'args': {'name': name}})
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, default=str)
+
+    def _export_on_exit(self):
+        if not self._spans:
+            return
+        try:
+            os.makedirs(os.path.join("logs", "traces"), exist_ok=True)
+            path = os.path.join("logs", "traces", f"jarvis_trace_{time.strftime('%Y%m%d_%H%M%S')}.json")
+            self.export_chrome(path)
+            logger.info(f"Tracer: Chrome trace written to {path}. Stage summary: {self.summary()}")
+        except Exception as e:
+            logger.error(f"Tracer: Export failed: {e}")
+
+# Process-wide tracer; its spans are exported to logs/traces/ on exit
+tracer = Tracer()
+if tracer.enabled:
+    atexit.register(tracer._export_on_exit)
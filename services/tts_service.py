@@ -12,6 +12,8 @@ from piper.voice import PiperVoice
 
 from PyQt6.QtCore import QThread, pyqtSignal
 
+from services.tracing import tracer
+
 logger = logging.getLogger(__name__)
 
 class TTSService(QThread):
@@ -28,6 +30,7 @@ class TTSService(QThread):
         self.queue = queue.Queue()
         self.running = True
         self.aborted = False # For interruption
+        self._flush_generation = 0 # Bumped by flush(); stale queued speech is skipped
         self.persona = "edge" # Options: "edge", "piper"
         self.piper_model_path = os.path.join("models", "piper_voices", "pt_BR-faber-medium.onnx")
         self.piper_voice = None
@@ -54,12 +57,14 @@ class TTSService(QThread):
             
             while self.running:
                 try:
-                    # Get (text, mood, persona_override) from queue
+                    # Get (text, mood, persona_override, turn_id, queued_at) from queue
                     data = self.queue.get(timeout=0.5)
                     if not data: continue
                     
-                    text, mood, persona_override = data
+                    text, mood, persona_override, turn_id, queued_at = data
+                    generation = self._flush_generation
                     current_persona = persona_override or self.persona
+                    tracer.record("tts.queue_wait", queued_at, time.perf_counter(), turn_id)
                     
                     if text:
                         print(f"HUD: TTS Processing request: {text[:50]}")
@@ -84,29 +89,42 @@ class TTSService(QThread):
                                 rate = "-15%"
                                 pitch = "-1Hz"
                             
-                            if current_persona == "edge":
-                                # Generate Neural Voice Audio via Edge
-                                communicate = edge_tts.Communicate(text, VOICE_MODEL, rate=rate, pitch=pitch)
-                                loop.run_until_complete(communicate.save(temp_path))
-                            elif self.piper_voice:
-                                # Generate via Piper (Local)
-                                with open(temp_path, "wb") as f:
-                                    self.piper_voice.synthesize(text, f)
-                            else:
-                                logger.error("TTS: Requested persona not available. Falling back.")
-                                continue
+                            with tracer.span("tts.synthesis", turn_id, persona=current_persona):
+                                if current_persona == "edge":
+                                    # Generate Neural Voice Audio via Edge
+                                    communicate = edge_tts.Communicate(text, VOICE_MODEL, rate=rate, pitch=pitch)
+                                    loop.run_until_complete(communicate.save(temp_path))
+                                elif self.piper_voice:
+                                    # Generate via Piper (Local)
+                                    with open(temp_path, "wb") as f:
+                                        self.piper_voice.synthesize(text, f)
+                                else:
+                                    logger.error("TTS: Requested persona not available. Falling back.")
+                                    continue
                             
+                            # Flushed while synthesizing - drop the answer instead of playing it
+                            # (speaking_finished is still emitted so the voice thread resumes)
+                            if generation != self._flush_generation:
+                                logger.info("TTS: Discarding speech superseded by interruption")
+                                tracer.finish_turn(turn_id, cancelled=True)
+                                try:
+                                    os.remove(temp_path)
+                                except:
+                                    pass
+
                             # Play the audio using sounddevice (non-blocking with wait)
-                            if os.path.exists(temp_path):
+                            elif os.path.exists(temp_path):
                                 data, fs = sf.read(temp_path)
                                 self.aborted = False
                                 
                                 # Play in background
+                                playback_start = time.perf_counter()
                                 sd.play(data, fs)
                                 
                                 # Wait for finish or abortion
                                 while sd.get_stream().active and not self.aborted:
                                     time.sleep(0.1)
+                                tracer.record("tts.playback", playback_start, time.perf_counter(), turn_id, aborted=self.aborted)
                                 
                                 if self.aborted:
                                     sd.stop()
@@ -119,6 +137,7 @@ class TTSService(QThread):
                                     pass
                             
                             logger.info("TTS: Speech completed")
+                            tracer.finish_turn(turn_id)
                         except Exception as e:
                             print(f"HUD: TTS Engine internal error: {e}")
                             logger.error(f"TTS Engine error: {e}")
@@ -137,13 +156,13 @@ class TTSService(QThread):
         finally:
             logger.info("TTS Service: Shutdown complete")
 
-    def speak(self, text: str, mood: str = 'neutral', persona: str = None):
+    def speak(self, text: str, mood: str = 'neutral', persona: str = None, turn_id: str = None):
         """Queue text to be spoken with emotional context and optional persona override"""
         if text:
             # Strip emojis and markdown
             clean_text = text.replace("*", "").replace("#", "")
             logger.info(f"TTS: Queued: {clean_text[:50]}... (Mood: {mood}, Persona: {persona or self.persona})")
-            self.queue.put((clean_text, mood, persona))
+            self.queue.put((clean_text, mood, persona, turn_id, time.perf_counter()))
         else:
             logger.warning("TTS: Empty text ignored")
 
@@ -166,3 +185,15 @@ class TTSService(QThread):
         self.aborted = True
         sd.stop()
         logger.info("TTS Service: Current speech delivery aborted")
+
+    def flush(self):
+        """Abort current speech and drop everything still queued (barge-in)"""
+        self._flush_generation += 1
+        with self.queue.mutex:
+            dropped = len(self.queue.queue)
+            self.queue.queue.clear()
+            self.queue.unfinished_tasks = max(0, self.queue.unfinished_tasks - dropped)
+            self.queue.all_tasks_done.notify_all()
+        self.abort()
+        if dropped:
+            logger.info(f"TTS Service: Flushed {dropped} queued utterances")
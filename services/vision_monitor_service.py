@@ -3,6 +3,9 @@ import logging
 import os
 from datetime import datetime
 
+from services.work_scheduler import WorkPriority
+from services.service_runtime import run_cpu
+
 logger = logging.getLogger(__name__)
 
 class VisionMonitorService:
@@ -34,15 +37,19 @@ class VisionMonitorService:
             try:
                 # Wait for the next interval
                 await asyncio.sleep(self.interval)
+
+                # Skip this cycle rather than compete with a user turn or a loaded CPU
+                if not await self.ai_service.scheduler.admit("vision_analysis", WorkPriority.BACKGROUND, max_wait=10):
+                    continue
                 
-                # Take screenshot
+                # Take screenshot (kept in memory - no PNG round-trip)
                 logger.debug("VisionMonitor: Capturando tela para análise proativa...")
-                screenshot_path = self.ai_service.vision_service.capture_screen()
+                screenshot = self.ai_service.vision_service.capture_screen_image()
                 
-                if screenshot_path:
+                if screenshot is not None:
                     # Process with VLM
-                    # Note: LocalAIProcessor.process_image handles the VLM inference
-                    result = await self.ai_service.processor.process_image(screenshot_path, self.PROMPT)
+                    # Note: LocalAIProcessor.process_image handles downscaling, caching and inference
+                    result = await self.ai_service.nlp_processor.ai_engine.process_image(screenshot, self.PROMPT)
                     
                     if "NADA RELEVANTE" not in result.upper() and len(result) > 10:
                         logger.info(f"VisionMonitor: Insight detectado: {result}")
@@ -51,12 +58,9 @@ class VisionMonitorService:
                         if hasattr(self.ai_service, 'learning_insight'):
                             self.ai_service.learning_insight.emit(f"👁️ Sugestão Proativa: {result}")
                         
-                        # Add to memory as a contextual event
-                        self.ai_service.memory.store_fact(f"Visual Insight proativo: {result}", category="vision_monitor")
-                
-                # Cleanup screenshot
-                if screenshot_path and os.path.exists(screenshot_path):
-                    os.remove(screenshot_path)
+                        # Add to memory as a contextual event (embedding runs on the runtime's CPU pool)
+                        await run_cpu(lambda: self.ai_service.memory_service.store_fact(
+                            f"Visual Insight proativo: {result}", category="vision_monitor"))
                     
             except Exception as e:
                 logger.error(f"VisionMonitor: Loop error: {e}")
@@ -40,6 +40,14 @@ class VisionService:
             logger.error(f"VisionService: Screenshot failed: {e}")
             return None
 
+    def capture_screen_image(self, region: Optional[Tuple[int, int, int, int]] = None) -> Optional[Image.Image]:
+        """Capture the screen straight into memory (no PNG written) for VLM analysis"""
+        try:
+            return pyautogui.screenshot(region=region) if region else pyautogui.screenshot()
+        except Exception as e:
+            logger.error(f"VisionService: In-memory screenshot failed: {e}")
+            return None
+
     async def perform_click(self, x: int, y: int):
         """Perform a mouse click at specified coordinates"""
         try:
@@ -88,11 +96,11 @@ class VisionService:
             logger.error(f"VisionService: Failed to get window info: {e}")
         return {"title": "Unknown", "app": "Unknown"}
 
-    def process_with_vision_model(self, image_path: str, prompt: str) -> str:
-        """Analyze image using local GGUF vision model via NLPProcessor"""
+    def process_with_vision_model(self, image, prompt: str) -> str:
+        """Analyze image (path or in-memory PIL image) using local GGUF vision model via NLPProcessor"""
         if self.nlp_processor:
             # Check if it has the local engine
             if hasattr(self.nlp_processor, 'ai_engine'):
-                return asyncio.run(self.nlp_processor.ai_engine.process_image(image_path, prompt))
+                return asyncio.run(self.nlp_processor.ai_engine.process_image(image, prompt))
         
         return "Visão computacional local não disponível ou não inicializada."
@@ -0,0 +1,159 @@
+import time
+import asyncio
+import logging
+import threading
+from enum import IntEnum
+from contextlib import contextmanager
+from typing import Optional, Callable, Dict, Any
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+class WorkPriority(IntEnum):
+    INTERACTIVE = 0  # User turns - never deferred
+    NORMAL = 1       # Post-turn work (memory writes); waits for interactive turns only
+    BACKGROUND = 2   # Vision analysis, document ingestion, batch learning
+    IDLE = 3         # Nice-to-have work, shed first
+
+# How long a job may be deferred before it is shed (or forced to run if not sheddable)
+DEFAULT_MAX_WAIT = {
+    WorkPriority.NORMAL: 10.0,
+    WorkPriority.BACKGROUND: 30.0,
+    WorkPriority.IDLE: 0.0,
+}
+
+class WorkScheduler:
+    """
+    Central admission point for background AI work.
+    Interactive turns are registered with interactive_turn(); while one is in progress,
+    or while system CPU is above `cpu_threshold`, background jobs calling admit()
+    are deferred and eventually shed so the user's turn gets the CPU and the LLM.
+    NORMAL jobs only yield to interactive turns, not to CPU load.
+    """
+    def __init__(self, cpu_threshold: float = 75.0, poll_interval: float = 0.25,
+                 cpu_sample_ttl: float = 1.0, cpu_sampler: Optional[Callable[[], float]] = None):
+        self.cpu_threshold = cpu_threshold
+        self.poll_interval = poll_interval
+        self.cpu_sample_ttl = cpu_sample_ttl
+        self._cpu_sampler = cpu_sampler or (lambda: psutil.cpu_percent(interval=None))
+        self._cpu_value = 0.0
+        self._cpu_sampled_at = 0.0
+
+        self._lock = threading.Lock()
+        self._interactive = 0
+        self._jobs: Dict[str, Dict[str, int]] = {}
+
+    # ── Interactive turns ───────────────────────────────────────────────────────
+
+    def begin_interactive(self):
+        with self._lock:
+            self._interactive += 1
+
+    def end_interactive(self):
+        with self._lock:
+            self._interactive = max(0, self._interactive - 1)
+
+    @contextmanager
+    def interactive_turn(self):
+        self.begin_interactive()
+        try:
+            yield
+        finally:
+            self.end_interactive()
+
+    @property
+    def interactive_active(self) -> bool:
+        return self._interactive > 0
+
+    # ── Load ────────────────────────────────────────────────────────────────────
+
+    def cpu_percent(self) -> float:
+        """System CPU, sampled at most once per `cpu_sample_ttl` seconds"""
+        now = time.monotonic()
+        if now - self._cpu_sampled_at >= self.cpu_sample_ttl:
+            try:
+                self._cpu_value = self._cpu_sampler()
+            except Exception as e:
+                logger.debug(f"WorkScheduler: CPU sample failed: {e}")
+            self._cpu_sampled_at = now
+        return self._cpu_value
+
+    def busy_reason(self, priority: WorkPriority) -> Optional[str]:
+        """Why a job of `priority` should not run now, or None"""
+        if priority <= WorkPriority.INTERACTIVE:
+            return None
+        if self.interactive_active:
+            return "interactive"
+        if priority >= WorkPriority.BACKGROUND and self.cpu_percent() > self.cpu_threshold:
+            return "cpu"
+        return None
+
+    # ── Admission ───────────────────────────────────────────────────────────────
+
+    def _count(self, name: str, outcome: str):
+        with self._lock:
+            job = self._jobs.setdefault(name, {'run': 0, 'deferred': 0, 'shed': 0, 'forced': 0})
+            job[outcome] += 1
+
+    def _max_wait(self, priority: WorkPriority, max_wait: Optional[float]) -> float:
+        return DEFAULT_MAX_WAIT.get(priority, 0.0) if max_wait is None else max_wait
+
+    def _settle(self, name: str, priority: WorkPriority, reason: str, sheddable: bool) -> bool:
+        if sheddable:
+            self._count(name, 'shed')
+            logger.info(f"WorkScheduler: Shed '{name}' ({priority.name}, {reason})")
+            return False
+        self._count(name, 'forced')
+        logger.info(f"WorkScheduler: Running overdue '{name}' despite {reason}")
+        return True
+
+    async def admit(self, name: str, priority: WorkPriority = WorkPriority.BACKGROUND,
+                    max_wait: Optional[float] = None, sheddable: bool = True) -> bool:
+        """
+        Wait until `name` may run. Returns False if the job was shed; jobs that must
+        not be lost pass sheddable=False and run anyway once `max_wait` expires.
+        """
+        reason = self.busy_reason(priority)
+        if reason is None:
+            self._count(name, 'run')
+            return True
+
+        self._count(name, 'deferred')
+        deadline = time.monotonic() + self._max_wait(priority, max_wait)
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            reason = self.busy_reason(priority)
+            if reason is None:
+                self._count(name, 'run')
+                return True
+        return self._settle(name, priority, reason, sheddable)
+
+    def admit_blocking(self, name: str, priority: WorkPriority = WorkPriority.BACKGROUND,
+                       max_wait: Optional[float] = None, sheddable: bool = True) -> bool:
+        """admit() for plain threads (e.g. watchdog callbacks)"""
+        reason = self.busy_reason(priority)
+        if reason is None:
+            self._count(name, 'run')
+            return True
+
+        self._count(name, 'deferred')
+        deadline = time.monotonic() + self._max_wait(priority, max_wait)
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            reason = self.busy_reason(priority)
+            if reason is None:
+                self._count(name, 'run')
+                return True
+        return self._settle(name, priority, reason, sheddable)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            jobs = {name: dict(counts) for name, counts in self._jobs.items()}
+        return {
+            'interactive': self._interactive,
+            'cpu': round(self._cpu_value, 1),
+            'deferred': sum(j['deferred'] for j in jobs.values()),
+            'shed': sum(j['shed'] for j in jobs.values()),
+            'jobs': jobs
+        }
@@ -61,7 +61,7 @@ class WorkflowService:
             for cmd in commands:
                 logger.info(f"WorkflowService: Executing step: {cmd}")
                 # We reuse the AI Service command processing logic
-                ai_service.process_command(cmd)
+                ai_service.process_command(cmd, source="workflow")
                 # Wait a bit between steps for stability
                 await asyncio.sleep(2.0)
             
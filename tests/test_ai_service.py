@@ -7,6 +7,9 @@ import unittest
 import sys
 import os
 import threading
+import asyncio
+import time
+from collections import deque
 from unittest.mock import MagicMock, patch, AsyncMock
 from PyQt6.QtCore import QCoreApplication
 
@@ -15,6 +18,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from services.ai_service import AIService
 from conversation_manager import IntentType
+from services.cancellation import CancellationToken, OperationCancelled
+from services.stream_coalescer import TokenStreamCoalescer
 
 # Create global app instance for QObjects
 app = QCoreApplication.instance() or QCoreApplication(sys.argv)
@@ -50,8 +55,8 @@ class TestAIServiceInit(unittest.TestCase):
     def test_init_task_queue(self):
         """Test task queue is initialized"""
         self.assertIsNotNone(self.service.pending_tasks)
-        self.assertIsInstance(self.service.pending_tasks, list)
-        self.assertEqual(len(self.service.pending_tasks), 0)
+        self.assertIsInstance(self.service.pending_tasks, deque)
+        self.assertEqual(self.service.pending_count(), 0)
 
     def test_init_task_lock(self):
         """Test task lock is initialized"""
@@ -102,13 +107,41 @@ class TestAIServiceProcessCommand(unittest.TestCase):
         for i, cmd in enumerate(commands):
             self.assertEqual(self.service.pending_tasks[i]['data'], cmd)
 
+    def test_duplicate_command_is_merged(self):
+        """A duplicate final from Vosk and the same text from Telegram share one task"""
+        replies = []
+        first = self.service.process_command("Abrir navegador.")
+        second = self.service.process_command("abrir navegador", source="telegram", on_result=replies.append)
+
+        self.assertFalse(first.merged)
+        self.assertTrue(second.merged)
+        self.assertIs(second.ticket, first.ticket)
+        self.assertEqual(len(self.service.pending_tasks), 1)
+
+        self.service.admission.complete(first.ticket, "resultado")
+        self.assertEqual(replies, ["resultado"])
+        self.assertEqual(self.service.admission.stats()['dropped'], 1)
+
+    def test_stopping_a_workflow_from_telegram_is_confirmed(self):
+        """A saved workflow answers its requester instead of reporting a cancellation"""
+        replies, cancelled = [], MagicMock()
+        self.service.workflow_manager = MagicMock(is_recording=True)
+        self.service.workflow_manager.stop_recording.return_value = "rotina"
+        self.service.process_command("parar gravação", source="telegram", on_result=replies.append,
+                                     on_cancel=cancelled)
+
+        cancelled.assert_not_called()
+        self.assertEqual([r.response_suggestion for r in replies], ["✅ Workflow 'rotina' gravado e salvo com sucesso."])
+        self.assertEqual(len(self.service.pending_tasks), 0)
+
     def test_process_command_thread_safe(self):
         """Test queuing is thread-safe"""
-        def add_commands():
+        def add_commands(n):
             for i in range(10):
-                self.service.process_command(f"command {i}")
+                # Distinct texts: identical in-flight commands are merged by admission
+                self.service.process_command(f"command {n}-{i}")
         
-        threads = [threading.Thread(target=add_commands) for _ in range(5)]
+        threads = [threading.Thread(target=add_commands, args=(n,)) for n in range(5)]
         
         for t in threads:
             t.start()
@@ -145,6 +178,278 @@ class TestAIServiceFeedback(unittest.TestCase):
         self.assertFalse(task['data'])
 
 
+class TestAIServiceTaskLanes(unittest.TestCase):
+    """Test event-driven task lanes"""
+
+    def setUp(self):
+        self.service = AIService()
+        self.done = []
+
+        async def fake_process(task):
+            if 'investigue' in str(task['data']):
+                await asyncio.sleep(0.3)
+            self.done.append(task['data'])
+
+        self.service._process_task = fake_process
+        self.service.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.service.loop.close()
+
+    def run_for(self, seconds):
+        async def scenario():
+            server = asyncio.create_task(self.service._serve())
+            await asyncio.sleep(seconds)
+            self.service._stop_event.set()
+            await server
+        self.service.loop.run_until_complete(scenario())
+
+    def test_task_lane_routing(self):
+        """Research goes to its own lane, commands and feedback to theirs"""
+        self.service.task_queues = {lane: None for lane in self.service.concurrency}
+        self.assertEqual(self.service._task_lane({'type': 'command', 'data': 'aumentar volume'}), 'command')
+        self.assertEqual(self.service._task_lane({'type': 'command', 'data': 'investigue o preço de gpus'}), 'research')
+        self.assertEqual(self.service._task_lane({'type': 'feedback', 'data': True}), 'feedback')
+
+    def test_research_does_not_block_commands(self):
+        """A slow research task does not delay a later volume command"""
+        self.service.process_command("investigue baterias de lítio")
+        self.service.process_command("aumentar volume")
+
+        self.run_for(0.1)
+
+        self.assertEqual(self.done, ["aumentar volume"])
+
+    def test_commands_keep_submission_order(self):
+        """Commands in the same lane run in order"""
+        for cmd in ["abrir chrome", "fechar chrome", "tocar música"]:
+            self.service.process_command(cmd)
+
+        self.run_for(0.1)
+
+        self.assertEqual(self.done, ["abrir chrome", "fechar chrome", "tocar música"])
+        self.assertEqual(self.service.pending_count(), 0)
+        # Finished turns no longer hold background work back
+        self.assertFalse(self.service.scheduler.interactive_active)
+
+    def test_barge_in_drops_queued_tasks(self):
+        """Tasks cancelled while queued never reach _process_task"""
+        self.service.process_command("o que é um buraco negro")
+        self.service.process_command("abrir chrome")
+
+        self.assertEqual(self.service.interrupt("barge_in"), 2)
+        self.run_for(0.1)
+
+        self.assertEqual(self.done, [])
+        self.assertEqual(self.service._inflight, [])
+
+    def test_new_utterance_keeps_system_commands(self):
+        """A new utterance cancels pending answers but not direct commands"""
+        self.service.process_command("o que é um buraco negro")
+        self.service.process_command("abrir chrome")
+
+        self.assertEqual(self.service.interrupt("new_utterance", include_commands=False), 1)
+        self.run_for(0.1)
+
+        self.assertEqual(self.done, ["abrir chrome"])
+
+    def test_interrupt_is_scoped_to_source(self):
+        """Speaking over the HUD never cancels a Telegram request, and its requester hears of its own cancels"""
+        notices = []
+        self.service.telegram = MagicMock()
+        self.service.telegram.send_message.side_effect = notices.append
+        self.service._on_telegram_command("o que é um buraco negro")
+        self.service.process_command("conte uma piada", source="voice")
+        self.service.process_command("me fale de marte", source="voice", supersede=True)
+
+        self.assertEqual(self.service.interrupt("barge_in", sources=AIService.HUD_SOURCES), 1)
+        self.run_for(0.1)
+
+        self.assertEqual(self.done, ["o que é um buraco negro"])
+        self.assertEqual(notices, [])
+
+        self.service._on_telegram_command("abrir chrome")
+        self.service.interrupt("shutdown")
+        self.run_for(0.1)
+        self.assertEqual(notices, ["⚠️ Comando cancelado (shutdown)."])
+
+
+class TestAIServicePipeline(unittest.TestCase):
+    """Test stage ordering inside _process_task"""
+
+    def setUp(self):
+        self.service = AIService()
+        self.service.processing_finished = MagicMock()
+        self.service.learning_insight = MagicMock()
+        self.service.learning_module = None
+
+        self.service.nlp_processor = MagicMock()
+        self.service.nlp_processor.process_text = AsyncMock(return_value=MagicMock(
+            intent=IntentType.DIRECT_COMMAND, response_suggestion="Ok", entities={},
+            confidence=0.9, processing_time=0.1
+        ))
+
+        def slow_store(**kwargs):
+            time.sleep(0.3)
+            self.stored.append(kwargs['user_text'])
+
+        self.stored = []
+        self.service.memory_service = MagicMock()
+        self.service.memory_service.retrieve_scored_context.return_value = []
+        self.service.memory_service.format_context.return_value = ""
+        self.service.memory_service.store_interaction.side_effect = slow_store
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        if self.service._background_tasks:
+            self.loop.run_until_complete(asyncio.wait(list(self.service._background_tasks)))
+        self.loop.close()
+
+    def test_result_emitted_before_memory_is_stored(self):
+        """processing_finished does not wait for the memory write"""
+        start = time.perf_counter()
+        self.loop.run_until_complete(self.service._process_task({'type': 'command', 'data': 'abrir chrome'}))
+        elapsed = time.perf_counter() - start
+
+        self.service.processing_finished.emit.assert_called_once()
+        self.assertLess(elapsed, 0.25)
+        self.assertEqual(self.stored, [])
+
+        # Background work completes afterwards
+        self.loop.run_until_complete(asyncio.wait(list(self.service._background_tasks)))
+        self.assertEqual(self.stored, ['abrir chrome'])
+
+    def test_precomputed_analysis_is_passed_to_nlp(self):
+        """Rule-based analysis computed alongside retrieval is reused by process_text"""
+        self.loop.run_until_complete(self.service._process_task({'type': 'command', 'data': 'abrir chrome'}))
+        kwargs = self.service.nlp_processor.process_text.call_args.kwargs
+        self.assertIs(kwargs['analysis'], self.service.nlp_processor.analyze_text.return_value)
+
+    def test_retrieval_overlaps_analysis(self):
+        """RAG retrieval and rule-based analysis run side by side, not one after the other"""
+        def slow_retrieval(text):
+            time.sleep(0.3)
+            return []
+
+        def slow_analysis(*args):
+            time.sleep(0.3)
+            return MagicMock()
+
+        self.service.memory_service.retrieve_scored_context.side_effect = slow_retrieval
+        self.service.nlp_processor.analyze_text.side_effect = slow_analysis
+
+        start = time.perf_counter()
+        self.loop.run_until_complete(self.service._process_task({'type': 'command', 'data': 'o que é entropia'}))
+        elapsed = time.perf_counter() - start
+
+        self.service.processing_finished.emit.assert_called_once()
+        self.assertLess(elapsed, 0.5)
+
+    def test_long_task_is_interactive_only_until_first_response(self):
+        """A long research turn stops holding background work back once the user sees a reply"""
+        scheduler = self.service.scheduler
+        observed = {}
+        self.service.memory_service.retrieve_scored_context.side_effect = \
+            lambda text: observed.setdefault('before_reply', scheduler.interactive_active) and []
+
+        async def research(topic):
+            observed['during_research'] = scheduler.interactive_active
+            await asyncio.sleep(0.3)
+            return "resultados"
+
+        self.service.web_agent = MagicMock()
+        self.service.web_agent.research_topic = AsyncMock(side_effect=research)
+        scheduler.begin_interactive()
+        task = {'type': 'command', 'data': 'investigue o preço de gpus', 'interactive': True}
+        self.loop.run_until_complete(self.service._process_task(task))
+        self.service._release_task(task)
+
+        # Interactive while the turn is being prepared, then free once the first line is out
+        self.assertTrue(observed['before_reply'])
+        self.assertFalse(observed['during_research'])
+        self.assertEqual(scheduler.stats()['interactive'], 0)
+
+    def test_prefix_does_not_end_the_interactive_window(self):
+        """A conversational turn stays interactive through the "JARVIS: " prefix until generation answers"""
+        scheduler = self.service.scheduler
+        observed = {}
+
+        async def generate(text, intent, context, stream_callback=None, **kwargs):
+            stream_callback("JARVIS: ")
+            await asyncio.sleep(0.1)  # Let the coalescer flush the prefix
+            observed['during_generation'] = scheduler.interactive_active
+            stream_callback("Olá, tudo bem.")
+            await asyncio.sleep(0.1)
+            observed['after_first_token'] = scheduler.interactive_active
+            return self.service.nlp_processor.process_text.return_value
+
+        self.service.nlp_processor.process_text.side_effect = generate
+        scheduler.begin_interactive()
+        task = {'type': 'command', 'data': 'me conte sobre o universo', 'interactive': True}
+        self.loop.run_until_complete(self.service._process_task(task))
+        self.service._release_task(task)
+
+        self.assertTrue(observed['during_generation'])
+        self.assertFalse(observed['after_first_token'])
+        self.assertEqual(scheduler.stats()['interactive'], 0)
+
+    def test_cancelled_task_is_not_emitted(self):
+        """An answer cancelled during generation is neither emitted nor stored"""
+        token = CancellationToken()
+
+        async def interrupted(*args, **kwargs):
+            kwargs['cancel_token'].cancel("barge_in")
+            return self.service.nlp_processor.process_text.return_value
+
+        self.service.nlp_processor.process_text.side_effect = interrupted
+        with self.assertRaises(OperationCancelled):
+            self.loop.run_until_complete(self.service._process_task(
+                {'type': 'command', 'data': 'o que é um buraco negro', 'cancel_token': token}
+            ))
+
+        self.service.processing_finished.emit.assert_not_called()
+        self.assertEqual(self.service._background_tasks, set())
+
+    def test_concurrent_lanes_keep_their_own_context_and_stream(self):
+        """Cancelling one lane drops only its tokens; RAG results never cross tasks"""
+        emitted, seen = [], {}
+        self.service.stream_token_received = MagicMock()
+        self.service.stream_token_received.emit.side_effect = emitted.append
+        self.service.memory_service.retrieve_scored_context.side_effect = \
+            lambda text: [{'kind': 'fact', 'text': f"sobre {text}", 'score': 0.9}]
+        survivor, victim = CancellationToken(), CancellationToken()
+
+        async def generate(text, intent, context, **kwargs):
+            seen[text] = [item['text'] for item in context.retrieved_context]
+            kwargs['stream_callback'](f"{text} parcial")
+            await asyncio.sleep(0.05)
+            if text == "conte uma piada":
+                victim.cancel("barge_in")
+            kwargs['cancel_token'].raise_if_cancelled()
+            kwargs['stream_callback'](" fim.")
+            return self.service.nlp_processor.process_text.return_value
+
+        self.service.nlp_processor.process_text.side_effect = generate
+        tasks = [{'type': 'command', 'data': "o que é entropia", 'cancel_token': survivor},
+                 {'type': 'command', 'data': "conte uma piada", 'cancel_token': victim}]
+
+        async def scenario():
+            return await asyncio.gather(*(self.service._process_task(t) for t in tasks), return_exceptions=True)
+
+        # Frame interval long enough that only sentence ends flush
+        with patch('services.ai_service.TokenStreamCoalescer',
+                   side_effect=lambda emit: TokenStreamCoalescer(emit, interval=60)):
+            outcome = self.loop.run_until_complete(scenario())
+        self.assertIsInstance(outcome[1], OperationCancelled)
+        tasks[1]['stream'].reset()
+
+        self.assertEqual(seen, {"o que é entropia": ["sobre o que é entropia"],
+                                "conte uma piada": ["sobre conte uma piada"]})
+        self.assertEqual("".join(emitted), "o que é entropia parcial fim.")
+        self.assertEqual(self.service.context.retrieved_context, [])
+        self.assertEqual([h['user_input'] for h in self.service.context.conversation_history], ["o que é entropia"])
+
+
 class TestAIServiceStop(unittest.TestCase):
     """Test stop functionality"""
     
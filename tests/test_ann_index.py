@@ -0,0 +1,152 @@
+"""
+Unit Tests for the approximate nearest-neighbor index used by RAG retrieval
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+import numpy as np
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import memory_store
+from services.memory_store import MemoryStore
+from services.embedding_store import normalize_rows
+from services.ann_index import IVFFlatIndex, top_k, default_nlist, create_index
+
+
+def clustered(n, dim=32, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    points = centers[rng.integers(0, clusters, n)] + 0.3 * rng.standard_normal((n, dim)).astype(np.float32)
+    return normalize_rows(points).astype(np.float32)
+
+
+def recall(index, data, queries, k):
+    hits = 0
+    for q in queries:
+        exact = set(top_k(data @ q, k))
+        rows, _ = index.search(q, k, lambda r: data[r])
+        hits += len(exact & set(rows.tolist()))
+    return hits / (len(queries) * k)
+
+
+class TestTopK(unittest.TestCase):
+    def test_matches_full_sort(self):
+        scores = np.random.default_rng(1).random(1000)
+        np.testing.assert_array_equal(top_k(scores, 10), np.argsort(scores)[::-1][:10])
+        self.assertEqual(len(top_k(scores[:3], 10)), 3)
+        self.assertEqual(len(top_k(scores, 0)), 0)
+
+
+class TestIVFFlatIndex(unittest.TestCase):
+    """Test recall against brute force, incremental adds and persistence"""
+
+    def setUp(self):
+        self.data = clustered(5000)
+        self.queries = clustered(50, seed=1)
+        self.index = IVFFlatIndex(32, default_nlist(len(self.data)))
+        self.index.train(self.data)
+
+    def test_recall_against_brute_force(self):
+        self.index.add(self.data, 0)
+        self.assertEqual(self.index.ntotal, 5000)
+        self.assertGreaterEqual(recall(self.index, self.data, self.queries, 10), 0.9)
+
+    def test_incremental_add_keeps_row_ids(self):
+        for start in range(0, 5000, 700):
+            self.index.add(self.data[start:start + 700], start)
+        rows, scores = self.index.search(self.data[1234], 1, lambda r: self.data[r])
+        self.assertEqual(rows[0], 1234)
+        self.assertAlmostEqual(float(scores[0]), 1.0, places=5)
+
+    def test_save_and_load(self):
+        self.index.add(self.data, 0)
+        root = tempfile.mkdtemp()
+        try:
+            path = os.path.join(root, "ann_ivf.npz")
+            self.index.save(path)
+            loaded = IVFFlatIndex.load(path)
+            self.assertEqual((loaded.ntotal, loaded.nlist, loaded.nprobe),
+                             (self.index.ntotal, self.index.nlist, self.index.nprobe))
+            for q in self.queries[:5]:
+                np.testing.assert_array_equal(loaded.search(q, 5, lambda r: self.data[r])[0],
+                                              self.index.search(q, 5, lambda r: self.data[r])[0])
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+class TestCollectionSearch(unittest.TestCase):
+    """Test the exact/ANN switch inside a memory collection"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = MemoryStore(self.root)
+        self.data = clustered(3000)
+
+    def tearDown(self):
+        if not self.store.closed:
+            self.store.close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def fill(self, collection, start, stop):
+        collection.extend([{'document': str(i)} for i in range(start, stop)], self.data[start:stop])
+
+    @patch.object(memory_store, 'ANN_THRESHOLD', 2000)
+    @patch('services.ann_index.HNSWLIB_AVAILABLE', False)
+    def test_switches_to_index_and_persists_it(self):
+        docs = self.store.collection("documents")
+        self.fill(docs, 0, 1500)
+        self.assertIsNone(docs.index)
+        rows, scores = docs.search(self.data[42], 3)
+        self.assertEqual(rows[0], 42)
+
+        self.fill(docs, 1500, 2500)
+        self.assertIsInstance(docs.index, IVFFlatIndex)
+        self.assertEqual(docs.index.ntotal, 2500)
+        np.testing.assert_allclose(docs.take(np.array([10, 2100])), self.data[[10, 2100]], rtol=1e-5)
+
+        # Rows added after the last save are caught up when the index is reloaded
+        path = os.path.join(docs.dir, "ann_ivf.npz")
+        stale = os.path.join(self.root, "stale.npz")
+        shutil.copy(path, stale)
+        self.fill(docs, 2500, 3000)
+        self.store.close()
+        shutil.copy(stale, path)
+
+        self.store = MemoryStore(self.root)
+        docs = self.store.collection("documents")
+        self.assertEqual(docs.index.ntotal, 3000)
+        rows, scores = docs.search(self.data[2900], 1)
+        self.assertEqual(rows[0], 2900)
+        self.assertGreaterEqual(recall(docs.index, self.data, clustered(30, seed=2), 5), 0.9)
+
+    @patch.object(memory_store, 'ANN_THRESHOLD', 2000)
+    @patch('services.ann_index.HNSWLIB_AVAILABLE', False)
+    def test_index_filters_tombstones_and_newer_rows_before_scoring(self):
+        """Many tombstones near the query and rows added after the snapshot never cost a result slot"""
+        docs = self.store.collection("documents")
+        self.fill(docs, 0, 2500)
+        query = self.data[42]
+        nearest = top_k(self.data[:2500] @ query, 300)
+        docs.commit_manifest(memory_store.ManifestUpdate(tombstones=nearest.tolist()))
+        snapshot = docs.snapshot()
+        self.fill(docs, 2500, 3000)
+
+        rows, scores = docs.search(query, 5, snapshot)
+        self.assertEqual(len(rows), 5)
+        self.assertTrue((rows < 2500).all())
+        self.assertFalse(set(rows.tolist()) & set(nearest.tolist()))
+        np.testing.assert_allclose(scores, self.data[rows] @ query, rtol=1e-5)
+
+    @patch('services.ann_index.HNSWLIB_AVAILABLE', False)
+    def test_create_index_falls_back_to_ivf(self):
+        self.assertIsInstance(create_index(32, 100000), IVFFlatIndex)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Unit Tests for cooperative cancellation (barge-in)
+"""
+
+import unittest
+import asyncio
+import threading
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.cancellation import CancellationToken, OperationCancelled
+from benchmarks.llm_benchmark import FakeLlama, InstrumentedLlama
+from conversation_manager import ConversationContext, IntentType
+from nlp_processor import NLPProcessor, ProcessingMode
+
+
+class TestCancellationToken(unittest.TestCase):
+    """Test the token itself"""
+
+    def test_cancel_sets_reason_once(self):
+        token = CancellationToken()
+        self.assertFalse(token.cancelled)
+        token.raise_if_cancelled()
+
+        token.cancel("barge_in")
+        token.cancel("new_utterance")  # first reason wins
+
+        self.assertTrue(token.cancelled)
+        with self.assertRaises(OperationCancelled) as ctx:
+            token.raise_if_cancelled()
+        self.assertEqual(ctx.exception.reason, "barge_in")
+
+    def test_callbacks(self):
+        """Callbacks run on cancel, or immediately when registered afterwards"""
+        token = CancellationToken()
+        calls = []
+        token.on_cancel(lambda: calls.append("before"))
+        token.cancel()
+        token.on_cancel(lambda: calls.append("after"))
+        self.assertEqual(calls, ["before", "after"])
+
+
+class TestGenerationCancellation(unittest.TestCase):
+    """Streaming generation stops once the token fires"""
+
+    def setUp(self):
+        self.llm = InstrumentedLlama(FakeLlama(decode_ms_per_token=2, chars_per_token=1))
+        self.processor = NLPProcessor(llm=self.llm)
+        self.processor.ai_engine.max_tokens = 512
+
+    def ask(self, token):
+        return asyncio.run(self.processor.process_text(
+            "o que é inteligência artificial", IntentType.CONVERSATIONAL_QUERY, ConversationContext(),
+            mode=ProcessingMode.DETAILED, stream_callback=lambda piece: None, cancel_token=token
+        ))
+
+    def test_generation_stops_early(self):
+        token = CancellationToken()
+        timer = threading.Timer(0.05, token.cancel, args=("barge_in",))
+        timer.start()
+        try:
+            with self.assertRaises(OperationCancelled):
+                self.ask(token)
+        finally:
+            timer.cancel()
+
+        self.assertGreater(self.llm.tokens, 0)
+        self.assertLess(self.llm.tokens, 100)
+
+    def test_cancelled_before_start_skips_model(self):
+        token = CancellationToken()
+        token.cancel("new_utterance")
+        with self.assertRaises(OperationCancelled):
+            self.ask(token)
+        self.assertEqual(self.llm.inner.calls, 0)
+
+    def test_uncancelled_generation_completes(self):
+        result = self.ask(CancellationToken())
+        self.assertIn("Resposta simulada", result.response_suggestion)
+
+
+if __name__ == '__main__':
+    unittest.main()
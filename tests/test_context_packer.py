@@ -0,0 +1,95 @@
+"""
+Unit Tests for the token-budget context packer
+"""
+
+import unittest
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.context_packer import ContextPacker
+
+
+def word_tokenizer(text):
+    """One token per whitespace-separated word"""
+    return text.split()
+
+
+class TestContextPacker(unittest.TestCase):
+    """Test token counting and greedy packing"""
+
+    def setUp(self):
+        self.calls = []
+
+        def counting_tokenizer(text):
+            self.calls.append(text)
+            return word_tokenizer(text)
+
+        self.packer = ContextPacker(tokenize=counting_tokenizer, n_ctx=100, reserve_tokens=20)
+
+    def test_count_tokens_uses_tokenizer(self):
+        """Counts come from the supplied tokenizer"""
+        self.assertEqual(self.packer.count_tokens("abrir o youtube agora"), 4)
+
+    def test_token_counts_are_cached(self):
+        """Repeated sections are tokenized only once"""
+        for _ in range(5):
+            self.packer.count_tokens("o usuário prefere café")
+        self.assertEqual(len(self.calls), 1)
+        self.assertGreater(self.packer.stats()['hit_rate'], 0.5)
+
+    def test_estimate_without_tokenizer(self):
+        """Falls back to a chars/4 estimate"""
+        packer = ContextPacker()
+        self.assertEqual(packer.count_tokens("a" * 40), 10)
+
+    def test_pack_prefers_high_scores(self):
+        """Highest-scoring items are packed first"""
+        items = [
+            {'kind': 'fact', 'text': "baixo " * 5, 'score': 0.4},
+            {'kind': 'document', 'text': "alto " * 5, 'score': 0.9},
+        ]
+        packed = self.packer.pack(items, budget=7)
+        self.assertEqual(len(packed), 1)
+        self.assertEqual(packed[0]['kind'], 'document')
+
+    def test_pack_skips_oversized_items(self):
+        """A large item that does not fit leaves room for smaller ones"""
+        items = [
+            {'kind': 'document', 'text': "grande " * 50, 'score': 0.9},
+            {'kind': 'fact', 'text': "pequeno fato", 'score': 0.5},
+        ]
+        packed = self.packer.pack(items, budget=10)
+        self.assertEqual([i['kind'] for i in packed], ['fact'])
+
+    def test_budget_accounts_for_skeleton_and_reserve(self):
+        """Budget is n_ctx minus generation reserve minus prompt skeleton"""
+        skeleton = "palavra " * 30
+        self.assertEqual(self.packer.available_budget(skeleton), 100 - 20 - 30)
+
+    def test_render_groups_sections(self):
+        """Rendering groups items under their section titles"""
+        items = [
+            {'kind': 'conversation', 'text': "abrir youtube", 'score': 0.5},
+            {'kind': 'fact', 'text': "nome é Tony", 'score': 0.8},
+            {'kind': 'fact', 'text': "gosta de rock", 'score': 0.7},
+        ]
+        rendered = self.packer.render(items)
+        self.assertEqual(
+            rendered,
+            "Known Facts: nome é Tony | gosta de rock\nPast Context: abrir youtube"
+        )
+
+    def test_build_never_exceeds_budget(self):
+        """Packed context always fits in the window"""
+        items = [{'kind': 'document', 'text': f"trecho {i} " * 8, 'score': 1.0 - i / 100} for i in range(50)]
+        skeleton = "instrução " * 10
+        block = self.packer.build(items, skeleton)
+        self.assertLessEqual(self.packer.count_tokens(block), self.packer.available_budget(skeleton))
+        self.assertIn("trecho 0", block)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Unit Tests for the embedding backends (ONNX pipeline and backend selection)
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+import shutil
+import numpy as np
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import embedding_backend
+from services.embedding_backend import (
+    OnnxEmbeddingBackend, create_embedding_backend, mean_pool, CONFIG_FILE, BACKEND_ENV
+)
+
+
+class FakeTokenizer:
+    """One token per word (id = word length), padded to the longest text"""
+    def __init__(self):
+        self.batches = []
+
+    def encode_batch(self, texts):
+        self.batches.append(list(texts))
+        width = max(len(t.split()) for t in texts)
+        out = []
+        for text in texts:
+            ids = [len(w) for w in text.split()]
+            pad = width - len(ids)
+            out.append(SimpleNamespace(ids=ids + [0] * pad, attention_mask=[1] * len(ids) + [0] * pad,
+                                       type_ids=[0] * width))
+        return out
+
+
+def fake_infer(feeds):
+    """Hidden state per token: [id, 1, 0, 0]; padding tokens get garbage"""
+    ids = feeds['input_ids'].astype(np.float32)
+    hidden = np.zeros(ids.shape + (4,), dtype=np.float32)
+    hidden[..., 0] = ids
+    hidden[..., 1] = 1
+    hidden[feeds['attention_mask'] == 0] = 99
+    return hidden
+
+
+class TestEmbeddingBackend(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.write_config({'dim': 4, 'normalize': True, 'inputs': ['input_ids', 'attention_mask']})
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def write_config(self, config):
+        with open(os.path.join(self.root, CONFIG_FILE), 'w', encoding='utf-8') as f:
+            json.dump(config, f)
+
+    def test_mean_pool_ignores_padding(self):
+        hidden = np.array([[[1, 2], [3, 4], [100, 100]]], dtype=np.float32)
+        mask = np.array([[1, 1, 0]])
+        np.testing.assert_allclose(mean_pool(hidden, mask), [[2, 3]])
+
+    def test_onnx_encode_pools_normalizes_and_keeps_order(self):
+        feeds_seen = []
+
+        def infer(feeds):
+            feeds_seen.append(sorted(feeds))
+            return fake_infer(feeds)
+
+        tokenizer = FakeTokenizer()
+        backend = OnnxEmbeddingBackend(self.root, tokenizer=tokenizer, infer=infer)
+        texts = ["oi", "abrir o navegador agora", "tempo", "tocar uma música"]
+        vectors = backend.encode(texts, batch_size=2)
+
+        self.assertEqual(vectors.shape, (4, 4))
+        np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1, rtol=1e-6)
+        for text, vector in zip(texts, vectors):
+            ids = [len(w) for w in text.split()]
+            expected = np.array([np.mean(ids), 1, 0, 0], dtype=np.float32)
+            np.testing.assert_allclose(vector, expected / np.linalg.norm(expected), rtol=1e-6)
+        # Longest texts are batched together; only the graph's inputs are fed
+        self.assertEqual(tokenizer.batches[0], ["abrir o navegador agora", "tocar uma música"])
+        self.assertEqual(feeds_seen[0], ['attention_mask', 'input_ids'])
+
+    def test_single_string_returns_vector(self):
+        self.write_config({'dim': 4, 'normalize': False})
+        backend = OnnxEmbeddingBackend(self.root, tokenizer=FakeTokenizer(), infer=fake_infer)
+        vector = backend.encode("abrir youtube")
+        self.assertEqual(vector.shape, (4,))
+        np.testing.assert_allclose(vector, [6, 1, 0, 0])
+
+    def test_int8_graph_needs_a_passing_export_check(self):
+        open(os.path.join(self.root, "model_int8.onnx"), 'wb').close()
+        load = lambda **kwargs: OnnxEmbeddingBackend(self.root, tokenizer=FakeTokenizer(), infer=fake_infer, **kwargs)
+        # Not measured (or measured too low): model.onnx unless int8 is asked for
+        self.assertEqual(os.path.basename(load().model_path), "model.onnx")
+        self.assertEqual(os.path.basename(load(int8=True).model_path), "model_int8.onnx")
+        self.write_config({'dim': 4, 'min_cosine': 0.9999, 'min_cosine_int8': 0.991})
+        self.assertEqual(os.path.basename(load().model_path), "model.onnx")
+        with self.assertRaises(ValueError):
+            load(int8=True)
+        self.write_config({'dim': 4, 'min_cosine': 0.9999, 'min_cosine_int8': 0.9993})
+        with patch.object(embedding_backend, '_onnxruntime_available', return_value=True):
+            self.assertEqual(os.path.basename(load().model_path), "model_int8.onnx")
+            # OpenVINO keeps the fp32 graph, it is faster there than the int8 one
+            self.assertEqual(os.path.basename(load(runtime="openvino").model_path), "model.onnx")
+        with patch.object(embedding_backend, '_onnxruntime_available', return_value=False):
+            self.assertEqual(os.path.basename(load().model_path), "model.onnx")
+
+    def test_selection(self):
+        with patch.object(embedding_backend, 'SentenceTransformerBackend',
+                          side_effect=lambda path: SimpleNamespace(name="sentence-transformers")), \
+                patch.object(embedding_backend, 'OnnxEmbeddingBackend') as onnx:
+            onnx.return_value = SimpleNamespace(name="onnx", runtime="openvino", model_path="model.onnx")
+            self.assertEqual(create_embedding_backend("st", "auto", self.root).name, "onnx")
+            self.assertEqual(create_embedding_backend("st", "sentence-transformers", self.root).name,
+                             "sentence-transformers")
+            # No export: auto stays on sentence-transformers
+            empty = os.path.join(self.root, "missing")
+            self.assertEqual(create_embedding_backend("st", "auto", empty).name, "sentence-transformers")
+            # A broken export falls back under auto, but not when ONNX is required
+            onnx.side_effect = RuntimeError("bad graph")
+            self.assertEqual(create_embedding_backend("st", "auto", self.root).name, "sentence-transformers")
+            with self.assertRaises(RuntimeError):
+                create_embedding_backend("st", "onnx", self.root)
+            with patch.dict(os.environ, {BACKEND_ENV: "sentence-transformers"}):
+                self.assertEqual(create_embedding_backend("st", onnx_dir=self.root).name, "sentence-transformers")
+
+        with self.assertRaises(ValueError):
+            create_embedding_backend("st", "tensorflow", self.root)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Unit Tests for the capacity-doubling embedding store
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.embedding_store import EmbeddingStore
+
+
+class TestEmbeddingStore(unittest.TestCase):
+    """Test growth, normalization and batch append"""
+
+    def test_append_normalizes_and_grows(self):
+        store = EmbeddingStore(initial_capacity=2)
+        for i in range(5):
+            self.assertEqual(store.append([3.0, 4.0 + i]), i)
+
+        self.assertEqual(len(store), 5)
+        self.assertEqual(store.capacity, 8)
+        self.assertEqual(store.vectors.shape, (5, 2))
+        np.testing.assert_allclose(store.vectors[0], [0.6, 0.8], rtol=1e-6)
+        np.testing.assert_allclose(np.linalg.norm(store.vectors, axis=1), 1.0, rtol=1e-6)
+
+    def test_growth_copies_are_linear(self):
+        """Total bytes moved while growing stays below twice the data size (not quadratic)"""
+        store = EmbeddingStore(initial_capacity=1)
+        for _ in range(1000):
+            store.append(np.ones(8, dtype=np.float32))
+        self.assertLess(store.copied_bytes, 2 * 1000 * 8 * 4)
+
+    def test_extend_batch(self):
+        store = EmbeddingStore()
+        rows = store.extend(np.array([[2.0, 0.0], [0.0, 0.0], [0.0, 5.0]]))
+
+        self.assertEqual(list(rows), [0, 1, 2])
+        np.testing.assert_allclose(store.vectors, [[1, 0], [0, 0], [0, 1]])
+        self.assertEqual(list(store.extend(np.empty((0, 2)))), [])
+
+    def test_from_array_keeps_or_normalizes(self):
+        raw = np.array([[2.0, 0.0]], dtype=np.float32)
+        np.testing.assert_allclose(EmbeddingStore.from_array(raw).vectors, raw)
+        np.testing.assert_allclose(EmbeddingStore.from_array(raw, normalize=True).vectors, [[1.0, 0.0]])
+        self.assertEqual(len(EmbeddingStore.from_array([])), 0)
+
+    def test_dimension_mismatch(self):
+        store = EmbeddingStore()
+        store.append([1.0, 0.0])
+        with self.assertRaises(ValueError):
+            store.append([1.0, 0.0, 0.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
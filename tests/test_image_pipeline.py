@@ -0,0 +1,81 @@
+"""
+Unit Tests for the VLM image preprocessing pipeline
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+
+from PIL import Image, ImageDraw
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.image_pipeline import ImagePipeline
+
+
+def make_screen(color=(20, 40, 60), box=(100, 100, 600, 400), size=(1920, 1080)):
+    """Synthetic 'screenshot' with a bright window on a dark background"""
+    img = Image.new("RGB", size, color)
+    ImageDraw.Draw(img).rectangle(box, fill=(230, 230, 230))
+    return img
+
+
+class TestImagePipeline(unittest.TestCase):
+    """Test downscaling, hashing and payload caching"""
+
+    def setUp(self):
+        self.pipeline = ImagePipeline(target_size=336)
+
+    def test_downscales_to_projector_resolution(self):
+        """Longest side is reduced to the projector resolution, aspect kept"""
+        prepared = self.pipeline.prepare(make_screen())
+        self.assertEqual(max(prepared.size), 336)
+        self.assertEqual(prepared.size, (336, 189))
+        self.assertTrue(prepared.data_uri.startswith("data:image/jpeg;base64,"))
+
+    def test_same_screen_hits_cache(self):
+        """Repeated analysis of the same screen reuses the payload"""
+        first = self.pipeline.prepare(make_screen())
+        second = self.pipeline.prepare(make_screen())
+
+        self.assertFalse(first.cache_hit)
+        self.assertTrue(second.cache_hit)
+        self.assertEqual(first.data_uri, second.data_uri)
+        self.assertEqual(self.pipeline.stats()['hits'], 1)
+
+    def test_near_identical_screen_hits_cache(self):
+        """A few changed pixels (e.g. cursor blink) do not invalidate the cache"""
+        self.pipeline.prepare(make_screen())
+        noisy = make_screen()
+        noisy.putpixel((5, 5), (255, 255, 255))
+        self.assertTrue(self.pipeline.prepare(noisy).cache_hit)
+
+    def test_different_screen_misses_cache(self):
+        """A visibly different screen is re-encoded"""
+        self.pipeline.prepare(make_screen())
+        other = self.pipeline.prepare(make_screen(box=(1200, 600, 1900, 1050)))
+        self.assertFalse(other.cache_hit)
+
+    def test_accepts_file_path(self):
+        """Legacy callers passing a PNG path still work"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "shot.png")
+            make_screen().save(path)
+            prepared = self.pipeline.prepare(path)
+        self.assertEqual(max(prepared.size), 336)
+
+    def test_cache_is_bounded(self):
+        """Least recently used entries are evicted"""
+        pipeline = ImagePipeline(cache_size=2, max_hamming_distance=0)
+        for x in (0, 600, 1200):
+            pipeline.prepare(make_screen(box=(x, 0, x + 500, 300)))
+        self.assertEqual(pipeline.stats()['cached_images'], 2)
+
+    def test_hamming_distance(self):
+        self.assertEqual(ImagePipeline.hamming_distance(0b1011, 0b0001), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Unit Tests for the brain indexer's startup reconciliation scan
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.indexer_service import BrainIndexerService
+from services.ingestion_pipeline import scan_files
+
+
+class FakeMemoryService:
+    def __init__(self):
+        self.manifest = {}
+        self.removed = []
+        self.embedder = None
+
+    def document_manifest(self):
+        return dict(self.manifest)
+
+    def ingest_document(self, path):
+        raise AssertionError("reconcile must not ingest")
+
+    def remove_documents(self, paths):
+        for path in paths:
+            self.removed.append(path)
+            self.manifest.pop(path, None)
+
+
+class TestStartupReconciliation(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.watched = os.path.join(self.root, "Documents")
+        os.makedirs(os.path.join(self.watched, "sub"))
+        self.memory = FakeMemoryService()
+        self.indexer = BrainIndexerService(self.memory, watch_paths=[self.watched])
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def write(self, relative, text="conteúdo"):
+        path = os.path.join(self.watched, relative)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def remember(self, path):
+        st = os.stat(path)
+        self.memory.manifest[path] = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size,
+                                      'chunks': 1, 'done': True, 'hash': "x"}
+
+    def queued(self):
+        return sorted(self.indexer.queue._pending)
+
+    def test_queues_only_new_and_changed_files(self):
+        unchanged = self.write("a.md")
+        changed = self.write("sub/b.txt")
+        self.remember(unchanged)
+        self.remember(changed)
+        self.write("sub/b.txt", "conteúdo maior")
+        new = self.write("sub/c.py", "print()")
+        self.write("ignored.bin", "x")
+        self.write("relatorio.pdf", "%PDF-1.7")  # Not text: would be skipped, then re-queued every start
+
+        result = self.indexer.reconcile()
+        self.assertEqual(self.queued(), sorted([changed, new]))
+        self.assertEqual((result['files'], result['queued'], result['deleted']), (3, 2, 0))
+
+    def test_purges_deleted_files_under_watched_roots_only(self):
+        gone = os.path.join(self.watched, "apagado.md")
+        elsewhere = os.path.join(self.root, "documents_ingeridos", "manual.md")
+        self.memory.manifest[gone] = {'mtime_ns': 1, 'size': 1, 'chunks': 1, 'done': True, 'hash': "x"}
+        self.memory.manifest[elsewhere] = dict(self.memory.manifest[gone])
+
+        self.indexer.reconcile()
+        self.assertEqual(self.memory.removed, [gone])
+        self.assertEqual(self.queued(), [])
+
+    def test_unfinished_files_are_queued_again(self):
+        path = self.write("a.md")
+        self.remember(path)
+        self.memory.manifest[path]['done'] = False
+        self.indexer.reconcile()
+        self.assertEqual(self.queued(), [path])
+
+    def test_indexed_file_that_turns_binary_is_removed(self):
+        path = self.write("notas.txt")
+        self.remember(path)
+        with open(path, 'wb') as f:
+            f.write(b"\x00\x01 agora binario")
+        self.indexer.queue.debounce = 0
+        self.indexer.reconcile()
+        self.indexer.queue.run_pending()
+
+        self.assertEqual(self.memory.removed, [path])
+        self.assertNotIn(path, self.memory.manifest)
+        # Later passes only probe it again: nothing is left to remove
+        self.indexer.reconcile()
+        self.indexer.queue.run_pending()
+        self.assertEqual(self.memory.removed, [path])
+
+    def test_scan_files_reports_mtime_ns_and_size(self):
+        path = self.write("sub/x.md", "12345")
+        found = list(scan_files([self.watched], {'.md'}))
+        self.assertEqual(found, [(path, os.stat(path).st_mtime_ns, 5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Unit Tests for the debounced, coalescing brain-indexer queue
+"""
+
+import unittest
+import sys
+import os
+import time
+import tempfile
+import shutil
+import threading
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.indexing_queue import IndexingQueue
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestIndexingQueue(unittest.TestCase):
+    """Test debounce, coalescing, filters and re-queueing"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.clock = FakeClock()
+        self.processed = []
+        self.removed = []
+        self.queue = IndexingQueue(self.processed.append, remove=lambda paths: self.removed.extend(paths),
+                                   debounce=2.0, max_file_bytes=1000, clock=self.clock)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def file(self, name, data=b"texto"):
+        path = os.path.join(self.root, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_burst_is_coalesced_after_quiet_period(self):
+        path = self.file("nota.md")
+        for _ in range(3):  # created + modified + modified
+            self.queue.submit(path)
+            self.clock.now += 1.0
+        self.queue.run_pending()
+        self.assertEqual(self.processed, [])  # Last event was only 1s ago
+
+        self.clock.now += 1.5
+        self.queue.run_pending()
+        self.assertEqual(self.processed, [path])
+        stats = self.queue.stats()
+        self.assertEqual((stats['events'], stats['coalesced'], stats['processed'], stats['queued']), (3, 2, 1, 0))
+
+    def test_deleted_files_are_removed(self):
+        path = self.file("velho.txt")
+        self.queue.submit(path)
+        os.remove(path)
+        self.queue.submit(path, deleted=True)
+        self.clock.now += 3
+        self.queue.run_pending()
+        self.assertEqual((self.processed, self.removed), ([], [path]))
+
+    def test_binary_and_oversized_files_are_skipped(self):
+        self.queue.submit(self.file("foto.txt", b"\x89PNG\x00\x00data"))
+        self.queue.submit(self.file("log.txt", b"a" * 2000))
+        self.clock.now += 3
+        self.queue.run_pending()
+        self.assertEqual(self.processed, [])
+        self.assertEqual(self.queue.stats()['skipped'], 2)
+        self.assertEqual(self.removed, [])
+
+    def test_indexed_file_that_turns_binary_is_removed(self):
+        """Its old chunks are tombstoned instead of staying live behind a skip"""
+        indexed = self.file("nota.txt", b"\x89PNG\x00\x00data")
+        self.queue.indexed = lambda path: path == indexed
+        self.queue.submit(indexed)
+        self.queue.submit(self.file("foto.txt", b"\x89PNG\x00\x00data"))
+        self.clock.now += 3
+        self.queue.run_pending()
+        self.assertEqual((self.processed, self.removed), ([], [indexed]))
+        self.assertEqual(self.queue.stats()['skipped'], 2)
+
+    def test_event_during_ingestion_requeues_once(self):
+        path = self.file("nota.md")
+        def process(p):
+            self.processed.append(p)
+            if len(self.processed) == 1:
+                self.queue.submit(p)  # Saved again while being ingested
+        self.queue.process = process
+        self.queue.submit(path)
+        self.clock.now += 3
+        self.queue.run_pending()
+        self.assertEqual(len(self.processed), 1)
+        self.assertEqual(len(self.queue), 1)
+        self.clock.now += 3
+        self.queue.run_pending()
+        self.assertEqual(len(self.processed), 2)
+
+    def test_worker_threads(self):
+        done = threading.Event()
+        seen = []
+        def process(p):
+            seen.append((p, threading.current_thread().name))
+            done.set()
+        queue = IndexingQueue(process, debounce=0.05)
+        queue.start()
+        try:
+            path = self.file("a.txt")
+            queue.submit(path)
+            queue.submit(path)
+            self.assertTrue(done.wait(2.0))
+            time.sleep(0.1)
+            self.assertEqual(len(seen), 1)
+            self.assertTrue(seen[0][1].startswith("indexer"))
+            self.assertGreater(queue.stats()['files_per_min'], 0)
+        finally:
+            queue.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
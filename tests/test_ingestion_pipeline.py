@@ -0,0 +1,200 @@
+"""
+Unit Tests for the batched, resumable document ingestion pipeline
+"""
+
+import unittest
+import sys
+import os
+import io
+import random
+import tempfile
+import shutil
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.memory_store import MemoryStore
+from services.ingestion_pipeline import IngestionPipeline, iter_chunks, discover
+
+
+def paragraph_text(lines, seed=0):
+    rng = random.Random(seed)
+    words = ["memória", "jarvis", "documento", "busca", "vetor", "arquivo", "texto", "modelo"]
+    return "".join(" ".join(rng.choice(words) for _ in range(rng.randint(3, 12))) + "\n" for _ in range(lines))
+
+
+class FakeEncoder:
+    """Deterministic embeddings; records encoded texts and can fail on a given call"""
+
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.texts = []
+        self.fail_on = fail_on
+
+    def __call__(self, texts):
+        self.calls.append(len(texts))
+        if self.fail_on is not None and len(self.calls) == self.fail_on:
+            raise RuntimeError("encoder crashed")
+        self.texts.extend(texts)
+        return np.array([[len(t) % 7 + 1, t.count('a') + 1, 1.0] for t in texts], dtype=np.float32)
+
+
+class TestChunking(unittest.TestCase):
+    def chunks(self, text):
+        return [c for _, c in iter_chunks(io.StringIO(text), 800, 200)]
+
+    def test_chunks_cover_text_within_size(self):
+        text = paragraph_text(400) + "x" * 3000 + "\n" + paragraph_text(50, seed=1)
+        chunks = self.chunks(text)
+        self.assertTrue(all(len(c) <= 800 for c in chunks))
+        bodies, tail = [], ""
+        for chunk in chunks:
+            body = chunk[len(tail):]
+            bodies.append(body)
+            tail = body[-200:]
+        self.assertEqual("".join(bodies), text)
+        self.assertEqual(self.chunks(""), [])
+
+    def test_edit_changes_only_nearby_chunks(self):
+        lines = paragraph_text(600).splitlines(keepends=True)
+        before = self.chunks("".join(lines))
+        lines.insert(300, "uma linha nova inserida no meio do arquivo\n")
+        after = self.chunks("".join(lines))
+        self.assertGreater(len(before), 30)
+        self.assertLessEqual(len(set(after) - set(before)), 3)
+
+    def test_discover_filters_extensions_in_directories(self):
+        root = tempfile.mkdtemp()
+        try:
+            for name in ("a.txt", "b.md", "c.bin"):
+                open(os.path.join(root, name), 'w').close()
+            names = sorted(os.path.basename(p) for p, _, _ in discover([root]))
+            self.assertEqual(names, ["a.txt", "b.md"])
+            self.assertEqual(len(discover([os.path.join(root, "c.bin")])), 1)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+class TestIngestionPipeline(unittest.TestCase):
+    """Test batching, replace-by-source, the embedding cache, resume and skipping"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.docs_dir = os.path.join(self.root, "docs")
+        os.makedirs(self.docs_dir)
+        for i in range(6):
+            self.write(f"doc{i}.txt", paragraph_text(40 * (i + 1), seed=i))
+        self.write("empty.md", "")
+        self.store = MemoryStore(os.path.join(self.root, "db"))
+        self.docs = self.store.collection("documents")
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def write(self, name, text):
+        path = os.path.join(self.docs_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        # Make sure the manifest sees a new mtime even on coarse filesystem clocks
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        return path
+
+    def run_pipeline(self, encoder, workers=0, batch_size=8):
+        return IngestionPipeline(self.docs, encoder, batch_size=batch_size, workers=workers).run([self.docs_dir])
+
+    def live_keys(self):
+        return [(self.docs[r]['path'], self.docs[r]['hash'])
+                for r in range(len(self.docs)) if r not in self.docs._dead]
+
+    def test_batches_and_bulk_appends(self):
+        encoder = FakeEncoder()
+        progress = self.run_pipeline(encoder)
+        self.assertEqual(len(self.docs), progress.chunks)
+        self.assertEqual(progress.encoded, len(set(encoder.texts)))
+        self.assertTrue(all(n <= 8 for n in encoder.calls))
+        self.assertEqual(progress.files_done, 7)
+        self.assertEqual(progress.percent, 100.0)
+        self.assertEqual(self.docs[0]['source'], "doc0.txt")
+
+    def test_process_pool_gives_same_rows(self):
+        self.run_pipeline(FakeEncoder(), workers=2)
+        pooled = sorted(self.live_keys())
+        self.store.close()
+        shutil.rmtree(os.path.join(self.root, "db"))
+        self.store = MemoryStore(os.path.join(self.root, "db"))
+        self.docs = self.store.collection("documents")
+        self.run_pipeline(FakeEncoder(), workers=0)
+        self.assertEqual(sorted(self.live_keys()), pooled)
+
+    def test_modified_file_reembeds_only_changed_chunks(self):
+        original = paragraph_text(400, seed=9)
+        path = self.write("notes.md", original)
+        self.run_pipeline(FakeEncoder())
+        rows_before = len(self.docs)
+
+        lines = original.splitlines(keepends=True)
+        lines[200] = "linha editada pelo usuário com conteúdo novo\n"
+        self.write("notes.md", "".join(lines))
+        encoder = FakeEncoder()
+        progress = self.run_pipeline(encoder)
+        self.assertEqual(progress.files_total, 1)
+        self.assertLessEqual(progress.encoded, 3)
+        self.assertGreater(progress.kept, 20)
+        self.assertEqual(progress.tombstoned, progress.chunks)
+        self.assertEqual(len(self.docs), rows_before + progress.chunks)
+        keys = self.live_keys()
+        self.assertEqual(len(keys), len(set(keys)))
+
+        # Stale rows are hidden from search
+        for row in self.docs._dead:
+            rows, _ = self.docs.search(self.docs.take(np.array([row]))[0], len(self.docs))
+            self.assertNotIn(row, rows.tolist())
+
+        # Reverting the edit re-uses the cached embeddings
+        self.write("notes.md", original)
+        encoder = FakeEncoder()
+        progress = self.run_pipeline(encoder)
+        self.assertEqual(encoder.texts, [])
+        self.assertEqual(progress.cache_hits, progress.chunks)
+
+        self.assertGreater(IngestionPipeline(self.docs, FakeEncoder()).remove([path]), 0)
+        self.assertNotIn(path, [p for p, _ in self.live_keys()])
+        self.assertNotIn(path, self.store.file_manifest("documents"))
+
+    def test_touched_file_updates_manifest_without_reading_chunks(self):
+        self.run_pipeline(FakeEncoder())
+        path = os.path.join(self.docs_dir, "doc3.txt")
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        self.write("doc3.txt", text)  # Re-saved with identical content
+
+        encoder = FakeEncoder()
+        progress = self.run_pipeline(encoder)
+        self.assertEqual((progress.files_touched, progress.files_total, encoder.calls), (1, 0, []))
+        saved = self.store.file_manifest("documents")[path]
+        self.assertEqual(saved['mtime_ns'], os.stat(path).st_mtime_ns)
+        self.assertEqual(self.run_pipeline(FakeEncoder()).files_skipped, 7)
+
+    def test_resume_after_crash_and_skip_unchanged(self):
+        crashed = FakeEncoder(fail_on=3)
+        with self.assertRaises(RuntimeError):
+            self.run_pipeline(crashed)
+        self.assertEqual(len(self.docs), 16)
+
+        encoder = FakeEncoder()
+        self.run_pipeline(encoder)
+        keys = self.live_keys()
+        self.assertEqual(len(keys), len(set(keys)))                  # Nothing ingested twice
+        self.assertFalse(set(crashed.texts) & set(encoder.texts))   # ...or embedded twice
+
+        # A third run finds every file unchanged
+        encoder = FakeEncoder()
+        progress = self.run_pipeline(encoder)
+        self.assertEqual((progress.files_total, progress.files_skipped, encoder.calls), (0, 7, []))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+Unit Tests for the BM25 inverted index and hybrid (vector + keyword) retrieval
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+import shutil
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.memory_store import MemoryStore, ManifestUpdate
+from services.lexical_index import fold, stem, tokenize, reciprocal_rank_fusion, FTS5_AVAILABLE
+
+
+class TestTokenizer(unittest.TestCase):
+    def test_folds_accents_and_case(self):
+        self.assertEqual(fold("Informação São JOÃO"), "informacao sao joao")
+        self.assertEqual(tokenize("Ação"), tokenize("acao"))
+
+    def test_drops_stopwords_and_stems_plurals(self):
+        self.assertEqual(tokenize("os arquivos de configuração"), ["arquivo", "configuracao"])
+        self.assertEqual(stem("acoes"), "acao")
+        self.assertEqual(stem("papeis"), "papel")
+        self.assertEqual(stem("onibus"), "onibus")
+
+    def test_keeps_identifiers_whole_and_split(self):
+        terms = tokenize("Erro ERR-1042 em config.py (user_id)")
+        for term in ("err-1042", "err", "1042", "config.py", "config", "py", "user_id", "user", "id"):
+            self.assertIn(term, terms)
+
+    def test_reciprocal_rank_fusion(self):
+        fused = reciprocal_rank_fusion([[1, 2, 3], [3, 4]], k=60)
+        self.assertAlmostEqual(fused[3], 1 / 63 + 1 / 61)
+        self.assertEqual(max(fused, key=fused.get), 3)
+        self.assertNotIn(5, fused)
+
+
+@unittest.skipUnless(FTS5_AVAILABLE, "SQLite built without FTS5")
+class TestLexicalCollection(unittest.TestCase):
+    """Test the FTS5-backed index kept alongside each collection's metadata"""
+
+    DOCS = [
+        "O servidor caiu com o erro ERR-1042 ontem",
+        "Reunião com a Conceição sobre o orçamento",
+        "Ajuste o timeout em config.py para 30 segundos",
+        "Receitas de bolo de cenoura",
+    ]
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = MemoryStore(self.root)
+        self.vectors = np.eye(len(self.DOCS), 8, dtype=np.float32)
+
+    def tearDown(self):
+        if not self.store.closed:
+            self.store.close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def fill(self):
+        collection = self.store.collection("facts")
+        collection.extend([{'document': d} for d in self.DOCS], self.vectors)
+        return collection
+
+    def test_keyword_search(self):
+        collection = self.fill()
+        rows, scores = collection.lexical_search("qual foi o ERR-1042?", 3)
+        self.assertEqual(rows[0], 0)
+        rows, _ = collection.lexical_search("conceicao", 3)   # accents folded on both sides
+        self.assertEqual(rows.tolist(), [1])
+        rows, _ = collection.lexical_search("config.py", 3)
+        self.assertEqual(rows.tolist(), [2])
+        self.assertEqual(len(collection.lexical_search("de o que", 3)[0]), 0)  # stopwords only
+
+    def test_tombstoned_rows_never_match(self):
+        collection = self.fill()
+        collection.commit_manifest(ManifestUpdate(tombstones=[0]))
+        self.assertEqual(len(collection.lexical_search("ERR-1042", 3)[0]), 0)
+
+    def test_hybrid_surfaces_exact_identifier(self):
+        collection = self.fill()
+        # The query vector points at the cake recipe; the identifier only matches lexically
+        rows, scores, similarities = collection.hybrid_search(self.vectors[3], "config.py", 2, threshold=0.5)
+        self.assertEqual(set(rows.tolist()), {2, 3})
+        self.assertAlmostEqual(float(similarities[rows.tolist().index(2)]), 0.0)
+        # Rank 1 in both rankings is normalized to 1.0
+        rows, scores, _ = collection.hybrid_search(self.vectors[2], "config.py", 2, threshold=0.5)
+        self.assertEqual(rows[0], 2)
+        self.assertAlmostEqual(float(scores[0]), 1.0, places=5)
+
+    def test_interactions_index_only_what_was_said(self):
+        conversations = self.store.collection("conversations")
+        turns = [("abrir o spotify", "Abrindo o Spotify"), ("que horas são", "São 10h"),
+                 ("tocar jazz", "Tocando jazz"), ("como está o tempo", "Ensolarado")]
+        conversations.extend([{'type': "interaction", 'user_text': q, 'ai_response': a,
+                               'document': f"User asked: '{q}'. Jarvis responded: '{a}'."} for q, a in turns],
+                             self.vectors)
+        self.assertEqual(len(conversations.lexical_search("jarvis", 4)[0]), 0)
+        self.assertEqual(conversations.lexical_search("spotify", 4)[0].tolist(), [0])
+
+    def test_common_words_do_not_fuse_below_threshold(self):
+        collection = self.store.collection("facts")
+        collection.extend([{'document': f"{d} jarvis"} for d in self.DOCS], self.vectors)
+        # "jarvis" is in every row: its BM25 is ~0 and unrelated rows stay out
+        rows, _, _ = collection.hybrid_search(self.vectors[3], "jarvis", 4, threshold=0.5)
+        self.assertEqual(rows.tolist(), [3])
+        rows, _, _ = collection.hybrid_search(self.vectors[3], "jarvis config.py", 4, threshold=0.5)
+        self.assertEqual(set(rows.tolist()), {2, 3})
+
+    def test_older_index_is_rebuilt_on_open(self):
+        conversations = self.store.collection("conversations")
+        conversations.append({'type': "interaction", 'user_text': "oi", 'ai_response': "olá",
+                              'document': "User asked: 'oi'. Jarvis responded: 'olá'."}, self.vectors[0])
+        # An index written by the template-based document_text()
+        self.store.db.execute("UPDATE lexical_conversations SET terms = 'user asked oi jarvis responded ola'")
+        self.store.db.commit()
+        self.store.close()
+        with open(self.store.manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        del manifest['collections']["conversations"]['lexical']  # Manifests from before the version
+        with open(self.store.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+
+        self.store = MemoryStore(self.root)
+        conversations = self.store.collection("conversations")
+        self.assertEqual(len(conversations.lexical_search("jarvis", 3)[0]), 0)
+        self.assertEqual(conversations.lexical_search("oi", 3)[0].tolist(), [0])
+
+    def test_index_survives_restart_and_catches_up(self):
+        self.fill()
+        self.store.db.execute("DELETE FROM lexical_facts WHERE rowid >= 2")  # index older than the rows
+        self.store.db.commit()
+        self.store.close()
+
+        self.store = MemoryStore(self.root)
+        collection = self.store.collection("facts")
+        self.assertEqual(collection.lexical_search("cenoura", 3)[0].tolist(), [3])
+        collection.append({'document': "nova nota sobre cenoura"}, np.ones(8, dtype=np.float32))
+        self.assertEqual(sorted(collection.lexical_search("cenoura", 3)[0].tolist()), [3, 4])
+
+    def test_recovery_drops_index_rows_without_vectors(self):
+        collection = self.fill()
+        collection.close()
+        self.store._delete_rows_from("facts", 3)
+        self.assertEqual(len(collection.lexical_search("cenoura", 3)[0]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
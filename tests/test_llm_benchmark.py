@@ -0,0 +1,96 @@
+"""
+Unit Tests for the LLM benchmark harness
+"""
+
+import unittest
+import asyncio
+import sys
+import os
+import csv
+import json
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.llm_benchmark import FakeLlama, run_benchmark, percentile, build_processor, main, CORPUS
+from nlp_processor import NLPProcessor, ProcessingMode
+from conversation_manager import ConversationContext, IntentType
+
+
+class TestLLMBenchmark(unittest.TestCase):
+    """Run the harness end to end against the fake backend"""
+
+    def run_fake(self, **kwargs):
+        processor = NLPProcessor(llm=FakeLlama(**kwargs))
+        return asyncio.run(run_benchmark(processor, repeats=1, warmup=0, label="test"))
+
+    def test_collects_metrics_for_every_sample(self):
+        report = self.run_fake()
+        summary = report.summary()
+
+        self.assertEqual(summary['samples'], len(CORPUS))
+        self.assertGreater(summary['llm_calls'], 0)
+        self.assertIsNotNone(summary['ttft_ms']['p50'])
+        self.assertIsNotNone(summary['latency_ms']['p99'])
+        self.assertEqual(summary['json_valid_rate'], 1.0)
+        self.assertEqual(summary['intent_accuracy'], 1.0)
+
+    def test_invalid_json_is_detected(self):
+        """Truncated generations lower the JSON-validity rate"""
+        summary = self.run_fake(invalid_json_every=2).summary()
+        self.assertLess(summary['json_valid_rate'], 1.0)
+
+    def test_backend_is_restored(self):
+        """The timing proxy is removed after the run"""
+        llm = FakeLlama()
+        processor = NLPProcessor(llm=llm)
+        asyncio.run(run_benchmark(processor, corpus=CORPUS[:2], warmup=0))
+        self.assertIs(processor.ai_engine.llm, llm)
+
+    def test_writes_json_and_csv(self):
+        report = self.run_fake()
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, "out.json")
+            csv_path = os.path.join(tmp, "out.csv")
+            report.write_json(json_path)
+            report.write_csv(csv_path)
+
+            with open(json_path, encoding='utf-8') as f:
+                data = json.load(f)
+            with open(csv_path, encoding='utf-8', newline='') as f:
+                rows = list(csv.DictReader(f))
+
+        self.assertEqual(data['summary']['label'], "test")
+        self.assertEqual(len(data['samples']), len(CORPUS))
+        self.assertEqual(len(rows), len(CORPUS))
+        self.assertIn('ttft_ms', rows[0])
+
+    def test_prompt_budget_follows_small_n_ctx(self):
+        """With --n-ctx 384 retrieved memory is packed for 384 tokens, not the processor's 2048"""
+        processor = build_processor(FakeLlama(n_ctx=384), 384)
+        self.assertEqual((processor.ai_engine.n_ctx, processor.ai_engine.context_packer.n_ctx), (384, 384))
+        context = ConversationContext()
+        context.retrieved_context = [{'kind': 'fact', 'text': f"fato {i} sobre a automação da casa do usuário",
+                                      'score': 0.9 - i / 1000} for i in range(200)]
+        result = asyncio.run(processor.process_text("o que é um buraco negro", IntentType.CONVERSATIONAL_QUERY,
+                                                    context, mode=ProcessingMode.DETAILED))
+        self.assertEqual(result.response_suggestion, "Resposta simulada para o que é um buraco negro.")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, "out.json")
+            main(['--fake', '--n-ctx', '384', '--repeats', '1', '--fake-decode-ms', '0', '--json', json_path])
+            with open(json_path, encoding='utf-8') as f:
+                summary = json.load(f)['summary']
+        self.assertEqual(summary['config']['n_ctx'], 384)
+        self.assertEqual(summary['json_valid_rate'], 1.0)
+
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertIsNone(percentile([], 95))
+
+
+if __name__ == '__main__':
+    unittest.main()
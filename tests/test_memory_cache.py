@@ -0,0 +1,101 @@
+"""
+Unit Tests for the query embedding LRU and the retrieval result cache
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.memory_cache import LRUCache, EmbeddingCache, ResultCache, normalize_text
+from services.memory_store import MemoryStore
+from services.memory_service import MemoryService
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        out = np.zeros((len(texts), 4), dtype=np.float32)
+        for i, text in enumerate(texts):
+            out[i, sum(map(ord, text.lower())) % 4] = 1.0
+        return out
+
+
+class TestCaches(unittest.TestCase):
+    def test_lru_evicts_least_recent(self):
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats()['hits'], 2)
+        self.assertEqual(cache.stats()['hit_rate'], round(2 / 3, 3))
+
+    def test_embedding_cache_normalizes_and_batches_misses(self):
+        embedder = CountingEmbedder()
+        cache = EmbeddingCache(maxsize=10)
+        self.assertEqual(normalize_text("  Abrir   YouTube "), "abrir youtube")
+        first = cache.encode(["abrir youtube", "tocar música"], embedder.encode)
+        second = cache.encode(["Abrir  YouTube", "tocar música", "que horas são"], embedder.encode)
+        self.assertEqual(embedder.calls, [["abrir youtube", "tocar música"], ["que horas são"]])
+        np.testing.assert_array_equal(first, second[:2])
+        with self.assertRaises(ValueError):
+            cache.cache.get("abrir youtube")[0] = 5.0  # cached vectors are read-only
+
+    def test_result_cache_generation_and_ttl(self):
+        now = [0.0]
+        cache = ResultCache(ttl=10, clock=lambda: now[0])
+        cache.put("q", 1, ["item"])
+        self.assertEqual(cache.get("q", 1), ["item"])
+        self.assertIsNone(cache.get("q", 2))      # store changed
+        cache.put("q", 2, ["item"])
+        now[0] = 11.0
+        self.assertIsNone(cache.get("q", 2))      # expired
+        self.assertEqual(cache.stats()['misses'], 2)
+
+
+class TestServiceCaching(unittest.TestCase):
+    """Repeated queries skip the embedder and the search until the store is written"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.service = MemoryService(db_path=self.root)
+        self.service.embedder = CountingEmbedder()
+
+    def tearDown(self):
+        MemoryStore.open(self.root).close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_repeated_query_hits_both_caches(self):
+        service = self.service
+        service.store_fact("gosto de café")
+        first = service.retrieve_scored_context("gosto de café", threshold=0.5)
+        first[0]['text'] = "mutated by a caller"
+        calls = len(service.embedder.calls)
+        again = service.retrieve_scored_context("Gosto de  café", threshold=0.5)
+        self.assertEqual(len(service.embedder.calls), calls)
+        self.assertEqual(again[0]['text'], "gosto de café")
+        self.assertEqual(service.cache_stats()['results']['hits'], 1)
+        self.assertEqual(service.cache_stats()['embeddings']['hits'], 1)  # first query reused the fact's vector
+
+    def test_write_invalidates_results(self):
+        service = self.service
+        service.store_fact("gosto de café")
+        self.assertEqual(len(service.retrieve_scored_context("café", threshold=-1)), 1)
+        service.store_fact("café sem açúcar")
+        texts = [i['text'] for i in service.retrieve_scored_context("café", threshold=-1)]
+        self.assertIn("café sem açúcar", texts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+Unit Tests for conversation retention (TTL expiry, deduplication, summary compaction)
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.memory_store import MemoryStore
+from services.memory_retention import (
+    RetentionEngine, RetentionPolicy, turn_time, digest_turns, merge_digests, summarize_digest,
+    cluster_rows, DAY, SUMMARY_CATEGORY
+)
+
+NOW = 1_700_000_000.0
+
+
+def unit(x):
+    x = np.asarray(x, dtype=np.float32)
+    return x / np.linalg.norm(x, axis=-1, keepdims=True)
+
+
+def turn(text, intent, days_ago, answer="ok"):
+    return {'type': "interaction", 'intent': intent, 'timestamp': str(NOW - days_ago * DAY),
+            'user_text': text, 'ai_response': answer, 'document': f"User asked: '{text}'. Jarvis responded: '{answer}'."}
+
+
+class TestRetentionHelpers(unittest.TestCase):
+    def test_turn_time(self):
+        self.assertEqual(turn_time({'timestamp': "1700000000.5"}), 1700000000.5)
+        self.assertIsNotNone(turn_time({'timestamp': "2024-05-01T10:00:00"}))
+        self.assertIsNone(turn_time({'timestamp': "ontem"}))
+        self.assertIsNone(turn_time({}))
+
+    def test_digest_merge_and_summary(self):
+        old = digest_turns([turn("previsão do tempo", 'INFORMATION_QUERY', 40, "sol"),
+                            turn("previsão do tempo", 'INFORMATION_QUERY', 39, "chuva")])
+        new = digest_turns([turn("vai chover amanhã?", 'INFORMATION_QUERY', 31, "não")])
+        merged = merge_digests(old, new)
+        self.assertEqual(merged['turns'], 3)
+        self.assertEqual(merged['asked'], {"previsão do tempo": 2, "vai chover amanhã?": 1})
+        self.assertEqual(merged['answer'], "não")
+        self.assertEqual((merged['first'], merged['last']), (old['first'], new['last']))
+        text = summarize_digest(merged)
+        self.assertTrue(text.startswith("Summary of 3 past conversations"))
+        self.assertIn("'previsão do tempo' x2", text)
+        self.assertIn("Latest answer: 'não'", text)
+
+    def test_cluster_rows(self):
+        vectors = unit([[1, 0, 0], [0.95, 0.1, 0], [0, 1, 0], [0.9, 0, 0.1], [0, 0.97, 0.1]])
+        self.assertEqual(cluster_rows(vectors, 0.8), [[0, 1, 3], [2, 4]])
+
+
+class TestRetentionEngine(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = MemoryStore(self.root)
+        self.conversations = self.store.collection("conversations")
+        self.facts = self.store.collection("facts")
+        self.rng = np.random.default_rng(0)
+        self.topics = unit(self.rng.standard_normal((4, 16)))
+
+    def tearDown(self):
+        if not self.store.closed:
+            self.store.close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def near(self, topic, noise):
+        return unit(self.topics[topic] + self.rng.standard_normal(16) * noise / 4)
+
+    def engine(self, **policy):
+        return RetentionEngine(self.conversations, self.facts, policy=RetentionPolicy(**policy), clock=lambda: NOW)
+
+    def documents(self):
+        snapshot = self.conversations.snapshot()
+        live = [r for r in range(snapshot.rows) if r not in snapshot.dead]
+        return [m['user_text'] for m in self.conversations.get_many(live, snapshot)]
+
+    def test_expires_by_intent_and_age(self):
+        self.conversations.extend([
+            turn("abrir youtube", 'DIRECT_COMMAND', 20),
+            turn("que horas são", 'TIME_QUERY', 2),
+            turn("o que é entropia", 'INFORMATION_QUERY', 20),
+            turn("abrir spotify", 'DIRECT_COMMAND', 3),
+        ], np.stack([self.near(i, 0.1) for i in range(4)]))
+        engine = self.engine(vacuum_ratio=1.0)
+        self.assertTrue(engine.run_pass())
+        self.assertEqual(self.documents(), ["o que é entropia", "abrir spotify"])
+        self.assertEqual(engine.stats()['expired'], 2)
+
+    def test_keeps_newest_of_near_duplicates(self):
+        texts = ["tocar jazz", "tocar jazz", "tocar jazz", "me conte uma piada"]
+        self.conversations.extend([turn(t, 'CONVERSATIONAL_QUERY', 5 - i) for i, t in enumerate(texts)],
+                                  np.stack([self.near(0, 0.01), self.near(0, 0.01), self.near(0, 0.01),
+                                            self.near(1, 0.01)]))
+        engine = self.engine(vacuum_ratio=1.0)
+        engine.run_pass()
+        self.assertEqual(self.conversations.snapshot().dead, frozenset({0, 1}))
+        self.assertEqual(engine.stats()['duplicates'], 2)
+
+    def test_old_clusters_become_one_summary(self):
+        # Noise keeps them apart from duplicates while in the same topic
+        metadatas = [turn(f"pergunta sobre python {i}", 'INFORMATION_QUERY', 60 - i) for i in range(4)]
+        metadatas.append(turn("lembrete da consulta", 'CONVERSATIONAL_QUERY', 50))
+        vectors = [self.near(2, 0.3) for _ in range(4)] + [self.near(3, 0.3)]
+        self.conversations.extend(metadatas, np.stack(vectors))
+
+        engine = self.engine(duplicate_similarity=0.999, cluster_similarity=0.7)
+        self.assertTrue(engine.run_pass())
+        self.assertEqual(len(self.facts), 1)
+        summary = self.facts[0]
+        self.assertEqual((summary['category'], summary['turns']), (SUMMARY_CATEGORY, 4))
+        self.assertIn("'pergunta sobre python 0'", summary['document'])
+        # The pass vacuumed the folded turns away
+        self.assertEqual(len(self.conversations), 1)
+        self.assertEqual(self.documents(), ["lembrete da consulta"])
+
+        # A later cluster on the same topic extends the existing summary
+        self.conversations.extend([turn(f"mais python {i}", 'INFORMATION_QUERY', 35) for i in range(3)],
+                                  np.stack([self.near(2, 0.3) for _ in range(3)]))
+        engine.run_pass()
+        self.assertEqual(self.facts.live_count, 1)
+        self.assertEqual(engine.stats()['merged'], 1)
+        live = [r for r in range(len(self.facts)) if r not in self.facts.snapshot().dead]
+        self.assertEqual(self.facts[live[0]]['turns'], 7)
+
+    def test_steps_are_incremental_and_stop_at_recent_turns(self):
+        self.conversations.extend([turn(f"abrir app {i}", 'DIRECT_COMMAND', 30) for i in range(5)]
+                                  + [turn("abrir app recente", 'DIRECT_COMMAND', 0)],
+                                  np.stack([self.near(i % 4, 0.5) for i in range(6)]))
+        engine = self.engine(batch=2, vacuum_ratio=1.0)
+        self.assertFalse(engine.step())
+        self.assertEqual(self.conversations.snapshot().dead, frozenset({0, 1}))
+        self.assertFalse(engine.run_pass(max_steps=1))
+        self.assertTrue(engine.run_pass())
+        self.assertEqual(self.documents(), ["abrir app recente"])
+        self.assertEqual(engine.stats()['scanned'], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,248 @@
+"""
+Unit Tests for the append-only, memory-mapped MemoryService persistence
+"""
+
+import unittest
+import sys
+import os
+import pickle
+import tempfile
+import shutil
+import numpy as np
+from unittest.mock import patch, MagicMock
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import memory_store
+from services.memory_store import MemoryStore
+from services.memory_service import MemoryService
+
+
+def vec(*values):
+    return np.array(values, dtype=np.float32)
+
+
+class TestMemoryStore(unittest.TestCase):
+    """Test appends, reload, sealing, compaction and crash recovery"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = MemoryStore(self.root)
+
+    def tearDown(self):
+        if not self.store.closed:
+            self.store.close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def reopen(self):
+        self.store.close()
+        self.store = MemoryStore(self.root)
+        return self.store.collection("facts")
+
+    def test_append_and_reload(self):
+        facts = self.store.collection("facts")
+        facts.append({'document': "gosto de café"}, vec(3, 4))
+        facts.extend([{'document': "a"}, {'document': "b"}], np.eye(2, dtype=np.float32))
+
+        facts = self.reopen()
+        self.assertEqual(len(facts), 3)
+        self.assertEqual(facts[0]['document'], "gosto de café")
+        np.testing.assert_allclose(facts.vectors[0], [0.6, 0.8], rtol=1e-6)
+        np.testing.assert_allclose(facts.similarities(vec(1, 0)), [0.6, 1.0, 0.0], rtol=1e-6)
+        self.assertTrue(facts.contains_document("b"))
+        self.assertFalse(facts.contains_document("c"))
+
+    def test_write_touches_only_new_bytes(self):
+        facts = self.store.collection("facts")
+        facts.append({'document': "a"}, vec(1, 0))
+        size = os.path.getsize(facts.tail_path)
+        facts.append({'document': "b"}, vec(0, 1))
+        self.assertEqual(os.path.getsize(facts.tail_path) - size, 2 * 4)
+
+    def test_sealed_segments_are_mmapped_and_compacted(self):
+        with patch.object(memory_store, 'SEGMENT_ROWS', 4), patch.object(memory_store, 'MAX_SEGMENTS', 2):
+            facts = self.store.collection("facts")
+            for i in range(13):
+                facts.append({'document': str(i)}, vec(1, i))
+
+            # 3 seals -> compaction into one segment, one row left in the tail
+            self.assertEqual(len(facts.segment_files), 1)
+            self.assertEqual(facts.segment_files[0]['rows'], 12)
+            self.assertIsInstance(facts._segments[0], np.memmap)
+
+            facts = self.reopen()
+            self.assertEqual(len(facts), 13)
+            self.assertEqual(facts[12]['document'], "12")
+            self.assertEqual(sorted(os.listdir(facts.dir)), sorted([facts.segment_files[0]['file'], "tail_12.f32"]))
+
+    def test_search_batch_matches_brute_force(self):
+        """Blocked argpartition scan across segments and tail, several queries, tombstones skipped"""
+        rng = np.random.default_rng(0)
+        data = rng.standard_normal((150, 8)).astype(np.float32)
+        data /= np.linalg.norm(data, axis=1, keepdims=True)
+        with patch.object(memory_store, 'SEGMENT_ROWS', 64), patch.object(memory_store, 'SEARCH_BLOCK', 20):
+            facts = self.store.collection("facts")
+            facts.extend([{'document': str(i)} for i in range(150)], data)
+            facts.commit_manifest(memory_store.ManifestUpdate(tombstones=[3, 77, 149]))
+            queries = data[[3, 10, 140]]
+            results = facts.search_batch(queries, 5)
+
+        scores = data @ queries.T
+        scores[[3, 77, 149]] = -np.inf
+        for j, (rows, row_scores) in enumerate(results):
+            np.testing.assert_array_equal(rows, np.argsort(-scores[:, j])[:5])
+            np.testing.assert_allclose(row_scores, np.sort(scores[:, j])[::-1][:5], rtol=1e-5)
+            np.testing.assert_array_equal(facts.search(queries[j], 5)[0], rows)
+        self.assertNotIn(3, results[0][0])
+
+    def test_crash_leftovers_are_dropped(self):
+        """A vector written without its metadata, a torn row and temp files are discarded on load"""
+        facts = self.store.collection("facts")
+        facts.append({'document': "a"}, vec(1, 0))
+        facts.close()
+        with open(facts.tail_path, 'ab') as f:
+            f.write(vec(0, 1).tobytes() + b"\x00\x00")  # orphan vector + torn row
+        open(os.path.join(facts.dir, "seg_000009.npy.tmp"), 'wb').close()
+
+        facts = self.reopen()
+        self.assertEqual(len(facts), 1)
+        self.assertEqual(os.path.getsize(facts.tail_path), 2 * 4)
+        self.assertEqual(os.listdir(facts.dir), ["tail_0.f32"])
+
+    def test_vacuum_drops_tombstoned_rows(self):
+        with patch.object(memory_store, 'SEGMENT_ROWS', 4):
+            docs = self.store.collection("documents")
+            manifest = memory_store.ManifestUpdate(files=[("a.txt", 1, 10, 10, True, "h")])
+            docs.extend([{'document': f"trecho {i}", 'path': "a.txt", 'hash': f"c{i}"} for i in range(10)],
+                        np.array([vec(1, i) for i in range(10)]), manifest)
+            docs.commit_manifest(memory_store.ManifestUpdate(tombstones=[0, 1, 2, 5, 9]))
+            old = docs.snapshot()
+
+            self.assertEqual(docs.vacuum(), 5)
+            self.assertEqual((len(docs), docs.live_count, docs.key), (5, 5, "documents__1"))
+            self.assertEqual([d['document'] for d in docs.get_many(range(5))],
+                             ["trecho 3", "trecho 4", "trecho 6", "trecho 7", "trecho 8"])
+            self.assertEqual(docs.search(vec(1, 4) / np.linalg.norm(vec(1, 4)), 1)[0].tolist(), [1])
+            self.assertEqual(docs.lexical_search("trecho", 10)[0].tolist(), [0, 1, 2, 3, 4])
+            self.assertEqual(self.store.live_chunks(docs.key, "a.txt"), {'c3': [0], 'c4': [1], 'c6': [2], 'c7': [3], 'c8': [4]})
+            self.assertTrue(self.store.file_manifest(docs.key)["a.txt"]['done'])
+            # A reader holding the old snapshot still sees the old numbering
+            rows, _ = docs.search(vec(1, 4) / np.linalg.norm(vec(1, 4)), 1, old)
+            self.assertEqual(docs.get_many(rows, old)[0]['document'], "trecho 4")
+            self.assertEqual(docs.vacuum(), 0)
+
+        docs.append({'document': "novo"}, vec(0, 1))
+        self.store.close()
+        self.store = MemoryStore(self.root)
+        docs = self.store.collection("documents")
+        self.assertEqual(len(docs), 6)
+        self.assertEqual(docs[5]['document'], "novo")
+        keys = {k for (k,) in self.store.db.execute("SELECT DISTINCT collection FROM items")}
+        self.assertEqual(keys, {"documents__1"})
+
+    def test_relations(self):
+        self.assertTrue(self.store.add_relation("Steve Jobs", "fundador de", "Apple"))
+        self.assertFalse(self.store.add_relation("Steve Jobs", "fundador de", "Apple"))
+        self.assertEqual(self.store.load_relations(), {"Steve Jobs": {"fundador de": ["Apple"]}})
+
+
+class FakeEmbedder:
+    def encode(self, text):
+        if isinstance(text, list):
+            return np.stack([self.encode(t) for t in text])
+        v = np.zeros(4, dtype=np.float32)
+        v[sum(map(ord, text)) % 4] = 2.0
+        return v
+
+
+class BatchEmbedder(FakeEmbedder):
+    """Accepts the sentence-transformers keyword arguments used by ingestion"""
+    def encode(self, text, **kwargs):
+        return super().encode(text)
+
+
+class TestMemoryServicePersistence(unittest.TestCase):
+    """MemoryService on top of the store, including migration of the old pickles"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        MemoryStore.open(self.root).close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def service(self):
+        service = MemoryService(db_path=self.root)
+        service.embedder = FakeEmbedder()
+        return service
+
+    def test_migrates_legacy_pickles(self):
+        with open(os.path.join(self.root, "facts.pkl"), 'wb') as f:
+            pickle.dump({'docs': [{'type': 'fact', 'document': "sou o tony"}],
+                         'embeddings': np.array([[0.0, 5.0, 0.0, 0.0]])}, f)
+        with open(os.path.join(self.root, "docs_rag.pkl"), 'wb') as f:
+            pickle.dump({'documents': [], 'embeddings': [], 'knowledge_graph': {"tony": {"dono de": ["stark"]}}}, f)
+
+        service = self.service()
+
+        self.assertEqual(len(service.facts), 1)
+        np.testing.assert_allclose(service.facts.vectors[0], [0, 1, 0, 0])
+        self.assertEqual(service.query_relations("tony"), {"dono de": ["stark"]})
+        self.assertTrue(os.path.exists(os.path.join(self.root, "facts.pkl.migrated")))
+
+    def test_store_and_retrieve_survive_restart(self):
+        service = self.service()
+        service.store_fact("gosto de café")
+        service.store_fact("gosto de café")  # duplicate ignored
+        service.store_interaction("oi", "olá", "GREETING", "1")
+        service.store.close()
+
+        service = self.service()
+        self.assertEqual(len(service.facts), 1)
+        items = service.retrieve_scored_context("gosto de café", threshold=0.5)
+        self.assertEqual([i['text'] for i in items if i['kind'] == 'fact'], ["gosto de café"])
+
+    def test_batch_retrieval_matches_single_queries(self):
+        service = self.service()
+        for fact in ("gosto de café", "moro em lisboa", "meu cachorro é o rex", "trabalho com python"):
+            service.store_fact(fact)
+        queries = ["gosto de café", "onde eu moro", "python"]
+        batch = service.retrieve_scored_context_batch(queries, threshold=0.5)
+        self.assertEqual(batch, [service.retrieve_scored_context(q, threshold=0.5) for q in queries])
+        self.assertIn("trabalho com python", [i['text'] for i in batch[2]])
+
+    def test_user_requested_ingestion_is_not_gated(self):
+        """Batches of an ingestion the user asked for never wait on the scheduler"""
+        folder = os.path.join(self.root, "docs")
+        os.makedirs(folder)
+        with open(os.path.join(folder, "a.txt"), 'w', encoding='utf-8') as f:
+            f.write("o relatório trimestral fala de vendas\n")
+        service = self.service()
+        service.embedder = BatchEmbedder()
+        service.scheduler = MagicMock()
+
+        service.ingest_directory(folder, background=False)
+        service.scheduler.admit_blocking.assert_not_called()
+        self.assertGreater(service.documents.live_count, 0)
+
+        with open(os.path.join(folder, "b.txt"), 'w', encoding='utf-8') as f:
+            f.write("a reunião ficou para sexta\n")
+        service.ingest_directory(folder)
+        service.scheduler.admit_blocking.assert_called()
+
+    def test_documents_are_vacuumed_between_ingestions(self):
+        service = self.service()
+        service.documents.extend([{'document': f"trecho {i}", 'path': "a.txt"} for i in range(10)],
+                                 np.eye(4, dtype=np.float32)[np.arange(10) % 4])
+        service.documents.commit_manifest(memory_store.ManifestUpdate(tombstones=list(range(6))))
+
+        with service._document_writer():
+            self.assertEqual(service.vacuum_documents(), 0)  # An ingestion holds the row numbers
+        self.assertEqual(service.vacuum_documents(), 6)
+        self.assertEqual((len(service.documents), service.documents.live_count), (4, 4))
+        self.assertEqual(service.vacuum_documents(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Unit Tests for int8 / float16 quantized embedding storage
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+import numpy as np
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import memory_store
+from services.memory_store import MemoryStore
+from services.embedding_store import normalize_rows, quantize, code_scores
+from services.ann_index import top_k
+
+
+def embeddings(n, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    return normalize_rows(rng.standard_normal((n, dim)).astype(np.float32)).astype(np.float32)
+
+
+class TestQuantize(unittest.TestCase):
+    def test_scores_close_to_float32(self):
+        data, query = embeddings(2000), embeddings(1, seed=1)[0]
+        exact = data @ query
+        for mode, tolerance in (("int8", 0.02), ("float16", 0.002)):
+            codes, scales = quantize(data, mode)
+            self.assertEqual(codes.dtype, np.int8 if mode == "int8" else np.float16)
+            approx = code_scores(codes, scales, query, block=300)
+            self.assertLess(np.abs(approx - exact).max(), tolerance, mode)
+
+    def test_zero_vector_and_unknown_mode(self):
+        codes, scales = quantize(np.zeros((1, 4), dtype=np.float32), "int8")
+        self.assertFalse(codes.any())
+        self.assertTrue(np.isfinite(scales).all())
+        with self.assertRaises(ValueError):
+            quantize(np.zeros((1, 4)), "int4")
+
+
+class TestQuantizedCollection(unittest.TestCase):
+    """Test code files, quantized search with re-scoring and mode switches"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = MemoryStore(self.root)
+        self.data = embeddings(200)
+
+    def tearDown(self):
+        if not self.store.closed:
+            self.store.close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def fill(self, docs):
+        with patch.object(memory_store, 'SEGMENT_ROWS', 64), patch.object(memory_store, 'MAX_SEGMENTS', 100):
+            for start in range(0, len(self.data), 64):
+                docs.extend([{'document': str(i)} for i in range(start, start + 64)][:len(self.data) - start],
+                            self.data[start:start + 64])
+
+    def code_files(self, docs):
+        return sorted(f for f in os.listdir(docs.dir) if f.count(".") == 2)
+
+    def test_search_matches_float32_and_persists_codes(self):
+        docs = self.store.collection("documents", quantization="int8")
+        self.fill(docs)
+        self.assertEqual(len(self.code_files(docs)), 6)  # codes + scales for 3 sealed segments
+        self.assertEqual(docs.nbytes_codes, 192 * (64 + 4))
+
+        for query in embeddings(20, seed=3):
+            rows, scores = docs.search(query, 5)
+            exact = top_k(self.data @ query, 5)
+            np.testing.assert_array_equal(rows, exact)
+            np.testing.assert_allclose(scores, (self.data @ query)[exact], rtol=1e-5)
+
+        self.store.close()
+        self.store = MemoryStore(self.root)
+        docs = self.store.collection("documents")
+        self.assertEqual(docs.quantization, "int8")
+        self.assertEqual(docs.search(self.data[150], 1)[0][0], 150)
+
+    def test_switching_modes_rebuilds_and_cleans_code_files(self):
+        docs = self.store.collection("documents")
+        self.fill(docs)
+        self.assertEqual(self.code_files(docs), [])
+
+        docs.set_quantization("float16")
+        self.assertEqual(len(self.code_files(docs)), 3)
+        self.assertEqual(docs.search(self.data[10], 1)[0][0], 10)
+
+        docs.set_quantization(None)
+        self.assertEqual(self.code_files(docs), [])
+
+    def test_compaction_keeps_codes(self):
+        docs = self.store.collection("documents", quantization="int8")
+        self.fill(docs)
+        docs.compact()
+        self.assertEqual(len(self.code_files(docs)), 2)
+        self.assertEqual(docs.search(self.data[70], 1)[0][0], 70)
+
+    @patch.object(memory_store, 'ANN_THRESHOLD', 100)
+    @patch('services.ann_index.HNSWLIB_AVAILABLE', False)
+    def test_ivf_candidates_are_scored_on_codes(self):
+        """Above the threshold the index reads decoded codes and only the pool is re-read in float32"""
+        docs = self.store.collection("documents", quantization="int8")
+        self.fill(docs)
+        self.assertEqual(docs.index.kind, "ivf")
+        with patch.object(docs, 'take', wraps=docs.take) as take, \
+                patch.object(docs, 'take_approximate', wraps=docs.take_approximate) as approximate:
+            results = docs.search_batch(embeddings(10, seed=4), 5)
+        approximate.assert_called()
+        self.assertTrue(all(len(call.args[0]) <= 5 * docs.rescore_factor for call in take.call_args_list))
+
+        for query, (rows, scores) in zip(embeddings(10, seed=4), results):
+            self.assertEqual(len(rows), 5)
+            np.testing.assert_allclose(scores, self.data[rows] @ query, rtol=1e-5)
+            self.assertTrue(np.all(np.diff(scores) <= 0))
+        # Sealed rows decode close to float32, tail rows have no codes and come back exact
+        decoded = docs.take_approximate(np.arange(180, 200))
+        self.assertLess(np.abs(decoded[:12] - self.data[180:192]).max(), 0.01)
+        np.testing.assert_allclose(decoded[12:], self.data[192:200], rtol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Unit Tests for cross-source request de-duplication
+"""
+
+import unittest
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.request_admission import RequestAdmission, normalize_command
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRequestAdmission(unittest.TestCase):
+    """Test normalization, merging and result fan-out"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.admission = RequestAdmission(window=1.5, clock=self.clock)
+
+    def test_normalize(self):
+        self.assertEqual(normalize_command("  Abrir o YouTube, por favor! "), "abrir o youtube por favor")
+        self.assertEqual(normalize_command("Música"), normalize_command("musica"))
+
+    def test_near_duplicates_merge_into_inflight_ticket(self):
+        first = self.admission.admit("tocar música no spotify", "voice")
+        second = self.admission.admit("tocar musica no spotfy", "voice")
+
+        self.assertFalse(first.merged)
+        self.assertTrue(second.merged)
+        self.assertIs(second.ticket, first.ticket)
+        self.assertEqual(first.ticket.sources, ["voice", "voice"])
+
+    def test_different_numbers_never_merge(self):
+        self.admission.admit("aumentar o volume para 20", "voice")
+        self.assertFalse(self.admission.admit("aumentar o volume para 30", "voice").merged)
+
+    def test_negations_and_different_words_never_merge(self):
+        """Close strings that mean something else stay separate tickets"""
+        self.admission.admit("desligar o computador", "voice")
+        self.assertFalse(self.admission.admit("não desligar o computador", "voice").merged)
+        self.admission.admit("ligar a luz da sala", "voice")
+        self.assertFalse(self.admission.admit("desligar a luz da sala", "voice").merged)
+        self.admission.admit("abrir o chrome", "voice")
+        self.assertFalse(self.admission.admit("fechar o chrome", "voice").merged)
+
+    def test_merged_requesters_hear_about_cancellation(self):
+        cancelled, results = [], []
+        first = self.admission.admit("o que é entropia", "voice", on_cancel=lambda r: cancelled.append(("voice", r)))
+        self.admission.admit("o que e entropia", "telegram", on_result=results.append,
+                             on_cancel=lambda r: cancelled.append(("telegram", r)))
+
+        self.admission.complete(first.ticket, reason="barge_in")
+
+        self.assertEqual(cancelled, [("voice", "barge_in"), ("telegram", "barge_in")])
+        self.assertEqual(results, [])
+
+    def test_result_is_delivered_to_every_requester(self):
+        received = []
+        first = self.admission.admit("que horas são", "voice", on_result=lambda r: received.append(("voice", r)))
+        self.admission.admit("que horas sao?", "telegram", on_result=lambda r: received.append(("telegram", r)))
+
+        self.admission.complete(first.ticket, "10:30")
+        self.admission.complete(first.ticket, "ignored")  # idempotent
+
+        self.assertEqual(received, [("voice", "10:30"), ("telegram", "10:30")])
+
+    def test_window_after_completion(self):
+        """Late duplicates inside the window get the cached result, later repeats run again"""
+        received = []
+        first = self.admission.admit("abrir chrome", "voice")
+        self.admission.complete(first.ticket, "ok")
+
+        self.clock.now += 1.0
+        late = self.admission.admit("abrir chrome", "workflow", on_result=received.append)
+        self.assertTrue(late.merged)
+        self.assertEqual(received, ["ok"])
+
+        self.clock.now += 2.0
+        self.assertFalse(self.admission.admit("abrir chrome", "voice").merged)
+
+    def test_cancelled_ticket_is_forgotten(self):
+        """A command repeated after its first attempt was cancelled is processed again"""
+        first = self.admission.admit("o que é um buraco negro", "voice")
+        self.admission.complete(first.ticket)
+        self.assertFalse(self.admission.admit("o que é um buraco negro", "voice").merged)
+
+    def test_stats(self):
+        first = self.admission.admit("abrir chrome", "voice")
+        self.admission.admit("abrir chrome", "voice")
+        self.admission.complete(first.ticket, "ok")
+        self.admission.admit("abrir chrome", "telegram")
+
+        stats = self.admission.stats()
+        self.assertEqual(stats['admitted'], 1)
+        self.assertEqual(stats['merged_inflight'], 1)
+        self.assertEqual(stats['dropped_recent'], 1)
+        self.assertEqual(stats['dropped'], 2)
+        self.assertEqual(stats['dropped_by_source'], {'voice': 1, 'telegram': 1})
+        self.assertEqual(self.admission.in_flight(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
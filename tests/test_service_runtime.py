@@ -0,0 +1,178 @@
+"""
+Unit Tests for the shared background service runtime
+"""
+
+import unittest
+import asyncio
+import sys
+import os
+import time
+import threading
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import service_runtime
+from services.service_runtime import ServiceRuntime, ServiceEntry
+
+
+def burn(seconds):
+    """Busy-loop for roughly `seconds` of CPU"""
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+
+class TestServiceRuntime(unittest.TestCase):
+    """Test lifecycle, work submission and CPU accounting"""
+
+    def setUp(self):
+        self.runtime = ServiceRuntime(cpu_workers=2, io_workers=2)
+
+    def tearDown(self):
+        self.runtime.stop()
+
+    def start(self):
+        self.runtime.start()
+        deadline = time.time() + 2
+        while not self.runtime.running and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_services_share_one_loop(self):
+        """All services run on the runtime loop"""
+        loops = []
+
+        async def service():
+            loops.append(asyncio.get_running_loop())
+            await asyncio.sleep(10)
+
+        self.runtime.register("a", service)
+        self.runtime.register("b", service)
+        self.start()
+        time.sleep(0.1)
+
+        self.assertEqual(len(loops), 2)
+        self.assertIs(loops[0], loops[1])
+        self.assertEqual(self.runtime.health()['a']['state'], "running")
+
+    def test_cpu_accounting_per_service(self):
+        """A busy service is charged more CPU than an idle one, including child tasks and pool jobs"""
+        async def busy():
+            burn(0.05)
+            await asyncio.create_task(asyncio.sleep(0))  # child task inherits the service
+            await asyncio.get_running_loop().create_task(self._child_burn())
+            await self.runtime.run_cpu(burn, 0.05)
+            await asyncio.sleep(10)
+
+        async def idle():
+            await asyncio.sleep(10)
+
+        self.runtime.register("busy", busy)
+        self.runtime.register("idle", idle)
+        self.start()
+        time.sleep(0.5)
+
+        report = {row['service']: row for row in self.runtime.cpu_report()}
+        self.assertGreaterEqual(report['busy']['cpu_s'], 0.14)
+        self.assertLess(report['idle']['cpu_s'], 0.02)
+        self.assertEqual(report['busy']['pool_jobs'], 1)
+        self.assertEqual(self.runtime.cpu_report()[0]['service'], "busy")
+
+    async def _child_burn(self):
+        burn(0.05)
+
+    def test_stop_hooks_and_clean_shutdown(self):
+        """Sync and async stop hooks run, tasks are cancelled and the loop closes"""
+        calls = []
+
+        async def service():
+            await asyncio.sleep(10)
+
+        async def async_stop():
+            calls.append("async")
+
+        self.runtime.register("sync", service, stop=lambda: calls.append("sync"))
+        self.runtime.register("async", service, stop=async_stop)
+        self.start()
+        time.sleep(0.05)
+        self.runtime.stop()
+
+        self.assertEqual(sorted(calls), ["async", "sync"])
+        self.assertTrue(self.runtime.loop.is_closed())
+        self.assertEqual(self.runtime.health()['sync']['state'], "stopped")
+
+    def test_crashed_service_is_reported(self):
+        """A failing service does not take the runtime down"""
+        async def broken():
+            raise RuntimeError("boom")
+
+        async def healthy():
+            await asyncio.sleep(10)
+
+        self.runtime.register("broken", broken)
+        self.runtime.register("healthy", healthy, health=lambda: "ok")
+        self.start()
+        time.sleep(0.1)
+
+        health = self.runtime.health()
+        self.assertEqual(health['broken']['state'], "crashed")
+        self.assertIn("boom", health['broken']['error'])
+        self.assertEqual(health['healthy']['health'], "ok")
+
+    def test_submit_from_other_thread(self):
+        """Coroutines can be scheduled from any thread"""
+        self.start()
+
+        async def compute():
+            return await self.runtime.run_io(lambda: 21 * 2)
+
+        self.assertEqual(self.runtime.submit(compute()).result(timeout=2), 42)
+
+    def test_module_helpers_use_the_calling_services_pools(self):
+        """Code inside a service reaches the runtime pools without holding a reference to it"""
+        threads = []
+
+        def where():
+            threads.append(threading.current_thread().name)
+            burn(0.02)
+
+        async def service():
+            await service_runtime.run_cpu(where)
+            await service_runtime.run_io(where)
+            await asyncio.sleep(10)
+
+        self.runtime.register("memory", service)
+        self.start()
+        time.sleep(0.3)
+
+        self.assertTrue(threads[0].startswith("jarvis-cpu"))
+        self.assertTrue(threads[1].startswith("jarvis-io"))
+        report = {row['service']: row for row in self.runtime.cpu_report()}
+        self.assertEqual(report['memory']['pool_jobs'], 2)
+        # Outside a runtime the helpers fall back to a worker thread
+        self.assertEqual(asyncio.run(service_runtime.run_cpu(lambda: 7)), 7)
+
+    def test_concurrent_charges_are_not_lost(self):
+        entry = ServiceEntry(name="x", start=None)
+
+        def charge():
+            for _ in range(20000):
+                entry.charge(0.001, pool_job=True)
+
+        workers = [threading.Thread(target=charge) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        cpu_seconds, pool_jobs = entry.usage()
+        self.assertEqual(pool_jobs, 80000)
+        self.assertAlmostEqual(cpu_seconds, 80.0, places=6)
+
+    def test_duplicate_registration_rejected(self):
+        self.runtime.register("a", lambda: asyncio.sleep(0))
+        with self.assertRaises(ValueError):
+            self.runtime.register("a", lambda: asyncio.sleep(0))
+
+
+if __name__ == '__main__':
+    unittest.main()
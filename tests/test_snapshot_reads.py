@@ -0,0 +1,117 @@
+"""
+Unit Tests for lock-free snapshot reads of the memory store during writes
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+import threading
+import numpy as np
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import memory_store
+from services.memory_store import MemoryStore, ManifestUpdate
+
+
+def unit_rows(n, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    data = rng.standard_normal((n, dim)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+class TestSnapshotReads(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = MemoryStore(self.root)
+        self.facts = self.store.collection("facts")
+        self.data = unit_rows(400)
+
+    def tearDown(self):
+        if not self.store.closed:
+            self.store.close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_snapshot_is_immutable(self):
+        self.facts.extend([{'document': f"nota {i}"} for i in range(10)], self.data[:10])
+        snapshot = self.facts.snapshot()
+        self.facts.extend([{'document': f"nota {i}"} for i in range(10, 20)], self.data[10:20])
+        self.facts.commit_manifest(ManifestUpdate(tombstones=[0]))
+
+        self.assertEqual(snapshot.rows, 10)
+        self.assertEqual(snapshot.dead, frozenset())
+        rows, _ = self.facts.search(self.data[15], 20, snapshot)
+        self.assertTrue((rows < 10).all())
+        self.assertIn(0, rows)
+        # Keyword hits are clipped to the snapshot's rows; tombstones come from the database
+        self.assertEqual(len(self.facts.lexical_search("nota", 50, snapshot)[0]), 9)
+        self.assertEqual(self.facts.snapshot().rows, 20)
+        self.assertNotIn(0, self.facts.search(self.data[0], 20)[0])
+
+    def test_reads_do_not_wait_for_the_store_lock(self):
+        self.facts.extend([{'document': f"nota {i}"} for i in range(10)], self.data[:10])
+        held, release = threading.Event(), threading.Event()
+
+        def writer():
+            with self.store.lock:  # e.g. a long compaction or index build
+                held.set()
+                release.wait(10)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        held.wait(5)
+        try:
+            done = []
+            reader = threading.Thread(target=lambda: done.append((
+                self.facts.search(self.data[3], 2)[0][0],
+                self.facts.get_many([3])[0]['document'],
+                self.facts.lexical_search("nota", 3)[0].tolist(),
+            )))
+            reader.start()
+            reader.join(5)
+            self.assertEqual(len(done), 1, "read blocked behind the writer")
+            self.assertEqual(done[0][:2], (3, "nota 3"))
+        finally:
+            release.set()
+            thread.join()
+
+    def test_concurrent_ingest_and_retrieval(self):
+        errors, reads = [], [0]
+        finished = threading.Event()
+
+        def ingest():
+            try:
+                for start in range(0, len(self.data), 20):
+                    self.facts.extend([{'document': str(i)} for i in range(start, start + 20)],
+                                      self.data[start:start + 20])
+            finally:
+                finished.set()
+
+        def retrieve():
+            # Every row a snapshot returns has its vector and its committed metadata
+            while not finished.is_set() or reads[0] == 0:
+                snapshot = self.facts.snapshot()
+                for rows, _ in self.facts.search_batch(self.data[:3], 5, snapshot):
+                    docs = self.facts.get_many(rows)
+                    if [d['document'] for d in docs] != [str(r) for r in rows]:
+                        errors.append(rows)
+                reads[0] += 1
+
+        with patch.object(memory_store, 'SEGMENT_ROWS', 64), patch.object(memory_store, 'MAX_SEGMENTS', 2):
+            threads = [threading.Thread(target=ingest), threading.Thread(target=retrieve)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(30)
+
+        self.assertEqual(errors, [])
+        self.assertGreater(reads[0], 0)
+        self.assertEqual(self.facts.search(self.data[399], 1)[0][0], 399)
+
+
+if __name__ == '__main__':
+    unittest.main()
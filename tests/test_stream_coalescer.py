@@ -0,0 +1,81 @@
+"""
+Unit Tests for the token stream coalescer
+"""
+
+import unittest
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.stream_coalescer import TokenStreamCoalescer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenStreamCoalescer(unittest.TestCase):
+    """Test batching of streamed tokens"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.emitted = []
+        self.coalescer = TokenStreamCoalescer(self.emitted.append, interval=0.033, clock=self.clock)
+
+    def test_tokens_within_frame_are_buffered(self):
+        """Tokens inside one frame interval produce no emission"""
+        for token in ["Abr", "indo", " o", " You"]:
+            self.coalescer.push(token)
+        self.assertEqual(self.emitted, [])
+
+        self.coalescer.flush()
+        self.assertEqual(self.emitted, ["Abrindo o You"])
+
+    def test_flush_after_interval(self):
+        """A token arriving after the frame interval flushes the buffer"""
+        self.coalescer.push("Olá")
+        self.clock.now = 0.05
+        self.coalescer.push(" senhor")
+        self.assertEqual(self.emitted, ["Olá senhor"])
+
+    def test_sentence_boundary_flushes(self):
+        """Sentence punctuation flushes immediately"""
+        self.coalescer.push("Pronto")
+        self.coalescer.push(".")
+        self.assertEqual(self.emitted, ["Pronto."])
+
+    def test_no_text_lost(self):
+        """Concatenated output equals concatenated input"""
+        tokens = [f"tok{i} " for i in range(200)]
+        for i, token in enumerate(tokens):
+            self.clock.now = i * 0.005
+            self.coalescer.push(token)
+        self.coalescer.flush()
+
+        self.assertEqual("".join(self.emitted), "".join(tokens))
+        # 200 tokens at 5ms spacing -> roughly one flush per 7 tokens
+        self.assertLess(len(self.emitted), 40)
+        self.assertEqual(self.coalescer.stats()['tokens_received'], 200)
+
+    def test_empty_flush_emits_nothing(self):
+        """Flushing an empty buffer is a no-op"""
+        self.coalescer.flush()
+        self.coalescer.push("")
+        self.assertEqual(self.emitted, [])
+
+    def test_reset_discards_buffer(self):
+        """Reset drops pending tokens"""
+        self.coalescer.push("descartar")
+        self.coalescer.reset()
+        self.coalescer.flush()
+        self.assertEqual(self.emitted, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Unit Tests for per-turn latency tracing
+"""
+
+import unittest
+import asyncio
+import sys
+import os
+import json
+import time
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.tracing import Tracer, _NULL_SPAN
+
+
+class TestTracer(unittest.TestCase):
+    """Test span recording, propagation and export"""
+
+    def setUp(self):
+        self.tracer = Tracer(enabled=True)
+
+    def test_disabled_tracer_is_noop(self):
+        """Disabled tracing returns a shared no-op span and records nothing"""
+        tracer = Tracer(enabled=False)
+        self.assertIsNone(tracer.start_turn())
+        self.assertIs(tracer.span("llm.generate"), _NULL_SPAN)
+        with tracer.span("llm.generate") as span:
+            span.set(tokens=3)
+        tracer.record("stt.final", 0.0, 1.0)
+        self.assertEqual(tracer.spans(), [])
+
+    def test_span_records_duration_and_attributes(self):
+        turn = self.tracer.start_turn("text")
+        with self.tracer.span("ai.rag", turn, k=5) as span:
+            time.sleep(0.01)
+            span.set(hits=2)
+
+        [recorded] = self.tracer.spans(turn)
+        self.assertEqual(recorded['name'], "ai.rag")
+        self.assertGreaterEqual(recorded['dur_ms'], 9)
+        self.assertEqual(recorded['attrs'], {'k': 5, 'hits': 2})
+
+    def test_turn_propagates_through_context_and_threads(self):
+        """Spans opened under use_turn (including asyncio.to_thread work) inherit the turn"""
+        turn = self.tracer.start_turn("voice")
+
+        async def pipeline():
+            with self.tracer.use_turn(turn):
+                with self.tracer.span("ai.route"):
+                    pass
+                await asyncio.to_thread(lambda: self.tracer.span("llm.generate").__enter__().__exit__(None, None, None))
+
+        asyncio.run(pipeline())
+        self.assertEqual([s['name'] for s in self.tracer.spans(turn)], ["ai.route", "llm.generate"])
+        self.assertIsNone(self.tracer.current_turn())
+
+    def test_finish_turn_records_end_to_end_span(self):
+        turn = self.tracer.start_turn("voice")
+        self.assertEqual(self.tracer.active_turn, turn)
+        self.tracer.finish_turn(turn)
+        self.tracer.finish_turn(turn)  # second call is ignored
+
+        turns = [s for s in self.tracer.spans(turn) if s['name'] == "turn"]
+        self.assertEqual(len(turns), 1)
+        self.assertEqual(turns[0]['attrs']['source'], "voice")
+
+    def test_rolling_summary(self):
+        for ms in range(1, 101):
+            self.tracer.record("stt.final", 0.0, ms / 1000)
+        summary = self.tracer.summary()['stt.final']
+        self.assertEqual(summary['count'], 100)
+        self.assertAlmostEqual(summary['p50_ms'], 50, places=1)
+        self.assertAlmostEqual(summary['p95_ms'], 95, places=1)
+
+    def test_exports(self):
+        turn = self.tracer.start_turn()
+        with self.tracer.span("tts.synthesis", turn):
+            pass
+
+        with tempfile.TemporaryDirectory() as tmp:
+            chrome_path = os.path.join(tmp, "trace.json")
+            jsonl_path = os.path.join(tmp, "trace.jsonl")
+            self.tracer.export_chrome(chrome_path)
+            self.tracer.export_jsonl(jsonl_path)
+
+            with open(chrome_path, encoding='utf-8') as f:
+                chrome = json.load(f)
+            with open(jsonl_path, encoding='utf-8') as f:
+                lines = [json.loads(line) for line in f]
+
+        complete = [e for e in chrome['traceEvents'] if e['ph'] == 'X']
+        self.assertEqual(complete[0]['name'], "tts.synthesis")
+        self.assertEqual(complete[0]['args']['turn'], turn)
+        self.assertTrue(any(e['ph'] == 'M' for e in chrome['traceEvents']))
+        self.assertEqual(lines[0]['turn'], turn)
+
+    def test_streams_to_jsonl_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "live.jsonl")
+            tracer = Tracer(enabled=True, output_path=path)
+            tracer.record("voice.silence_wait", 0.0, 0.8)
+            with open(path, encoding='utf-8') as f:
+                line = json.loads(f.readline())
+        self.assertEqual(line['name'], "voice.silence_wait")
+        self.assertAlmostEqual(line['dur_ms'], 800, places=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
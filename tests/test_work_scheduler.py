@@ -0,0 +1,66 @@
+"""
+Unit Tests for priority scheduling and load shedding of background work
+"""
+
+import unittest
+import asyncio
+import threading
+import time
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.work_scheduler import WorkScheduler, WorkPriority
+
+
+class TestWorkScheduler(unittest.TestCase):
+    """Test deferral, shedding and accounting"""
+
+    def setUp(self):
+        self.cpu = 10.0
+        self.scheduler = WorkScheduler(cpu_threshold=75.0, poll_interval=0.01, cpu_sample_ttl=0.0,
+                                       cpu_sampler=lambda: self.cpu)
+
+    def test_idle_system_runs_immediately(self):
+        self.assertTrue(asyncio.run(self.scheduler.admit("vision_analysis")))
+        self.assertEqual(self.scheduler.stats()['jobs']['vision_analysis']['run'], 1)
+
+    def test_background_waits_for_interactive_turn(self):
+        """A job deferred by a user turn runs as soon as the turn ends"""
+        self.scheduler.begin_interactive()
+        threading.Timer(0.05, self.scheduler.end_interactive).start()
+
+        start = time.perf_counter()
+        admitted = asyncio.run(self.scheduler.admit("batch_learning", max_wait=1.0))
+
+        self.assertTrue(admitted)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.04)
+        self.assertEqual(self.scheduler.stats()['jobs']['batch_learning'], {'run': 1, 'deferred': 1, 'shed': 0, 'forced': 0})
+
+    def test_high_cpu_sheds_background_but_not_normal(self):
+        self.cpu = 95.0
+        self.assertFalse(asyncio.run(self.scheduler.admit("vision_analysis", max_wait=0.03)))
+        self.assertTrue(asyncio.run(self.scheduler.admit("memory_store", WorkPriority.NORMAL)))
+
+        stats = self.scheduler.stats()
+        self.assertEqual(stats['shed'], 1)
+        self.assertEqual(stats['deferred'], 1)
+
+    def test_unsheddable_job_runs_when_overdue(self):
+        with self.scheduler.interactive_turn():
+            admitted = self.scheduler.admit_blocking("document_ingestion", max_wait=0.03, sheddable=False)
+        self.assertTrue(admitted)
+        self.assertEqual(self.scheduler.stats()['jobs']['document_ingestion']['forced'], 1)
+        self.assertFalse(self.scheduler.interactive_active)
+
+    def test_interactive_is_never_deferred(self):
+        self.cpu = 100.0
+        with self.scheduler.interactive_turn():
+            self.assertIsNone(self.scheduler.busy_reason(WorkPriority.INTERACTIVE))
+            self.assertEqual(self.scheduler.busy_reason(WorkPriority.NORMAL), "interactive")
+
+
+if __name__ == '__main__':
+    unittest.main()
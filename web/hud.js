@@ -195,51 +195,49 @@ window.jarvis_hud = {
         const el = document.getElementById('response-text');
         // If it starts with JARVIS:, we might want to preserve it or just clear for streaming
         if (msg.startsWith('JARVIS: ')) {
-            window._currentResponseText = "";
             // Reset token streaming state for the new request
-            window._tokenBuffer = "";
-            window._isStreamingResponse = false;
+            window._stream = null;
         }
         fadeOut(el, 200, () => {
             el.innerText = msg;
             fadeIn(el, 400);
         });
     },
-    append_token: (token) => {
+    append_token: (chunk) => {
+        // Chunks arrive coalesced (several tokens per call), so the closing
+        // quote may sit anywhere inside a chunk - scan instead of comparing tokens.
         const el = document.getElementById('response-text');
-        
-        // Initialize if first token
-        if (!window._tokenBuffer) {
-            window._tokenBuffer = "";
-            window._isStreamingResponse = false;
-        }
-        
-        window._tokenBuffer += token;
-        
-        // Look for the start of the suggested_response content: "suggested_response": "
         const trigger = '"suggested_response": "';
-        if (!window._isStreamingResponse) {
-            const index = window._tokenBuffer.indexOf(trigger);
-            if (index !== -1) {
-                window._isStreamingResponse = true;
-                window._currentResponseText = "JARVIS: ";
-                // Everything after the trigger
-                window._currentResponseText += window._tokenBuffer.substring(index + trigger.length);
-            }
-        } else {
-            // We are already streaming the core response
-            // Stop if we hit the end quote (simple check)
-            if (token === '"' && !window._tokenBuffer.endsWith('\\"')) {
-                window._isStreamingResponse = false;
-            } else {
-                window._currentResponseText += token;
-            }
-        }
 
-        if (window._isStreamingResponse) {
-            el.innerText = window._currentResponseText;
+        if (!window._stream) {
+            window._stream = { buffer: "", cursor: -1, node: null, done: false };
+        }
+        const s = window._stream;
+        if (s.done) return;
+        s.buffer += chunk;
+
+        // Wait for the start of the suggested_response content
+        if (s.cursor < 0) {
+            const index = s.buffer.indexOf(trigger);
+            if (index === -1) return;
+            s.cursor = index + trigger.length;
+            // A single text node that we append to - avoids re-rendering the whole element
+            s.node = document.createTextNode("JARVIS: ");
+            el.replaceChildren(s.node);
             el.style.opacity = 1;
         }
+
+        let out = "";
+        while (s.cursor < s.buffer.length) {
+            const c = s.buffer[s.cursor];
+            if (c === '"' && s.buffer[s.cursor - 1] !== '\\') {
+                s.done = true;
+                break;
+            }
+            out += c;
+            s.cursor++;
+        }
+        if (out) s.node.appendData(out);
     },
     update_waveform: (level) => {
         // Boost level for visibility